@@ -1,6 +1,8 @@
 import streamlit as st
 import sqlite3
 import os
+import ids
+import numeric_columns
 
 # Logo zur Sidebar hinzufügen
 from config import add_logo
@@ -14,14 +16,14 @@ c = conn.cursor()
 def create_tables():
     c.execute('''
     CREATE TABLE IF NOT EXISTS locations (
-        id TEXT PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
         erfasser TEXT,
         datum TEXT,
         standort TEXT,
         stadt TEXT,
         lat REAL,
         lng REAL,
-        leistungswert TEXT,
+        leistungswert REAL CHECK (typeof(leistungswert) IN ('real', 'integer', 'null')),
         eigentuemer TEXT,
         umruestung BOOLEAN,
         alte_nummer TEXT,
@@ -29,25 +31,29 @@ def create_tables():
         vermarktungsform TEXT,
         status TEXT,
         current_step TEXT,
-        created_at TEXT
+        created_at TEXT,
+        pk INTEGER PRIMARY KEY AUTOINCREMENT
     )
     ''')
     
     c.execute('''
     CREATE TABLE IF NOT EXISTS workflow_history (
-        id TEXT PRIMARY KEY,
-        location_id TEXT,
+        id TEXT NOT NULL UNIQUE,
+        location_id INTEGER,
         step TEXT,
         status TEXT,
         comment TEXT,
         user TEXT,
         timestamp TEXT,
-        FOREIGN KEY (location_id) REFERENCES locations (id)
+        pk INTEGER PRIMARY KEY,
+        FOREIGN KEY (location_id) REFERENCES locations (pk)
     )
     ''')
     conn.commit()
 
 create_tables()
+ids.ensure_integer_keys(conn)
+numeric_columns.ensure_numeric_columns(conn)
 
 # CSS für optimiertes Layout
 st.markdown("""
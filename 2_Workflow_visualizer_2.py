@@ -1,5 +1,5 @@
 import streamlit as st
-import graphviz
+import workflow_graph
 
 st.title("Workflow der Digitalen Säule")
 
@@ -9,53 +9,8 @@ st.write("""Die Digitale Säule unterscheidet sich von anderen Vermarktungsforme
 2. **Workflow**: Überspringt den Niederlassungsleiter im Genehmigungsprozess
 """)
 
-# Graphviz Diagramm erstellen
-graph = graphviz.Digraph()
-graph.attr(rankdir='TB')  # Vertikale Ausrichtung (Top to Bottom)
-
-# Knoten mit Farbgebung definieren
-# Haupt-Workflow-Schritte in Blau
-graph.node('A', 'Erfassung durch Akquisiteur', shape='box', style='filled', fillcolor='#D6EAF8', color='#2E86C1')
-graph.node('B', 'Leiter Akquisitionsmanagement', shape='box', style='filled', fillcolor='#D6EAF8', color='#2E86C1')
-graph.node('D', 'Baurecht', shape='box', style='filled', fillcolor='#D6EAF8', color='#2E86C1')
-graph.node('F', 'CEO', shape='box', style='filled', fillcolor='#D6EAF8', color='#2E86C1')
-graph.node('G', 'Bauteam', shape='box', style='filled', fillcolor='#D6EAF8', color='#2E86C1')
-graph.node('H', 'Fertigstellung', shape='box', style='filled', fillcolor='#D4EFDF', color='#27AE60')  # Grün für Abschluss
-
-# Entscheidungsknoten in Gelb
-graph.node('E', 'Klage/Widerspruch?', shape='diamond', style='filled', fillcolor='#FCF3CF', color='#F1C40F')
-graph.node('E1', 'Klage-/Widerspruchsverfahren', shape='box', style='filled', fillcolor='#FDEBD0', color='#F39C12')
-
-# Prozessabbrüche in Rot
-graph.node('X1', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='#FADBD8', color='#E74C3C')
-graph.node('X2', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='#FADBD8', color='#E74C3C')
-graph.node('X3', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='#FADBD8', color='#E74C3C')
-graph.node('X4', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='#FADBD8', color='#E74C3C')
-
-# Kanten definieren
-graph.edge('A', 'B')
-graph.edge('B', 'D', label='Genehmigung', color='#27AE60', penwidth='2.0')
-graph.edge('B', 'X1', label='Ablehnung', color='#E74C3C', penwidth='2.0')
-graph.edge('D', 'F', label='Bauantrag genehmigt', color='#27AE60', penwidth='2.0')
-graph.edge('D', 'E', label='Bauantrag abgelehnt', color='#E74C3C', penwidth='2.0')
-graph.edge('E', 'E1', label='Ja', color='#F39C12', penwidth='2.0')
-graph.edge('E', 'X2', label='Nein', color='#E74C3C', penwidth='2.0')
-graph.edge('E1', 'F', label='Erfolg', color='#27AE60', penwidth='2.0')
-graph.edge('E1', 'X3', label='Misserfolg', color='#E74C3C', penwidth='2.0')
-graph.edge('F', 'G', label='Genehmigung', color='#27AE60', penwidth='2.0')
-graph.edge('F', 'X4', label='Ablehnung', color='#E74C3C', penwidth='2.0')
-graph.edge('G', 'H', label='Aufbau + Stromanschluss', color='#27AE60', penwidth='2.0')
-
-# Hinweis auf übersprungenen Schritt mit Farbakzent
-graph.attr(label='Hinweis: Niederlassungsleiter wird übersprungen', labelloc='t', fontcolor='#3498DB', fontsize='16')
-
-# Übersprungenen Schritt als gestrichelte Box anzeigen - neben dem Hauptpfad
-graph.node('C', 'Niederlassungsleiter\n(übersprungen)', shape='box', style='dashed,filled', fillcolor='#EBF5FB', color='#85C1E9')
-graph.edge('C', 'X1', style='invis')  # Unsichtbare Kante zur korrekten Positionierung
-
-# Gestrichelte Linien für den übersprungenen Pfad
-graph.edge('B', 'C', label='Standard-\nWorkflow', style='dashed', color='#85C1E9')
-graph.edge('C', 'D', label='Standard-\nWorkflow', style='dashed', color='#85C1E9')
+# Graphviz-Quelltext aus der gemeinsamen Workflow-Definition (einmal gebaut und gecacht)
+graph = workflow_graph.cached_graphviz_source()
 
 # Graph anzeigen mit Größenanpassung
 st.graphviz_chart(graph, use_container_width=True)
@@ -1,6 +1,6 @@
 import streamlit as st
 from streamlit_agraph import agraph, Node, Edge, Config
-import graphviz
+import workflow_graph
 
 def main():
     st.title("Workflow der Digitalen Säule")
@@ -26,42 +26,8 @@ def main():
         show_agraph_workflow()
 
 def show_graphviz_workflow():
-    # Graphviz Diagramm erstellen
-    graph = graphviz.Digraph()
-    graph.attr(rankdir='TB')
-    
-    # Knoten definieren
-    graph.node('A', 'Erfassung durch Akquisiteur', shape='box')
-    graph.node('B', 'Leiter Akquisitionsmanagement', shape='box')
-    graph.node('D', 'Baurecht', shape='box')
-    graph.node('E', 'Klage/Widerspruch?', shape='diamond')
-    graph.node('E1', 'Klage-/Widerspruchsverfahren', shape='box')
-    graph.node('F', 'CEO', shape='box')
-    graph.node('G', 'Bauteam', shape='box')
-    graph.node('H', 'Fertigstellung', shape='box')
-    graph.node('X1', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='lightgray')
-    graph.node('X2', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='lightgray')
-    graph.node('X3', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='lightgray')
-    graph.node('X4', 'Prozess unterbrochen', shape='ellipse', style='filled', fillcolor='lightgray')
-    
-    # Kanten definieren
-    graph.edge('A', 'B')
-    graph.edge('B', 'D', label='Genehmigung')
-    graph.edge('B', 'X1', label='Ablehnung')
-    graph.edge('D', 'F', label='Bauantrag genehmigt')
-    graph.edge('D', 'E', label='Bauantrag abgelehnt')
-    graph.edge('E', 'E1', label='Ja')
-    graph.edge('E', 'X2', label='Nein')
-    graph.edge('E1', 'F', label='Erfolg')
-    graph.edge('E1', 'X3', label='Misserfolg')
-    graph.edge('F', 'G', label='Genehmigung')
-    graph.edge('F', 'X4', label='Ablehnung')
-    graph.edge('G', 'H', label='Aufbau + Stromanschluss')
-    
-    # Hinweis auf übersprungenen Schritt
-    graph.attr(label='Hinweis: Niederlassungsleiter wird übersprungen', labelloc='t')
-    
-    st.graphviz_chart(graph)
+    # Graphviz-Diagramm aus der gemeinsamen Workflow-Definition (einmal gebaut und gecacht)
+    st.graphviz_chart(workflow_graph.cached_graphviz_source())
     
     st.info("""
     **Wichtig:** Bei der Digitalen Säule wird der Workflow-Schritt 'Niederlassungsleiter' 
@@ -70,17 +36,23 @@ def show_graphviz_workflow():
     """)
 
 def show_agraph_workflow():
-    # Knoten erstellen
-    nodes = [
-        Node(id="A", label="Erfassung durch Akquisiteur", size=25),
-        Node(id="B", label="Leiter Akquisitionsmanagement", size=25),
-        Node(id="D", label="Baurecht", size=25),
-        Node(id="E", label="Klage/Widerspruch?", size=20, symbolType="diamond"),
-        Node(id="E1", label="Klage-/Widerspruchsverfahren", size=25),
-        Node(id="F", label="CEO", size=25),
-        Node(id="G", label="Bauteam", size=25),
-        Node(id="H", label="Fertigstellung", size=25),
-        Node(id="X1", label="Prozess unterbrochen", size=20, color="lightgray"),
-        Node(id="X2", label="Prozess unterbrochen", size=20, color="lightgray"),
-        Node(id="X3", label)
-    ]
\ No newline at end of file
+    # Knoten und Kanten aus der gemeinsamen Workflow-Definition erstellen
+    nodes = []
+    for node_id, attrs in workflow_graph.NODES.items():
+        if node_id.startswith('X'):
+            nodes.append(Node(id=node_id, label=attrs['label'], size=20, color="lightgray"))
+        elif attrs['shape'] == 'diamond':
+            nodes.append(Node(id=node_id, label=attrs['label'], size=20, symbolType="diamond"))
+        else:
+            nodes.append(Node(id=node_id, label=attrs['label'], size=25, color=attrs['color']))
+    
+    edges = [
+        Edge(source=source, target=target, label=attrs.get('label', ''), color=attrs['color'])
+        for source, target, attrs in workflow_graph.EDGES
+    ]
+    
+    config = Config(width=900, height=600, directed=True, hierarchical=True)
+    agraph(nodes=nodes, edges=edges, config=config)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+from datetime import datetime
+
+import pandas as pd
+
+import ids
+import timestamps
+
+# SLA in Tagen je Prozessschritt (maximale Verweildauer, bevor ein Standort als überfällig gilt)
+SLA_DAYS = {
+    'leiter_akquisition': 5,
+    'niederlassungsleiter': 5,
+    'baurecht': 60,
+    'widerspruch': 90,
+    'ceo': 7,
+    'bauteam': 45,
+    'fertigstellung': 10,
+}
+
+# Historien-Status, mit denen ein Standort einen Schritt verlässt
+# ('submitted' und 'updated' sind Zwischenstände innerhalb eines Schritts)
+TRANSITION_STATUSES = ('completed', 'approved', 'rejected', 'objection')
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+# Index für die Suche des Eintrittszeitpunkts je Standort (samt der Epoch-Spalten, mit denen gerechnet wird)
+def ensure_history_index(conn):
+    ids.ensure_integer_keys(conn)
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_history_location_time
+    ON workflow_history (location_id, timestamp)
+    ''')
+    conn.commit()
+    timestamps.ensure_epoch_columns(conn)
+
+
+def load_aging(conn, now=None, location_id=None):
+    """
+    Verweildauer im aktuellen Schritt für alle aktiven Standorte in einem Durchlauf berechnen.
+    Eintrittszeitpunkt ist der letzte Historien-Eintrag eines anderen Schritts (sonst created_at).
+    Benötigt die Epoch-Spalten (timestamps.ensure_epoch_columns).
+    location_id: nur diesen Standort laden (Abfrage über den Primärschlüssel)
+    Returns: DataFrame mit id, standort, stadt, current_step, vermarktungsform, entered_at
+             (Epoch-Sekunden), age_days, sla_days, sla_breach
+    """
+    rows = conn.execute(f'''
+    SELECT l.id, l.standort, l.stadt, l.current_step, l.vermarktungsform, l.created_at_epoch,
+           (SELECT MAX(h.timestamp_epoch)
+            FROM workflow_history h
+            WHERE h.location_id = l.pk AND h.step != l.current_step) AS entered_at
+    FROM locations l
+    WHERE l.status = 'active' AND l.current_step != 'fertig'{' AND l.id = ?' if location_id is not None else ''}
+    ''', () if location_id is None else (location_id,)).fetchall()
+
+    df = pd.DataFrame(rows, columns=[
+        'id', 'standort', 'stadt', 'current_step', 'vermarktungsform', 'created_at', 'entered_at'
+    ])
+    if df.empty:
+        df['age_days'] = pd.Series(dtype=float)
+        df['sla_days'] = pd.Series(dtype=float)
+        df['sla_breach'] = pd.Series(dtype=bool)
+        return df
+
+    now = timestamps.to_epoch(pd.Timestamp(now or datetime.now()))
+    entered = df['entered_at'].astype(float).fillna(df['created_at'].astype(float))
+
+    df['entered_at'] = entered
+    df['age_days'] = timestamps.days_between(entered, now).round(1)
+    df['sla_days'] = df['current_step'].map(SLA_DAYS).astype(float)
+    df['sla_breach'] = (df['age_days'] > df['sla_days']).fillna(False)
+    return df.drop(columns=['created_at'])
+
+
+def load_step_durations(conn):
+    """
+    Abgeschlossene Verweildauern je Schritt aus der Historie berechnen (aktive und archivierte
+    Standorte). Dauer eines Schritts = Zeit zwischen dem vorherigen Übergang (bzw. created_at) und
+    dem Übergang, mit dem der Standort den Schritt verlassen hat. Rechnet nur mit den Epoch-Spalten.
+    Returns: DataFrame mit location_id (locations.pk), step, vermarktungsform, status, days
+    """
+    import archive
+
+    placeholders = ", ".join(["?" for _ in TRANSITION_STATUSES])
+    rows = []
+    for history, locations in archive.history_tables(conn):
+        rows += conn.execute(f'''
+        SELECT h.location_id, h.step, h.status, h.timestamp_epoch, l.created_at_epoch, l.vermarktungsform
+        FROM {history} h
+        JOIN {locations} l ON l.pk = h.location_id
+        WHERE h.status IN ({placeholders})
+        ORDER BY h.location_id, h.timestamp_epoch
+        ''', TRANSITION_STATUSES).fetchall()
+
+    df = pd.DataFrame(rows, columns=[
+        'location_id', 'step', 'status', 'timestamp', 'created_at', 'vermarktungsform'
+    ])
+    if df.empty:
+        return pd.DataFrame(columns=['location_id', 'step', 'vermarktungsform', 'status', 'days'])
+
+    ts = df['timestamp'].astype(float)
+    previous = ts.groupby(df['location_id']).shift(1)
+    previous = previous.fillna(df['created_at'].astype(float))
+
+    df['days'] = timestamps.days_between(previous, ts)
+    # Die Erfassung selbst hat keine Wartezeit
+    df = df[(df['step'] != 'erfassung') & df['days'].notna()].copy()
+    df['days'] = df['days'].clip(lower=0)
+    return df[['location_id', 'step', 'vermarktungsform', 'status', 'days']].reset_index(drop=True)
+
+
+def latency_percentiles(durations, by=('step',), value='days'):
+    """
+    P50/P90/P99 je Gruppe (z.B. Schritt oder Schritt und Vermarktungsform).
+    Returns: DataFrame mit den Gruppierungsspalten, anzahl, p50, p90, p99
+    """
+    by = list(by)
+    if durations.empty:
+        return pd.DataFrame(columns=by + ['anzahl', 'p50', 'p90', 'p99'])
+
+    grouped = durations.groupby(by)[value]
+    result = grouped.quantile(list(PERCENTILES)).unstack()
+    result.columns = [f"p{int(round(q * 100))}" for q in PERCENTILES]
+    result.insert(0, 'anzahl', grouped.size())
+    return result.round(1).reset_index()
+
+
+def sla_summary(aging):
+    """
+    Übersicht je Schritt: Anzahl aktiver Standorte, Überschreitungen und Warteschlangen-Alter.
+    Sortiert nach Anzahl der SLA-Verletzungen, der Engpass steht also oben.
+    """
+    if aging.empty:
+        return pd.DataFrame(columns=['current_step', 'anzahl', 'sla_days', 'ueberfaellig',
+                                     'quote', 'p50', 'p90', 'p99', 'max'])
+
+    grouped = aging.groupby('current_step')
+    summary = pd.DataFrame({
+        'anzahl': grouped.size(),
+        'sla_days': grouped['sla_days'].first(),
+        'ueberfaellig': grouped['sla_breach'].sum().astype(int),
+    })
+    summary['quote'] = (summary['ueberfaellig'] / summary['anzahl'] * 100).round(1)
+    percentiles = grouped['age_days'].quantile(list(PERCENTILES)).unstack()
+    percentiles.columns = [f"p{int(round(q * 100))}" for q in PERCENTILES]
+    summary = summary.join(percentiles.round(1))
+    summary['max'] = grouped['age_days'].max()
+    summary = summary.sort_values(['ueberfaellig', 'p90'], ascending=False)
+    return summary.reset_index()
+
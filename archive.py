@@ -0,0 +1,247 @@
+"""
+Archivierung abgeschlossener Workflows (fertig, abgelehnt, abgebrochen).
+
+Standorte in einem Endzustand, deren letzte Aktivität älter als N Tage ist, werden samt
+Historie aus den Tabellen locations/workflow_history in locations_archive/
+workflow_history_archive verschoben. Für die Dashboard-Summen bleibt je Tag, Vermarktungsform,
+Status und Schritt eine Summenzeile in locations_archive_summary stehen.
+
+Auswertungen über abgeschlossene Fälle (Verweildauern, Prozesssimulation, Prognose, Process
+Mining) lesen über history_tables aktive und archivierte Historie. Die Kommentare im Archiv
+bleiben in der Volltextsuche (history_archive_fts, siehe search.py).
+
+Aufruf:
+    python archive.py                # Standard: älter als ARCHIVE_AFTER_DAYS
+    python archive.py --days 90
+"""
+import argparse
+import sqlite3
+from datetime import datetime
+
+import ids
+import schema
+import timestamps
+
+ARCHIVE_AFTER_DAYS = 180
+BATCH_SIZE = 1000
+
+TERMINAL_STATUSES = ('rejected', 'completed')
+TERMINAL_STEPS = ('fertig', 'abgelehnt', 'abgebrochen')
+
+HISTORY_COLUMNS = ('id', 'location_id', 'step', 'status', 'comment', 'user', 'timestamp')
+
+
+def ensure_archive(conn):
+    """
+    Archiv- und Summentabellen anlegen und die Archivspalten an locations angleichen.
+    """
+    ids.ensure_integer_keys(conn)
+    timestamps.ensure_epoch_columns(conn)
+    # Spalten explizit statt *, damit generierte Spalten (timestamps) nicht als normale Spalten kopiert werden
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS locations_archive AS
+    SELECT {', '.join(schema.table_columns(conn, 'locations'))} FROM locations WHERE 0
+    ''')
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS workflow_history_archive AS
+    SELECT {', '.join(HISTORY_COLUMNS)} FROM workflow_history WHERE 0
+    ''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_archive_id ON locations_archive (id)')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_history_archive_location
+    ON workflow_history_archive (location_id, timestamp)
+    ''')
+    # Summen je Erfassungstag; created_at enthält hier nur das Datum (YYYY-MM-DD), damit
+    # die Filter des Dashboards unverändert auf die Summentabelle passen
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS locations_archive_summary (
+        created_at TEXT NOT NULL,
+        vermarktungsform TEXT NOT NULL,
+        status TEXT NOT NULL,
+        current_step TEXT NOT NULL,
+        anzahl INTEGER NOT NULL,
+        PRIMARY KEY (created_at, vermarktungsform, status, current_step)
+    )
+    ''')
+    conn.commit()
+
+    # Spalten, die locations später per ALTER TABLE bekommen hat, auch im Archiv ergänzen
+    types = {row[1]: row[2] or 'TEXT' for row in conn.execute("PRAGMA table_info(locations)")}
+    schema.ensure_columns(conn, 'locations_archive', types)
+    schema.ensure_columns(conn, 'locations_archive', {'archived_at': 'TEXT'})
+    # Verweis der archivierten Historie (workflow_history_archive.location_id)
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_archive_pk ON locations_archive (pk)')
+    for table in ('locations_archive', 'workflow_history_archive', 'locations_archive_summary'):
+        timestamps.add_epoch_columns(conn, table)
+
+    import search
+    search.ensure_search_index(conn)
+
+
+def _candidates(conn, cutoff, batch_size):
+    status_placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+    step_placeholders = ", ".join("?" for _ in TERMINAL_STEPS)
+    rows = conn.execute(f'''
+    SELECT l.id
+    FROM locations l
+    WHERE (l.status IN ({status_placeholders}) OR l.current_step IN ({step_placeholders}))
+      AND COALESCE((SELECT MAX(h.timestamp_epoch) FROM workflow_history h WHERE h.location_id = l.pk),
+                   l.created_at_epoch) < ?
+    LIMIT ?
+    ''', (*TERMINAL_STATUSES, *TERMINAL_STEPS, cutoff, batch_size)).fetchall()
+    return [row[0] for row in rows]
+
+
+def archive_batch(conn, ids):
+    """
+    Standorte mit den gegebenen IDs samt Historie in einer Transaktion ins Archiv verschieben.
+    pk wird mitkopiert, die archivierte Historie verweist also weiter auf denselben Schlüssel.
+    """
+    columns = ", ".join(schema.table_columns(conn, 'locations'))
+    history_columns = ", ".join(HISTORY_COLUMNS)
+    now = datetime.now().isoformat()
+
+    try:
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_ids (id TEXT PRIMARY KEY)')
+        conn.execute('DELETE FROM archive_ids')
+        conn.executemany('INSERT INTO archive_ids VALUES (?)', [(id_,) for id_ in ids])
+
+        conn.execute(f'''
+        INSERT OR REPLACE INTO locations_archive ({columns}, archived_at)
+        SELECT {columns}, ? FROM locations WHERE id IN (SELECT id FROM archive_ids)
+        ''', (now,))
+        conn.execute(f'''
+        INSERT INTO workflow_history_archive ({history_columns})
+        SELECT {history_columns} FROM workflow_history
+        WHERE location_id IN (SELECT pk FROM locations WHERE id IN (SELECT id FROM archive_ids))
+        ''')
+        conn.execute('''
+        INSERT INTO locations_archive_summary (created_at, vermarktungsform, status, current_step, anzahl)
+        SELECT substr(COALESCE(created_at, ''), 1, 10), COALESCE(vermarktungsform, ''),
+               COALESCE(status, ''), COALESCE(current_step, ''), COUNT(*)
+        FROM locations
+        WHERE id IN (SELECT id FROM archive_ids)
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (created_at, vermarktungsform, status, current_step)
+        DO UPDATE SET anzahl = anzahl + excluded.anzahl
+        ''')
+        conn.execute('''
+        DELETE FROM workflow_history
+        WHERE location_id IN (SELECT pk FROM locations WHERE id IN (SELECT id FROM archive_ids))
+        ''')
+        conn.execute('DELETE FROM locations WHERE id IN (SELECT id FROM archive_ids)')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(ids)
+
+
+def archive_terminal(conn, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, on_batch=None):
+    """
+    Alle abgeschlossenen Workflows, deren letzte Aktivität älter als older_than_days ist,
+    in Batches archivieren (jede Batch ist eine eigene Transaktion).
+    on_batch: optionale Funktion, die nach jeder Batch die bisherige Anzahl erhält
+    Returns: Anzahl archivierter Standorte
+    """
+    ensure_archive(conn)
+    cutoff = timestamps.since(older_than_days)
+    archived = 0
+    while True:
+        ids = _candidates(conn, cutoff, batch_size)
+        if not ids:
+            break
+        archived += archive_batch(conn, ids)
+        if on_batch:
+            on_batch(archived)
+    return archived
+
+
+def _has_archive(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'locations_archive_summary'"
+    ).fetchone() is not None
+
+
+def history_tables(conn):
+    """
+    Historientabellen mit der jeweils zugehörigen Standorttabelle, aktiv und (falls vorhanden)
+    archiviert. Ein archivierter Standort hat seine gesamte Historie im Archiv, die Paare
+    überschneiden sich also nicht.
+    Returns: Liste von (Historientabelle, Standorttabelle)
+    """
+    tables = [('workflow_history', 'locations')]
+    if _has_archive(conn):
+        tables.append(('workflow_history_archive', 'locations_archive'))
+    return tables
+
+
+def archived_counts(conn, query_suffix="", params=()):
+    """
+    Anzahl archivierter Standorte je Vermarktungsform, Status und Schritt für dieselben Filter
+    wie auf locations (created_at_epoch, vermarktungsform). Zeitfilter wirken auf Tagesebene.
+    Returns: Liste von (vermarktungsform, status, current_step, anzahl)
+    """
+    if not _has_archive(conn):
+        return []
+    return conn.execute(f'''
+    SELECT vermarktungsform, status, current_step, SUM(anzahl)
+    FROM locations_archive_summary{query_suffix}
+    GROUP BY vermarktungsform, status, current_step
+    ''', list(params)).fetchall()
+
+
+def archived_forms(conn):
+    if not _has_archive(conn):
+        return []
+    return [row[0] for row in conn.execute(
+        "SELECT DISTINCT vermarktungsform FROM locations_archive_summary WHERE vermarktungsform != ''"
+    )]
+
+
+def load_archived(conn, location_id, columns):
+    """
+    Einzelnen archivierten Standort lesen (für Detailansichten, ohne ihn zurückzuverschieben).
+    Returns: Zeile mit den angefragten Spalten oder None
+    """
+    if not _has_archive(conn):
+        return None
+    return conn.execute(
+        f"SELECT {', '.join(columns)} FROM locations_archive WHERE id = ?", (location_id,)
+    ).fetchone()
+
+
+def load_history(conn, location_id):
+    """
+    Workflow-Historie eines Standorts, bei archivierten Standorten aus dem Archiv.
+    Returns: Liste von (step, status, comment, user, timestamp_epoch), zeitlich sortiert
+    """
+    query = '''
+    SELECT step, status, comment, user, timestamp_epoch
+    FROM {table}
+    WHERE location_id = (SELECT pk FROM {locations} WHERE id = ?)
+    ORDER BY timestamp_epoch ASC
+    '''
+    rows = conn.execute(query.format(table='workflow_history', locations='locations'), (location_id,)).fetchall()
+    if rows or not _has_archive(conn):
+        return rows
+    return conn.execute(query.format(table='workflow_history_archive', locations='locations_archive'),
+                        (location_id,)).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Abgeschlossene Workflows archivieren.")
+    parser.add_argument("--db", default="werbetraeger.db", help="Pfad zur Datenbank")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="Mindestalter der letzten Aktivität in Tagen")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        archived = archive_terminal(conn, args.days)
+    finally:
+        conn.close()
+    print(f"{archived} Standorte archiviert.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import csv
+import io
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+import pandas as pd
+
+import ids
+import notifications
+import numeric_columns
+
+# Zielspalten und akzeptierte Spaltenüberschriften in der Importdatei (Vergleich ohne Groß-/Kleinschreibung)
+COLUMN_ALIASES = {
+    'erfasser': ('erfasser', 'name des erfassers', 'name'),
+    'datum': ('datum', 'datum der akquisition'),
+    'standort': ('standort', 'standortbezeichnung', 'straße', 'strasse'),
+    'stadt': ('stadt', 'ort'),
+    'lat': ('lat', 'breitengrad'),
+    'lng': ('lng', 'lon', 'längengrad', 'laengengrad'),
+    'leistungswert': ('leistungswert',),
+    'eigentuemer': ('eigentuemer', 'eigentümer'),
+    'umruestung': ('umruestung', 'umrüstung', 'art'),
+    'alte_nummer': ('alte_nummer', 'alte werbeträgernummer', 'alte nummer'),
+    'seiten': ('seiten', 'anzahl der seiten'),
+    'vermarktungsform': ('vermarktungsform',),
+}
+
+REQUIRED_COLUMNS = ('erfasser', 'standort', 'stadt', 'lat', 'lng', 'seiten', 'vermarktungsform')
+
+SEITEN_OPTIONS = ('einseitig', 'doppelseitig', 'dreiseitig')
+
+# Werte, die in der Spalte Umrüstung als "ja" gelten
+UMRUESTUNG_TRUE = {'umrüstung', 'umruestung', 'ja', 'j', 'yes', 'true', 'wahr', '1', 'x'}
+
+# Koordinatenbereich Deutschland (großzügig gerundet)
+LAT_RANGE = (47.0, 55.5)
+LNG_RANGE = (5.5, 15.5)
+
+CHUNK_SIZE = 5000
+
+INSERT_LOCATION = '''
+INSERT INTO locations (id, erfasser, datum, standort, stadt, lat, lng,
+                      leistungswert, eigentuemer, umruestung, alte_nummer,
+                      seiten, vermarktungsform, status, current_step, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_HISTORY = '''
+INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
+'''
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    rejected: pd.DataFrame
+    duration: float
+
+
+def _alias_map():
+    return {alias: column for column, aliases in COLUMN_ALIASES.items() for alias in aliases}
+
+
+def normalize(chunk):
+    """
+    Spaltenüberschriften auf die Zielspalten abbilden und Textwerte bereinigen.
+    Unbekannte Spalten werden verworfen, fehlende als leer ergänzt.
+    """
+    aliases = _alias_map()
+    renamed = {}
+    for column in chunk.columns:
+        target = aliases.get(str(column).strip().lower())
+        if target and target not in renamed.values():
+            renamed[column] = target
+
+    df = chunk[list(renamed)].rename(columns=renamed)
+    for column in COLUMN_ALIASES:
+        if column not in df.columns:
+            df[column] = ''
+    df = df[list(COLUMN_ALIASES)].fillna('').astype(str)
+    return df.apply(lambda column: column.str.strip())
+
+
+def validate(df):
+    """
+    Alle Zeilen eines Blocks spaltenweise prüfen und in gültige Zeilen und Ablehnungen aufteilen.
+    Returns: (gültige Zeilen mit typisierten Werten, DataFrame mit zeile und fehler)
+    """
+    errors = pd.Series('', index=df.index)
+
+    def reject(mask, message):
+        nonlocal errors
+        errors = errors.where(~mask, errors + message + '; ')
+
+    for column in REQUIRED_COLUMNS:
+        reject(df[column] == '', f"Pflichtfeld '{column}' fehlt")
+
+    lat = pd.to_numeric(df['lat'].str.replace(',', '.', regex=False), errors='coerce')
+    lng = pd.to_numeric(df['lng'].str.replace(',', '.', regex=False), errors='coerce')
+    reject((df['lat'] != '') & lat.isna(), "Breitengrad ist keine Zahl")
+    reject((df['lng'] != '') & lng.isna(), "Längengrad ist keine Zahl")
+    reject(lat.notna() & ~lat.between(*LAT_RANGE), "Breitengrad außerhalb Deutschlands")
+    reject(lng.notna() & ~lng.between(*LNG_RANGE), "Längengrad außerhalb Deutschlands")
+
+    leistungswert, leistungswert_errors = numeric_columns.parse_series(df['leistungswert'])
+    reject(leistungswert_errors != '', "Leistungswert ist keine gültige Zahl")
+
+    seiten = df['seiten'].str.lower()
+    reject((seiten != '') & ~seiten.isin(SEITEN_OPTIONS), "Seiten muss einseitig, doppelseitig oder dreiseitig sein")
+    reject((seiten == 'dreiseitig') & (df['vermarktungsform'] != 'Digitale Säule'),
+           "dreiseitig ist nur bei der Digitalen Säule möglich")
+
+    umruestung = df['umruestung'].str.lower().isin(UMRUESTUNG_TRUE)
+    reject(umruestung & (df['alte_nummer'] == ''), "Alte Werbeträgernummer fehlt bei Umrüstung")
+
+    # ISO (2025-07-01) oder deutsches Format (01.07.2025)
+    datum = pd.to_datetime(df['datum'], errors='coerce', format='ISO8601')
+    datum = datum.fillna(pd.to_datetime(df['datum'], errors='coerce', format='%d.%m.%Y'))
+    reject((df['datum'] != '') & datum.isna(), "Datum ungültig")
+
+    valid = errors == ''
+    rejected = pd.DataFrame({'fehler': errors[~valid].str.rstrip('; ')})
+
+    result = df[valid].copy()
+    result['lat'] = lat[valid]
+    result['lng'] = lng[valid]
+    result['leistungswert'] = leistungswert[valid].astype(object).where(leistungswert[valid].notna(), None)
+    result['seiten'] = seiten[valid]
+    result['umruestung'] = umruestung[valid]
+    result['alte_nummer'] = result['alte_nummer'].where(result['umruestung'], '')
+    result['eigentuemer'] = result['eigentuemer'].str.lower().map(
+        lambda value: 'Stadt' if value == 'stadt' else 'Privater Eigentümer'
+    )
+    result['datum'] = datum[valid].dt.strftime('%Y-%m-%d').where(datum[valid].notna(), datetime.now().date().isoformat())
+    return result, rejected
+
+
+def _iter_csv(source, chunksize):
+    text = source.read()
+    if isinstance(text, bytes):
+        text = text.decode('utf-8-sig')
+    try:
+        delimiter = csv.Sniffer().sniff(text[:4096], delimiters=';,\t').delimiter
+    except csv.Error:
+        delimiter = ';'
+    yield from pd.read_csv(io.StringIO(text), sep=delimiter, dtype=str, keep_default_na=False,
+                           chunksize=chunksize)
+
+
+def _iter_excel(source, chunksize):
+    # openpyxl erst hier laden, es wird nur für Excel-Dateien benötigt
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value or '').strip() for value in next(rows, [])]
+        batch = []
+        for row in rows:
+            batch.append(['' if value is None else value for value in row])
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def read_chunks(source, filename, chunksize=CHUNK_SIZE):
+    """
+    Importdatei blockweise lesen (CSV mit ; , oder Tab als Trennzeichen, oder XLSX).
+    source: Dateipfad oder dateiartiges Objekt (z.B. Streamlit-Upload)
+    """
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return _iter_excel(source, chunksize)
+    if isinstance(source, str):
+        source = open(source, 'rb')
+    return _iter_csv(source, chunksize)
+
+
+def _parameters(valid, user, now):
+    location_rows = []
+    history_rows = []
+    for row in valid.itertuples(index=False):
+        location_id = ids.new_id()
+        location_rows.append((
+            location_id, row.erfasser, row.datum, row.standort, row.stadt, row.lat, row.lng,
+            row.leistungswert, row.eigentuemer, row.umruestung, row.alte_nummer,
+            row.seiten, row.vermarktungsform, "active", "leiter_akquisition", now
+        ))
+        history_rows.append((
+            ids.new_id(), location_id, "erfassung", "completed",
+            "Standort per Massenimport erfasst", user or row.erfasser, now
+        ))
+    return location_rows, history_rows
+
+
+def import_locations(conn, source, filename, user=None, chunksize=CHUNK_SIZE):
+    """
+    Standorte aus CSV/XLSX importieren: blockweise lesen und prüfen, gültige Zeilen samt
+    Erfassungs-Eintrag in der Historie per executemany in einer einzigen Transaktion schreiben.
+    Bei einem Datenbankfehler wird der gesamte Import zurückgerollt.
+    Returns: ImportResult mit Anzahl importierter Zeilen, Ablehnungen (zeile, fehler, Originalwerte) und Dauer
+    """
+    start = time.perf_counter()
+    now = datetime.now().isoformat()
+    imported = 0
+    rejects = []
+    offset = 0
+
+    try:
+        for chunk in read_chunks(source, filename, chunksize):
+            df = normalize(chunk)
+            # Zeilennummer wie in der Tabellenkalkulation (Kopfzeile = 1)
+            df.index = range(offset + 2, offset + 2 + len(df))
+            offset += len(df)
+
+            valid, rejected = validate(df)
+            if not rejected.empty:
+                rejects.append(rejected.join(df))
+
+            location_rows, history_rows = _parameters(valid, user, now)
+            conn.executemany(INSERT_LOCATION, location_rows)
+            conn.executemany(INSERT_HISTORY, history_rows)
+            notifications.enqueue_many(conn, [
+                (notifications.STEP_RECIPIENTS['leiter_akquisition'], row[0], 'leiter_akquisition',
+                 "Standort per Massenimport erfasst")
+                for row in location_rows
+            ])
+            imported += len(location_rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    rejected = pd.concat(rejects) if rejects else pd.DataFrame(columns=['fehler'] + list(COLUMN_ALIASES))
+    rejected = rejected.rename_axis('zeile').reset_index()
+    return ImportResult(imported, rejected, time.perf_counter() - start)
+
+
+def reject_report(rejected):
+    """
+    Ablehnungsbericht als CSV (Semikolon, UTF-8 mit BOM für Excel).
+    """
+    return rejected.to_csv(index=False, sep=';').encode('utf-8-sig')
+
+
+def template_csv():
+    header = ['Erfasser', 'Datum', 'Standort', 'Stadt', 'Breitengrad', 'Längengrad', 'Leistungswert',
+              'Eigentümer', 'Umrüstung', 'Alte Werbeträgernummer', 'Seiten', 'Vermarktungsform']
+    example = ['Max Mustermann', '01.07.2025', 'Holzmarktstraße 70', 'Berlin', '52.5125', '13.4232', '100',
+               'Privater Eigentümer', 'Neustandort', '', 'dreiseitig', 'Digitale Säule']
+    return (';'.join(header) + '\n' + ';'.join(example) + '\n').encode('utf-8-sig')
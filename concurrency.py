@@ -0,0 +1,149 @@
+from typing import NamedTuple
+
+import streamlit as st
+
+import schema
+
+# Versionsspalte für optimistische Sperren: jede Änderung an einem Standort erhöht sie um 1
+VERSION_COLUMN = 'version'
+
+
+class Snapshot(NamedTuple):
+    location_id: str
+    version: int
+    values: dict
+
+
+class SaveResult(NamedTuple):
+    saved: bool
+    version: int
+    applied: dict
+    conflicts: dict  # Feld -> (gesehener Wert, aktueller Wert, eigener Wert)
+
+
+def ensure_version_column(conn):
+    schema.ensure_columns(conn, 'locations', {VERSION_COLUMN: 'INTEGER NOT NULL DEFAULT 0'})
+
+
+def snapshot(location, fields):
+    return Snapshot(location.id, location.version or 0, {field: getattr(location, field) for field in fields})
+
+
+def remember(key, location, fields):
+    """
+    Stand merken, den der Benutzer in diesem Lauf angezeigt bekommt, und den Stand des
+    vorherigen Laufs zurückgeben. Klickt der Benutzer auf Speichern, ist das genau der Stand,
+    auf dem seine Eingaben beruhen (der aktuelle Lauf hat die Daten bereits neu geladen).
+    """
+    previous = st.session_state.get(key)
+    current = snapshot(location, fields)
+    st.session_state[key] = current
+    if previous is None or previous.location_id != location.id:
+        return current
+    return previous
+
+
+def _current(conn, location_id, fields):
+    row = conn.execute(
+        f"SELECT {VERSION_COLUMN}, {', '.join(fields)} FROM locations WHERE id = ?", (location_id,)
+    ).fetchone()
+    if row is None:
+        return None, {}
+    return row[0], dict(zip(fields, row[1:]))
+
+
+def _compare_and_swap(conn, location_id, version, changes):
+    assignments = ", ".join(f"{field} = ?" for field in changes)
+    cursor = conn.execute(
+        f"UPDATE locations SET {assignments}, {VERSION_COLUMN} = {VERSION_COLUMN} + 1 "
+        f"WHERE id = ? AND {VERSION_COLUMN} = ?",
+        (*changes.values(), location_id, version)
+    )
+    return cursor.rowcount == 1
+
+
+def _same(a, b):
+    # Leere Eingaben aus Formularen ('') und nie gesetzte Spalten (NULL) gelten als gleich
+    return (a if a is not None else '') == (b if b is not None else '')
+
+
+def update_fields(conn, seen, changes, guard=()):
+    """
+    Geänderte Felder per Compare-and-Swap auf die Versionsspalte schreiben. Kein Commit.
+
+    Geschrieben werden nur Felder, die der Benutzer gegenüber dem gesehenen Stand geändert hat.
+    Hat jemand anderes zwischenzeitlich gespeichert, werden dessen Änderungen übernommen, solange
+    sie andere Felder betreffen; nur Felder, die beide unterschiedlich geändert haben, sind
+    Konflikte und werden nicht überschrieben.
+
+    seen: Snapshot des Stands, auf dem die Eingaben beruhen
+    changes: Dictionary Feld -> neuer Wert (Felder müssen im Snapshot enthalten sein)
+    guard: Felder, die seit dem Snapshot unverändert sein müssen (z.B. status/current_step bei
+           Workflow-Übergängen); wurden sie geändert, wird nichts geschrieben
+    Returns: SaveResult
+    """
+    mine = {field: value for field, value in changes.items() if not _same(value, seen.values.get(field))}
+    if not mine:
+        return SaveResult(True, seen.version, {}, {})
+
+    if _compare_and_swap(conn, seen.location_id, seen.version, mine):
+        return SaveResult(True, seen.version + 1, mine, {})
+
+    # Zwischenzeitlich geändert: aktuellen Stand lesen und nicht überlappende Änderungen übernehmen
+    fields = list(dict.fromkeys([*changes, *guard]))
+    version, current = _current(conn, seen.location_id, fields)
+    if version is None:
+        return SaveResult(False, seen.version, {}, {})
+
+    moved = {field: (seen.values.get(field), current[field], changes.get(field, seen.values.get(field)))
+             for field in guard if not _same(current[field], seen.values.get(field))}
+    if moved:
+        return SaveResult(False, version, {}, moved)
+
+    conflicts = {}
+    applicable = {}
+    for field, value in mine.items():
+        if _same(current[field], value):
+            continue
+        if not _same(current[field], seen.values.get(field)):
+            conflicts[field] = (seen.values.get(field), current[field], value)
+        else:
+            applicable[field] = value
+
+    if not applicable:
+        return SaveResult(not conflicts, version, {}, conflicts)
+    if not _compare_and_swap(conn, seen.location_id, version, applicable):
+        # Erneut überholt (sehr selten): nichts schreiben, der Benutzer sieht beim nächsten Lauf den neuen Stand
+        version, current = _current(conn, seen.location_id, fields)
+        return SaveResult(False, version, {}, {field: (seen.values.get(field), current.get(field), value)
+                                               for field, value in mine.items()})
+    return SaveResult(not conflicts, version + 1, applicable, conflicts)
+
+
+def conflict_message(result, labels=None):
+    """
+    Lesbare Beschreibung der Konflikte für die Oberfläche.
+    """
+    labels = labels or {}
+    if not result.conflicts:
+        return "Der Standort wurde zwischenzeitlich geändert oder archiviert. Bitte die Ansicht neu laden."
+    lines = [
+        f"- **{labels.get(field, field)}**: aktuell „{current or '–'}“ (Ihre Eingabe: „{own or '–'}“)"
+        for field, (_, current, own) in result.conflicts.items()
+    ]
+    return "Der Standort wurde zwischenzeitlich geändert. Folgende Felder wurden nicht überschrieben:\n" + "\n".join(lines)
+
+
+def report_conflict(key, result, labels=None):
+    """
+    Konfliktmeldung für den nächsten Lauf merken und neu laden, damit die Formularfelder den
+    aktuellen Stand zeigen (die Meldung erscheint über show_conflict).
+    """
+    st.session_state[f"{key}_conflict"] = conflict_message(result, labels)
+    st.rerun()
+
+
+def show_conflict(key):
+    message = st.session_state.pop(f"{key}_conflict", None)
+    if message:
+        st.warning(message)
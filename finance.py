@@ -0,0 +1,418 @@
+"""
+Wirtschaftlichkeitsmodell für Standorte (Investition, Einnahmen, Betriebskosten, NPV, ROI,
+Amortisation), Monte-Carlo-Simulation und Sensitivitätsanalyse der Kennzahlen.
+
+Alle Szenarien eines Standorts werden als NumPy-Arrays gezogen und in einem Durchlauf
+ausgewertet; der Barwert der wachsenden Jahresgewinne ist ein fester Faktor je Annahmensatz.
+Die CEO-Queue wird über einen Prozesspool parallel simuliert. Die Sensitivitätsanalyse wertet
+das volle Raster Zinssatz × Wachstum × Kostenquote × Laufzeit per Broadcasting aus.
+
+Aufruf (Laufzeitmessung):
+    python finance.py --sites 200 --scenarios 100000
+"""
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+# Annahmen des Modells
+INVESTMENT_RANGE = (20000, 35000)  # Investitionskosten je Säule in €
+REVENUE_PER_SIDE_RANGE = (2000, 4000)  # Jahreseinnahmen je Seite in €
+OPEX_RATIO_RANGE = (0.4, 0.5)  # Betriebskosten als Anteil der Einnahmen
+DISCOUNT_RATE = 0.08
+GROWTH_RATE = 0.02
+HORIZON_YEARS = 10
+CITY_REVENUE_FACTOR = 1.15  # Städtische Standorte haben bessere Performance
+
+SIDES = {'einseitig': 1, 'doppelseitig': 2, 'dreiseitig': 3}
+
+# Szenarien je Standort
+DEFAULT_SCENARIOS = 20000
+SCENARIO_OPTIONS = (10000, 20000, 50000, 100000)
+
+# Ab dieser Anzahl Standorte lohnt sich der Prozesspool
+PARALLEL_MIN_SITES = 8
+
+PERCENTILES = (10, 50, 90)
+
+# Achsen der Sensitivitätsanalyse
+GRID_AXES = {
+    'discount_rate': tuple(np.round(np.arange(0.04, 0.1201, 0.01), 3)),
+    'growth_rate': tuple(np.round(np.arange(0.0, 0.0401, 0.005), 3)),
+    'opex_ratio': tuple(np.round(np.arange(0.30, 0.6001, 0.025), 3)),
+    'years': tuple(range(5, 16)),
+}
+# Abstand, unter dem der Basiswert einen Rasterpunkt ersetzt statt zusätzlich eingefügt zu werden
+_AXIS_TOLERANCE = 0.001
+AXIS_LABELS = {
+    'discount_rate': 'Diskontierungsrate',
+    'growth_rate': 'Wachstum p.a.',
+    'opex_ratio': 'Betriebskostenquote',
+    'years': 'Laufzeit (Jahre)',
+}
+
+
+class SensitivityGrid(NamedTuple):
+    location_id: str
+    axes: dict  # Achsenname -> Tupel der Rasterwerte (GRID_AXES plus Basiswert, Reihenfolge wie GRID_AXES)
+    base: dict  # Achsenname -> Index des Basisfalls
+    npv: np.ndarray  # Form (Zinssätze, Wachstum, Kostenquoten, Laufzeiten)
+    roi: np.ndarray  # Form (1, 1, Kostenquoten, 1), hängt nur von der Kostenquote ab
+
+
+class SiteInputs(NamedTuple):
+    location_id: str
+    sides: int
+    revenue_factor: float
+
+
+class SimulationSummary(NamedTuple):
+    location_id: str
+    scenarios: int
+    npv: tuple  # (P10, P50, P90)
+    roi: tuple
+    payback: tuple
+    loss_probability: float  # Anteil der Szenarien mit negativem NPV
+
+
+def site_inputs(location_id, seiten, eigentuemer, leistungswert):
+    """
+    Standortabhängige Eingaben des Modells (Seitenzahl, Einnahmefaktor).
+    """
+    revenue_factor = CITY_REVENUE_FACTOR if eigentuemer == 'Stadt' else 1.0
+    try:
+        leistungswert = float(leistungswert or 0)
+    except (TypeError, ValueError):
+        leistungswert = 0.0
+    if leistungswert > 0:
+        revenue_factor *= (1 + leistungswert / 200)  # Reduzierter Einfluss
+    return SiteInputs(location_id, SIDES.get(seiten, 1), revenue_factor)
+
+
+def seed_for(location_id):
+    # Konsistente Zufallszahlen je Standort
+    return int(hashlib.md5(str(location_id).encode()).hexdigest()[:8], 16)
+
+
+def present_value_factor(discount_rate=DISCOUNT_RATE, growth_rate=GROWTH_RATE, years=HORIZON_YEARS):
+    """
+    Barwert eines Jahresgewinns von 1 €, der ab Jahr 2 jährlich um growth_rate steigt.
+    Arrays werden elementweise (mit Broadcasting) ausgewertet.
+    """
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    growth_rate = np.asarray(growth_rate, dtype=float)
+    years = np.asarray(years, dtype=float)
+    q = (1 + growth_rate) / (1 + discount_rate)
+    # Geometrische Reihe sum_{t=1..n} q^(t-1) / (1 + r); bei q == 1 ist sie n / (1 + r)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        series = np.where(np.isclose(q, 1.0), years, (1 - q ** years) / (1 - q))
+    return series / (1 + discount_rate)
+
+
+def point_estimate(inputs):
+    """
+    Eine konsistente Schätzung je Standort (fester Zufallsstartwert aus der ID), wie sie die
+    CEO-Genehmigung anzeigt und die Portfolio-Optimierung verwendet.
+    Returns: Dictionary mit investment, annual_revenue, operating_costs, annual_profit, roi, payback_period, npv
+    """
+    rng = np.random.RandomState(seed_for(inputs.location_id) % (2**32 - 1))
+    investment = rng.randint(*INVESTMENT_RANGE)
+    annual_revenue = rng.randint(*REVENUE_PER_SIDE_RANGE) * inputs.sides * inputs.revenue_factor
+    operating_costs = annual_revenue * rng.uniform(*OPEX_RATIO_RANGE)
+    annual_profit = annual_revenue - operating_costs
+    npv, roi, payback = metrics(investment, annual_profit)
+    return {
+        'investment': investment,
+        'annual_revenue': annual_revenue,
+        'operating_costs': operating_costs,
+        'annual_profit': annual_profit,
+        'roi': float(roi),
+        'payback_period': float(payback),
+        'npv': float(npv)
+    }
+
+
+def draw_scenarios(inputs, scenarios=DEFAULT_SCENARIOS, seed=None):
+    """
+    Zufällige Szenarien für Investition, Einnahmen und Betriebskostenquote.
+    Returns: (investment, annual_revenue, opex_ratio) als Arrays der Länge scenarios
+    """
+    rng = np.random.default_rng(seed_for(inputs.location_id) if seed is None else seed)
+    investment = rng.integers(*INVESTMENT_RANGE, size=scenarios).astype(float)
+    revenue = rng.integers(*REVENUE_PER_SIDE_RANGE, size=scenarios) * inputs.sides * inputs.revenue_factor
+    opex_ratio = rng.uniform(*OPEX_RATIO_RANGE, size=scenarios)
+    return investment, revenue, opex_ratio
+
+
+def metrics(investment, annual_profit, discount_rate=DISCOUNT_RATE, growth_rate=GROWTH_RATE, years=HORIZON_YEARS):
+    """
+    NPV, ROI (%) und Amortisationszeit (Jahre) für beliebig geformte Arrays.
+    """
+    npv = -investment + annual_profit * present_value_factor(discount_rate, growth_rate, years)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        roi = annual_profit / investment * 100
+        payback = np.where(annual_profit > 0, investment / annual_profit, np.inf)
+    return npv, roi, payback
+
+
+def simulate(inputs, scenarios=DEFAULT_SCENARIOS, seed=None):
+    """
+    Monte-Carlo-Simulation eines Standorts in einem vektorisierten Durchlauf.
+    Returns: (npv, roi, payback) als Arrays der Länge scenarios
+    """
+    investment, revenue, opex_ratio = draw_scenarios(inputs, scenarios, seed)
+    return metrics(investment, revenue * (1 - opex_ratio))
+
+
+def summarize(location_id, npv, roi, payback):
+    return SimulationSummary(
+        location_id,
+        len(npv),
+        tuple(float(value) for value in np.percentile(npv, PERCENTILES)),
+        tuple(float(value) for value in np.percentile(roi, PERCENTILES)),
+        tuple(float(value) for value in np.percentile(payback, PERCENTILES)),
+        float(np.mean(npv < 0)),
+    )
+
+
+def histogram(values, bins=40):
+    """
+    Häufigkeiten für ein Balkendiagramm.
+    Returns: (Klassenmitten, Anzahl je Klasse)
+    """
+    counts, edges = np.histogram(values, bins=bins)
+    return (edges[:-1] + edges[1:]) / 2, counts
+
+
+def simulate_summary(inputs, scenarios=DEFAULT_SCENARIOS):
+    return summarize(inputs.location_id, *simulate(inputs, scenarios))
+
+
+def _simulate_chunk(chunk, scenarios):
+    return [simulate_summary(inputs, scenarios) for inputs in chunk]
+
+
+def simulate_queue(sites, scenarios=DEFAULT_SCENARIOS, processes=None):
+    """
+    Alle Standorte einer Queue simulieren. Ab PARALLEL_MIN_SITES Standorten werden sie in
+    Blöcken auf einen Prozesspool verteilt (übertragen werden nur die Kennzahlen, nicht die Szenarien).
+    sites: Liste von SiteInputs
+    Returns: Liste von SimulationSummary in der Reihenfolge von sites
+    """
+    sites = list(sites)
+    processes = processes or os.cpu_count() or 1
+    if len(sites) < PARALLEL_MIN_SITES or processes == 1:
+        return _simulate_chunk(sites, scenarios)
+
+    size = -(-len(sites) // processes)
+    chunks = [sites[i:i + size] for i in range(0, len(sites), size)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        results = executor.map(_simulate_chunk, chunks, [scenarios] * len(chunks))
+        return [summary for chunk in results for summary in chunk]
+
+
+def base_case(estimate):
+    """
+    Basisfall eines Standorts: die Punktschätzung aus point_estimate, wie sie die
+    CEO-Genehmigung als Kennzahlen anzeigt.
+    Returns: (investment, annual_revenue, opex_ratio)
+    """
+    revenue = float(estimate['annual_revenue'])
+    opex_ratio = float(estimate['operating_costs']) / revenue if revenue else sum(OPEX_RATIO_RANGE) / 2
+    return float(estimate['investment']), revenue, opex_ratio
+
+
+def _grid_arrays(axes):
+    # Achsen als gegeneinander gedrehte Arrays, damit Rechenoperationen das volle Raster aufspannen
+    names = list(axes)
+    return [np.asarray(axes[name], dtype=float).reshape([-1 if i == position else 1 for i in range(len(names))])
+            for position, name in enumerate(names)]
+
+
+def _nearest_index(values, target):
+    return int(np.argmin(np.abs(np.asarray(values, dtype=float) - target)))
+
+
+def _centred_axis(values, centre):
+    # Basiswert exakt ins Raster aufnehmen: liegt er nahe an einem Rasterpunkt, ersetzt er ihn,
+    # sonst wird er einsortiert
+    values = list(values)
+    nearest = _nearest_index(values, centre)
+    if abs(values[nearest] - centre) <= _AXIS_TOLERANCE:
+        values[nearest] = centre
+    else:
+        values = sorted(values + [centre])
+    return tuple(values), values.index(centre)
+
+
+def sensitivity_grid(inputs, estimate):
+    """
+    NPV und ROI eines Standorts über das volle Raster GRID_AXES, zentriert auf die Punktschätzung
+    (estimate aus point_estimate): im Basisfall stimmt der NPV mit den angezeigten Kennzahlen überein.
+    Returns: SensitivityGrid (Arrays schreibgeschützt, da aus dem Cache geteilt)
+    """
+    return _sensitivity_grid(inputs.location_id, *base_case(estimate))
+
+
+@lru_cache(maxsize=256)
+def _sensitivity_grid(location_id, investment, revenue, base_opex_ratio):
+    axes = {}
+    base = {}
+    for name, centre in (('discount_rate', DISCOUNT_RATE), ('growth_rate', GROWTH_RATE),
+                         ('opex_ratio', base_opex_ratio), ('years', HORIZON_YEARS)):
+        axes[name], base[name] = _centred_axis(GRID_AXES[name], centre)
+    discount_rate, growth_rate, opex_ratio, years = _grid_arrays(axes)
+    profit = revenue * (1 - opex_ratio)
+    npv, roi, _ = metrics(investment, profit, discount_rate, growth_rate, years)
+    npv.flags.writeable = False
+    roi.flags.writeable = False
+    return SensitivityGrid(location_id, axes, base, npv, roi)
+
+
+def tornado(grid):
+    """
+    NPV am unteren und oberen Ende jeder Achse, alle anderen Annahmen im Basisfall.
+    Returns: Liste von (Achse, NPV unten, NPV oben, NPV Basis), nach Spannweite absteigend
+    """
+    names = list(grid.axes)
+    base_index = tuple(grid.base[name] for name in names)
+    base_npv = float(grid.npv[base_index])
+    rows = []
+    for position, name in enumerate(names):
+        low = list(base_index)
+        high = list(base_index)
+        low[position] = 0
+        high[position] = len(grid.axes[name]) - 1
+        rows.append((name, float(grid.npv[tuple(low)]), float(grid.npv[tuple(high)]), base_npv))
+    return sorted(rows, key=lambda row: abs(row[2] - row[1]), reverse=True)
+
+
+def grid_slice(grid, rows, columns, fixed=None):
+    """
+    Zweidimensionaler Ausschnitt des NPV-Rasters; nicht gewählte Achsen stehen auf fixed bzw. im Basisfall.
+    Returns: Array der Form (len(axes[rows]), len(axes[columns]))
+    """
+    fixed = {**grid.base, **(fixed or {})}
+    names = list(grid.axes)
+    index = tuple(slice(None) if name in (rows, columns) else fixed[name] for name in names)
+    values = grid.npv[index]
+    return values if names.index(rows) < names.index(columns) else values.T
+
+
+def break_even_opex_ratio(investment, revenue, discount_rate=DISCOUNT_RATE, growth_rate=GROWTH_RATE, years=HORIZON_YEARS):
+    """
+    Betriebskostenquote, bei der der NPV genau 0 ist (geschlossen, elementweise mit Broadcasting).
+    """
+    return 1 - np.asarray(investment, dtype=float) / (np.asarray(revenue, dtype=float)
+                                                      * present_value_factor(discount_rate, growth_rate, years))
+
+
+def break_even_investment(annual_profit, discount_rate=DISCOUNT_RATE, growth_rate=GROWTH_RATE, years=HORIZON_YEARS):
+    """
+    Höchste Investition, bei der der NPV nicht negativ wird.
+    """
+    return np.asarray(annual_profit, dtype=float) * present_value_factor(discount_rate, growth_rate, years)
+
+
+def break_even_discount_rate(investment, annual_profit, growth_rate=GROWTH_RATE, years=HORIZON_YEARS,
+                             low=-0.5, high=2.0, iterations=60):
+    """
+    Interner Zinsfuß: Diskontierungsrate mit NPV = 0, per vektorisierter Bisektion für ganze
+    Arrays auf einmal (der Barwertfaktor fällt streng mit dem Zinssatz).
+    Werte außerhalb [low, high] werden auf die Grenze gesetzt.
+    """
+    investment, annual_profit, growth_rate, years = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (investment, annual_profit, growth_rate, years))
+    )
+    lower = np.full(investment.shape, low)
+    upper = np.full(investment.shape, high)
+    for _ in range(iterations):
+        middle = (lower + upper) / 2
+        positive = annual_profit * present_value_factor(middle, growth_rate, years) > investment
+        lower = np.where(positive, middle, lower)
+        upper = np.where(positive, upper, middle)
+    return (lower + upper) / 2
+
+
+def tornado_figure(rows, height=320):
+    """
+    Tornado-Diagramm der NPV-Spannweite je Annahme.
+    """
+    import plotly.graph_objects as go
+
+    labels = [AXIS_LABELS[name] for name, _, _, _ in rows][::-1]
+    base = rows[0][3] if rows else 0
+    fig = go.Figure()
+    fig.add_trace(go.Bar(y=labels, x=[low - base for _, low, _, _ in rows][::-1], base=base,
+                         orientation='h', name='unteres Ende', marker_color='#d62728'))
+    fig.add_trace(go.Bar(y=labels, x=[high - base for _, _, high, _ in rows][::-1], base=base,
+                         orientation='h', name='oberes Ende', marker_color='#2ca02c'))
+    fig.update_layout(barmode='overlay', height=height, margin=dict(l=10, r=10, t=30, b=10),
+                      xaxis_title='Kapitalwert (NPV) €')
+    return fig
+
+
+def heatmap_figure(grid, rows, columns, fixed=None, height=420):
+    """
+    Heatmap des NPV über zwei Achsen des Rasters.
+    """
+    import plotly.graph_objects as go
+
+    values = grid_slice(grid, rows, columns, fixed)
+    fig = go.Figure(go.Heatmap(
+        z=values, x=[str(round(value, 3)) for value in grid.axes[columns]], y=[str(round(value, 3)) for value in grid.axes[rows]],
+        colorscale='RdYlGn', zmid=0, colorbar=dict(title='NPV €')
+    ))
+    fig.update_layout(height=height, margin=dict(l=10, r=10, t=30, b=10),
+                      xaxis_title=AXIS_LABELS[columns], yaxis_title=AXIS_LABELS[rows])
+    return fig
+
+
+def load_queue_inputs(conn, current_step='ceo'):
+    """
+    Modelleingaben aller aktiven Standorte eines Prozessschritts.
+    Returns: Liste von (SiteInputs, Standortbezeichnung)
+    """
+    rows = conn.execute('''
+    SELECT id, seiten, eigentuemer, leistungswert, standort || ', ' || stadt
+    FROM locations
+    WHERE status = 'active' AND current_step = ?
+    ORDER BY created_at, id
+    ''', (current_step,)).fetchall()
+    return [(site_inputs(*row[:4]), row[4]) for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Laufzeit der Monte-Carlo-Simulation messen.")
+    parser.add_argument("--sites", type=int, default=200)
+    parser.add_argument("--scenarios", type=int, default=100000)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    sites = [SiteInputs(f"site-{i}", 1 + i % 3, 1.0 + (i % 5) / 10) for i in range(args.sites)]
+
+    start = time.perf_counter()
+    simulate_summary(sites[0], args.scenarios)
+    print(f"1 Standort, {args.scenarios} Szenarien: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    _simulate_chunk(sites, args.scenarios)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    simulate_queue(sites, args.scenarios, args.processes)
+    parallel = time.perf_counter() - start
+    print(f"{args.sites} Standorte: seriell {serial:.2f} s, Prozesspool {parallel:.2f} s")
+
+    start = time.perf_counter()
+    grid = sensitivity_grid(sites[0], point_estimate(sites[0]))
+    tornado(grid)
+    print(f"Sensitivitätsraster ({grid.npv.size} Punkte): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Prognose des Fertigstellungstermins je aktivem Standort aus den historischen Verweildauern.
+
+Je Schritt und Vermarktungsform werden die abgeschlossenen Verweildauern als empirische
+Verteilung geführt (zu wenige Beobachtungen: alle Vermarktungsformen des Schritts, sonst eine
+Annahme aus der SLA-Frist). Für einen Standort zählt im aktuellen Schritt nur der Rest der
+Verteilung oberhalb der bereits verstrichenen Zeit; dazu kommen die Dauern der noch folgenden
+Schritte bis zur Fertigstellung (ohne Ablehnungen, die Prognose gilt für den Fall der Genehmigung).
+Alle Standorte einer Gruppe (Schritt, Vermarktungsform) werden in einem NumPy-Durchlauf berechnet.
+
+Die Prognosen werden je Datenbank gecacht: einmal je Kalendertag neu, dazwischen werden nur
+Standorte neu berechnet, die hinzugekommen sind oder deren Version (jede Änderung, auch ein
+Übergang) sich geändert hat. Detailansichten (completion_label) lesen und aktualisieren nur den
+eigenen Standort.
+"""
+import threading
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import aging
+import pipeline_simulation
+
+# Regulärer Weg zur Fertigstellung aus den Übergängen der Workflow-Seiten; Nebenschritte wie der
+# Widerspruch münden bei Genehmigung wieder in diesen Weg
+PATH = pipeline_simulation.approved_path()
+REJOIN = {step: outcomes['approved'] for step, outcomes in pipeline_simulation.TRANSITIONS.items()
+          if step not in PATH and 'approved' in outcomes}
+
+# Mindestanzahl Beobachtungen für eine eigene Verteilung je Schritt und Vermarktungsform
+MIN_SAMPLES = 5
+
+# Annahme ohne Historie: Lognormalverteilung mit Median = halbe SLA-Frist
+DEFAULT_SIGMA = 0.6
+FALLBACK_SAMPLES = 200
+
+# Stichproben je Standort für das P90 der Gesamtdauer
+DRAWS = 400
+
+RESULT_COLUMNS = ['id', 'current_step', 'vermarktungsform', 'age_days', 'expected_days', 'p90_days',
+                  'expected_date', 'p90_date', 'overdue']
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class DurationModel(NamedTuple):
+    samples: dict  # (Schritt, Vermarktungsform) bzw. (Schritt, None) -> sortierte Verweildauern in Tagen
+    future: dict  # (Schritt, Vermarktungsform) -> Stichproben der Dauer aller folgenden Schritte (Memo)
+
+
+def fit(durations):
+    """
+    Empirische Verteilungen aus aging.load_step_durations.
+    Returns: DurationModel
+    """
+    samples = {}
+    if not durations.empty:
+        for (step, form), days in durations.groupby(['step', 'vermarktungsform'])['days']:
+            samples[(step, form)] = np.sort(days.to_numpy(dtype=float))
+        for step, days in durations.groupby('step')['days']:
+            samples[(step, None)] = np.sort(days.to_numpy(dtype=float))
+    return DurationModel(samples, {})
+
+
+def distribution(model, step, form):
+    """
+    Sortierte Verweildauern für einen Schritt und eine Vermarktungsform (mit Rückfallstufen).
+    """
+    for key in ((step, form), (step, None)):
+        days = model.samples.get(key)
+        if days is not None and len(days) >= MIN_SAMPLES:
+            return days
+    key = (step, 'SLA')
+    if key not in model.samples:
+        rng = np.random.default_rng(0)
+        model.samples[key] = np.sort(rng.lognormal(np.log(aging.SLA_DAYS.get(step, 10) / 2), DEFAULT_SIGMA,
+                                                   FALLBACK_SAMPLES))
+    return model.samples[key]
+
+
+def remaining_steps(step):
+    """
+    Schritte nach step bis zur Fertigstellung (ohne step selbst).
+    Returns: Tupel der Schritte oder None, wenn step nicht zum Weg gehört
+    """
+    if step in REJOIN:
+        return PATH[PATH.index(REJOIN[step]):]
+    if step in PATH:
+        return PATH[PATH.index(step) + 1:]
+    return None
+
+
+def _future(model, step, form):
+    # Stichproben der Summe aller folgenden Schritte, einmal je (Schritt, Vermarktungsform)
+    key = (step, form)
+    if key not in model.future:
+        rng = np.random.default_rng(0)
+        total = np.zeros(DRAWS)
+        for name in remaining_steps(step):
+            total += rng.choice(distribution(model, name, form), DRAWS)
+        model.future[key] = total
+    return model.future[key]
+
+
+def predict(model, sites, now=None):
+    """
+    Erwartete und P90-Fertigstellung für alle Standorte, je Gruppe (Schritt, Vermarktungsform)
+    vektorisiert. Der Rest im aktuellen Schritt ist die Verteilung oberhalb der verstrichenen Zeit;
+    liegt der Standort schon über allen Beobachtungen (overdue), wird die volle Verteilung angesetzt.
+    sites: DataFrame mit id, current_step, vermarktungsform, age_days (wie aging.load_aging)
+    Returns: DataFrame mit RESULT_COLUMNS
+    """
+    now = pd.Timestamp(now or datetime.now())
+    frames = []
+    for (step, form), group in sites.groupby(['current_step', 'vermarktungsform'], dropna=False, sort=False):
+        form = None if pd.isna(form) else form
+        if remaining_steps(step) is None:
+            continue
+        days = distribution(model, step, form)
+        future = _future(model, step, form)
+        ages = group['age_days'].fillna(0).to_numpy(dtype=float)
+
+        # Anteil der Verteilung oberhalb der verstrichenen Zeit: Startindex und Größe je Standort
+        start = np.searchsorted(days, ages, side='right')
+        tail = len(days) - start
+        overdue = tail == 0
+        suffix = np.concatenate((np.cumsum(days[::-1])[::-1], [0.0]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected_rest = np.where(overdue, days.mean(), suffix[start] / tail - ages)
+
+        rng = np.random.default_rng(0)
+        offset = np.where(overdue, 0, start)
+        size = np.where(overdue, len(days), tail)
+        picks = offset[:, None] + (rng.random((len(ages), DRAWS)) * size[:, None]).astype(int)
+        rest = days[picks] - np.where(overdue, 0.0, ages)[:, None]
+        p90 = np.percentile(rest + future, 90, axis=1)
+
+        expected = expected_rest + future.mean()
+        frames.append(pd.DataFrame({
+            'id': group['id'].to_numpy(),
+            'current_step': step,
+            'vermarktungsform': form,
+            'age_days': ages,
+            'expected_days': expected.round(1),
+            'p90_days': p90.round(1),
+            'expected_date': now + pd.to_timedelta(expected, unit='D'),
+            'p90_date': now + pd.to_timedelta(p90, unit='D'),
+            'overdue': overdue,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[RESULT_COLUMNS]
+
+
+class ForecastCache:
+    def __init__(self):
+        self.day = None
+        self.model = None
+        self.keys = {}  # id -> (version, current_step) beim letzten Abgleich
+        self.rows = pd.DataFrame(columns=RESULT_COLUMNS)
+
+
+def _database(conn):
+    return conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+
+
+def _ensure_model(conn, cache, now):
+    # Verteilungen einmal je Kalendertag neu schätzen, dabei alle Prognosen verwerfen
+    day = now.date()
+    if cache.day != day:
+        cache.day = day
+        cache.model = fit(aging.load_step_durations(conn))
+        cache.keys = {}
+        cache.rows = pd.DataFrame(columns=RESULT_COLUMNS)
+
+
+def _cache(conn):
+    cache = _caches.get(_database(conn))
+    if cache is None:
+        cache = _caches[_database(conn)] = ForecastCache()
+    return cache
+
+
+def _refresh(conn, cache, now):
+    """
+    Cache mit der Datenbank abgleichen.
+    Returns: Anzahl neu berechneter Standorte
+    """
+    _ensure_model(conn, cache, now)
+    versions = dict(conn.execute('''
+    SELECT id, version FROM locations WHERE status = 'active'
+    ''').fetchall())
+    sites = aging.load_aging(conn, now)
+    keys = {site_id: (versions.get(site_id), step) for site_id, step in zip(sites['id'], sites['current_step'])}
+
+    changed = [site_id for site_id, key in keys.items() if cache.keys.get(site_id) != key]
+    kept = cache.rows[cache.rows['id'].isin(keys.keys()) & ~cache.rows['id'].isin(changed)]
+    fresh = predict(cache.model, sites[sites['id'].isin(changed)], now)
+    frames = [frame for frame in (kept, fresh) if not frame.empty]
+    cache.rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+    cache.keys = keys
+    return len(changed)
+
+
+def get_forecasts(conn, now=None):
+    """
+    Prognosen aller aktiven Standorte (gecacht, siehe Modulbeschreibung).
+    Returns: DataFrame mit RESULT_COLUMNS
+    """
+    now = pd.Timestamp(now or datetime.now())
+    with _caches_lock:
+        cache = _cache(conn)
+        _refresh(conn, cache, now)
+        return cache.rows.copy()
+
+
+def forecast_for(conn, location_id, now=None):
+    """
+    Prognose eines Standorts als Series oder None (nicht aktiv bzw. nicht auf dem Weg zur Fertigstellung).
+    Liest nur diesen Standort (Primärschlüssel) und berechnet ihn nur neu, wenn sich Version oder
+    Schritt seit dem letzten Abgleich geändert haben; die übrigen Einträge des Caches bleiben unberührt.
+    """
+    now = pd.Timestamp(now or datetime.now())
+    with _caches_lock:
+        cache = _cache(conn)
+        _ensure_model(conn, cache, now)
+        version = conn.execute("SELECT version FROM locations WHERE id = ?", (location_id,)).fetchone()
+        site = aging.load_aging(conn, now, location_id)
+        if site.empty:
+            return None
+        key = (version[0] if version else None, site['current_step'].iloc[0])
+        cached = cache.rows[cache.rows['id'] == location_id]
+        if cache.keys.get(location_id) == key and not cached.empty:
+            return cached.iloc[0]
+
+        fresh = predict(cache.model, site, now)
+        others = cache.rows[cache.rows['id'] != location_id]
+        frames = [frame for frame in (others, fresh) if not frame.empty]
+        cache.rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+        cache.keys[location_id] = key
+        return None if fresh.empty else fresh.iloc[0]
+
+
+def completion_label(conn, location_id):
+    """
+    Prognose eines Standorts als Text für die Detailansichten, z.B. "14.11.2026 (P90: 02.12.2026)".
+    Returns: Text oder None
+    """
+    row = forecast_for(conn, location_id)
+    if row is None:
+        return None
+    return f"{row['expected_date']:%d.%m.%Y} (P90: {row['p90_date']:%d.%m.%Y})"
@@ -0,0 +1,357 @@
+"""
+Schlüssel von locations und workflow_history.
+
+Beide Tabellen haben einen ganzzahligen Primärschlüssel pk (Alias der rowid). Die Historie
+verweist über workflow_history.location_id (INTEGER) auf locations.pk, das Archiv ebenso über
+workflow_history_archive.location_id auf locations_archive.pk. Die Indizes auf location_id
+(Verweildauern, Process Mining, Suche) speichern damit 8 statt 36 Byte je Eintrag, und Joins
+vergleichen Ganzzahlen. locations.pk ist AUTOINCREMENT: archivierte Standorte behalten ihren pk,
+ein neuer Standort bekommt ihn also nie ein zweites Mal.
+
+Die Spalte id (UUID-Text, NOT NULL UNIQUE) ist nur noch der externe Schlüssel für Seiten, URLs,
+Exporte, Benachrichtigungen und Jobs. Schreibende Stellen übergeben weiter diese ID; die Historie
+bildet sie beim Einfügen per Unterabfrage auf pk ab (siehe INSERT in den Seiten). Neue IDs sind
+zeitlich sortierte UUIDv7, sie werden im Index auf id also am Ende angehängt, statt Seiten zu
+teilen. Bestehende uuid4-IDs gelten unverändert weiter.
+
+migrate baut Tabellen mit dem alten Schlüssel (id TEXT PRIMARY KEY, location_id TEXT) einmalig
+um; rowids, Indizes und Trigger bleiben dabei erhalten, der Volltextindex passt also weiter.
+
+Aufruf:
+    python ids.py                   # Vergleich alter/neuer Schlüssel (Einfügezeit, Größe) und Indexbericht
+    python ids.py --rows 100000
+    python ids.py --migrate         # werbetraeger.db auf die ganzzahligen Schlüssel umstellen
+"""
+import argparse
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+
+import schema
+
+# Primärschlüssel der Standorte (nie wiederverwendet, siehe oben) und der Historie
+LOCATION_KEY = 'pk INTEGER PRIMARY KEY AUTOINCREMENT'
+HISTORY_KEY = 'pk INTEGER PRIMARY KEY'
+
+# Obergrenze des 12-Bit-Zählers innerhalb einer Millisekunde (RFC 9562, Methode 1)
+_COUNTER_MAX = 0xFFF
+
+_lock = threading.Lock()
+_last = {'ms': 0, 'counter': 0}
+_migrated = set()
+
+
+class IndexSize(NamedTuple):
+    name: str
+    pages: int
+    fill: float
+
+
+class BenchmarkResult(NamedTuple):
+    strategy: str
+    seconds: float
+    database_kib: int
+    indexes: list
+
+
+def new_id():
+    """
+    Neue UUIDv7 als Text. Innerhalb eines Prozesses streng aufsteigend, auch bei
+    mehreren IDs in derselben Millisekunde.
+    """
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last['ms']:
+            # Zufälliger Startwert in der unteren Hälfte lässt Platz zum Hochzählen
+            counter = random.getrandbits(11)
+        else:
+            ms = _last['ms']
+            counter = _last['counter'] + 1
+            if counter > _COUNTER_MAX:
+                ms += 1
+                counter = random.getrandbits(11)
+        _last['ms'], _last['counter'] = ms, counter
+    tail = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (ms & ((1 << 48) - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | tail
+    return str(uuid.UUID(int=value))
+
+
+def created_at(value):
+    """
+    Erzeugungszeitpunkt einer UUIDv7 (lokale Zeit), None für uuid4 und ungültige Werte.
+    """
+    try:
+        parsed = uuid.UUID(str(value))
+    except ValueError:
+        return None
+    if parsed.version != 7:
+        return None
+    return datetime.fromtimestamp((parsed.int >> 80) / 1000)
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _declared_types(conn, table):
+    return {row[1]: (row[2] or '').upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _create_sql(conn, table):
+    return conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+
+
+def pending_tables(conn):
+    """
+    Tabellen, die noch den alten Schlüssel haben (kein pk, pk ohne AUTOINCREMENT bzw.
+    location_id als Text).
+    Returns: Liste der Tabellennamen in Migrationsreihenfolge
+    """
+    tables = _tables(conn)
+    pending = []
+    if 'locations' in tables and 'AUTOINCREMENT' not in _create_sql(conn, 'locations').upper():
+        pending.append('locations')
+    if 'workflow_history' in tables:
+        types = _declared_types(conn, 'workflow_history')
+        if 'pk' not in types or 'INT' not in types.get('location_id', ''):
+            pending.append('workflow_history')
+    # Das Archiv wird mit der Historie umgestellt (pk der archivierten Standorte, dann die Verweise)
+    if 'workflow_history_archive' in tables:
+        if 'INT' not in _declared_types(conn, 'workflow_history_archive').get('location_id', ''):
+            pending += [table for table in ('locations_archive', 'workflow_history_archive') if table in tables]
+    return pending
+
+
+def _with_key(create_sql, key):
+    # pk anlegen bzw. ersetzen: hinter die übrigen Spalten, aber vor Tabellenbedingungen wie FOREIGN KEY
+    if re.search(r'\bpk\s+INTEGER\b', create_sql, flags=re.IGNORECASE):
+        return re.sub(r'\bpk\s+INTEGER(?:\s+PRIMARY\s+KEY)?(?:\s+AUTOINCREMENT)?', key, create_sql, count=1,
+                      flags=re.IGNORECASE)
+    constraint = re.search(r',\s*(?:CONSTRAINT|FOREIGN\s+KEY|PRIMARY\s+KEY\s*\(|UNIQUE\s*\(|CHECK\s*\()',
+                           create_sql, flags=re.IGNORECASE)
+    end = constraint.start() if constraint else create_sql.rindex(')')
+    return f"{create_sql[:end]}, {key}{create_sql[end:]}"
+
+
+def _rebuild(conn, table, create_sql, expressions=None):
+    """
+    Tabelle mit neuer Definition aufbauen (in der laufenden Transaktion). rowids bleiben erhalten,
+    Indizes und Trigger werden neu angelegt.
+    create_sql: CREATE TABLE für die neue Tabelle (noch unter dem alten Namen)
+    expressions: Spalte -> SQL-Ausdruck für den kopierten Wert (Zeile der alten Tabelle heißt t)
+    """
+    dependents = [row[0] for row in conn.execute('''
+    SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''', (table,))]
+
+    new_table = f"{table}__keys"
+    new_sql = re.sub(r'^(\s*CREATE\s+TABLE\s+)["`\[]?\w+["`\]]?', lambda match: match.group(1) + new_table,
+                     create_sql, count=1, flags=re.IGNORECASE)
+    names = schema.table_columns(conn, table)
+    values = ", ".join((expressions or {}).get(name, f"t.{name}") for name in names)
+    conn.execute(new_sql)
+    conn.execute(f"INSERT INTO {new_table} (rowid, {', '.join(names)}) SELECT t.rowid, {values} FROM {table} t")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for sql in dependents:
+        conn.execute(sql)
+    schema.invalidate(conn, table)
+
+
+def _migrate_locations(conn):
+    create_sql = re.sub(r'\bid\s+TEXT\s+PRIMARY\s+KEY\b', 'id TEXT NOT NULL UNIQUE', _create_sql(conn, 'locations'),
+                        count=1, flags=re.IGNORECASE)
+    _rebuild(conn, 'locations', _with_key(create_sql, LOCATION_KEY))
+
+
+def _migrate_archived_locations(conn):
+    # Archivierte Standorte ohne pk (vor der Umstellung archiviert) oder mit einem pk, den ein
+    # aktiver Standort inzwischen wieder bekommen hat, erhalten neue Werte aus der Sequenz
+    if 'pk' not in _declared_types(conn, 'locations_archive'):
+        conn.execute("ALTER TABLE locations_archive ADD COLUMN pk INTEGER")
+        schema.invalidate(conn, 'locations_archive')
+    start = conn.execute('''
+    SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'locations'), 0),
+               COALESCE((SELECT MAX(pk) FROM locations), 0),
+               COALESCE((SELECT MAX(pk) FROM locations_archive), 0))
+    ''').fetchone()[0]
+    rowids = [row[0] for row in conn.execute('''
+    SELECT rowid FROM locations_archive a
+    WHERE a.pk IS NULL OR EXISTS (SELECT 1 FROM locations l WHERE l.pk = a.pk)
+    ORDER BY rowid
+    ''')]
+    conn.executemany("UPDATE locations_archive SET pk = ? WHERE rowid = ?",
+                     [(start + number, rowid) for number, rowid in enumerate(rowids, 1)])
+    last = start + len(rowids)
+    if not conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'locations'", (last,)).rowcount:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('locations', ?)", (last,))
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_locations_archive_pk ON locations_archive (pk)')
+
+
+def _migrate_history(conn, table, locations):
+    create_sql = _create_sql(conn, table)
+    create_sql = re.sub(r'\bid\s+TEXT\s+PRIMARY\s+KEY\b', 'id TEXT NOT NULL UNIQUE', create_sql,
+                        count=1, flags=re.IGNORECASE)
+    create_sql = re.sub(r'\blocation_id(?:\s+\w+)?(?=\s*[,)])', 'location_id INTEGER', create_sql,
+                        count=1, flags=re.IGNORECASE)
+    create_sql = re.sub(r'REFERENCES\s+locations\s*\(\s*id\s*\)', 'REFERENCES locations (pk)', create_sql,
+                        flags=re.IGNORECASE)
+    if table == 'workflow_history':
+        create_sql = _with_key(create_sql, HISTORY_KEY)
+    _rebuild(conn, table, create_sql, {
+        # Bereits umgestellte Werte (Ganzzahlen) bleiben, Texte werden über die ID abgebildet
+        'location_id': f"CASE WHEN typeof(t.location_id) = 'integer' THEN t.location_id "
+                       f"ELSE (SELECT l.pk FROM {locations} l WHERE l.id = t.location_id) END",
+    })
+
+
+def migrate(conn):
+    """
+    Alle Tabellen mit altem Schlüssel in einer Transaktion umbauen.
+    Returns: Liste der umgebauten Tabellen
+    """
+    pending = pending_tables(conn)
+    if pending:
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Reihenfolge: erst die Standorttabellen (pk), dann die Historie, die darauf verweist
+            if 'locations' in pending:
+                _migrate_locations(conn)
+            if 'locations_archive' in pending:
+                _migrate_archived_locations(conn)
+            if 'workflow_history' in pending:
+                _migrate_history(conn, 'workflow_history', 'locations')
+            if 'workflow_history_archive' in pending:
+                _migrate_history(conn, 'workflow_history_archive', 'locations_archive')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            schema.invalidate(conn)
+            raise
+    return pending
+
+
+def ensure_integer_keys(conn):
+    """
+    Migration einmal pro Prozess und Datenbank prüfen (danach ohne Abfrage).
+    """
+    database = conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+    if database not in _migrated or database == ":memory:":
+        migrate(conn)
+        _migrated.add(database)
+
+
+def index_sizes(conn, names=None):
+    """
+    Seitenzahl und Füllgrad der Indizes (über die virtuelle Tabelle dbstat).
+    Returns: Liste von IndexSize, sortiert nach Name
+    """
+    rows = conn.execute('''
+    SELECT s.name, COUNT(*), SUM(s.pgsize - s.unused) * 1.0 / SUM(s.pgsize)
+    FROM dbstat s JOIN sqlite_master m ON m.name = s.name
+    WHERE m.type = 'index'
+    GROUP BY s.name ORDER BY s.name
+    ''').fetchall()
+    return [IndexSize(*row) for row in rows if names is None or row[0] in names]
+
+
+def _uuid4():
+    return str(uuid.uuid4())
+
+
+# Vergleichbare Varianten für benchmark: (Schlüssellayout, ID-Erzeuger)
+# - text: bisheriges Schema, id TEXT PRIMARY KEY und workflow_history.location_id als Text
+# - integer: pk als Primärschlüssel, id UNIQUE, location_id als Verweis auf locations.pk
+STRATEGIES = {
+    'text+uuid4': ('text', _uuid4),
+    'text+uuid7': ('text', new_id),
+    'integer+uuid7': ('integer', new_id),
+}
+
+_LAYOUTS = {
+    'text': (
+        "CREATE TABLE locations (id TEXT PRIMARY KEY, standort TEXT, created_at TEXT)",
+        "CREATE TABLE workflow_history (id TEXT PRIMARY KEY, location_id TEXT, step TEXT, timestamp TEXT)",
+    ),
+    'integer': (
+        f"CREATE TABLE locations (id TEXT NOT NULL UNIQUE, standort TEXT, created_at TEXT, {LOCATION_KEY})",
+        f"CREATE TABLE workflow_history (id TEXT NOT NULL UNIQUE, location_id INTEGER, step TEXT, timestamp TEXT, "
+        f"{HISTORY_KEY})",
+    ),
+}
+
+
+def benchmark(rows=20000, history_per_location=3, strategy='integer+uuid7', batch=1000, cache_kib=2000):
+    """
+    Einfügen in eine leere Datenbankdatei mit dem Schlüsselschema von locations/workflow_history
+    messen (blockweise Transaktionen wie beim Massenimport). Der Seitencache ist bewusst klein,
+    damit die Indizes wie bei einem großen Bestand nicht vollständig im Speicher liegen.
+    Returns: BenchmarkResult mit Dauer, Dateigröße und Indexgrößen nach dem Einfügen
+    """
+    layout, make_id = STRATEGIES[strategy]
+    now = datetime.now().isoformat()
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, 'benchmark.db'))
+        conn.execute(f"PRAGMA cache_size = -{cache_kib}")
+        for sql in _LAYOUTS[layout]:
+            conn.execute(sql)
+        conn.execute("CREATE INDEX idx_history_location ON workflow_history (location_id)")
+
+        start = time.perf_counter()
+        for offset in range(0, rows, batch):
+            for _ in range(min(batch, rows - offset)):
+                location_id = make_id()
+                cursor = conn.execute("INSERT INTO locations (id, standort, created_at) VALUES (?, ?, ?)",
+                                      (location_id, "Teststraße 1", now))
+                reference = cursor.lastrowid if layout == 'integer' else location_id
+                conn.executemany("INSERT INTO workflow_history (id, location_id, step, timestamp) VALUES (?, ?, ?, ?)", [
+                    (make_id(), reference, "erfassung", now) for _ in range(history_per_location)
+                ])
+            conn.commit()
+        seconds = time.perf_counter() - start
+
+        size = conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+        result = BenchmarkResult(strategy, seconds, size // 1024, index_sizes(conn))
+        conn.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alten und neuen Schlüssel von locations/workflow_history vergleichen.")
+    parser.add_argument("--rows", type=int, default=20000, help="Anzahl Standorte (je 3 Historieneinträge)")
+    parser.add_argument("--database", default="werbetraeger.db")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Datenbank auf die ganzzahligen Schlüssel umstellen (statt des Vergleichs)")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.database)
+    if args.migrate:
+        tables = migrate(conn)
+        print(f"Umgestellt: {', '.join(tables)}" if tables else "Keine Tabellen umzustellen")
+        orphans = conn.execute("SELECT COUNT(*) FROM workflow_history WHERE location_id IS NULL").fetchone()[0]
+        if orphans:
+            print(f"{orphans} Historieneinträge ohne zugehörigen Standort (location_id NULL)")
+    else:
+        for strategy in STRATEGIES:
+            result = benchmark(args.rows, strategy=strategy)
+            print(f"{result.strategy}: {result.seconds:.2f} s für {args.rows} Standorte, "
+                  f"Datei {result.database_kib} KiB")
+            for index in result.indexes:
+                print(f"  {index.name:<40} {index.pages:>6} Seiten, Füllgrad {index.fill:.0%}")
+
+    print(f"{args.database}:")
+    for index in index_sizes(conn):
+        print(f"  {index.name:<40} {index.pages:>6} Seiten, Füllgrad {index.fill:.0%}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
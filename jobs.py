@@ -0,0 +1,675 @@
+"""
+Hintergrundjobs: persistente Warteschlange (Tabelle jobs), Ausführung in Worker-Prozessen,
+Wiederholung mit exponentiellem Backoff, Fortschritt und Checkpoints, wiederkehrende Jobs per Cron.
+
+Seiten reihen Jobs mit enqueue ein (ohne Commit, also in der Transaktion des Aufrufers) und fragen
+den Stand mit get_job ab (eine Abfrage über den Primärschlüssel). Ein Runner-Thread je Prozess
+vergibt fällige Jobs an einen Prozesspool; die Jobs schreiben Fortschritt, Checkpoint und Ergebnis
+über eine eigene Verbindung. Bricht ein Prozess ab, läuft die Sperre des Jobs aus und ein anderer
+Versuch setzt beim letzten Checkpoint fort.
+
+Aufruf:
+    python jobs.py --worker              # Runner im Vordergrund (z.B. als eigener Dienst)
+    python jobs.py --enqueue archive_terminal
+    python jobs.py --list
+"""
+import argparse
+import csv
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Ablage für Exporte und Berichte
+EXPORT_DIR = os.path.join(BASE_DIR, "exports")
+REPORT_DIR = os.path.join(BASE_DIR, "reports")
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+POLL_INTERVAL = 5
+MAX_ATTEMPTS = 3
+BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+
+# Ohne Lebenszeichen so lange gilt ein laufender Job als verwaist und wird erneut eingereiht. Lebenszeichen
+# gibt nur der Job selbst (progress/save_checkpoint): ein hängender Job verliert seine Sperre, auch wenn
+# Runner und Worker-Prozess noch leben. Job-Funktionen melden sich daher mindestens so oft.
+LEASE_SECONDS = 300
+
+# Fortschritt wird höchstens so oft geschrieben (Sekunden), damit Jobs nicht an der Datenbank hängen
+PROGRESS_INTERVAL = 1.0
+
+# Job-Arten: Name -> "modul:funktion"; die Funktion erhält (context, payload) und liefert ein JSON-fähiges Ergebnis
+JOB_TYPES = {
+    'archive_terminal': 'jobs:archive_terminal_job',
+    'rebuild_search_index': 'jobs:rebuild_search_index_job',
+    'workflow_graph_snapshot': 'jobs:workflow_graph_snapshot_job',
+    'export_locations': 'jobs:export_locations_job',
+    'completion_report': 'jobs:completion_report_job',
+}
+
+# Wiederkehrende Wartungsjobs: Name -> (Job-Art, Cron-Ausdruck "Minute Stunde Tag Monat Wochentag")
+DEFAULT_SCHEDULES = {
+    'archivierung': ('archive_terminal', '30 2 * * *'),
+    'suchindex': ('rebuild_search_index', '0 3 * * 0'),
+    'prozessdiagramm': ('workflow_graph_snapshot', '0 4 * * *'),
+}
+
+JOB_COLUMNS = ('id', 'kind', 'status', 'attempts', 'max_attempts', 'progress', 'message', 'created_at',
+               'started_at', 'finished_at', 'run_after', 'last_error', 'result', 'schedule')
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    progress: float  # 0..1
+    message: str
+    created_at: str
+    started_at: str
+    finished_at: str
+    run_after: str
+    last_error: str
+    result: object  # aus JSON gelesen
+    schedule: str  # Name des Zeitplans bei wiederkehrenden Jobs
+
+
+def ensure_jobs(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        priority INTEGER DEFAULT 0,
+        attempts INTEGER DEFAULT 0,
+        max_attempts INTEGER DEFAULT 3,
+        run_after TEXT,
+        created_at TEXT,
+        started_at TEXT,
+        finished_at TEXT,
+        heartbeat_at TEXT,
+        progress REAL DEFAULT 0,
+        message TEXT,
+        checkpoint TEXT,
+        result TEXT,
+        last_error TEXT,
+        schedule TEXT
+    )
+    ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_jobs_queued
+    ON jobs (priority DESC, id) WHERE status = 'queued'
+    ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_jobs_running
+    ON jobs (heartbeat_at) WHERE status = 'running'
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS job_schedules (
+        name TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload TEXT,
+        cron TEXT NOT NULL,
+        next_run TEXT,
+        last_job_id INTEGER,
+        enabled INTEGER DEFAULT 1
+    )
+    ''')
+    now = datetime.now()
+    conn.executemany('''
+    INSERT OR IGNORE INTO job_schedules (name, kind, cron, next_run) VALUES (?, ?, ?, ?)
+    ''', [(name, kind, cron, next_run(cron, now).isoformat()) for name, (kind, cron) in DEFAULT_SCHEDULES.items()])
+    conn.commit()
+
+
+def enqueue(conn, kind, payload=None, priority=0, max_attempts=MAX_ATTEMPTS, run_after=None, schedule=None):
+    """
+    Job einreihen. Kein Commit: läuft in der Transaktion des Aufrufers (wie notifications.enqueue).
+    Returns: ID des Jobs
+    """
+    if kind not in JOB_TYPES:
+        raise ValueError(f"Unbekannte Job-Art: {kind}")
+    cursor = conn.execute('''
+    INSERT INTO jobs (kind, payload, priority, max_attempts, run_after, created_at, schedule)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (kind, json.dumps(payload or {}), priority, max_attempts,
+          run_after.isoformat() if run_after else None, datetime.now().isoformat(), schedule))
+    return cursor.lastrowid
+
+
+def _job(row):
+    values = dict(zip(JOB_COLUMNS, row))
+    values['result'] = json.loads(values['result']) if values['result'] else None
+    return Job(**values)
+
+
+def get_job(conn, job_id):
+    """
+    Stand eines Jobs (günstig genug, um ihn bei jedem Lauf einer Seite abzufragen).
+    Returns: Job oder None
+    """
+    row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job(row) if row else None
+
+
+def recent_jobs(conn, limit=50, kind=None):
+    query = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+    params = []
+    if kind:
+        query += " WHERE kind = ?"
+        params.append(kind)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    return [_job(row) for row in conn.execute(query, params).fetchall()]
+
+
+def list_schedules(conn):
+    return conn.execute('''
+    SELECT name, kind, cron, next_run, last_job_id, enabled FROM job_schedules ORDER BY name
+    ''').fetchall()
+
+
+def backoff(attempt):
+    """
+    Wartezeit vor dem nächsten Versuch in Sekunden (verdoppelt sich je Fehlversuch).
+    """
+    return min(BACKOFF_SECONDS * 2 ** max(attempt - 1, 0), MAX_BACKOFF_SECONDS)
+
+
+# Cron-Ausdrücke
+
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def _cron_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        part, _, step = part.partition('/')
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step:
+                end = high
+        values.update(range(start, end + 1, int(step or 1)))
+    if high == 6 and 7 in values:
+        # Sonntag darf als 0 oder 7 angegeben werden
+        values.discard(7)
+        values.add(0)
+    if not values or min(values) < low or max(values) > high:
+        raise ValueError(f"Ungültiges Cron-Feld: {text}")
+    return values
+
+
+def parse_cron(expression):
+    """
+    Cron-Ausdruck in Wertemengen zerlegen.
+    Returns: (Minuten, Stunden, Tage, Monate, Wochentage, Tag eingeschränkt, Wochentag eingeschränkt)
+    """
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron-Ausdruck braucht 5 Felder: {expression}")
+    sets = [_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)]
+    return (*sets, fields[2] != '*', fields[4] != '*')
+
+
+def next_run(expression, after):
+    """
+    Nächster Zeitpunkt nach after, der auf den Cron-Ausdruck passt (minutengenau).
+    Wie bei cron gilt: sind Tag und Wochentag eingeschränkt, reicht einer von beiden.
+    """
+    minutes, hours, days, months, weekdays, days_restricted, weekdays_restricted = parse_cron(expression)
+    start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    day = start.date()
+    for _ in range(366 * 5):
+        day_match = day.day in days
+        weekday_match = (day.weekday() + 1) % 7 in weekdays
+        if days_restricted and weekdays_restricted:
+            matches = day_match or weekday_match
+        else:
+            matches = day_match and weekday_match
+        if day.month in months and matches:
+            for hour in sorted(hours):
+                if day == start.date() and hour < start.hour:
+                    continue
+                for minute in sorted(minutes):
+                    if day == start.date() and hour == start.hour and minute < start.minute:
+                        continue
+                    return datetime(day.year, day.month, day.day, hour, minute)
+        day += timedelta(days=1)
+    raise ValueError(f"Cron-Ausdruck trifft nie zu: {expression}")
+
+
+# Ausführung im Worker-Prozess
+
+class LeaseLost(Exception):
+    """
+    Die Sperre des Jobs ist ausgelaufen und ein neuer Versuch hat ihn übernommen; der alte Versuch bricht ab.
+    """
+
+
+class JobContext:
+    """
+    Wird an die Job-Funktion übergeben: Verbindung, letzter Checkpoint, Fortschritt melden.
+    """
+
+    def __init__(self, conn, job_id, attempt, checkpoint):
+        self.conn = conn
+        self.job_id = job_id
+        self.attempt = attempt
+        self.checkpoint = checkpoint
+        self._last_progress = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        """
+        Fortschritt melden (done/total oder ein Anteil 0..1); dient zugleich als Lebenszeichen.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        fraction = done / total if total else done
+        self._renew('''
+        UPDATE jobs SET progress = ?, message = COALESCE(?, message), heartbeat_at = ?
+        WHERE id = ? AND status = 'running' AND attempts = ?
+        ''', (max(0.0, min(1.0, float(fraction))), message, datetime.now().isoformat(), self.job_id, self.attempt))
+
+    def save_checkpoint(self, state, done=None, total=None, message=None):
+        """
+        Zwischenstand sichern; ein späterer Versuch erhält ihn als context.checkpoint.
+        """
+        self.checkpoint = state
+        self._renew('''
+        UPDATE jobs SET checkpoint = ?, heartbeat_at = ? WHERE id = ? AND status = 'running' AND attempts = ?
+        ''', (json.dumps(state), datetime.now().isoformat(), self.job_id, self.attempt))
+        if done is not None:
+            self.progress(done, total, message, force=True)
+
+    def _renew(self, sql, params):
+        # Schreibt nur, solange dieser Versuch die Sperre hält
+        cursor = self.conn.execute(sql, params)
+        self.conn.commit()
+        if cursor.rowcount != 1:
+            raise LeaseLost(f"Job {self.job_id}: Sperre für Versuch {self.attempt} verloren")
+
+
+def _resolve(kind):
+    module_name, _, function_name = JOB_TYPES[kind].partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _finish_failed(conn, job_id, attempts, max_attempts, error):
+    # Nur den Versuch attempts abschließen, nicht einen inzwischen neu vergebenen
+    now = datetime.now()
+    if attempts < max_attempts:
+        conn.execute('''
+        UPDATE jobs SET status = 'queued', run_after = ?, last_error = ?, heartbeat_at = NULL
+        WHERE id = ? AND status = 'running' AND attempts = ?
+        ''', ((now + timedelta(seconds=backoff(attempts))).isoformat(), error[:2000], job_id, attempts))
+    else:
+        conn.execute('''
+        UPDATE jobs SET status = 'failed', finished_at = ?, last_error = ?
+        WHERE id = ? AND status = 'running' AND attempts = ?
+        ''', (now.isoformat(), error[:2000], job_id, attempts))
+    conn.commit()
+
+
+def execute(database, job_id):
+    """
+    Einen bereits vergebenen Job ausführen (läuft im Worker-Prozess, eigene Verbindung).
+    Returns: Endstatus
+    """
+    conn = sqlite3.connect(database, timeout=30)
+    try:
+        row = conn.execute('''
+        SELECT kind, payload, attempts, max_attempts, checkpoint FROM jobs WHERE id = ?
+        ''', (job_id,)).fetchone()
+        if row is None:
+            return None
+        kind, payload, attempts, max_attempts, checkpoint = row
+        context = JobContext(conn, job_id, attempts, json.loads(checkpoint) if checkpoint else None)
+        try:
+            result = _resolve(kind)(context, json.loads(payload) if payload else {})
+        except LeaseLost:
+            conn.rollback()
+            return None
+        except Exception as e:
+            conn.rollback()
+            _finish_failed(conn, job_id, attempts, max_attempts, f"{type(e).__name__}: {e}")
+            return QUEUED if attempts < max_attempts else FAILED
+        cursor = conn.execute('''
+        UPDATE jobs SET status = 'done', progress = 1, finished_at = ?, result = ?
+        WHERE id = ? AND status = 'running' AND attempts = ?
+        ''', (datetime.now().isoformat(), json.dumps(result), job_id, attempts))
+        conn.commit()
+        return DONE if cursor.rowcount == 1 else None
+    finally:
+        conn.close()
+
+
+# Runner
+
+def _claim(conn, now):
+    """
+    Nächsten fälligen Job für diesen Runner sperren (Compare-and-Swap auf den Status).
+    Returns: ID oder None
+    """
+    while True:
+        row = conn.execute('''
+        SELECT id FROM jobs
+        WHERE status = 'queued' AND (run_after IS NULL OR run_after <= ?)
+        ORDER BY priority DESC, id
+        LIMIT 1
+        ''', (now,)).fetchone()
+        if row is None:
+            return None
+        cursor = conn.execute('''
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, heartbeat_at = ?
+        WHERE id = ? AND status = 'queued'
+        ''', (now, now, row[0]))
+        conn.commit()
+        if cursor.rowcount == 1:
+            return row[0]
+
+
+def enqueue_due_schedules(conn, now=None):
+    """
+    Fällige wiederkehrende Jobs einreihen. Verpasste Termine (Server war aus) werden einmal nachgeholt.
+    Returns: Anzahl eingereihter Jobs
+    """
+    now = now or datetime.now()
+    due = conn.execute('''
+    SELECT name, kind, payload, cron, next_run FROM job_schedules
+    WHERE enabled = 1 AND next_run <= ?
+    ''', (now.isoformat(),)).fetchall()
+    count = 0
+    for name, kind, payload, cron, scheduled in due:
+        following = next_run(cron, now).isoformat()
+        # Nur der Runner, der den Termin weitersetzt, reiht den Job ein
+        cursor = conn.execute('''
+        UPDATE job_schedules SET next_run = ? WHERE name = ? AND next_run = ?
+        ''', (following, name, scheduled))
+        if cursor.rowcount == 1:
+            job_id = enqueue(conn, kind, json.loads(payload) if payload else None, schedule=name)
+            conn.execute("UPDATE job_schedules SET last_job_id = ? WHERE name = ?", (job_id, name))
+            count += 1
+        conn.commit()
+    return count
+
+
+def requeue_stale(conn, now=None):
+    """
+    Laufende Jobs ohne Lebenszeichen seit LEASE_SECONDS (hängend oder Prozess abgebrochen) erneut einreihen
+    bzw. als fehlgeschlagen markieren, wenn keine Versuche mehr übrig sind.
+    """
+    now = now or datetime.now()
+    cutoff = (now - timedelta(seconds=LEASE_SECONDS)).isoformat()
+    stale = conn.execute('''
+    SELECT id, attempts, max_attempts FROM jobs WHERE status = 'running' AND heartbeat_at < ?
+    ''', (cutoff,)).fetchall()
+    for job_id, attempts, max_attempts in stale:
+        _finish_failed(conn, job_id, attempts, max_attempts, "Keine Rückmeldung des Worker-Prozesses")
+    return len(stale)
+
+
+class JobRunner(threading.Thread):
+    """
+    Hintergrund-Thread, der fällige Jobs an einen Prozesspool vergibt. Seitenaufrufe warten nie
+    auf Jobs; der Runner vergibt Sperren, die Lebenszeichen kommen von den Jobs selbst.
+    """
+
+    def __init__(self, database, processes=None, interval=POLL_INTERVAL):
+        super().__init__(name="job-runner", daemon=True)
+        self.database = database
+        self.processes = processes or max(1, (os.cpu_count() or 2) - 1)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._running = {}  # job_id -> Future
+
+    def _pool(self):
+        # spawn statt fork: der Streamlit-Prozess hat viele Threads, ein Fork könnte deren Sperren erben
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def run(self):
+        conn = sqlite3.connect(self.database, timeout=30)
+        pool = self._pool()
+        try:
+            ensure_jobs(conn)
+            while not self._stop_event.is_set():
+                try:
+                    pool = self._tick(conn, pool)
+                except sqlite3.Error:
+                    conn.rollback()
+                self._wake_event.wait(self.interval)
+                self._wake_event.clear()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            conn.close()
+
+    def _tick(self, conn, pool):
+        now = datetime.now()
+        enqueue_due_schedules(conn, now)
+
+        # Abgeschlossene Ausführungen abräumen; ein abgestürzter Prozess macht den Pool unbrauchbar
+        broken = False
+        for job_id, future in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[job_id]
+            error = future.exception()
+            if error is not None:
+                row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row:
+                    _finish_failed(conn, job_id, *row, f"{type(error).__name__}: {error}")
+                broken = True
+        if broken:
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = self._pool()
+
+        # Jobs ohne Lebenszeichen (hängend oder Prozess abgebrochen) erneut einreihen
+        requeue_stale(conn, now)
+
+        while len(self._running) < self.processes:
+            job_id = _claim(conn, now.isoformat())
+            if job_id is None:
+                break
+            try:
+                future = pool.submit(execute, self.database, job_id)
+            except (RuntimeError, BrokenProcessPool) as e:
+                # Pool nicht nutzbar (z.B. Prozessstart fehlgeschlagen): Job zurückgeben, nächste Runde neuer Pool
+                _finish_failed(conn, job_id, *conn.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone(),
+                    f"{type(e).__name__}: {e}")
+                pool.shutdown(wait=False, cancel_futures=True)
+                return self._pool()
+            future.add_done_callback(lambda _: self._wake_event.set())
+            self._running[job_id] = future
+        return pool
+
+    def wake(self):
+        self._wake_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+
+_runners = {}
+_runners_lock = threading.Lock()
+
+
+def start_runner(database='werbetraeger.db', processes=None, interval=POLL_INTERVAL):
+    """
+    Runner für eine Datenbank einmal pro Prozess starten (weitere Aufrufe liefern den laufenden Runner).
+    """
+    database = os.path.abspath(database)
+    with _runners_lock:
+        runner = _runners.get(database)
+        if runner is None or not runner.is_alive():
+            runner = JobRunner(database, processes, interval)
+            runner.start()
+            _runners[database] = runner
+    return runner
+
+
+def wake_runner(database='werbetraeger.db'):
+    """
+    Laufenden Runner sofort eine Runde ausführen lassen (z.B. nach dem Einreihen eines Jobs).
+    """
+    runner = _runners.get(os.path.abspath(database))
+    if runner is not None:
+        runner.wake()
+
+
+# Job-Funktionen
+
+def archive_terminal_job(context, payload):
+    import archive
+
+    days = payload.get('older_than_days', archive.ARCHIVE_AFTER_DAYS)
+    # Lebenszeichen je Batch, der Gesamtumfang ist vorab nicht bekannt
+    archived = archive.archive_terminal(context.conn, older_than_days=days,
+                                        on_batch=lambda count: context.progress(0, message=f"{count} Standorte archiviert"))
+    return {'archived': archived}
+
+
+def rebuild_search_index_job(context, payload):
+    import search
+
+    return {'rebuilt': search.rebuild_search_index(context.conn)}
+
+
+def workflow_graph_snapshot_job(context, payload):
+    import workflow_graph
+
+    workflow_graph.cached_graphviz_source()
+    context.progress(0.5, message="Graphviz-Quelle erstellt", force=True)
+    workflow_graph.cached_figure_dict()
+    return {'hash': workflow_graph.definition_hash()}
+
+
+def export_locations_job(context, payload, batch_size=2000):
+    """
+    Alle Standorte als CSV exportieren, in Batches über den Primärschlüssel. Nach jeder Batch werden
+    letzte ID und Dateiposition gesichert; ein neuer Versuch kürzt die Datei auf diese Position und
+    setzt dort fort.
+    """
+    import schema
+
+    columns = schema.table_columns(context.conn, 'locations')
+    path = os.path.join(EXPORT_DIR, payload.get('filename') or f"standorte_{context.job_id}.csv")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    total = context.conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+
+    state = context.checkpoint or {'last_id': '', 'offset': 0, 'rows': 0}
+    with open(path, 'a+' if state['offset'] else 'w', newline='', encoding='utf-8') as file:
+        file.seek(state['offset'])
+        file.truncate()
+        writer = csv.writer(file, delimiter=';')
+        if not state['offset']:
+            writer.writerow(columns)
+        while True:
+            rows = context.conn.execute(f'''
+            SELECT {', '.join(columns)} FROM locations WHERE id > ? ORDER BY id LIMIT ?
+            ''', (state['last_id'], batch_size)).fetchall()
+            if not rows:
+                break
+            writer.writerows(rows)
+            file.flush()
+            state = {'last_id': rows[-1][columns.index('id')], 'offset': file.tell(), 'rows': state['rows'] + len(rows)}
+            context.save_checkpoint(state, state['rows'], total, f"{state['rows']} von {total} Standorten")
+    return {'path': os.path.relpath(path, BASE_DIR), 'rows': state['rows']}
+
+
+def completion_report_job(context, payload):
+    """
+    Übergabeprotokoll eines fertiggestellten Standorts als Markdown-Datei.
+    """
+    import archive
+    import records
+    import timestamps
+
+    location = records.load_location(context.conn, payload['location_id'])
+    if location is None:
+        raise ValueError(f"Standort {payload['location_id']} nicht gefunden")
+    history = archive.load_history(context.conn, location.id)
+
+    lines = [
+        f"# Übergabeprotokoll {location.standort}, {location.stadt}",
+        "",
+        f"- Vermarktungsform: {location.vermarktungsform}",
+        f"- Seiten: {location.seiten}",
+        f"- Aufbau (IST): {location.ist_date or '–'} durch {location.contractor or '–'}",
+        f"- Finale Abnahme: {location.final_inspection or '–'}",
+        f"- Netzwerk-ID: {location.network_id or '–'}, CMS-ID: {location.dms_id or '–'}",
+        f"- Fertiggestellt am: {location.completion_date or '–'}",
+        "",
+        "## Workflow-Historie",
+        "",
+        "| Schritt | Status | Benutzer | Zeitpunkt | Kommentar |",
+        "|---|---|---|---|---|",
+    ]
+    lines += [f"| {step} | {status} | {user} | {timestamps.format_one(timestamp, timestamps.DATETIME_FORMAT)} "
+              f"| {(comment or '').replace('|', '/')} |"
+              for step, status, comment, user, timestamp in history]
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"uebergabe_{location.id}.md")
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("\n".join(lines) + "\n")
+    return {'path': os.path.relpath(path, BASE_DIR)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hintergrundjobs ausführen und verwalten.")
+    parser.add_argument("--database", default=os.path.join(BASE_DIR, "werbetraeger.db"))
+    parser.add_argument("--worker", action="store_true", help="Runner im Vordergrund starten")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--enqueue", choices=sorted(JOB_TYPES), help="Job einreihen")
+    parser.add_argument("--payload", default="{}", help="Parameter des Jobs als JSON")
+    parser.add_argument("--list", action="store_true", help="Letzte Jobs anzeigen")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.database, timeout=30)
+    ensure_jobs(conn)
+    if args.enqueue:
+        job_id = enqueue(conn, args.enqueue, json.loads(args.payload))
+        conn.commit()
+        print(f"Job {job_id} ({args.enqueue}) eingereiht")
+    if args.list:
+        for job in recent_jobs(conn, 20):
+            print(f"{job.id:>6} {job.kind:<24} {job.status:<8} {job.progress:>4.0%} "
+                  f"Versuch {job.attempts}/{job.max_attempts} {job.last_error or ''}")
+    conn.close()
+
+    if args.worker:
+        runner = JobRunner(os.path.abspath(args.database), args.processes)
+        runner.start()
+        try:
+            while runner.is_alive():
+                runner.join(1)
+        except KeyboardInterrupt:
+            runner.stop()
+            runner.join()
+
+
+if __name__ == "__main__":
+    main()
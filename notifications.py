@@ -0,0 +1,263 @@
+import json
+import os
+import smtplib
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+from email.message import EmailMessage
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Verzeichnis der lokalen Zustellung (Ersatz für SMTP in Entwicklung und Tests)
+OUTBOX_DIR = os.path.join(BASE_DIR, "notifications")
+
+# Empfänger (Rolle) je Prozessschritt, der einen Standort neu in seiner Queue hat
+STEP_RECIPIENTS = {
+    'leiter_akquisition': 'rolle:leiter_akquisition',
+    'niederlassungsleiter': 'rolle:niederlassungsleiter',
+    'baurecht': 'rolle:baurecht',
+    'widerspruch': 'rolle:baurecht',
+    'ceo': 'rolle:ceo',
+    'bauteam': 'rolle:bauteam',
+    'fertigstellung': 'rolle:fertigstellung',
+}
+
+# Endzustände, über die der Erfasser des Standorts informiert wird
+ERFASSER_STEPS = ('abgelehnt', 'abgebrochen', 'rejected', 'fertig')
+
+POLL_INTERVAL = 30
+BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+
+INSERT_OUTBOX = '''
+INSERT INTO notification_outbox (recipient, location_id, step, message, created_at)
+VALUES (?, ?, ?, ?, ?)
+'''
+
+
+def ensure_outbox(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS notification_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient TEXT NOT NULL,
+        location_id TEXT,
+        step TEXT,
+        message TEXT,
+        created_at TEXT,
+        sent_at TEXT,
+        attempts INTEGER DEFAULT 0,
+        last_error TEXT
+    )
+    ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_outbox_pending
+    ON notification_outbox (id) WHERE sent_at IS NULL
+    ''')
+    conn.commit()
+
+
+def enqueue(conn, recipient, location_id, step, message):
+    """
+    Benachrichtigung in die Outbox schreiben. Kein Commit: läuft in der Transaktion des Aufrufers,
+    die Benachrichtigung existiert also genau dann, wenn der Übergang gespeichert wurde.
+    """
+    conn.execute(INSERT_OUTBOX, (recipient, location_id, step, message, datetime.now().isoformat()))
+
+
+def enqueue_many(conn, rows):
+    """
+    Mehrere Benachrichtigungen (recipient, location_id, step, message) in einem executemany schreiben.
+    """
+    now = datetime.now().isoformat()
+    conn.executemany(INSERT_OUTBOX, [(*row, now) for row in rows])
+
+
+def notify_transition(conn, location_id, next_step, message):
+    """
+    Benachrichtigungen für einen Übergang einreihen: Rolle des nächsten Schritts bzw.
+    bei Endzuständen der Erfasser des Standorts. Kein Commit (siehe enqueue).
+    """
+    recipient = STEP_RECIPIENTS.get(next_step)
+    if recipient:
+        enqueue(conn, recipient, location_id, next_step, message)
+    if next_step in ERFASSER_STEPS:
+        conn.execute('''
+        INSERT INTO notification_outbox (recipient, location_id, step, message, created_at)
+        SELECT 'erfasser:' || erfasser, id, ?, ?, ?
+        FROM locations
+        WHERE id = ? AND erfasser IS NOT NULL AND erfasser != ''
+        ''', (next_step, message, datetime.now().isoformat(), location_id))
+
+
+class FileTransport:
+    """
+    Lokale Zustellung: jeder Digest wird als JSON-Zeile in <verzeichnis>/<empfänger>.jsonl angehängt.
+    """
+
+    def __init__(self, directory=OUTBOX_DIR):
+        self.directory = directory
+
+    def send(self, recipient, subject, body):
+        os.makedirs(self.directory, exist_ok=True)
+        filename = "".join(char if char.isalnum() or char in "-_" else "_" for char in recipient)
+        with open(os.path.join(self.directory, f"{filename}.jsonl"), "a", encoding="utf-8") as file:
+            file.write(json.dumps({
+                'recipient': recipient, 'subject': subject, 'body': body,
+                'sent_at': datetime.now().isoformat()
+            }, ensure_ascii=False) + "\n")
+
+
+class SMTPTransport:
+    """
+    Versand per SMTP. addresses bildet Empfänger (z.B. 'rolle:ceo') auf E-Mail-Adressen ab;
+    Empfänger ohne Adresse werden übersprungen.
+    """
+
+    def __init__(self, host, port=25, sender="workflow@localhost", addresses=None, username=None, password=None):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.addresses = addresses or {}
+        self.username = username
+        self.password = password
+
+    def send(self, recipient, subject, body):
+        address = self.addresses.get(recipient)
+        if not address:
+            return
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = address
+        message['Subject'] = subject
+        message.set_content(body)
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.username:
+                smtp.starttls()
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+def default_transport():
+    # SMTP nur, wenn konfiguriert; Adressen als JSON, z.B. {"rolle:ceo": "ceo@example.com"}
+    host = os.environ.get("NOTIFY_SMTP_HOST")
+    if not host:
+        return FileTransport()
+    return SMTPTransport(
+        host,
+        port=int(os.environ.get("NOTIFY_SMTP_PORT", 25)),
+        sender=os.environ.get("NOTIFY_SENDER", "workflow@localhost"),
+        addresses=json.loads(os.environ.get("NOTIFY_ADDRESSES", "{}")),
+        username=os.environ.get("NOTIFY_SMTP_USER"),
+        password=os.environ.get("NOTIFY_SMTP_PASSWORD"),
+    )
+
+
+def _digest(entries):
+    count = len(entries)
+    subject = f"Digitale Säule: {count} {'neuer Vorgang' if count == 1 else 'neue Vorgänge'}"
+    lines = [f"- {standort or '?'}, {stadt or '?'} ({step}): {message}"
+             for _, _, step, message, standort, stadt in entries]
+    return subject, "\n".join(lines)
+
+
+def deliver_pending(conn, transport, batch_size=BATCH_SIZE):
+    """
+    Offene Benachrichtigungen je Empfänger zu einem Digest bündeln und zustellen.
+    Fehlgeschlagene Zustellungen werden bis MAX_ATTEMPTS beim nächsten Lauf erneut versucht.
+    Returns: Anzahl zugestellter Benachrichtigungen
+    """
+    rows = conn.execute('''
+    SELECT o.id, o.recipient, o.step, o.message, l.standort, l.stadt
+    FROM notification_outbox o
+    LEFT JOIN locations l ON l.id = o.location_id
+    WHERE o.sent_at IS NULL AND o.attempts < ?
+    ORDER BY o.id
+    LIMIT ?
+    ''', (MAX_ATTEMPTS, batch_size)).fetchall()
+
+    by_recipient = defaultdict(list)
+    for row in rows:
+        by_recipient[row[1]].append(row)
+
+    delivered = 0
+    for recipient, entries in by_recipient.items():
+        ids = [(entry[0],) for entry in entries]
+        try:
+            transport.send(recipient, *_digest(entries))
+        except Exception as e:
+            conn.executemany(
+                "UPDATE notification_outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(str(e)[:500], id_) for (id_,) in ids]
+            )
+        else:
+            now = datetime.now().isoformat()
+            conn.executemany("UPDATE notification_outbox SET sent_at = ? WHERE id = ?", [(now, id_) for (id_,) in ids])
+            delivered += len(ids)
+        conn.commit()
+    return delivered
+
+
+class NotificationWorker(threading.Thread):
+    """
+    Hintergrund-Thread, der die Outbox regelmäßig abarbeitet. Nutzt eine eigene Verbindung,
+    Seitenaufrufe warten also nie auf den Versand.
+    """
+
+    def __init__(self, database, transport=None, interval=POLL_INTERVAL):
+        super().__init__(name="notification-worker", daemon=True)
+        self.database = database
+        self.transport = transport or default_transport()
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.database, timeout=30)
+        try:
+            ensure_outbox(conn)
+            while not self._stop_event.is_set():
+                try:
+                    # Solange volle Batches anfallen, direkt weitermachen
+                    while deliver_pending(conn, self.transport) >= BATCH_SIZE:
+                        pass
+                except sqlite3.Error:
+                    conn.rollback()
+                self._wake_event.wait(self.interval)
+                self._wake_event.clear()
+        finally:
+            conn.close()
+
+    def wake(self):
+        self._wake_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def start_worker(database='werbetraeger.db', transport=None, interval=POLL_INTERVAL):
+    """
+    Worker für eine Datenbank einmal pro Prozess starten (weitere Aufrufe liefern den laufenden Worker).
+    """
+    database = os.path.abspath(database)
+    with _workers_lock:
+        worker = _workers.get(database)
+        if worker is None or not worker.is_alive():
+            worker = NotificationWorker(database, transport, interval)
+            worker.start()
+            _workers[database] = worker
+    return worker
+
+
+def wake_worker(database='werbetraeger.db'):
+    """
+    Laufenden Worker sofort eine Runde ausführen lassen (z.B. nach einem Commit).
+    """
+    worker = _workers.get(os.path.abspath(database))
+    if worker is not None:
+        worker.wake()
@@ -0,0 +1,269 @@
+"""
+Numerische Spalten, die ursprünglich als TEXT angelegt wurden (bisher nur leistungswert).
+
+migrate baut die betroffenen Tabellen einmalig mit REAL-Spalten und einer CHECK-Bedingung neu auf
+(SQLite kann den Typ einer Spalte nicht per ALTER TABLE ändern). rowids, Indizes und Trigger bleiben
+erhalten, der Volltextindex passt also weiter. Altwerte werden wie Eingaben gelesen ("1.000",
+"12,5", " 100 "); was sich nicht lesen lässt, wird NULL und mit dem Originalwert im
+Umwandlungsbericht (Tabelle numeric_conversion_report) festgehalten.
+
+Schreibende Stellen prüfen Eingaben mit parse_number bzw. parse_series; die CHECK-Bedingung
+weist alles ab, was trotzdem als Text ankommt.
+
+Aufruf:
+    python numeric_columns.py                # Migration ausführen und Bericht ausgeben
+"""
+import argparse
+import math
+import re
+import sqlite3
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import schema
+
+# Spalte -> (SQL-Typ, kleinster zulässiger Wert)
+NUMERIC_COLUMNS = {
+    'leistungswert': ('REAL', 0),
+}
+
+# Tabellen mit diesen Spalten (das Archiv spiegelt locations)
+TABLES = ('locations', 'locations_archive')
+
+INDEXES = {
+    'idx_locations_leistungswert': ('locations', 'leistungswert'),
+}
+
+# Dezimalzahl nach dem Vereinheitlichen der Trennzeichen
+_NUMBER = r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?'
+
+_migrated = set()
+
+
+class ConversionIssue(NamedTuple):
+    table: str
+    row_id: str
+    column: str
+    original: str
+    reason: str
+
+
+def column_definition(column):
+    sql_type, _ = NUMERIC_COLUMNS[column]
+    return f"{column} {sql_type} CHECK (typeof({column}) IN ('real', 'integer', 'null'))"
+
+
+def parse_series(values, column='leistungswert'):
+    """
+    Texte spaltenweise in Zahlen umwandeln. Deutsches Format hat Vorrang: "12,5" ist 12.5,
+    "1.000" und "1.000.000" sind Tausendertrennzeichen; kommen beide Zeichen vor, ist das
+    letzte das Dezimaltrennzeichen. Leere Werte werden NaN ohne Fehler.
+    Returns: (Series mit float/NaN, Series mit Fehlertext bzw. '')
+    """
+    _, minimum = NUMERIC_COLUMNS[column]
+    text = pd.Series(values, dtype=object).fillna('').astype(str).str.replace(r'\s', '', regex=True)
+    empty = text == ''
+
+    comma = text.str.rfind(',')
+    dot = text.str.rfind('.')
+    grouped_dots = text.str.fullmatch(r'[+-]?\d{1,3}(?:\.\d{3})+')
+    decimal_comma = (comma > dot) | grouped_dots
+    normalized = text.where(~decimal_comma, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    normalized = normalized.where(decimal_comma, normalized.str.replace(',', '', regex=False))
+
+    valid = normalized.str.fullmatch(_NUMBER) & ~empty
+    numbers = pd.to_numeric(normalized.where(valid), errors='coerce').astype(float)
+
+    errors = pd.Series('', index=text.index)
+    errors = errors.where(empty | valid, "keine Zahl")
+    errors = errors.where(~(valid & ~np.isfinite(numbers)), "Zahl außerhalb des gültigen Bereichs")
+    errors = errors.where(~(numbers < minimum), f"kleiner als {minimum}")
+    numbers = numbers.where(errors == '')
+    return numbers, errors
+
+
+def parse_number(value, column='leistungswert'):
+    """
+    Einzelne Eingabe prüfen (z.B. aus einem Formular).
+    Returns: float oder None bei leerer Eingabe
+    Raises: ValueError mit Fehlertext, wenn der Wert keine zulässige Zahl ist
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        _, minimum = NUMERIC_COLUMNS[column]
+        if not math.isfinite(value):
+            raise ValueError("Zahl außerhalb des gültigen Bereichs")
+        if value < minimum:
+            raise ValueError(f"kleiner als {minimum}")
+        return float(value)
+    numbers, errors = parse_series([value], column)
+    if errors.iloc[0]:
+        raise ValueError(errors.iloc[0])
+    return None if pd.isna(numbers.iloc[0]) else float(numbers.iloc[0])
+
+
+def format_number(value):
+    """
+    Zahl für die Anzeige im deutschen Format ohne unnötige Nachkommastellen, z.B. "1.000" oder "12,5".
+    """
+    if value is None or isinstance(value, float) and math.isnan(value):
+        return "–"
+    if isinstance(value, str):
+        return value
+    text = f"{value:,.2f}".rstrip('0').rstrip('.')
+    return text.replace(',', '\0').replace('.', ',').replace('\0', '.')
+
+
+def declared_types(conn, table):
+    return {row[1]: (row[2] or '').upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def pending_columns(conn, table):
+    """
+    Spalten der Tabelle, die noch nicht den Zieltyp haben.
+    """
+    types = declared_types(conn, table)
+    return [column for column, (sql_type, _) in NUMERIC_COLUMNS.items() if column in types and types[column] != sql_type]
+
+
+def _ensure_report(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS numeric_conversion_report (
+        table_name TEXT NOT NULL,
+        row_id TEXT,
+        column_name TEXT NOT NULL,
+        original TEXT,
+        reason TEXT,
+        converted_at TEXT
+    )
+    ''')
+
+
+def _rebuild(conn, table, columns):
+    """
+    Tabelle mit geänderten Spaltentypen neu aufbauen (in der laufenden Transaktion).
+    Returns: Liste von ConversionIssue
+    """
+    create_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    dependents = [row[0] for row in conn.execute('''
+    SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''', (table,))]
+
+    new_table = f"{table}__numeric"
+    new_sql = re.sub(r'^(\s*CREATE\s+TABLE\s+)["`\[]?\w+["`\]]?', lambda match: match.group(1) + new_table,
+                     create_sql, count=1, flags=re.IGNORECASE)
+    for column in columns:
+        new_sql = re.sub(rf'["`\[]?\b{column}\b["`\]]?\s+\w+(?:\s+CHECK\s*\([^)]*\))?', column_definition(column),
+                         new_sql, count=1, flags=re.IGNORECASE)
+
+    names = schema.table_columns(conn, table)
+    copied = ", ".join('NULL' if name in columns else name for name in names)
+    conn.execute(new_sql)
+    conn.execute(f"INSERT INTO {new_table} (rowid, {', '.join(names)}) SELECT rowid, {copied} FROM {table}")
+
+    issues = []
+    for column in columns:
+        rows = conn.execute(f"SELECT rowid, id, {column} FROM {table} WHERE {column} IS NOT NULL").fetchall()
+        if not rows:
+            continue
+        rowids, ids, originals = zip(*rows)
+        numbers, errors = parse_series(originals, column)
+        conn.executemany(f"UPDATE {new_table} SET {column} = ? WHERE rowid = ?", [
+            (number, rowid) for number, rowid in zip(numbers.tolist(), rowids) if not np.isnan(number)
+        ])
+        issues += [ConversionIssue(table, row_id, column, str(original), error)
+                   for row_id, original, error in zip(ids, originals, errors) if error]
+
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for sql in dependents:
+        conn.execute(sql)
+    return issues
+
+
+def migrate(conn):
+    """
+    Alle Tabellen mit noch nicht umgestellten Spalten in einer Transaktion neu aufbauen,
+    Umwandlungsbericht schreiben und Indizes anlegen.
+    Returns: Liste von ConversionIssue (leer, wenn alles lesbar war oder nichts zu tun ist)
+    """
+    existing = {row[0] for row in conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(TABLES))})", TABLES
+    )}
+    pending = {table: pending_columns(conn, table) for table in TABLES if table in existing}
+    pending = {table: columns for table, columns in pending.items() if columns}
+
+    issues = []
+    if pending:
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _ensure_report(conn)
+            for table, columns in pending.items():
+                issues += _rebuild(conn, table, columns)
+            now = datetime.now().isoformat()
+            conn.executemany('''
+            INSERT INTO numeric_conversion_report (table_name, row_id, column_name, original, reason, converted_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(*issue, now) for issue in issues])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        for table in pending:
+            schema.invalidate(conn, table)
+
+    for name, (table, column) in INDEXES.items():
+        if table in existing:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})")
+    conn.commit()
+    return issues
+
+
+def ensure_numeric_columns(conn):
+    """
+    Migration einmal pro Prozess und Datenbank prüfen (danach ohne Abfrage).
+    """
+    database = conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+    if database not in _migrated or database == ":memory:":
+        migrate(conn)
+        _migrated.add(database)
+
+
+def conversion_report(conn):
+    """
+    Nicht umwandelbare Altwerte aller bisherigen Migrationen.
+    Returns: DataFrame mit table_name, row_id, column_name, original, reason, converted_at
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'numeric_conversion_report'"
+    ).fetchone()
+    if not exists:
+        return pd.DataFrame(columns=['table_name', 'row_id', 'column_name', 'original', 'reason', 'converted_at'])
+    return pd.read_sql_query("SELECT * FROM numeric_conversion_report ORDER BY converted_at, table_name", conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Als TEXT gespeicherte Zahlenspalten auf REAL umstellen.")
+    parser.add_argument("--database", default="werbetraeger.db")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.database)
+    pending = {table: pending_columns(conn, table) for table in TABLES}
+    issues = migrate(conn)
+    for table, columns in pending.items():
+        if columns:
+            print(f"{table}: {', '.join(columns)} umgestellt")
+    if not any(pending.values()):
+        print("Keine Spalten umzustellen")
+    report = conversion_report(conn)
+    print(f"{len(issues)} nicht umwandelbare Werte in diesem Lauf, {len(report)} im Bericht insgesamt")
+    if not report.empty:
+        print(report.to_string(index=False))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,28 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-from datetime import datetime, timedelta
 import plotly.express as px
+import aging
+import schema
+import archive
+import finance
+import concurrency
+import forecast
+import timestamps
+import numeric_columns
+import regions
 
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+aging.ensure_history_index(conn)
+concurrency.ensure_version_column(conn)
+numeric_columns.ensure_numeric_columns(conn)
+regions.ensure_region_column(conn)
 
-# Verfügbare Spalten in der Datenbank prüfen
+# Verfügbare Spalten in der Datenbank prüfen (einmal pro Prozess, danach aus dem Schema-Cache)
 def get_available_columns():
-    c.execute("PRAGMA table_info(locations)")
-    columns_info = c.fetchall()
-    return {col[1] for col in columns_info}  # Set mit verfügbaren Spaltennamen
+    return schema.available_columns(conn, 'locations')  # Set mit verfügbaren Spaltennamen
 
 available_columns = get_available_columns()
 
@@ -28,6 +38,8 @@ selected_timeframe = st.sidebar.selectbox("Zeitraum", date_options)
 # Vermarktungsform-Filter
 c.execute('SELECT DISTINCT vermarktungsform FROM locations')
 marketing_forms = [form[0] for form in c.fetchall() if form[0] is not None]
+# Vermarktungsformen, die nur noch im Archiv vorkommen
+marketing_forms += [form for form in archive.archived_forms(conn) if form not in marketing_forms]
 if marketing_forms:
     selected_forms = st.sidebar.multiselect("Vermarktungsform", marketing_forms, default=marketing_forms)
 else:
@@ -39,13 +51,14 @@ params = []
 
 if selected_timeframe != "Alle":
     if selected_timeframe == "Letzte 30 Tage":
-        date_threshold = (datetime.now() - timedelta(days=30)).isoformat()
+        date_threshold = timestamps.since(30)
     elif selected_timeframe == "Letztes Quartal":
-        date_threshold = (datetime.now() - timedelta(days=90)).isoformat()
+        date_threshold = timestamps.since(90)
     elif selected_timeframe == "Letztes Jahr":
-        date_threshold = (datetime.now() - timedelta(days=365)).isoformat()
+        date_threshold = timestamps.since(365)
     
-    where_clauses.append("created_at >= ?")
+    # Ganzzahliger Vergleich über den Index (locations und Archiv-Summen haben beide created_at_epoch)
+    where_clauses.append("created_at_epoch >= ?")
     params.append(date_threshold)
 
 if selected_forms:
@@ -57,35 +70,52 @@ where_clause = " AND ".join(where_clauses) if where_clauses else ""
 query_suffix = f" WHERE {where_clause}" if where_clause else ""
 
 
-# KPIs berechnen
-c.execute(f'SELECT COUNT(*) FROM locations{query_suffix}', params)
-total = c.fetchone()[0] or 0
+COUNT_COLUMNS = ['vermarktungsform', 'status', 'current_step', 'anzahl']
+
+
+# Standorte je Vermarktungsform, Status und Schritt: jede Region (Niederlassung) wird parallel
+# mit eigener Verbindung gezählt, die Teilergebnisse werden zusammengeführt
+def load_counts(query_suffix, query_params):
+    region_suffix = f"{query_suffix} AND region = ?" if query_suffix else " WHERE region = ?"
+    partial = regions.fan_out(conn, lambda region_conn, region: region_conn.execute(f'''
+        SELECT vermarktungsform, status, current_step, COUNT(*)
+        FROM locations{region_suffix}
+        GROUP BY vermarktungsform, status, current_step
+    ''', [*query_params, region]).fetchall())
+    return pd.DataFrame([row for rows in partial.values() for row in rows], columns=COUNT_COLUMNS)
+
+live_counts = load_counts(query_suffix, params)
+# Summenzeilen archivierter Standorte zählen überall mit (außer in der Diagnose unten)
+counts_df = pd.concat([
+    live_counts,
+    pd.DataFrame(archive.archived_counts(conn, query_suffix, params), columns=COUNT_COLUMNS)
+], ignore_index=True)
+
+
+# Anzahl Standorte für einen Filter (leere Werte erfüllen wie in SQL keine Bedingung)
+def count_locations(status=None, step=None, form=None, not_step=None):
+    mask = pd.Series(True, index=counts_df.index)
+    if status is not None:
+        mask &= counts_df['status'] == status
+    if step is not None:
+        mask &= counts_df['current_step'] == step
+    if form is not None:
+        mask &= counts_df['vermarktungsform'] == form
+    if not_step is not None:
+        mask &= counts_df['current_step'].notna() & (counts_df['current_step'] != not_step)
+    return int(counts_df.loc[mask, 'anzahl'].sum())
 
-# Parameter für weitere Abfragen klonen
-status_params = params.copy()
+# KPIs berechnen
+total = count_locations()
 
 # In Bearbeitung: Alle mit status='active' außer die, die bereits fertig sind
-if where_clause:
-    # Wichtig: Wir zählen nur die aktiven Einträge, die noch nicht fertig sind
-    status_query_suffix = f"{query_suffix} AND status = 'active' AND current_step != 'fertig'"
-    rejected_query_suffix = f"{query_suffix} AND status = 'rejected'"
-    completed_query_suffix = f"{query_suffix} AND current_step = 'fertig'"
-else:
-    status_query_suffix = " WHERE status = 'active' AND current_step != 'fertig'"
-    rejected_query_suffix = " WHERE status = 'rejected'"
-    completed_query_suffix = " WHERE current_step = 'fertig'"
-
-# Aktive Standorte im Prozess (nicht fertig)
-c.execute(f'SELECT COUNT(*) FROM locations{status_query_suffix}', status_params)
-in_progress = c.fetchone()[0] or 0
+in_progress = count_locations(status='active', not_step='fertig')
 
 # Abgelehnte Standorte
-c.execute(f'SELECT COUNT(*) FROM locations{rejected_query_suffix}', status_params)
-rejected = c.fetchone()[0] or 0
+rejected = count_locations(status='rejected')
 
 # Fertige Standorte
-c.execute(f'SELECT COUNT(*) FROM locations{completed_query_suffix}', status_params)
-completed = c.fetchone()[0] or 0
+completed = count_locations(step='fertig')
 
 # Prüfen, ob die Summe stimmt (es sollte total = in_progress + rejected + completed sein)
 if total != (in_progress + rejected + completed):
@@ -94,7 +124,7 @@ if total != (in_progress + rejected + completed):
 
 # Gesamte durchschnittliche Durchlaufzeit
 c.execute('''
-    SELECT AVG(julianday(h_end.timestamp) - julianday(h_start.timestamp))
+    SELECT AVG(h_end.timestamp_epoch - h_start.timestamp_epoch) / 86400.0
     FROM workflow_history h_start
     JOIN workflow_history h_end ON h_start.location_id = h_end.location_id
     WHERE h_start.step = 'erfassung' 
@@ -120,15 +150,11 @@ steps = ['erfassung', 'leiter_akquisition', 'niederlassungsleiter', 'baurecht',
 step_names = ['Erfassung', 'Leiter Akq.', 'Niederl.leiter', 'Baurecht', 'Widerspruch', 'CEO', 'Bauteam', 'Fertig']
 
 # Diagnose: Finde Standorte, die "in Bearbeitung" sind, aber keinen gültigen Schritt haben
-diagnose_params = params.copy()
-if where_clause:
-    diagnose_query = f"{query_suffix} AND status = 'active' AND current_step != 'fertig' AND current_step NOT IN ({','.join(['?']*len(steps[:-1]))})"
-else:
-    diagnose_query = f" WHERE status = 'active' AND current_step != 'fertig' AND current_step NOT IN ({','.join(['?']*len(steps[:-1]))})"
-
-diagnose_params.extend(steps[:-1])
-c.execute(f'SELECT COUNT(*), current_step FROM locations{diagnose_query} GROUP BY current_step', diagnose_params)
-missing_steps = c.fetchall()
+hidden = live_counts[
+    (live_counts['status'] == 'active') & live_counts['current_step'].notna()
+    & ~live_counts['current_step'].isin(steps)
+]
+missing_steps = [(int(count), step) for step, count in hidden.groupby('current_step')['anzahl'].sum().items()]
 
 # Wenn "versteckte" Standorte gefunden wurden, zeige einen Hinweis
 if missing_steps and sum(count for count, _ in missing_steps) > 0:
@@ -156,15 +182,7 @@ counts = []
 # Zähle nur AKTIVE Standorte in jedem Schritt (ausgenommen "fertig")
 active_step_counts = []
 for step in steps[:-1]:  # Alle außer "fertig"
-    step_params = params.copy()
-    if where_clause:
-        step_query = f"{query_suffix} AND current_step = ? AND status = 'active'"
-    else:
-        step_query = f" WHERE current_step = ? AND status = 'active'"
-    
-    step_params.append(step)
-    c.execute(f'SELECT COUNT(*) FROM locations{step_query}', step_params)
-    active_step_counts.append(c.fetchone()[0] or 0)
+    active_step_counts.append(count_locations(status='active', step=step))
 
 # Fertige Standorte (sollte gleich dem KPI "Abgeschlossen" sein)
 active_step_counts.append(completed)  # Verwende direkt den "Abgeschlossen"-Wert für "Fertig"
@@ -208,15 +226,7 @@ st.header("Aufteilung nach Vermarktungsform")
 if selected_forms:
     form_counts = []
     for form in selected_forms:
-        form_params = params.copy()
-        if where_clause:
-            form_query = f"{query_suffix} AND vermarktungsform = ?"
-        else:
-            form_query = " WHERE vermarktungsform = ?"
-        
-        form_params.append(form)
-        c.execute(f'SELECT COUNT(*) FROM locations{form_query}', form_params)
-        form_counts.append(c.fetchone()[0] or 0)
+        form_counts.append(count_locations(form=form))
     
     form_df = pd.DataFrame({
         'Vermarktungsform': selected_forms,
@@ -236,26 +246,10 @@ for form in selected_forms:
     form_data = {'Vermarktungsform': form}
     
     for status, status_name in zip(status_list, status_names):
-        status_params = params.copy()
-        if where_clause:
-            status_query = f"{query_suffix} AND vermarktungsform = ? AND status = ?"
-        else:
-            status_query = " WHERE vermarktungsform = ? AND status = ?"
-        
-        status_params.extend([form, status])
-        c.execute(f'SELECT COUNT(*) FROM locations{status_query}', status_params)
-        form_data[status_name] = c.fetchone()[0] or 0
+        form_data[status_name] = count_locations(status=status, form=form)
         
     # Fertiggestellte separat zählen
-    completed_params = params.copy()
-    if where_clause:
-        completed_query = f"{query_suffix} AND vermarktungsform = ? AND current_step = 'fertig'"
-    else:
-        completed_query = " WHERE vermarktungsform = ? AND current_step = 'fertig'"
-    
-    completed_params.append(form)
-    c.execute(f'SELECT COUNT(*) FROM locations{completed_query}', completed_params)
-    form_data['Fertig'] = c.fetchone()[0] or 0
+    form_data['Fertig'] = count_locations(form=form, step='fertig')
     
     data.append(form_data)
 
@@ -279,7 +273,7 @@ try:
         next_step = steps[i + 1]
         
         c.execute('''
-        SELECT AVG(julianday(h2.timestamp) - julianday(h1.timestamp))
+        SELECT AVG(h2.timestamp_epoch - h1.timestamp_epoch) / 86400.0
         FROM workflow_history h1
         JOIN workflow_history h2 ON h1.location_id = h2.location_id
         WHERE h1.step = ? AND h2.step = ?
@@ -304,6 +298,82 @@ try:
 except Exception as e:
     st.warning(f"Konnte Durchlaufzeiten nicht berechnen: {str(e)}")
 
+# Verweildauer im aktuellen Schritt und SLA-Verletzungen
+st.header("Verweildauer & SLA je Schritt")
+
+aging_df = aging.load_aging(conn)
+if selected_forms:
+    aging_df = aging_df[aging_df['vermarktungsform'].isin(selected_forms)]
+
+if aging_df.empty:
+    st.info("Keine aktiven Standorte im Prozess.")
+else:
+    summary_df = aging.sla_summary(aging_df)
+    breaches = int(aging_df['sla_breach'].sum())
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Aktive Standorte", len(aging_df))
+    col2.metric("SLA überschritten", breaches)
+    col3.metric("Engpass", summary_df['current_step'].iloc[0].capitalize() if breaches else "-")
+    
+    fig_aging = px.bar(
+        summary_df, x='current_step', y=['p50', 'p90', 'p99'], barmode='group',
+        labels={'current_step': 'Schritt', 'value': 'Tage im Schritt', 'variable': 'Perzentil'}
+    )
+    st.plotly_chart(fig_aging, use_container_width=True)
+    
+    summary_display = summary_df.rename(columns={
+        'current_step': 'Schritt', 'anzahl': 'Anzahl', 'sla_days': 'SLA (Tage)',
+        'ueberfaellig': 'Überfällig', 'quote': 'Quote (%)', 'max': 'Max'
+    })
+    st.dataframe(summary_display, hide_index=True, use_container_width=True)
+    
+    # Historische Durchlaufzeiten je Schritt und Vermarktungsform
+    durations_df = aging.load_step_durations(conn)
+    if selected_forms:
+        durations_df = durations_df[durations_df['vermarktungsform'].isin(selected_forms)]
+    if not durations_df.empty:
+        st.subheader("Abgeschlossene Schritte: Perzentile je Vermarktungsform (Tage)")
+        latency_df = aging.latency_percentiles(durations_df, by=('step', 'vermarktungsform'))
+        latency_df.columns = ['Schritt', 'Vermarktungsform', 'Anzahl', 'P50', 'P90', 'P99']
+        st.dataframe(latency_df, hide_index=True, use_container_width=True)
+    
+    overdue_df = aging_df[aging_df['sla_breach']].sort_values('age_days', ascending=False)
+    if not overdue_df.empty:
+        st.subheader("Überfällige Standorte")
+        overdue_display = overdue_df[['standort', 'stadt', 'current_step', 'vermarktungsform', 'age_days', 'sla_days']].copy()
+        overdue_display.columns = ['Standort', 'Stadt', 'Schritt', 'Vermarktungsform', 'Tage im Schritt', 'SLA (Tage)']
+        st.dataframe(overdue_display, hide_index=True, use_container_width=True)
+
+# Prognose der Fertigstellung aus den historischen Verweildauern (je Schritt und Vermarktungsform)
+st.header("Prognose Fertigstellung")
+
+forecast_df = forecast.get_forecasts(conn)
+if selected_forms:
+    forecast_df = forecast_df[forecast_df['vermarktungsform'].isin(selected_forms)]
+
+if forecast_df.empty:
+    st.info("Keine aktiven Standorte auf dem Weg zur Fertigstellung.")
+else:
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Erwartet fertig in 30 Tagen", int((forecast_df['expected_days'] <= 30).sum()))
+    col2.metric("Erwartet fertig in 90 Tagen", int((forecast_df['expected_days'] <= 90).sum()))
+    col3.metric("Letzte Fertigstellung (P90)", forecast_df['p90_date'].max().strftime('%d.%m.%Y'))
+    st.caption("Erwartungswert und P90 unter der Annahme, dass der Standort alle weiteren Schritte genehmigt durchläuft. "
+               "Im aktuellen Schritt wird die bereits verstrichene Zeit berücksichtigt.")
+    
+    forecast_display = forecast_df.merge(aging_df[['id', 'standort', 'stadt']], on='id').sort_values('expected_date')
+    forecast_display = pd.DataFrame({
+        'Standort': forecast_display['standort'],
+        'Stadt': forecast_display['stadt'],
+        'Schritt': forecast_display['current_step'],
+        'Vermarktungsform': forecast_display['vermarktungsform'],
+        'Tage im Schritt': forecast_display['age_days'],
+        'Erwartet': forecast_display['expected_date'].dt.strftime('%d.%m.%Y'),
+        'P90': forecast_display['p90_date'].dt.strftime('%d.%m.%Y'),
+    })
+    st.dataframe(forecast_display, hide_index=True, use_container_width=True)
+
 # Detailübersicht Standorte
 st.header("Detailübersicht Standorte")
 
@@ -327,8 +397,8 @@ try:
         
         # 1. KPIs, die aus vorhandenen Daten berechnet werden können
         if "leistungswert" in detail_df.columns:
-            # Leistungswert-bezogene KPIs
-            detail_df["leistungswert"] = pd.to_numeric(detail_df["leistungswert"], errors="coerce").fillna(0)
+            # Leistungswert-bezogene KPIs (Spalte ist REAL, leere Werte zählen als 0)
+            detail_df["leistungswert"] = detail_df["leistungswert"].astype(float).fillna(0)
             
         # Wenn Investitionskosten nicht vorhanden sind, schätzen
         if "investitionskosten" not in detail_df.columns:
@@ -378,20 +448,13 @@ try:
         
         # NPV (Net Present Value) berechnen, wenn nicht vorhanden
         if "npv" not in detail_df.columns or detail_df["npv"].isna().all():
-            # Einfache NPV-Kalkulation über 10 Jahre mit 5% Diskontierungsrate
-            discount_rate = 0.05
-            years = 10
-            
-            def calculate_npv(invest, annual_profit):
-                npv = -invest  # Anfangsinvestition negativ
-                for year in range(1, years + 1):
-                    npv += annual_profit / ((1 + discount_rate) ** year)
-                return round(npv)
-            
-            detail_df["npv"] = detail_df.apply(
-                lambda row: calculate_npv(row["investitionskosten"], row["jaehrlicher_gewinn"]), 
-                axis=1
+            # Einfache NPV-Kalkulation über 10 Jahre mit 5% Diskontierungsrate (ohne Wachstum), spaltenweise
+            npv, _, _ = finance.metrics(
+                detail_df["investitionskosten"].to_numpy(dtype=float),
+                detail_df["jaehrlicher_gewinn"].to_numpy(dtype=float),
+                discount_rate=0.05, growth_rate=0.0, years=10
             )
+            detail_df["npv"] = npv.round()
         
         # Strategischen Wert schätzen, wenn nicht vorhanden
         if "strategischer_wert" not in detail_df.columns or detail_df["strategischer_wert"].isna().all():
@@ -1,8 +1,7 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-import pydeck as pdk
-import numpy as np
+import regions
 
 # Seiteneinstellungen
 st.set_page_config(page_title="GeoMap", page_icon="🗺️", layout="wide")
@@ -11,6 +10,7 @@ st.title("Geografische Übersicht der Standorte")
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+regions.ensure_region_column(conn)
 
 # Farben je nach Bearbeitungsschritt definieren
 step_colors = {
@@ -69,9 +69,10 @@ if selected_steps:
 # Nur Standorte mit gültigen Koordinaten anzeigen
 query += " AND lat IS NOT NULL AND lng IS NOT NULL"
 
-# Daten abrufen
-c.execute(query, params)
-locations = c.fetchall()
+# Daten je Region (Niederlassung) parallel abrufen und zusammenführen
+query += " AND region = ?"
+partial = regions.fan_out(conn, lambda region_conn, region: region_conn.execute(query, params + [region]).fetchall())
+locations = [row for rows in partial.values() for row in rows]
 
 if not locations:
     st.warning("Keine Standorte mit den ausgewählten Filtern gefunden.")
@@ -114,7 +115,9 @@ else:
     for step, count in sorted(step_counts.items()):
         st.sidebar.write(f"{step.capitalize()}: {count}")
 
-    # Erstellen der Karte mit PyDeck
+    # Erstellen der Karte mit PyDeck (erst hier importiert, da nur bei vorhandenen Standorten benötigt)
+    import pydeck as pdk
+
     view_state = pdk.ViewState(
         latitude=df['lat'].mean(),
         longitude=df['lng'].mean(),
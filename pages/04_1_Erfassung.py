@@ -2,9 +2,11 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import sqlite3
-import uuid
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+import ids
+import pagination
+import notifications
+import numeric_columns
+import bulk_import
 
 # Streamlit-Seiteneinstellungen
 st.set_page_config(layout="wide", page_title="Standort erfassen")
@@ -12,6 +14,10 @@ st.set_page_config(layout="wide", page_title="Standort erfassen")
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+ids.ensure_integer_keys(conn)
+notifications.ensure_outbox(conn)
+notifications.start_worker()
+numeric_columns.ensure_numeric_columns(conn)
 
 # Initialisiere session_state für seiten-Variable
 if 'seiten' not in st.session_state:
@@ -26,6 +32,10 @@ def get_coordinates(address):
     Adresse in Geokoordinaten umwandeln unter Verwendung von Nominatim (OpenStreetMap).
     Returns: (latitude, longitude) oder None bei Fehlern
     """
+    # geopy erst beim ersten Aufruf laden, die Seite selbst braucht es nicht
+    from geopy.geocoders import Nominatim
+    from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+
     try:
         geolocator = Nominatim(user_agent="stroer_digital_saeule")
         location = geolocator.geocode(address, timeout=10)
@@ -182,15 +192,24 @@ with st.form(key='location_form'):
     
     # Wichtig: Überprüfe, ob der Button gedrückt wurde
     if submit_button:
+        # Leistungswert als Zahl prüfen (leer ist erlaubt)
+        try:
+            leistungswert = numeric_columns.parse_number(leistungswert)
+            leistungswert_error = None
+        except ValueError as e:
+            leistungswert_error = str(e)
+        
         if not name or not standort or not stadt:
             st.error("Bitte füllen Sie alle Pflichtfelder aus.")
         elif umruestung == "Umrüstung" and not alte_nummer:
             st.error("Bitte geben Sie die alte Werbeträgernummer an.")
+        elif leistungswert_error:
+            st.error(f"Leistungswert ungültig: {leistungswert_error}")
         elif not uploaded_files:
             st.error("Bitte laden Sie mindestens ein Bild hoch.")
         else:
             # Speichern der Daten
-            location_id = str(uuid.uuid4())
+            location_id = ids.new_id()
             
             # Explizit die Spalten angeben
             c.execute('''
@@ -206,15 +225,21 @@ with st.form(key='location_form'):
             ))
             
             # Workflow-History-Eintrag erstellen
-            history_id = str(uuid.uuid4())
+            history_id = ids.new_id()
             c.execute('''
-            INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+            VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
             ''', (
                 history_id, location_id, "erfassung", "completed", 
                 "Standort erfasst", name, datetime.now().isoformat()
             ))
             
+            # Leiter Akquisitionsmanagement benachrichtigen (Versand im Hintergrund)
+            notifications.notify_transition(conn, location_id, "leiter_akquisition", f"Neuer Standort erfasst von {name}")
+            
             conn.commit()
+            pagination.invalidate_queue_counts()
+            notifications.wake_worker()
             st.success("Standort erfolgreich gespeichert. Leiter Akquisitionsmanagement wird benachrichtigt.")
             
             # Session-State zurücksetzen
@@ -225,6 +250,40 @@ with st.form(key='location_form'):
             if 'calculated_address' in st.session_state:
                 del st.session_state.calculated_address
 
+# Massenimport aus CSV/Excel für Standortlisten der Akquise-Teams
+with st.expander("📥 Massenimport aus CSV/Excel", expanded=False):
+    st.write("Mehrere Standorte auf einmal erfassen. Ungültige Zeilen werden nicht importiert und im Ablehnungsbericht aufgeführt.")
+    st.download_button(
+        "Vorlage herunterladen (CSV)",
+        data=bulk_import.template_csv(),
+        file_name="Standorte_Vorlage.csv",
+        mime="text/csv"
+    )
+    import_file = st.file_uploader("Importdatei", type=['csv', 'xlsx'], key="bulk_import_file")
+    import_user = st.text_input("Name des Erfassers (optional, sonst aus der Datei)", key="bulk_import_user")
+
+    if st.button("Standorte importieren", disabled=import_file is None):
+        try:
+            with st.spinner("Importiere Standorte..."):
+                result = bulk_import.import_locations(conn, import_file, import_file.name, user=import_user or None)
+        except ImportError:
+            st.error("Für Excel-Dateien wird das Paket openpyxl benötigt. Bitte als CSV speichern oder openpyxl installieren.")
+        except Exception as e:
+            st.error(f"Import abgebrochen, es wurden keine Standorte gespeichert: {e}")
+        else:
+            pagination.invalidate_queue_counts()
+            notifications.wake_worker()
+            st.success(f"{result.imported} Standorte in {result.duration:.1f} s importiert. Leiter Akquisitionsmanagement wird benachrichtigt.")
+            if not result.rejected.empty:
+                st.warning(f"{len(result.rejected)} Zeilen abgelehnt.")
+                st.dataframe(result.rejected[['zeile', 'fehler', 'standort', 'stadt']].head(100), hide_index=True, use_container_width=True)
+                st.download_button(
+                    "Ablehnungsbericht herunterladen (CSV)",
+                    data=bulk_import.reject_report(result.rejected),
+                    file_name="Standorte_Ablehnungen.csv",
+                    mime="text/csv"
+                )
+
 # Hinweise zur Erfassung
 st.markdown("""
 ### Hinweise zur Erfassung:
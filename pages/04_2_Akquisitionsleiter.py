@@ -2,7 +2,15 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 from datetime import datetime
-import uuid
+import ids
+import pagination
+import notifications
+import records
+import concurrency
+import forecast
+import timestamps
+import regions
+import numeric_columns
 
 # Streamlit-Seiteneinstellungen
 st.set_page_config(layout="wide", page_title="Standort genehmigen")
@@ -10,74 +18,64 @@ st.set_page_config(layout="wide", page_title="Standort genehmigen")
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+ids.ensure_integer_keys(conn)
+pagination.ensure_queue_index(conn)
+notifications.ensure_outbox(conn)
+notifications.start_worker()
+concurrency.ensure_version_column(conn)
+timestamps.ensure_epoch_columns(conn)
+regions.ensure_region_column(conn)
 
 st.title("Standorte genehmigen")
 st.write("Als Leiter Akquisitionsmanagement genehmigen oder lehnen Sie hier neue Standorte ab.")
 
-# Funktion zum Laden aller Standorte, die auf Genehmigung durch den Leiter Akquisitionsmanagement warten
-def load_pending_locations():
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, leistungswert, eigentuemer, 
-           umruestung, alte_nummer, seiten, vermarktungsform, created_at
-    FROM locations 
-    WHERE status = 'active' AND current_step= 'leiter_akquisition'
-    ORDER BY created_at DESC
-    ''')
-    
-    locations = c.fetchall()
+# Filter der Queue des Leiters Akquisitionsmanagement
+QUEUE_WHERE = {'status': 'active', 'current_step': 'leiter_akquisition'}
+QUEUE_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'created_at'
+]
+
+# Spalten der Detailansicht
+DETAIL_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'status',
+    'current_step', 'created_at', 'version'
+]
+
+# Felder, deren angezeigter Stand beim Speichern gegen die Datenbank geprüft wird
+EDIT_FIELDS = ['status', 'current_step']
+
+# Bezeichnungen für Konfliktmeldungen
+FIELD_LABELS = {
+    'status': 'Status',
+    'current_step': 'Prozessschritt'
+}
+
+# Funktion zum Laden einer Seite der Standorte, die auf Genehmigung durch den Leiter Akquisitionsmanagement warten
+def load_pending_locations(cursor=None, search=""):
+    page = pagination.load_queue_page(conn, QUEUE_COLUMNS, QUEUE_WHERE, cursor, search)
     
-    if not locations:
-        return pd.DataFrame()
+    if not page.rows:
+        return pd.DataFrame(), page
     
     # In DataFrame umwandeln
-    df = pd.DataFrame(locations, columns=[
-        'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
-        'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'created_at'
-    ])
+    df = pd.DataFrame(page.rows, columns=QUEUE_COLUMNS)
     
     # Formatierungen anwenden
     df['umruestung'] = df['umruestung'].apply(lambda x: 'Umrüstung' if x else 'Neustandort')
     df['eigentuemer'] = df['eigentuemer'].apply(lambda x: 'Stadt' if x == 'Stadt' else 'Privat')
     
-    return df
+    return df, page
 
 # Funktion zum Laden eines spezifischen Standorts mit allen Details
 def load_location_details(location_id):
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, leistungswert, eigentuemer, 
-           umruestung, alte_nummer, seiten, vermarktungsform, status, current_step, created_at
-    FROM locations 
-    WHERE id = ?
-    ''', (location_id,))
-    
-    location = c.fetchone()
-    
-    if not location:
-        return None
-    
-    return {
-        'id': location[0],
-        'erfasser': location[1],
-        'datum': location[2],
-        'standort': location[3],
-        'stadt': location[4],
-        'lat': location[5],
-        'lng': location[6],
-        'leistungswert': location[7],
-        'eigentuemer': 'Stadt' if location[8] == 'Stadt' else 'Privat',
-        'umruestung': 'Umrüstung' if location[9] else 'Neustandort',
-        'alte_nummer': location[10],
-        'seiten': location[11],
-        'vermarktungsform': location[12],
-        'status': location[13],
-        'current_step': location[14],  # Name im Dictionary angepasst
-        'created_at': location[15]
-    }
+    return records.load_location(conn, location_id, DETAIL_COLUMNS)
 
 # Funktion zum Genehmigen oder Ablehnen eines Standorts
-def process_location(location_id, approve, reason):
+def process_location(location_id, approve, reason, seen):
     now = datetime.now().isoformat()
-    history_id = str(uuid.uuid4())
+    history_id = ids.new_id()
     
     if approve:
         # Genehmigen: Bei der Digitalen Säule überspringen wir den Niederlassungsleiter
@@ -92,16 +90,16 @@ def process_location(location_id, approve, reason):
         action = "rejected"
         message = f"Standort abgelehnt: {reason}"
     
-    # Status aktualisieren
-    c.execute('''
-    UPDATE locations
-    SET status = ?, current_step = ?
-    WHERE id = ?
-    ''', (status, next_step, location_id))
+    # Status aktualisieren, nur wenn der Standort seit dem Laden nicht weitergeleitet wurde
+    result = concurrency.update_fields(conn, seen, {'status': status, 'current_step': next_step},
+                                       guard=('status', 'current_step'))
+    if not result.saved:
+        return result
     
     # Workflow-History-Eintrag erstellen
     c.execute('''
-    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+    VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
     ''', (
         history_id, 
         location_id, 
@@ -112,8 +110,13 @@ def process_location(location_id, approve, reason):
         now
     ))
     
+    # Benachrichtigung in derselben Transaktion einreihen, Versand übernimmt der Hintergrund-Worker
+    notifications.notify_transition(conn, location_id, next_step, message)
+    
     conn.commit()
-    return True
+    pagination.invalidate_queue_counts()
+    notifications.wake_worker()
+    return result
 
 # Simulieren eines eingeloggten Benutzers (in einer echten App würde hier ein Login-System stehen)
 if 'username' not in st.session_state:
@@ -123,19 +126,24 @@ if 'username' not in st.session_state:
 # Anzeigen aller wartenden Standorte
 st.subheader("Wartende Standorte")
 
-df = load_pending_locations()
+# Nur die Niederlassungen des Bearbeiters (Auswahl in der Seitenleiste gilt für alle Queues)
+QUEUE_WHERE.update(regions.region_where(regions.select_regions()))
+search = st.text_input("Suche nach Standort oder Stadt", key="leiter_queue_search")
+df, page = load_pending_locations(pagination.get_cursor("leiter_queue", search, QUEUE_WHERE), search)
+total = pagination.count_queue(conn, QUEUE_WHERE, search)
 
 if df.empty:
     st.info("Aktuell gibt es keine Standorte, die auf Genehmigung warten.")
 else:
     # Liste der Standorte anzeigen
-    st.write(f"**{len(df)} Standorte** warten auf Ihre Genehmigung.")
+    st.write(f"**{total} Standorte** warten auf Ihre Genehmigung.")
     
-    # Vereinfachte Tabelle für die Übersicht
+    # Vereinfachte Tabelle für die Übersicht (nur die aktuelle Seite)
     display_df = df[['erfasser', 'datum', 'standort', 'stadt', 'vermarktungsform']].copy()
     display_df.columns = ['Erfasser', 'Datum', 'Standort', 'Stadt', 'Vermarktungsform']
     
     st.dataframe(display_df, hide_index=True)
+    pagination.render_page_navigation("leiter_queue", page, total)
     
     # Auswahl für detaillierte Ansicht
     selected_location = st.selectbox(
@@ -150,33 +158,39 @@ else:
         
         # Laden der detaillierten Standortinformationen
         location = load_location_details(selected_location)
+        # Stand, auf dem die Entscheidung beruht (für die Konfliktprüfung beim Speichern)
+        seen = concurrency.remember("leiter_seen", location, EDIT_FIELDS) if location else None
+        concurrency.show_conflict("leiter_seen")
         
         if location:
             col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown(f"**Standort:** {location['standort']}")
-                st.markdown(f"**Stadt:** {location['stadt']}")
-                st.markdown(f"**Erfasst von:** {location['erfasser']}")
-                st.markdown(f"**Datum der Akquisition:** {location['datum']}")
-                st.markdown(f"**Vermarktungsform:** {location['vermarktungsform']}")
-                if location['vermarktungsform'] == "Digitale Säule":
+                st.markdown(f"**Standort:** {location.standort}")
+                st.markdown(f"**Stadt:** {location.stadt}")
+                st.markdown(f"**Erfasst von:** {location.erfasser}")
+                st.markdown(f"**Datum der Akquisition:** {location.datum}")
+                st.markdown(f"**Vermarktungsform:** {location.vermarktungsform}")
+                if location.vermarktungsform == "Digitale Säule":
                     st.markdown("**Hinweis:** Bei der Digitalen Säule wird der Niederlassungsleiter im Workflow übersprungen.")
                 
             with col2:
-                st.markdown(f"**Koordinaten:** {location['lat']}, {location['lng']}")
-                st.markdown(f"**Art:** {location['umruestung']}")
-                if location['umruestung'] == 'Umrüstung':
-                    st.markdown(f"**Alte Werbeträgernummer:** {location['alte_nummer']}")
-                st.markdown(f"**Seiten:** {location['seiten']}")
-                st.markdown(f"**Eigentümer:** {location['eigentuemer']}")
-                st.markdown(f"**Leistungswert:** {location['leistungswert']}")
+                st.markdown(f"**Koordinaten:** {location.lat}, {location.lng}")
+                st.markdown(f"**Art:** {location.umruestung_label}")
+                if location.umruestung:
+                    st.markdown(f"**Alte Werbeträgernummer:** {location.alte_nummer}")
+                st.markdown(f"**Seiten:** {location.seiten}")
+                st.markdown(f"**Eigentümer:** {location.eigentuemer_label}")
+                st.markdown(f"**Leistungswert:** {numeric_columns.format_number(location.leistungswert)}")
+                completion = forecast.completion_label(conn, location.id)
+                if completion:
+                    st.markdown(f"**Voraussichtliche Fertigstellung:** {completion}")
             
             # Karte anzeigen
             st.subheader("Standort auf Karte")
             map_data = pd.DataFrame({
-                'lat': [float(location['lat'])],
-                'lon': [float(location['lng'])]
+                'lat': [float(location.lat)],
+                'lon': [float(location.lng)]
             })
             st.map(map_data, zoom=15)
             
@@ -218,9 +232,11 @@ else:
                 if not is_approve and not reason:
                     st.error("Bitte geben Sie einen Grund für die Ablehnung an.")
                 else:
-                    success = process_location(selected_location, is_approve, reason)
+                    result = process_location(selected_location, is_approve, reason, seen)
                     
-                    if success:
+                    if not result.saved:
+                        concurrency.report_conflict("leiter_seen", result, FIELD_LABELS)
+                    else:
                         if is_approve:
                             st.success(f"Standort wurde genehmigt und wird direkt an das Baurecht weitergeleitet.")
                         else:
@@ -2,7 +2,17 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 from datetime import datetime, timedelta
-import uuid
+import ids
+import pagination
+import notifications
+import records
+import archive
+import schema
+import concurrency
+import forecast
+import timestamps
+import regions
+import numeric_columns
 import random
 
 # Streamlit-Seiteneinstellungen
@@ -11,50 +21,65 @@ st.set_page_config(layout="wide", page_title="Baurecht")
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+ids.ensure_integer_keys(conn)
+pagination.ensure_queue_index(conn)
+notifications.ensure_outbox(conn)
+notifications.start_worker()
+concurrency.ensure_version_column(conn)
+timestamps.ensure_epoch_columns(conn)
+regions.ensure_region_column(conn)
+schema.ensure_columns(conn, 'locations', {'bauantrag_datum': 'TEXT'})
 
 st.title("Baurecht")
 st.write("Verwaltung von Bauanträgen und behördlichen Genehmigungen für die Digitalen Säulen.")
 
-# Funktion zum Laden aller Standorte, die im Baurechtsschritt sind
-def load_baurecht_locations():
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, eigentuemer, 
-           umruestung, seiten, vermarktungsform, created_at
-    FROM locations 
-    WHERE status = 'active' AND current_step = 'baurecht'
-    ORDER BY created_at DESC
-    ''')
-    
-    locations = c.fetchall()
+# Filter und Spalten der Queue
+QUEUE_WHERE = {'status': 'active', 'current_step': 'baurecht'}
+QUEUE_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
+    'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at', 'created_at_epoch'
+]
+
+# Spalten der Detailansicht
+DETAIL_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'status',
+    'current_step', 'created_at', 'bauantrag_datum', 'version'
+]
+
+# Felder, deren angezeigter Stand beim Speichern gegen die Datenbank geprüft wird
+EDIT_FIELDS = ['status', 'current_step', 'bauantrag_datum']
+
+# Bezeichnungen für Konfliktmeldungen
+FIELD_LABELS = {
+    'bauantrag_datum': 'Antragsdatum',
+    'status': 'Status',
+    'current_step': 'Prozessschritt'
+}
+
+# Funktion zum Laden einer Seite der Standorte im Baurechtsschritt
+def load_baurecht_locations(cursor=None, search=""):
+    page = pagination.load_queue_page(conn, QUEUE_COLUMNS, QUEUE_WHERE, cursor, search)
     
-    if not locations:
-        return pd.DataFrame()
+    if not page.rows:
+        return pd.DataFrame(), page
     
     # In DataFrame umwandeln
-    df = pd.DataFrame(locations, columns=[
-        'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
-        'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at'
-    ])
+    df = pd.DataFrame(page.rows, columns=QUEUE_COLUMNS)
     
     # Formatierungen anwenden
     df['umruestung'] = df['umruestung'].apply(lambda x: 'Umrüstung' if x else 'Neustandort')
     df['eigentuemer'] = df['eigentuemer'].apply(lambda x: 'Stadt' if x == 'Stadt' else 'Privat')
     
-    return df
+    return df, page
 
 
 
 
 # Funktion zum Laden der Historie eines Standorts
 def load_workflow_history(location_id):
-    c.execute('''
-    SELECT step, status, comment, user, timestamp
-    FROM workflow_history
-    WHERE location_id = ?
-    ORDER BY timestamp ASC
-    ''', (location_id,))
-    
-    history = c.fetchall()
+    # Bei archivierten Standorten kommt die Historie aus dem Archiv
+    history = archive.load_history(conn, location_id)
     
     if not history:
         return pd.DataFrame()
@@ -65,52 +90,24 @@ def load_workflow_history(location_id):
 
 # Funktion zum Laden eines spezifischen Standorts mit allen Details
 def load_location_details(location_id):
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, leistungswert, eigentuemer, 
-           umruestung, alte_nummer, seiten, vermarktungsform, status, current_step, created_at
-    FROM locations 
-    WHERE id = ?
-    ''', (location_id,))
-    
-    location = c.fetchone()
-    
-    if not location:
-        return None
-    
-    return {
-        'id': location[0],
-        'erfasser': location[1],
-        'datum': location[2],
-        'standort': location[3],
-        'stadt': location[4],
-        'lat': location[5],
-        'lng': location[6],
-        'leistungswert': location[7],
-        'eigentuemer': 'Stadt' if location[8] == 'Stadt' else 'Privat',
-        'umruestung': 'Umrüstung' if location[9] else 'Neustandort',
-        'alte_nummer': location[10],
-        'seiten': location[11],
-        'vermarktungsform': location[12],
-        'status': location[13],
-        'current_step': location[14],
-        'created_at': location[15]
-    }
+    return records.load_location(conn, location_id, DETAIL_COLUMNS)
 
 # Funktion zum Aktualisieren des Bauantrags
-def update_bauantrag(location_id, antragsdaten, status):
+def update_bauantrag(location_id, antragsdaten, status, seen):
     now = datetime.now().isoformat()
-    history_id = str(uuid.uuid4())
+    history_id = ids.new_id()
     
-    # Antragsdatum in der Datenbank speichern (in einer echten App würden hier mehr Daten gespeichert werden)
-    c.execute('''
-    UPDATE locations
-    SET bauantrag_datum = ?
-    WHERE id = ?
-    ''', (antragsdaten['antragsdatum'], location_id))
+    # Antragsdatum in der Datenbank speichern (in einer echten App würden hier mehr Daten gespeichert werden),
+    # nur solange der Standort noch im Baurecht liegt und niemand ein anderes Datum eingetragen hat
+    result = concurrency.update_fields(conn, seen, {'bauantrag_datum': antragsdaten['antragsdatum']},
+                                       guard=('status', 'current_step'))
+    if not result.saved:
+        return result
     
     # Workflow-History-Eintrag erstellen
     c.execute('''
-    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+    VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
     ''', (
         history_id, 
         location_id, 
@@ -122,12 +119,13 @@ def update_bauantrag(location_id, antragsdaten, status):
     ))
     
     conn.commit()
-    return True
+    pagination.invalidate_queue_counts()
+    return result
 
 # Funktion zum Verarbeiten der Bauantragsentscheidung
-def process_bauantrag_entscheidung(location_id, genehmigt, grund=None, widerspruch=False):
+def process_bauantrag_entscheidung(location_id, genehmigt, seen, grund=None, widerspruch=False):
     now = datetime.now().isoformat()
-    history_id = str(uuid.uuid4())
+    history_id = ids.new_id()
     
     if genehmigt:
         # Bauantrag genehmigt - zum CEO weiterleiten
@@ -149,16 +147,16 @@ def process_bauantrag_entscheidung(location_id, genehmigt, grund=None, widerspru
             action = "rejected"
             message = f"Bauantrag abgelehnt. Prozess beendet. Grund: {grund}"
     
-    # Status aktualisieren
-    c.execute('''
-    UPDATE locations
-    SET status = ?, current_step = ?
-    WHERE id = ?
-    ''', (status, next_step, location_id))
+    # Status aktualisieren, nur wenn der Standort seit dem Laden nicht weitergeleitet wurde
+    result = concurrency.update_fields(conn, seen, {'status': status, 'current_step': next_step},
+                                       guard=('status', 'current_step'))
+    if not result.saved:
+        return result
     
     # Workflow-History-Eintrag erstellen
     c.execute('''
-    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+    VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
     ''', (
         history_id, 
         location_id, 
@@ -169,8 +167,13 @@ def process_bauantrag_entscheidung(location_id, genehmigt, grund=None, widerspru
         now
     ))
     
+    # Benachrichtigung in derselben Transaktion einreihen, Versand übernimmt der Hintergrund-Worker
+    notifications.notify_transition(conn, location_id, next_step, message)
+    
     conn.commit()
-    return True
+    pagination.invalidate_queue_counts()
+    notifications.wake_worker()
+    return result
 
 # Simulieren eines eingeloggten Benutzers (in einer echten App würde hier ein Login-System stehen)
 if 'username' not in st.session_state:
@@ -180,19 +183,25 @@ if 'username' not in st.session_state:
 # Anzeigen aller Standorte im Baurechtsschritt
 st.subheader("Standorte im Baurechtsschritt")
 
-df = load_baurecht_locations()
+# Nur die Niederlassungen des Bearbeiters (Auswahl in der Seitenleiste gilt für alle Queues)
+QUEUE_WHERE.update(regions.region_where(regions.select_regions()))
+search = st.text_input("Suche nach Standort oder Stadt", key="baurecht_queue_search")
+df, page = load_baurecht_locations(pagination.get_cursor("baurecht_queue", search, QUEUE_WHERE), search)
+total = pagination.count_queue(conn, QUEUE_WHERE, search)
 
 if df.empty:
     st.info("Aktuell gibt es keine Standorte im Baurechtsschritt.")
 else:
     # Liste der Standorte anzeigen
-    st.write(f"**{len(df)} Standorte** im Baurechtsschritt.")
+    st.write(f"**{total} Standorte** im Baurechtsschritt.")
     
     # Vereinfachte Tabelle für die Übersicht
-    display_df = df[['standort', 'stadt', 'eigentuemer', 'vermarktungsform', 'created_at']].copy()
+    display_df = df[['standort', 'stadt', 'eigentuemer', 'vermarktungsform', 'created_at_epoch']].copy()
     display_df.columns = ['Standort', 'Stadt', 'Eigentümer', 'Vermarktungsform', 'Erfasst am']
+    display_df['Erfasst am'] = timestamps.format_epoch(display_df['Erfasst am'])
     
     st.dataframe(display_df, hide_index=True)
+    pagination.render_page_navigation("baurecht_queue", page, total)
     
     # Auswahl für detaillierte Ansicht
     selected_location = st.selectbox(
@@ -208,6 +217,9 @@ else:
         tab1, tab2, tab3 = st.tabs(["Standortdetails", "Bauantrag", "Historie"])
         
         location = load_location_details(selected_location)
+        # Stand, auf dem die Eingaben des Benutzers beruhen (für die Konfliktprüfung beim Speichern)
+        seen = concurrency.remember("baurecht_seen", location, EDIT_FIELDS) if location else None
+        concurrency.show_conflict("baurecht_seen")
         
         with tab1:
             st.subheader("Standortdetails")
@@ -216,26 +228,29 @@ else:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.markdown(f"**Standort:** {location['standort']}")
-                    st.markdown(f"**Stadt:** {location['stadt']}")
-                    st.markdown(f"**Vermarktungsform:** {location['vermarktungsform']}")
-                    st.markdown(f"**Seiten:** {location['seiten']}")
-                    st.markdown(f"**Art:** {location['umruestung']}")
-                    if location['umruestung'] == 'Umrüstung':
-                        st.markdown(f"**Alte Werbeträgernummer:** {location['alte_nummer']}")
+                    st.markdown(f"**Standort:** {location.standort}")
+                    st.markdown(f"**Stadt:** {location.stadt}")
+                    st.markdown(f"**Vermarktungsform:** {location.vermarktungsform}")
+                    st.markdown(f"**Seiten:** {location.seiten}")
+                    st.markdown(f"**Art:** {location.umruestung_label}")
+                    if location.umruestung:
+                        st.markdown(f"**Alte Werbeträgernummer:** {location.alte_nummer}")
                     
                 with col2:
-                    st.markdown(f"**Erfasst von:** {location['erfasser']}")
-                    st.markdown(f"**Datum der Akquisition:** {location['datum']}")
-                    st.markdown(f"**Koordinaten:** {location['lat']}, {location['lng']}")
-                    st.markdown(f"**Eigentümer:** {location['eigentuemer']}")
-                    st.markdown(f"**Leistungswert:** {location['leistungswert']}")
+                    st.markdown(f"**Erfasst von:** {location.erfasser}")
+                    st.markdown(f"**Datum der Akquisition:** {location.datum}")
+                    st.markdown(f"**Koordinaten:** {location.lat}, {location.lng}")
+                    st.markdown(f"**Eigentümer:** {location.eigentuemer_label}")
+                    st.markdown(f"**Leistungswert:** {numeric_columns.format_number(location.leistungswert)}")
+                    completion = forecast.completion_label(conn, location.id)
+                    if completion:
+                        st.markdown(f"**Voraussichtliche Fertigstellung:** {completion}")
                 
                 # Karte anzeigen
                 st.subheader("Standort auf Karte")
                 map_data = pd.DataFrame({
-                    'lat': [float(location['lat'])],
-                    'lon': [float(location['lng'])]
+                    'lat': [float(location.lat)],
+                    'lon': [float(location.lng)]
                 })
                 st.map(map_data, zoom=15)
         
@@ -271,10 +286,12 @@ else:
                 
                 if behorden_entscheidung == "Genehmigt":
                     if st.button("Genehmigung bestätigen", type="primary"):
-                        success = process_bauantrag_entscheidung(selected_location, True)
-                        if success:
+                        result = process_bauantrag_entscheidung(selected_location, True, seen)
+                        if result.saved:
                             st.success("Bauantrag genehmigt! Standort wird an den CEO zur finalen Genehmigung weitergeleitet.")
                             st.rerun()
+                        else:
+                            concurrency.report_conflict("baurecht_seen", result, FIELD_LABELS)
                 else:
                     # Bei Ablehnung - Grund erfassen und entscheiden, ob Widerspruch eingelegt wird
                     grund = st.text_area("Begründung der Ablehnung", placeholder="Geben Sie die Begründung der Behörde ein...")
@@ -290,14 +307,16 @@ else:
                             st.error("Bitte geben Sie die Begründung der Ablehnung ein.")
                         else:
                             widerspruch_einlegen = widerspruch == "Ja, Widerspruch einlegen"
-                            success = process_bauantrag_entscheidung(selected_location, False, grund, widerspruch_einlegen)
+                            result = process_bauantrag_entscheidung(selected_location, False, seen, grund, widerspruch_einlegen)
                             
-                            if success:
+                            if result.saved:
                                 if widerspruch_einlegen:
                                     st.success("Widerspruchsverfahren eingeleitet!")
                                 else:
                                     st.success("Prozess wurde beendet aufgrund der Ablehnung des Bauantrags.")
                                 st.rerun()
+                            else:
+                                concurrency.report_conflict("baurecht_seen", result, FIELD_LABELS)
             else:
                 st.info("Erstellen Sie einen neuen Bauantrag für diesen Standort.")
                 
@@ -319,7 +338,7 @@ else:
                     with col2:
                         amt = st.text_input(
                             "Zuständiges Amt",
-                            value=f"Bauamt {location['stadt']}"
+                            value=f"Bauamt {location.stadt}"
                         )
                         kontakt = st.text_input(
                             "Kontaktperson",
@@ -358,20 +377,23 @@ else:
                             'anmerkungen': anmerkungen
                         }
                         
-                        # Speichern in Session State für die Demo
-                        if 'bauantrag_daten' not in st.session_state:
-                            st.session_state.bauantrag_daten = {}
-                        if 'bauantrag_status' not in st.session_state:
-                            st.session_state.bauantrag_status = {}
-                            
-                        st.session_state.bauantrag_daten[selected_location] = antragsdaten
-                        st.session_state.bauantrag_status[selected_location] = "eingereicht"
-                        
                         # Speichern in der Datenbank
-                        update_bauantrag(selected_location, antragsdaten, "eingereicht")
+                        result = update_bauantrag(selected_location, antragsdaten, "eingereicht", seen)
                         
-                        st.success("Bauantrag erfolgreich eingereicht!")
-                        st.rerun()
+                        if result.saved:
+                            # Speichern in Session State für die Demo
+                            if 'bauantrag_daten' not in st.session_state:
+                                st.session_state.bauantrag_daten = {}
+                            if 'bauantrag_status' not in st.session_state:
+                                st.session_state.bauantrag_status = {}
+                                
+                            st.session_state.bauantrag_daten[selected_location] = antragsdaten
+                            st.session_state.bauantrag_status[selected_location] = "eingereicht"
+                            
+                            st.success("Bauantrag erfolgreich eingereicht!")
+                            st.rerun()
+                        else:
+                            concurrency.report_conflict("baurecht_seen", result, FIELD_LABELS)
         
         with tab3:
             st.subheader("Workflow-Historie")
@@ -381,7 +403,7 @@ else:
             
             if not history_df.empty:
                 # Formatierungen für bessere Lesbarkeit
-                history_df['Zeitstempel'] = pd.to_datetime(history_df['Zeitstempel']).dt.strftime('%d.%m.%Y, %H:%M Uhr')
+                history_df['Zeitstempel'] = timestamps.format_epoch(history_df['Zeitstempel'], timestamps.DATETIME_FORMAT)
                 
                 # Anzeigen der Historie mit farbiger Markierung
                 for idx, row in history_df.iterrows():
@@ -435,13 +457,3 @@ st.sidebar.markdown("""
 6. ➡️ Bauteam
 7. ➡️ Fertigstellung
 """)
-
-# Falls kein Bauantrags-Schema in der Datenbank existiert, erstellen wir es hier
-# In einer echten Anwendung würde dies im Init-Skript geschehen
-try:
-    c.execute('ALTER TABLE locations ADD COLUMN bauantrag_datum TEXT')
-except:
-    # Spalte existiert bereits
-    pass
-
-conn.commit()
\ No newline at end of file
@@ -2,8 +2,18 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 from datetime import datetime, timedelta
-import uuid
-import numpy as np
+import ids
+import pagination
+import notifications
+import records
+import archive
+import concurrency
+import forecast
+import timestamps
+import regions
+import finance
+import portfolio
+import numeric_columns
 
 # Streamlit-Seiteneinstellungen
 st.set_page_config(layout="wide", page_title="CEO Genehmigung")
@@ -11,47 +21,61 @@ st.set_page_config(layout="wide", page_title="CEO Genehmigung")
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+ids.ensure_integer_keys(conn)
+pagination.ensure_queue_index(conn)
+notifications.ensure_outbox(conn)
+notifications.start_worker()
+concurrency.ensure_version_column(conn)
+timestamps.ensure_epoch_columns(conn)
+regions.ensure_region_column(conn)
+numeric_columns.ensure_numeric_columns(conn)
 
 st.title("CEO-Genehmigung")
 st.write("Finale wirtschaftliche Bewertung und Genehmigung der Standorte für die Digitalen Säulen.")
 
-# Funktion zum Laden aller Standorte, die auf CEO-Entscheidung warten
-def load_ceo_locations():
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, eigentuemer, 
-           umruestung, seiten, vermarktungsform, created_at
-    FROM locations 
-    WHERE status = 'active' AND current_step = 'ceo'
-    ORDER BY created_at DESC
-    ''')
-    
-    locations = c.fetchall()
+# Filter und Spalten der Queue
+QUEUE_WHERE = {'status': 'active', 'current_step': 'ceo'}
+QUEUE_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
+    'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at', 'created_at_epoch'
+]
+
+# Spalten der Detailansicht
+DETAIL_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'status',
+    'current_step', 'created_at', 'bauantrag_datum', 'version'
+]
+
+# Felder, deren angezeigter Stand beim Speichern gegen die Datenbank geprüft wird
+EDIT_FIELDS = ['status', 'current_step']
+
+# Bezeichnungen für Konfliktmeldungen
+FIELD_LABELS = {
+    'status': 'Status',
+    'current_step': 'Prozessschritt'
+}
+
+# Funktion zum Laden einer Seite der Standorte, die auf CEO-Entscheidung warten
+def load_ceo_locations(cursor=None, search=""):
+    page = pagination.load_queue_page(conn, QUEUE_COLUMNS, QUEUE_WHERE, cursor, search)
     
-    if not locations:
-        return pd.DataFrame()
+    if not page.rows:
+        return pd.DataFrame(), page
     
     # In DataFrame umwandeln
-    df = pd.DataFrame(locations, columns=[
-        'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
-        'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at'
-    ])
+    df = pd.DataFrame(page.rows, columns=QUEUE_COLUMNS)
     
     # Formatierungen anwenden
     df['umruestung'] = df['umruestung'].apply(lambda x: 'Umrüstung' if x else 'Neustandort')
     df['eigentuemer'] = df['eigentuemer'].apply(lambda x: 'Stadt' if x == 'Stadt' else 'Privat')
     
-    return df
+    return df, page
 
 # Funktion zum Laden der Historie eines Standorts
 def load_workflow_history(location_id):
-    c.execute('''
-    SELECT step, status, comment, user, timestamp
-    FROM workflow_history
-    WHERE location_id = ?
-    ORDER BY timestamp ASC
-    ''', (location_id,))
-    
-    history = c.fetchall()
+    # Bei archivierten Standorten kommt die Historie aus dem Archiv
+    history = archive.load_history(conn, location_id)
     
     if not history:
         return pd.DataFrame()
@@ -62,105 +86,19 @@ def load_workflow_history(location_id):
 
 # Funktion zum Laden eines spezifischen Standorts mit allen Details
 def load_location_details(location_id):
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, leistungswert, eigentuemer, 
-           umruestung, alte_nummer, seiten, vermarktungsform, status, current_step, created_at,
-           bauantrag_datum
-    FROM locations 
-    WHERE id = ?
-    ''', (location_id,))
-    
-    location = c.fetchone()
-    
-    if not location:
-        return None
-    
-    # Alle Spalten in der DB ermitteln
-    c.execute('PRAGMA table_info(locations)')
-    columns = c.fetchall()
-    column_names = [col[1] for col in columns]
-    
-    # Dictionary erstellen mit allen Werten
-    location_dict = {column_names[i]: location[i] for i in range(len(location))}
-    
-    # Einige Werte formatieren
-    location_dict['eigentuemer'] = 'Stadt' if location_dict.get('eigentuemer') == 'Stadt' else 'Privat'
-    location_dict['umruestung'] = 'Umrüstung' if location_dict.get('umruestung') == 1 else 'Neustandort'
-    
-    return location_dict
+    return records.load_location(conn, location_id, DETAIL_COLUMNS)
 
 # Funktion zur Berechnung von wirtschaftlichen Kennzahlen (mit realistischen Werten)
 def calculate_financial_metrics(location):
-    # In einer echten Anwendung würden diese Daten aus einer Datenbank kommen
-    # Hier simulieren wir realistische Beispieldaten basierend auf dem Standort
-    
-    # Zufällige, aber konsistente Daten für einen gegebenen Standort generieren
-    import hashlib
-    
-    # Hash aus ID generieren für konsistente "Zufallszahlen"
-    hash_obj = hashlib.md5(location['id'].encode())
-    hash_value = int(hash_obj.hexdigest()[:8], 16) 
-    np.random.seed(hash_value % (2**32 - 1))
-    
-    # Realistische Wirtschaftliche Kennzahlen berechnen
-    # Investitionskosten für eine Digitale Säule: 20.000-35.000€
-    investment = np.random.randint(20000, 35000)
-    
-    # Mehr Seiten = mehr Einnahmen
-    sides = 1
-    if location['seiten'] == 'doppelseitig':
-        sides = 2
-    elif location['seiten'] == 'dreiseitig':
-        sides = 3
-        
-    # Jahreseinnahmen basierend auf Standort und Seiten
-    # Realistische jährliche Einnahmen pro Seite: 2.000-4.000€
-    revenue_factor = 1.0
-    if location['eigentuemer'] == 'Stadt':
-        revenue_factor = 1.15  # Städtische Standorte haben bessere Performance
-    
-    leistungswert = float(location.get('leistungswert', 0) or 0)
-    if leistungswert > 0:
-        revenue_factor *= (1 + leistungswert/200)  # Reduzierter Einfluss
-    
-    annual_revenue = np.random.randint(2000, 4000) * sides * revenue_factor
-    
-    # Betriebskosten: 40-50% der Einnahmen
-    operating_costs = annual_revenue * np.random.uniform(0.4, 0.5)
-    
-    # Gewinn
-    annual_profit = annual_revenue - operating_costs
-    
-    # ROI berechnen: Realistischer Bereich 5-10%
-    roi = (annual_profit / investment) * 100
-    
-    # Amortisationszeit in Jahren: Typisch 8-12 Jahre
-    payback_period = investment / annual_profit
-    
-    # NPV über 10 Jahre mit 8% Diskontierungsrate
-    discount_rate = 0.08
-    cash_flows = [-investment]
-    for year in range(1, 11):
-        # Leichte Steigerung der jährlichen Einnahmen
-        year_profit = annual_profit * (1 + 0.02) ** (year - 1)
-        cash_flows.append(year_profit)
-    
-    npv = sum(cf / (1 + discount_rate) ** i for i, cf in enumerate(cash_flows))
-    
-    return {
-        'investment': investment,
-        'annual_revenue': annual_revenue,
-        'operating_costs': operating_costs,
-        'annual_profit': annual_profit,
-        'roi': roi,
-        'payback_period': payback_period,
-        'npv': npv
-    }
+    # In einer echten Anwendung würden diese Daten aus einer Datenbank kommen; hier liefert das
+    # Wirtschaftlichkeitsmodell konsistente Beispielwerte je Standort (dieselben wie in der Portfolio-Optimierung)
+    inputs = finance.site_inputs(location.id, location.seiten, location.eigentuemer, location.leistungswert)
+    return finance.point_estimate(inputs)
 
 # Funktion zum Verarbeiten der CEO-Entscheidung
-def process_ceo_decision(location_id, approve, reason, financial_metrics):
+def process_ceo_decision(location_id, approve, reason, financial_metrics, seen):
     now = datetime.now().isoformat()
-    history_id = str(uuid.uuid4())
+    history_id = ids.new_id()
     
     if approve:
         # Genehmigen: Weiter zum Bauteam
@@ -175,16 +113,16 @@ def process_ceo_decision(location_id, approve, reason, financial_metrics):
         action = "rejected"
         message = f"Standort vom CEO abgelehnt. Grund: {reason}"
     
-    # Status aktualisieren
-    c.execute('''
-    UPDATE locations
-    SET status = ?, current_step = ?
-    WHERE id = ?
-    ''', (status, next_step, location_id))
+    # Status aktualisieren, nur wenn der Standort seit dem Laden nicht weitergeleitet wurde
+    result = concurrency.update_fields(conn, seen, {'status': status, 'current_step': next_step},
+                                       guard=('status', 'current_step'))
+    if not result.saved:
+        return result
     
     # Workflow-History-Eintrag erstellen
     c.execute('''
-    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+    VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
     ''', (
         history_id, 
         location_id, 
@@ -195,8 +133,13 @@ def process_ceo_decision(location_id, approve, reason, financial_metrics):
         now
     ))
     
+    # Benachrichtigung in derselben Transaktion einreihen, Versand übernimmt der Hintergrund-Worker
+    notifications.notify_transition(conn, location_id, next_step, message)
+    
     conn.commit()
-    return True
+    pagination.invalidate_queue_counts()
+    notifications.wake_worker()
+    return result
 
 # Simulieren eines eingeloggten Benutzers (in einer echten App würde hier ein Login-System stehen)
 if 'username' not in st.session_state:
@@ -206,23 +149,71 @@ if 'username' not in st.session_state:
 # Anzeigen aller Standorte im CEO-Genehmigungsschritt
 st.subheader("Standorte zur Genehmigung")
 
-df = load_ceo_locations()
+# Nur die Niederlassungen des Bearbeiters (Auswahl in der Seitenleiste gilt für alle Queues)
+QUEUE_WHERE.update(regions.region_where(regions.select_regions()))
+search = st.text_input("Suche nach Standort oder Stadt", key="ceo_queue_search")
+df, page = load_ceo_locations(pagination.get_cursor("ceo_queue", search, QUEUE_WHERE), search)
+total = pagination.count_queue(conn, QUEUE_WHERE, search)
 
 if df.empty:
     st.info("Aktuell gibt es keine Standorte zur CEO-Genehmigung.")
 else:
     # Liste der Standorte anzeigen
-    st.write(f"**{len(df)} Standorte** warten auf Ihre Genehmigung.")
+    st.write(f"**{total} Standorte** warten auf Ihre Genehmigung.")
     
     # Vereinfachte Tabelle für die Übersicht
-    display_df = df[['standort', 'stadt', 'eigentuemer', 'vermarktungsform', 'created_at']].copy()
+    display_df = df[['standort', 'stadt', 'eigentuemer', 'vermarktungsform', 'created_at_epoch']].copy()
     display_df.columns = ['Standort', 'Stadt', 'Eigentümer', 'Vermarktungsform', 'Erfasst am']
     
     # Datum formatieren
-    display_df['Erfasst am'] = pd.to_datetime(display_df['Erfasst am']).dt.strftime('%d.%m.%Y')
+    display_df['Erfasst am'] = timestamps.format_epoch(display_df['Erfasst am'])
     
     st.dataframe(display_df, hide_index=True)
-    
+    pagination.render_page_navigation("ceo_queue", page, total)
+    
+    # Simulation aller Standorte der Queue (parallel über einen Prozesspool)
+    with st.expander("🎲 Monte-Carlo-Simulation der gesamten Queue", expanded=False):
+        if st.button("Alle Standorte simulieren", key="ceo_queue_simulation"):
+            queue_inputs = finance.load_queue_inputs(conn, 'ceo')
+            summaries = finance.simulate_queue([inputs for inputs, _ in queue_inputs])
+            st.dataframe(pd.DataFrame({
+                'Standort': [name for _, name in queue_inputs],
+                'NPV P10 €': [summary.npv[0] for summary in summaries],
+                'NPV P50 €': [summary.npv[1] for summary in summaries],
+                'NPV P90 €': [summary.npv[2] for summary in summaries],
+                'ROI P50 %': [summary.roi[1] for summary in summaries],
+                'Verlustwahrscheinlichkeit %': [summary.loss_probability * 100 for summary in summaries],
+            }).round(1), hide_index=True)
+
+    # Budget-Optimierung: NPV-maximale Auswahl der Queue innerhalb des Jahresbudgets
+    with st.expander("💶 Budget-Optimierung der Queue", expanded=False):
+        candidates = portfolio.load_candidates(conn, 'ceo')
+        upper = portfolio.max_budget(candidates)
+
+        if upper <= 0:
+            st.info("Kein Standort der Queue hat einen positiven Kapitalwert.")
+        else:
+            budget = st.slider(
+                "Investitionsbudget (€ pro Jahr)",
+                min_value=0, max_value=int(upper), value=int(upper // 2), step=5000,
+                key="ceo_portfolio_budget"
+            )
+            result = portfolio.optimize(candidates, budget)
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Empfohlene Standorte", f"{len(result.selected)} von {len(candidates)}")
+            col2.metric("Investition", f"{result.investment:,.0f} €")
+            col3.metric("Kapitalwert (NPV)", f"{result.npv:,.0f} €")
+            col4.metric("NPV je weiterem Budget-€", f"{result.shadow_price:.2f} €")
+            st.caption(f"Verfahren: {result.method}. Höchstens erreichbar: {result.upper_bound:,.0f} € (LP-Schranke).")
+
+            st.dataframe(portfolio.tradeoffs(candidates, result).drop(columns='id'), hide_index=True)
+
+            # Höchster erreichbarer NPV in Abhängigkeit vom Budget
+            budgets = [upper * share / 20 for share in range(21)]
+            st.line_chart(pd.DataFrame({'Max. NPV €': portfolio.frontier(candidates, budgets)},
+                                       index=[round(value, -3) for value in budgets]))
+
     # Auswahl für detaillierte Ansicht
     selected_location = st.selectbox(
         "Standort zur Prüfung auswählen:",
@@ -237,6 +228,9 @@ else:
         tab1, tab2, tab3, tab4 = st.tabs(["Standortdetails", "Wirtschaftlichkeit", "Workflow-Historie", "Entscheidung"])
         
         location = load_location_details(selected_location)
+        # Stand, auf dem die Entscheidung beruht (für die Konfliktprüfung beim Speichern)
+        seen = concurrency.remember("ceo_seen", location, EDIT_FIELDS) if location else None
+        concurrency.show_conflict("ceo_seen")
         
         with tab1:
             st.subheader("Standortdetails")
@@ -245,28 +239,31 @@ else:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.markdown(f"**Standort:** {location.get('standort')}")
-                    st.markdown(f"**Stadt:** {location.get('stadt')}")
-                    st.markdown(f"**Vermarktungsform:** {location.get('vermarktungsform')}")
-                    st.markdown(f"**Seiten:** {location.get('seiten')}")
-                    st.markdown(f"**Art:** {location.get('umruestung')}")
-                    if location.get('umruestung') == 'Umrüstung':
-                        st.markdown(f"**Alte Werbeträgernummer:** {location.get('alte_nummer')}")
+                    st.markdown(f"**Standort:** {location.standort}")
+                    st.markdown(f"**Stadt:** {location.stadt}")
+                    st.markdown(f"**Vermarktungsform:** {location.vermarktungsform}")
+                    st.markdown(f"**Seiten:** {location.seiten}")
+                    st.markdown(f"**Art:** {location.umruestung_label}")
+                    if location.umruestung:
+                        st.markdown(f"**Alte Werbeträgernummer:** {location.alte_nummer}")
                     
                 with col2:
-                    st.markdown(f"**Erfasst von:** {location.get('erfasser')}")
-                    st.markdown(f"**Datum der Akquisition:** {location.get('datum')}")
-                    st.markdown(f"**Koordinaten:** {location.get('lat')}, {location.get('lng')}")
-                    st.markdown(f"**Eigentümer:** {location.get('eigentuemer')}")
-                    st.markdown(f"**Leistungswert:** {location.get('leistungswert')}")
-                    if location.get('bauantrag_datum'):
-                        st.markdown(f"**Bauantrag genehmigt am:** {location.get('bauantrag_datum')}")
+                    st.markdown(f"**Erfasst von:** {location.erfasser}")
+                    st.markdown(f"**Datum der Akquisition:** {location.datum}")
+                    st.markdown(f"**Koordinaten:** {location.lat}, {location.lng}")
+                    st.markdown(f"**Eigentümer:** {location.eigentuemer_label}")
+                    st.markdown(f"**Leistungswert:** {numeric_columns.format_number(location.leistungswert)}")
+                    completion = forecast.completion_label(conn, location.id)
+                    if completion:
+                        st.markdown(f"**Voraussichtliche Fertigstellung:** {completion}")
+                    if location.bauantrag_datum:
+                        st.markdown(f"**Bauantrag genehmigt am:** {location.bauantrag_datum}")
                 
                 # Karte anzeigen
                 st.subheader("Standort auf Karte")
                 map_data = pd.DataFrame({
-                    'lat': [float(location.get('lat'))],
-                    'lon': [float(location.get('lng'))]
+                    'lat': [float(location.lat)],
+                    'lon': [float(location.lng)]
                 })
                 st.map(map_data, zoom=15)
         
@@ -344,6 +341,66 @@ else:
                 # Anzeigen der Tabelle
                 st.markdown(html_table, unsafe_allow_html=True)
                 
+                # Monte-Carlo-Simulation: Verteilung statt Punktschätzung
+                st.markdown("### Monte-Carlo-Simulation")
+                
+                scenarios = st.select_slider(
+                    "Anzahl Szenarien",
+                    options=list(finance.SCENARIO_OPTIONS),
+                    value=finance.DEFAULT_SCENARIOS,
+                    format_func=lambda x: f"{x:,}".replace(",", "."),
+                    key="ceo_mc_scenarios"
+                )
+                inputs = finance.site_inputs(location.id, location.seiten, location.eigentuemer, location.leistungswert)
+                npv_values, roi_values, payback_values = finance.simulate(inputs, scenarios)
+                simulation = finance.summarize(location.id, npv_values, roi_values, payback_values)
+                
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("NPV P10", f"{simulation.npv[0]:,.0f} €")
+                col2.metric("NPV P50", f"{simulation.npv[1]:,.0f} €")
+                col3.metric("NPV P90", f"{simulation.npv[2]:,.0f} €")
+                col4.metric("Verlustwahrscheinlichkeit", f"{simulation.loss_probability:.1%}")
+                
+                st.dataframe(pd.DataFrame({
+                    'Kennzahl': ['Kapitalwert (NPV) €', 'ROI %', 'Amortisation Jahre'],
+                    'P10': [simulation.npv[0], simulation.roi[0], simulation.payback[0]],
+                    'P50': [simulation.npv[1], simulation.roi[1], simulation.payback[1]],
+                    'P90': [simulation.npv[2], simulation.roi[2], simulation.payback[2]],
+                }).round(1), hide_index=True)
+                
+                # Verteilung des NPV als Histogramm
+                centers, counts = finance.histogram(npv_values)
+                st.bar_chart(pd.DataFrame({'Szenarien': counts}, index=centers.round(-2)))
+                st.caption(f"{simulation.scenarios:,} Szenarien: Investition {finance.INVESTMENT_RANGE[0]:,}–{finance.INVESTMENT_RANGE[1]:,} €, "
+                           f"Einnahmen je Seite {finance.REVENUE_PER_SIDE_RANGE[0]:,}–{finance.REVENUE_PER_SIDE_RANGE[1]:,} €, "
+                           f"Betriebskosten {finance.OPEX_RATIO_RANGE[0]:.0%}–{finance.OPEX_RATIO_RANGE[1]:.0%} der Einnahmen.")
+                
+                # Sensitivitätsanalyse über das volle Annahmen-Raster (je Standort gecacht)
+                st.markdown("### Sensitivitätsanalyse")
+                
+                grid = finance.sensitivity_grid(inputs, financial)
+                base_investment, base_revenue, _ = finance.base_case(financial)
+                base_profit = financial['annual_profit']
+                
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Break-even Betriebskostenquote", f"{float(finance.break_even_opex_ratio(base_investment, base_revenue)):.1%}")
+                col2.metric("Interner Zinsfuß", f"{float(finance.break_even_discount_rate(base_investment, base_profit)):.1%}")
+                col3.metric("Max. Investition (NPV ≥ 0)", f"{float(finance.break_even_investment(base_profit)):,.0f} €")
+                
+                st.plotly_chart(finance.tornado_figure(finance.tornado(grid)), use_container_width=True)
+                
+                axis_names = list(finance.GRID_AXES)
+                col1, col2 = st.columns(2)
+                with col1:
+                    heat_rows = st.selectbox("Zeilen", axis_names, index=0, format_func=finance.AXIS_LABELS.get, key="ceo_heat_rows")
+                with col2:
+                    heat_columns = st.selectbox("Spalten", [name for name in axis_names if name != heat_rows], index=1,
+                                                format_func=finance.AXIS_LABELS.get, key="ceo_heat_columns")
+                st.plotly_chart(finance.heatmap_figure(grid, heat_rows, heat_columns), use_container_width=True)
+                st.caption("Basisfall: wirtschaftliche Kennzahlen oben (Investition, Einnahmen, Betriebskosten); "
+                           "nicht dargestellte Annahmen stehen auf dem Basisfall "
+                           f"({finance.DISCOUNT_RATE:.0%} Diskontierung, {finance.GROWTH_RATE:.0%} Wachstum, {finance.HORIZON_YEARS} Jahre).")
+                
                 # Cashflow-Modell für 5 Jahre
                 st.markdown("### 5-Jahres Cashflow-Projektion")
                 
@@ -408,7 +465,7 @@ else:
                     criteria.append("❌ NPV < 5.000 €")
                 
                 # Leistungswert-Kriterium
-                leistungswert = float(location.get('leistungswert', 0) or 0)
+                leistungswert = location.leistungswert or 0
                 if leistungswert > 80:
                     score += 1
                     criteria.append("✅ Leistungswert > 80")
@@ -448,7 +505,7 @@ else:
             
             if not history_df.empty:
                 # Formatierungen für bessere Lesbarkeit
-                history_df['Zeitstempel'] = pd.to_datetime(history_df['Zeitstempel']).dt.strftime('%d.%m.%Y, %H:%M Uhr')
+                history_df['Zeitstempel'] = timestamps.format_epoch(history_df['Zeitstempel'], timestamps.DATETIME_FORMAT)
                 
                 # Anzeigen der Historie mit farbiger Markierung
                 for idx, row in history_df.iterrows():
@@ -519,10 +576,12 @@ else:
                 if not is_approve and not reason:
                     st.error("Bitte geben Sie einen Grund für die Ablehnung an.")
                 else:
-                    success = process_ceo_decision(selected_location, is_approve, reason, 
-                                                  st.session_state.get('financial_metrics', {}))
+                    result = process_ceo_decision(selected_location, is_approve, reason, 
+                                                  st.session_state.get('financial_metrics', {}), seen)
                     
-                    if success:
+                    if not result.saved:
+                        concurrency.report_conflict("ceo_seen", result, FIELD_LABELS)
+                    else:
                         if is_approve:
                             st.success("Standort wurde genehmigt und wird an das Bauteam weitergeleitet.")
                         else:
@@ -2,7 +2,19 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 from datetime import datetime, timedelta
-import uuid
+import ids
+import pagination
+import notifications
+import records
+import archive
+import schema
+import concurrency
+import forecast
+import timestamps
+import regions
+import numeric_columns
+import routing
+import scheduling
 
 # Streamlit-Seiteneinstellungen
 st.set_page_config(layout="wide", page_title="Bauteam")
@@ -10,47 +22,99 @@ st.set_page_config(layout="wide", page_title="Bauteam")
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+ids.ensure_integer_keys(conn)
+pagination.ensure_queue_index(conn)
+notifications.ensure_outbox(conn)
+notifications.start_worker()
+concurrency.ensure_version_column(conn)
+timestamps.ensure_epoch_columns(conn)
+regions.ensure_region_column(conn)
 
 st.title("Bauteam")
 st.write("Planung und Durchführung der Baumaßnahmen für die genehmigten Digitalen Säulen.")
 
-# Funktion zum Laden aller Standorte für das Bauteam
-def load_bauteam_locations():
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, eigentuemer, 
-           umruestung, seiten, vermarktungsform, created_at
-    FROM locations 
-    WHERE status = 'active' AND current_step = 'bauteam'
-    ORDER BY created_at DESC
-    ''')
-    
-    locations = c.fetchall()
+# Filter und Spalten der Queue
+QUEUE_WHERE = {'status': 'active', 'current_step': 'bauteam'}
+QUEUE_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
+    'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at', 'created_at_epoch'
+]
+
+# Zusätzliche Spalten für die Bau-Informationen
+BUILD_COLUMNS = {
+    'plan_date': 'TEXT',
+    'ist_date': 'TEXT',
+    'build_status': 'TEXT',
+    'contractor': 'TEXT',
+    'power_connection': 'TEXT'
+}
+
+# Spalten der Detailansicht
+DETAIL_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'status',
+    'current_step', 'created_at', 'bauantrag_datum', 'version'
+] + list(BUILD_COLUMNS)
+
+# Felder, deren angezeigter Stand beim Speichern gegen die Datenbank geprüft wird
+EDIT_FIELDS = ['status', 'current_step'] + list(BUILD_COLUMNS)
+
+# Bezeichnungen für Konfliktmeldungen
+FIELD_LABELS = {
+    'plan_date': 'Geplantes Aufbaudatum (PLAN)',
+    'ist_date': 'Tatsächliches Aufbaudatum (IST)',
+    'build_status': 'Status der Baumaßnahme',
+    'contractor': 'Beauftragter Subunternehmer',
+    'power_connection': 'Status Stromanschluss',
+    'status': 'Status',
+    'current_step': 'Prozessschritt'
+}
+
+# Auswahlwerte für Baumaßnahme und Stromanschluss
+BUILD_STATUS_OPTIONS = [
+    "Nicht begonnen",
+    "In Planung",
+    "Materialbestellung",
+    "Fundament vorbereitet",
+    "Gerüstaufbau",
+    "Elektrik installiert",
+    "Display montiert",
+    "Inbetriebnahme",
+    "Abgeschlossen"
+]
+POWER_CONNECTION_OPTIONS = [
+    "Nicht beantragt",
+    "Beantragt",
+    "Genehmigt",
+    "In Vorbereitung",
+    "Installiert",
+    "Aktiv"
+]
+
+# Position des gespeicherten Werts in der Auswahl (erster Eintrag, wenn noch nichts gespeichert ist)
+def option_index(options, value):
+    return options.index(value) if value in options else 0
+
+# Funktion zum Laden einer Seite der Standorte für das Bauteam
+def load_bauteam_locations(cursor=None, search=""):
+    page = pagination.load_queue_page(conn, QUEUE_COLUMNS, QUEUE_WHERE, cursor, search)
     
-    if not locations:
-        return pd.DataFrame()
+    if not page.rows:
+        return pd.DataFrame(), page
     
     # In DataFrame umwandeln
-    df = pd.DataFrame(locations, columns=[
-        'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
-        'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at'
-    ])
+    df = pd.DataFrame(page.rows, columns=QUEUE_COLUMNS)
     
     # Formatierungen anwenden
     df['umruestung'] = df['umruestung'].apply(lambda x: 'Umrüstung' if x else 'Neustandort')
     df['eigentuemer'] = df['eigentuemer'].apply(lambda x: 'Stadt' if x == 'Stadt' else 'Privat')
     
-    return df
+    return df, page
 
 # Funktion zum Laden der Historie eines Standorts
 def load_workflow_history(location_id):
-    c.execute('''
-    SELECT step, status, comment, user, timestamp
-    FROM workflow_history
-    WHERE location_id = ?
-    ORDER BY timestamp ASC
-    ''', (location_id,))
-    
-    history = c.fetchall()
+    # Bei archivierten Standorten kommt die Historie aus dem Archiv
+    history = archive.load_history(conn, location_id)
     
     if not history:
         return pd.DataFrame()
@@ -61,78 +125,32 @@ def load_workflow_history(location_id):
 
 # Funktion zum Laden eines spezifischen Standorts mit allen Details
 def load_location_details(location_id):
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, leistungswert, eigentuemer, 
-           umruestung, alte_nummer, seiten, vermarktungsform, status, current_step, created_at,
-           bauantrag_datum
-    FROM locations 
-    WHERE id = ?
-    ''', (location_id,))
-    
-    location = c.fetchone()
-    
-    if not location:
-        return None
-    
-    # Alle Spalten in der DB ermitteln
-    c.execute('PRAGMA table_info(locations)')
-    columns = c.fetchall()
-    column_names = [col[1] for col in columns]
-    
-    # Dictionary erstellen mit allen Werten
-    location_dict = {column_names[i]: location[i] for i in range(len(location))}
-    
-    # Einige Werte formatieren
-    location_dict['eigentuemer'] = 'Stadt' if location_dict.get('eigentuemer') == 'Stadt' else 'Privat'
-    location_dict['umruestung'] = 'Umrüstung' if location_dict.get('umruestung') == 1 else 'Neustandort'
-    
-    return location_dict
+    return records.load_location(conn, location_id, DETAIL_COLUMNS)
 
 # Funktion zum Aktualisieren der Bau-Informationen
-def update_build_info(location_id, build_data):
+def update_build_info(location_id, build_data, seen):
     now = datetime.now().isoformat()
-    history_id = str(uuid.uuid4())
+    history_id = ids.new_id()
     
     # Benutzerdefinierte Felder für Bau-Informationen in der Datenbank speichern
     # In einer echten App würden wir eine separate Tabelle für detaillierte Bau-Informationen haben
     try:
-        # Prüfen, ob Spalten bereits existieren
-        c.execute("PRAGMA table_info(locations)")
-        columns = c.fetchall()
-        column_names = [col[1] for col in columns]
-        
-        # Felder für Baudaten hinzufügen, falls sie noch nicht existieren
-        if 'plan_date' not in column_names:
-            c.execute('ALTER TABLE locations ADD COLUMN plan_date TEXT')
-        if 'ist_date' not in column_names:
-            c.execute('ALTER TABLE locations ADD COLUMN ist_date TEXT')
-        if 'build_status' not in column_names:
-            c.execute('ALTER TABLE locations ADD COLUMN build_status TEXT')
-        if 'contractor' not in column_names:
-            c.execute('ALTER TABLE locations ADD COLUMN contractor TEXT')
-        if 'power_connection' not in column_names:
-            c.execute('ALTER TABLE locations ADD COLUMN power_connection TEXT')
+        # Felder für Baudaten hinzufügen, falls sie noch nicht existieren (Spalten aus dem Schema-Cache)
+        schema.ensure_columns(conn, 'locations', BUILD_COLUMNS)
     except:
         # Bei Fehler weitermachen - Spalten existieren möglicherweise bereits
         pass
     
-    # Update der Bau-Informationen in der Locations-Tabelle
-    c.execute('''
-    UPDATE locations
-    SET plan_date = ?, ist_date = ?, build_status = ?, contractor = ?, power_connection = ?
-    WHERE id = ?
-    ''', (
-        build_data.get('plan_date', ''),
-        build_data.get('ist_date', ''),
-        build_data.get('build_status', ''),
-        build_data.get('contractor', ''),
-        build_data.get('power_connection', ''),
-        location_id
-    ))
+    # Update der Bau-Informationen in der Locations-Tabelle: nur geänderte Felder, ohne
+    # zwischenzeitliche Änderungen anderer Benutzer an denselben Feldern zu überschreiben
+    result = concurrency.update_fields(conn, seen, {field: build_data.get(field, '') for field in BUILD_COLUMNS})
+    if not result.saved and not result.applied:
+        return result
     
     # Workflow-History-Eintrag erstellen
     c.execute('''
-    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+    VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
     ''', (
         history_id, 
         location_id, 
@@ -144,23 +162,27 @@ def update_build_info(location_id, build_data):
     ))
     
     conn.commit()
-    return True
+    pagination.invalidate_queue_counts()
+    return result
 
 # Funktion zum Abschließen des Bauvorhabens und Weiterleiten zur Fertigstellung
-def complete_build(location_id, build_data):
+def complete_build(location_id, build_data, seen):
     now = datetime.now().isoformat()
-    history_id = str(uuid.uuid4())
+    history_id = ids.new_id()
     
-    # Status aktualisieren
-    c.execute('''
-    UPDATE locations
-    SET status = ?, current_step = ?, ist_date = ?
-    WHERE id = ?
-    ''', ('active', 'fertigstellung', build_data.get('ist_date', now), location_id))
+    # Status aktualisieren, nur wenn der Standort seit dem Laden nicht weitergeleitet wurde
+    result = concurrency.update_fields(conn, seen, {
+        'status': 'active',
+        'current_step': 'fertigstellung',
+        'ist_date': build_data.get('ist_date', now)
+    }, guard=('status', 'current_step'))
+    if not result.saved:
+        return result
     
     # Workflow-History-Eintrag erstellen
     c.execute('''
-    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+    VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
     ''', (
         history_id, 
         location_id, 
@@ -171,8 +193,13 @@ def complete_build(location_id, build_data):
         now
     ))
     
+    # Benachrichtigung in derselben Transaktion einreihen, Versand übernimmt der Hintergrund-Worker
+    notifications.notify_transition(conn, location_id, 'fertigstellung', f"Bau abgeschlossen. IST-Datum: {build_data.get('ist_date', now)}")
+    
     conn.commit()
-    return True
+    pagination.invalidate_queue_counts()
+    notifications.wake_worker()
+    return result
 
 # Simulieren eines eingeloggten Benutzers (in einer echten App würde hier ein Login-System stehen)
 if 'username' not in st.session_state:
@@ -182,22 +209,34 @@ if 'username' not in st.session_state:
 # Anzeigen aller Standorte für das Bauteam
 st.subheader("Standorte in Umsetzung")
 
-df = load_bauteam_locations()
+# Spalten für die Bau-Informationen anlegen, damit die Detailansicht sie immer laden kann
+try:
+    schema.ensure_columns(conn, 'locations', BUILD_COLUMNS)
+except:
+    # Bei Fehler weitermachen
+    pass
+
+# Nur die Niederlassungen des Bearbeiters (Auswahl in der Seitenleiste gilt für alle Queues)
+QUEUE_WHERE.update(regions.region_where(regions.select_regions()))
+search = st.text_input("Suche nach Standort oder Stadt", key="bauteam_queue_search")
+df, page = load_bauteam_locations(pagination.get_cursor("bauteam_queue", search, QUEUE_WHERE), search)
+total = pagination.count_queue(conn, QUEUE_WHERE, search)
 
 if df.empty:
     st.info("Aktuell gibt es keine Standorte in der Bauphase.")
 else:
     # Liste der Standorte anzeigen
-    st.write(f"**{len(df)} Standorte** in der Bauphase.")
+    st.write(f"**{total} Standorte** in der Bauphase.")
     
     # Vereinfachte Tabelle für die Übersicht
-    display_df = df[['standort', 'stadt', 'vermarktungsform', 'seiten', 'created_at']].copy()
+    display_df = df[['standort', 'stadt', 'vermarktungsform', 'seiten', 'created_at_epoch']].copy()
     display_df.columns = ['Standort', 'Stadt', 'Vermarktungsform', 'Seiten', 'Erfasst am']
     
     # Datum formatieren
-    display_df['Erfasst am'] = pd.to_datetime(display_df['Erfasst am']).dt.strftime('%d.%m.%Y')
+    display_df['Erfasst am'] = timestamps.format_epoch(display_df['Erfasst am'])
     
     st.dataframe(display_df, hide_index=True)
+    pagination.render_page_navigation("bauteam_queue", page, total)
     
     # Auswahl für detaillierte Ansicht
     selected_location = st.selectbox(
@@ -213,6 +252,9 @@ else:
         tab1, tab2, tab3, tab4 = st.tabs(["Standortdetails", "Bauplanung", "Workflow-Historie", "Dokumente"])
         
         location = load_location_details(selected_location)
+        # Stand, auf dem die Eingaben des Benutzers beruhen (für die Konfliktprüfung beim Speichern)
+        seen = concurrency.remember("bauteam_seen", location, EDIT_FIELDS) if location else None
+        concurrency.show_conflict("bauteam_seen")
         
         with tab1:
             st.subheader("Standortdetails")
@@ -221,38 +263,56 @@ else:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.markdown(f"**Standort:** {location.get('standort')}")
-                    st.markdown(f"**Stadt:** {location.get('stadt')}")
-                    st.markdown(f"**Vermarktungsform:** {location.get('vermarktungsform')}")
-                    st.markdown(f"**Seiten:** {location.get('seiten')}")
-                    st.markdown(f"**Art:** {location.get('umruestung')}")
-                    if location.get('umruestung') == 'Umrüstung':
-                        st.markdown(f"**Alte Werbeträgernummer:** {location.get('alte_nummer')}")
+                    st.markdown(f"**Standort:** {location.standort}")
+                    st.markdown(f"**Stadt:** {location.stadt}")
+                    st.markdown(f"**Vermarktungsform:** {location.vermarktungsform}")
+                    st.markdown(f"**Seiten:** {location.seiten}")
+                    st.markdown(f"**Art:** {location.umruestung_label}")
+                    if location.umruestung:
+                        st.markdown(f"**Alte Werbeträgernummer:** {location.alte_nummer}")
                     
                 with col2:
-                    st.markdown(f"**Eigentümer:** {location.get('eigentuemer')}")
-                    st.markdown(f"**Leistungswert:** {location.get('leistungswert')}")
-                    st.markdown(f"**Bauantrag genehmigt am:** {location.get('bauantrag_datum')}")
-                    st.markdown(f"**Koordinaten:** {location.get('lat')}, {location.get('lng')}")
+                    st.markdown(f"**Eigentümer:** {location.eigentuemer_label}")
+                    st.markdown(f"**Leistungswert:** {numeric_columns.format_number(location.leistungswert)}")
+                    completion = forecast.completion_label(conn, location.id)
+                    if completion:
+                        st.markdown(f"**Voraussichtliche Fertigstellung:** {completion}")
+                    st.markdown(f"**Bauantrag genehmigt am:** {location.bauantrag_datum}")
+                    st.markdown(f"**Koordinaten:** {location.lat}, {location.lng}")
                     
                 
                 # Karte anzeigen
                 st.subheader("Standort auf Karte")
                 map_data = pd.DataFrame({
-                    'lat': [float(location.get('lat'))],
-                    'lon': [float(location.get('lng'))]
+                    'lat': [float(location.lat)],
+                    'lon': [float(location.lng)]
                 })
                 st.map(map_data, zoom=15)
         
         with tab2:
             st.subheader("Bauplanung und -fortschritt")
             
-            # Status prüfen und bereits eingetragene Baudaten laden
-            build_status = location.get('build_status', '')
-            plan_date = location.get('plan_date', '')
-            ist_date = location.get('ist_date', '')
-            contractor = location.get('contractor', '')
-            power_connection = location.get('power_connection', '')
+            # Status prüfen und bereits eingetragene Baudaten laden; vorbelegt wird der Stand, den der
+            # Benutzer gesehen hat, damit die Formularfelder beim Absenden ihre Eingaben behalten
+            build_status = seen.values['build_status'] or ''
+            plan_date = seen.values['plan_date'] or ''
+            ist_date = seen.values['ist_date'] or ''
+            contractor = seen.values['contractor'] or ''
+            power_connection = seen.values['power_connection'] or ''
+            
+            # Kapazität des Subunternehmers am geplanten Tag prüfen (Plan wird nur inkrementell abgeglichen)
+            schedule = scheduling.get_schedule(conn)
+            booking = schedule.bookings.get(selected_location)
+            if booking and schedule.conflicts_for(selected_location):
+                proposed = schedule.earliest_feasible(
+                    booking.contractor, max(datetime.now().date(), booking.day), ignore=selected_location
+                )
+                st.warning(
+                    f"⚠️ {booking.contractor} ist am {booking.day.strftime('%d.%m.%Y')} bzw. in dieser Woche bereits "
+                    f"ausgelastet (max. {scheduling.capacity(booking.contractor)[0]} Aufbauten je Tag, "
+                    f"{scheduling.capacity(booking.contractor)[1]} je Woche). "
+                    + (f"Frühester freier Termin: **{proposed.strftime('%d.%m.%Y')}**." if proposed else "")
+                )
             
             # Formular zur Bauplanung
             with st.form("build_planning_form"):
@@ -276,18 +336,8 @@ else:
                     
                     build_status_input = st.selectbox(
                         "Status der Baumaßnahme",
-                        options=[
-                            "Nicht begonnen",
-                            "In Planung",
-                            "Materialbestellung",
-                            "Fundament vorbereitet",
-                            "Gerüstaufbau",
-                            "Elektrik installiert",
-                            "Display montiert",
-                            "Inbetriebnahme",
-                            "Abgeschlossen"
-                        ],
-                        index=0 if not build_status else None,
+                        options=BUILD_STATUS_OPTIONS,
+                        index=option_index(BUILD_STATUS_OPTIONS, build_status),
                         format_func=lambda x: f"▶ {x}" if x == build_status else x
                     )
                 
@@ -300,20 +350,13 @@ else:
                     
                     power_connection_input = st.selectbox(
                         "Status Stromanschluss",
-                        options=[
-                            "Nicht beantragt",
-                            "Beantragt",
-                            "Genehmigt",
-                            "In Vorbereitung",
-                            "Installiert",
-                            "Aktiv"
-                        ],
-                        index=0 if not power_connection else None,
+                        options=POWER_CONNECTION_OPTIONS,
+                        index=option_index(POWER_CONNECTION_OPTIONS, power_connection),
                         format_func=lambda x: f"▶ {x}" if x == power_connection else x
                     )
                     
                     # Zusätzliche Felder für die Digitale Säule
-                    if location.get('vermarktungsform') == "Digitale Säule":
+                    if location.vermarktungsform == "Digitale Säule":
                         st.info("📌 **Hinweis Digitale Säule**: Bitte auf ausreichende Stromversorgung und Netzwerkverbindung achten!")
                         # Hier könnten weitere spezifische Felder für die Digitale Säule hinzugefügt werden
                 
@@ -357,18 +400,22 @@ else:
                     )
                 
                 if submit_button:
-                    success = update_build_info(selected_location, build_data)
+                    result = update_build_info(selected_location, build_data, seen)
                     
-                    if success:
+                    if result.saved:
                         st.success("Baudaten wurden erfolgreich gespeichert!")
                         st.rerun()
+                    else:
+                        concurrency.report_conflict("bauteam_seen", result, FIELD_LABELS)
                 
                 if complete_button and ist_complete:
-                    success = complete_build(selected_location, build_data)
+                    result = complete_build(selected_location, build_data, seen)
                     
-                    if success:
+                    if result.saved:
                         st.success("Standort als fertiggestellt markiert und zur finalen Fertigstellung weitergeleitet!")
                         st.rerun()
+                    else:
+                        concurrency.report_conflict("bauteam_seen", result, FIELD_LABELS)
             
             # Visualisierung des Fortschritts
             if build_status:
@@ -411,7 +458,7 @@ else:
             
             if not history_df.empty:
                 # Formatierungen für bessere Lesbarkeit
-                history_df['Zeitstempel'] = pd.to_datetime(history_df['Zeitstempel']).dt.strftime('%d.%m.%Y, %H:%M Uhr')
+                history_df['Zeitstempel'] = timestamps.format_epoch(history_df['Zeitstempel'], timestamps.DATETIME_FORMAT)
                 
                 # Anzeigen der Historie mit farbiger Markierung
                 for idx, row in history_df.iterrows():
@@ -457,7 +504,7 @@ else:
                 # Upload-Option
                 uploaded_file = st.file_uploader("Bauzeichnung hochladen", type=['pdf', 'jpg', 'png'])
                 
-                if location.get('vermarktungsform') == "Digitale Säule":
+                if location.vermarktungsform == "Digitale Säule":
                     # Beispiel-Dokumente für Digitale Säule
                     st.markdown("##### Vorhandene Zeichnungen:")
                     st.markdown("""
@@ -508,6 +555,48 @@ else:
                     
                     st.button("Abnahmeprotokoll generieren", disabled=True)
 
+# Tourenplanung: Standorte mit PLAN-Datum je Subunternehmer und Tag zu Touren verbinden
+st.markdown("---")
+st.subheader("Tourenplanung")
+
+route_sites = routing.load_sites(conn)
+
+if route_sites.empty:
+    st.info("Es gibt noch keine Standorte mit geplantem Aufbaudatum.")
+else:
+    route_day = st.selectbox(
+        "Tag",
+        options=["Alle Tage"] + sorted(route_sites['plan_date'].unique()),
+        key="bauteam_route_day"
+    )
+    if route_day != "Alle Tage":
+        route_sites = route_sites[route_sites['plan_date'] == route_day]
+    
+    routes = routing.plan_routes(route_sites)
+    st.write(f"**{len(routes)} Touren** mit {len(route_sites)} Standorten, "
+             f"Gesamtstrecke {sum(route.distance_km for route in routes):.1f} km (Luftlinie).")
+    st.dataframe(routing.routes_frame(routes, route_sites), hide_index=True)
+
+# Kapazitätsplanung: Konflikte je Subunternehmer und Terminvorschläge
+st.markdown("---")
+st.subheader("Kapazitätsplanung")
+
+schedule = scheduling.get_schedule(conn)
+capacity_conflicts = schedule.conflicts()
+proposals = scheduling.propose_dates(schedule)
+
+if not capacity_conflicts and not proposals:
+    st.success("Keine Kapazitätskonflikte bei den Subunternehmern.")
+else:
+    names = scheduling.location_names(conn)
+    if capacity_conflicts:
+        st.write(f"**{len(capacity_conflicts)} Kapazitätskonflikte** "
+                 f"(Standard: max. {scheduling.DAILY_CAPACITY} Aufbauten je Tag, {scheduling.WEEKLY_CAPACITY} je Woche)")
+        st.dataframe(scheduling.conflicts_frame(capacity_conflicts, names), hide_index=True)
+    if proposals:
+        st.write("**Terminvorschläge** (älteste Standorte zuerst, frühester freier Werktag)")
+        st.dataframe(scheduling.proposals_frame(proposals, names), hide_index=True)
+
 # Sidebar mit Workflow-Information
 st.sidebar.title("Workflow-Information")
 st.sidebar.markdown("""
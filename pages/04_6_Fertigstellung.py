@@ -2,8 +2,18 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 from datetime import datetime
-import uuid
-import time
+import ids
+import pagination
+import notifications
+import records
+import archive
+import schema
+import concurrency
+import forecast
+import timestamps
+import regions
+import numeric_columns
+import jobs
 
 # Streamlit-Seiteneinstellungen
 st.set_page_config(layout="wide", page_title="Fertigstellung")
@@ -11,47 +21,75 @@ st.set_page_config(layout="wide", page_title="Fertigstellung")
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
 c = conn.cursor()
+ids.ensure_integer_keys(conn)
+pagination.ensure_queue_index(conn)
+notifications.ensure_outbox(conn)
+notifications.start_worker()
+jobs.ensure_jobs(conn)
+jobs.start_runner()
+concurrency.ensure_version_column(conn)
+timestamps.ensure_epoch_columns(conn)
+regions.ensure_region_column(conn)
 
 st.title("Fertigstellung")
 st.write("Finale Abnahme, Dokumentation und Übergabe der Digitalen Säule in den Betrieb.")
 
-# Funktion zum Laden aller Standorte in der Fertigstellungsphase
-def load_completion_locations():
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, eigentuemer, 
-           umruestung, seiten, vermarktungsform, created_at, ist_date
-    FROM locations 
-    WHERE status = 'active' AND current_step = 'fertigstellung'
-    ORDER BY created_at DESC
-    ''')
-    
-    locations = c.fetchall()
+# Filter und Spalten der Queue
+QUEUE_WHERE = {'status': 'active', 'current_step': 'fertigstellung'}
+QUEUE_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
+    'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at', 'ist_date', 'ist_date_epoch'
+]
+
+# Zusätzliche Spalten für den Abschluss
+COMPLETION_COLUMNS = {
+    'completion_date': 'TEXT',
+    'final_inspection': 'TEXT',
+    'network_id': 'TEXT',
+    'dms_id': 'TEXT'
+}
+
+# Spalten der Detailansicht
+DETAIL_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'status',
+    'current_step', 'created_at', 'bauantrag_datum', 'plan_date', 'ist_date',
+    'build_status', 'contractor', 'power_connection', 'version'
+] + list(COMPLETION_COLUMNS)
+
+# Felder, deren angezeigter Stand beim Speichern gegen die Datenbank geprüft wird
+EDIT_FIELDS = ['status', 'current_step'] + list(COMPLETION_COLUMNS)
+
+# Bezeichnungen für Konfliktmeldungen
+FIELD_LABELS = {
+    'completion_date': 'Fertigstellungsdatum',
+    'final_inspection': 'Datum der Endabnahme',
+    'network_id': 'Netzwerk-ID',
+    'dms_id': 'CMS-ID',
+    'status': 'Status',
+    'current_step': 'Prozessschritt'
+}
+
+# Funktion zum Laden einer Seite der Standorte in der Fertigstellungsphase
+def load_completion_locations(cursor=None, search=""):
+    page = pagination.load_queue_page(conn, QUEUE_COLUMNS, QUEUE_WHERE, cursor, search)
     
-    if not locations:
-        return pd.DataFrame()
+    if not page.rows:
+        return pd.DataFrame(), page
     
     # In DataFrame umwandeln
-    df = pd.DataFrame(locations, columns=[
-        'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
-        'eigentuemer', 'umruestung', 'seiten', 'vermarktungsform', 'created_at', 'ist_date'
-    ])
+    df = pd.DataFrame(page.rows, columns=QUEUE_COLUMNS)
     
     # Formatierungen anwenden
     df['umruestung'] = df['umruestung'].apply(lambda x: 'Umrüstung' if x else 'Neustandort')
     df['eigentuemer'] = df['eigentuemer'].apply(lambda x: 'Stadt' if x == 'Stadt' else 'Privat')
     
-    return df
+    return df, page
 
 # Funktion zum Laden der Historie eines Standorts
 def load_workflow_history(location_id):
-    c.execute('''
-    SELECT step, status, comment, user, timestamp
-    FROM workflow_history
-    WHERE location_id = ?
-    ORDER BY timestamp ASC
-    ''', (location_id,))
-    
-    history = c.fetchall()
+    # Bei archivierten Standorten kommt die Historie aus dem Archiv
+    history = archive.load_history(conn, location_id)
     
     if not history:
         return pd.DataFrame()
@@ -62,55 +100,29 @@ def load_workflow_history(location_id):
 
 # Funktion zum Laden eines spezifischen Standorts mit allen Details
 def load_location_details(location_id):
-    c.execute('''
-    SELECT id, erfasser, datum, standort, stadt, lat, lng, leistungswert, eigentuemer, 
-           umruestung, alte_nummer, seiten, vermarktungsform, status, current_step, created_at,
-           bauantrag_datum, plan_date, ist_date, build_status, contractor, power_connection
-    FROM locations 
-    WHERE id = ?
-    ''', (location_id,))
-    
-    location = c.fetchone()
-    
-    if not location:
-        return None
-    
-    # Alle Spalten in der DB ermitteln
-    c.execute('PRAGMA table_info(locations)')
-    columns = c.fetchall()
-    column_names = [col[1] for col in columns]
-    
-    # Dictionary erstellen mit allen Werten
-    location_dict = {column_names[i]: location[i] for i in range(len(location))}
-    
-    # Einige Werte formatieren
-    location_dict['eigentuemer'] = 'Stadt' if location_dict.get('eigentuemer') == 'Stadt' else 'Privat'
-    location_dict['umruestung'] = 'Umrüstung' if location_dict.get('umruestung') == 1 else 'Neustandort'
-    
-    return location_dict
+    return records.load_location(conn, location_id, DETAIL_COLUMNS)
 
 # Funktion zum Fertigstellen des Standorts
-def complete_location(location_id, completion_data):
+def complete_location(location_id, completion_data, seen):
     now = datetime.now().isoformat()
-    history_id = str(uuid.uuid4())
+    history_id = ids.new_id()
     
-    # Status auf "completed" setzen
-    c.execute('''
-    UPDATE locations
-    SET status = ?, current_step = ?, completion_date = ?, 
-        final_inspection = ?, network_id = ?, dms_id = ?
-    WHERE id = ?
-    ''', (
-        'completed', 'fertig', now,
-        completion_data.get('final_inspection', ''),
-        completion_data.get('network_id', ''),
-        completion_data.get('dms_id', ''),
-        location_id
-    ))
+    # Status auf "completed" setzen, nur wenn der Standort seit dem Laden nicht weitergeleitet wurde
+    result = concurrency.update_fields(conn, seen, {
+        'status': 'completed',
+        'current_step': 'fertig',
+        'completion_date': now,
+        'final_inspection': completion_data.get('final_inspection', ''),
+        'network_id': completion_data.get('network_id', ''),
+        'dms_id': completion_data.get('dms_id', '')
+    }, guard=('status', 'current_step'))
+    if not result.saved:
+        return result
     
     # Workflow-History-Eintrag erstellen
     c.execute('''
-    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+    VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
     ''', (
         history_id, 
         location_id, 
@@ -121,54 +133,90 @@ def complete_location(location_id, completion_data):
         now
     ))
     
+    # Benachrichtigung in derselben Transaktion einreihen, Versand übernimmt der Hintergrund-Worker
+    notifications.notify_transition(conn, location_id, 'fertig', "Standort fertiggestellt und in Betrieb genommen.")
+    
+    # Übergabeprotokoll als Hintergrundjob erstellen (ebenfalls in derselben Transaktion)
+    job_id = jobs.enqueue(conn, 'completion_report', {'location_id': location_id})
+    
     conn.commit()
-    return True
+    pagination.invalidate_queue_counts()
+    notifications.wake_worker()
+    jobs.wake_runner()
+    st.session_state.completion_job = job_id
+    st.session_state.completion_done = True
+    return result
 
 # Simulieren eines eingeloggten Benutzers (in einer echten App würde hier ein Login-System stehen)
 if 'username' not in st.session_state:
     st.session_state.username = "Frank Fertigsteller"
     st.session_state.role = "Fertigstellung"
 
+
+# Ergebnis des Übergabeprotokolls
+def show_completion_result(job):
+    if job.status == jobs.DONE:
+        st.info(f"Übergabeprotokoll erstellt: {job.result['path']}")
+    else:
+        st.error(f"Übergabeprotokoll konnte nicht erstellt werden: {job.last_error}")
+
+
+# Stand des Übergabeprotokolls (eine Abfrage je Aktualisierung, bis der Job abgeschlossen ist)
+@st.fragment(run_every=2)
+def show_completion_job(job_id):
+    job = jobs.get_job(conn, job_id)
+    if job is None or job.status in (jobs.DONE, jobs.FAILED):
+        # Ganze Seite neu ausführen: dort wird das Ergebnis angezeigt und das Fragment nicht mehr gezeichnet
+        st.rerun()
+    st.progress(job.progress, text="Übergabeprotokoll wird im Hintergrund erstellt...")
+
+
+# Rückmeldung nach dem Fertigstellen (nach dem Neuladen der Seite)
+if st.session_state.pop('completion_done', False):
+    st.balloons()  # Visuelle Belohnung für die Fertigstellung
+    st.success("🎉 Standort wurde erfolgreich fertiggestellt und in Betrieb genommen!")
+    st.info("Dieser Standort wird nun im Dashboard als 'Fertig' angezeigt.")
+if 'completion_job' in st.session_state:
+    completion_job = jobs.get_job(conn, st.session_state.completion_job)
+    if completion_job is None or completion_job.status in (jobs.DONE, jobs.FAILED):
+        # Abgeschlossen: Ergebnis einmal anzeigen, danach keine Abfragen mehr
+        del st.session_state.completion_job
+        if completion_job is not None:
+            show_completion_result(completion_job)
+    else:
+        show_completion_job(completion_job.id)
+
 # Anzeigen aller Standorte in der Fertigstellungsphase
 st.subheader("Standorte in der finalen Fertigstellung")
 
 # Spalten für die Datenbank hinzufügen, falls sie noch nicht existieren
 try:
-    c.execute("PRAGMA table_info(locations)")
-    columns = c.fetchall()
-    column_names = [col[1] for col in columns]
-    
-    # Felder für Abschluss hinzufügen, falls sie noch nicht existieren
-    if 'completion_date' not in column_names:
-        c.execute('ALTER TABLE locations ADD COLUMN completion_date TEXT')
-    if 'final_inspection' not in column_names:
-        c.execute('ALTER TABLE locations ADD COLUMN final_inspection TEXT')
-    if 'network_id' not in column_names:
-        c.execute('ALTER TABLE locations ADD COLUMN network_id TEXT')
-    if 'dms_id' not in column_names:
-        c.execute('ALTER TABLE locations ADD COLUMN dms_id TEXT')
-    
-    conn.commit()
+    schema.ensure_columns(conn, 'locations', COMPLETION_COLUMNS)
 except:
     # Bei Fehler weitermachen
     pass
 
-df = load_completion_locations()
+# Nur die Niederlassungen des Bearbeiters (Auswahl in der Seitenleiste gilt für alle Queues)
+QUEUE_WHERE.update(regions.region_where(regions.select_regions()))
+search = st.text_input("Suche nach Standort oder Stadt", key="fertigstellung_queue_search")
+df, page = load_completion_locations(pagination.get_cursor("fertigstellung_queue", search, QUEUE_WHERE), search)
+total = pagination.count_queue(conn, QUEUE_WHERE, search)
 
 if df.empty:
     st.info("Aktuell gibt es keine Standorte in der finalen Fertigstellungsphase.")
 else:
     # Liste der Standorte anzeigen
-    st.write(f"**{len(df)} Standorte** zur finalen Fertigstellung.")
+    st.write(f"**{total} Standorte** zur finalen Fertigstellung.")
     
     # Vereinfachte Tabelle für die Übersicht
-    display_df = df[['standort', 'stadt', 'vermarktungsform', 'seiten', 'ist_date']].copy()
+    display_df = df[['standort', 'stadt', 'vermarktungsform', 'seiten', 'ist_date_epoch']].copy()
     display_df.columns = ['Standort', 'Stadt', 'Vermarktungsform', 'Seiten', 'Fertiggestellt am']
     
     # Datum formatieren
-    display_df['Fertiggestellt am'] = pd.to_datetime(display_df['Fertiggestellt am']).dt.strftime('%d.%m.%Y')
+    display_df['Fertiggestellt am'] = timestamps.format_epoch(display_df['Fertiggestellt am'])
     
     st.dataframe(display_df, hide_index=True)
+    pagination.render_page_navigation("fertigstellung_queue", page, total)
     
     # Auswahl für detaillierte Ansicht
     selected_location = st.selectbox(
@@ -184,6 +232,9 @@ else:
         tab1, tab2, tab3, tab4 = st.tabs(["Standortdetails", "Finale Freigabe", "Workflow-Historie", "Dokumentation"])
         
         location = load_location_details(selected_location)
+        # Stand, auf dem die Eingaben des Benutzers beruhen (für die Konfliktprüfung beim Speichern)
+        seen = concurrency.remember("fertigstellung_seen", location, EDIT_FIELDS) if location else None
+        concurrency.show_conflict("fertigstellung_seen")
         
         with tab1:
             st.subheader("Standortdetails")
@@ -192,27 +243,30 @@ else:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    st.markdown(f"**Standort:** {location.get('standort')}")
-                    st.markdown(f"**Stadt:** {location.get('stadt')}")
-                    st.markdown(f"**Vermarktungsform:** {location.get('vermarktungsform')}")
-                    st.markdown(f"**Seiten:** {location.get('seiten')}")
-                    st.markdown(f"**Art:** {location.get('umruestung')}")
-                    if location.get('umruestung') == 'Umrüstung':
-                        st.markdown(f"**Alte Werbeträgernummer:** {location.get('alte_nummer')}")
+                    st.markdown(f"**Standort:** {location.standort}")
+                    st.markdown(f"**Stadt:** {location.stadt}")
+                    st.markdown(f"**Vermarktungsform:** {location.vermarktungsform}")
+                    st.markdown(f"**Seiten:** {location.seiten}")
+                    st.markdown(f"**Art:** {location.umruestung_label}")
+                    if location.umruestung:
+                        st.markdown(f"**Alte Werbeträgernummer:** {location.alte_nummer}")
                     
                 with col2:
-                    st.markdown(f"**Eigentümer:** {location.get('eigentuemer')}")
-                    st.markdown(f"**Leistungswert:** {location.get('leistungswert')}")
-                    st.markdown(f"**Aufbau abgeschlossen am:** {location.get('ist_date')}")
-                    st.markdown(f"**Aufbau durchgeführt von:** {location.get('contractor')}")
-                    st.markdown(f"**Bauauftrags-Status:** {location.get('build_status')}")
-                    st.markdown(f"**Stromanschluss-Status:** {location.get('power_connection')}")
+                    st.markdown(f"**Eigentümer:** {location.eigentuemer_label}")
+                    st.markdown(f"**Leistungswert:** {numeric_columns.format_number(location.leistungswert)}")
+                    completion = forecast.completion_label(conn, location.id)
+                    if completion:
+                        st.markdown(f"**Voraussichtliche Fertigstellung:** {completion}")
+                    st.markdown(f"**Aufbau abgeschlossen am:** {location.ist_date}")
+                    st.markdown(f"**Aufbau durchgeführt von:** {location.contractor}")
+                    st.markdown(f"**Bauauftrags-Status:** {location.build_status}")
+                    st.markdown(f"**Stromanschluss-Status:** {location.power_connection}")
                 
                 # Karte anzeigen
                 st.subheader("Standort auf Karte")
                 map_data = pd.DataFrame({
-                    'lat': [float(location.get('lat'))],
-                    'lon': [float(location.get('lng'))]
+                    'lat': [float(location.lat)],
+                    'lon': [float(location.lng)]
                 })
                 st.map(map_data, zoom=15)
         
@@ -295,23 +349,11 @@ else:
                         completion_data['dms_id'] = dms_id
                         
                         # Standort als fertiggestellt markieren
-                        success = complete_location(selected_location, completion_data)
+                        result = complete_location(selected_location, completion_data, seen)
                         
-                        if success:
-                            st.balloons()  # Visuelle Belohnung für die Fertigstellung
-                            st.success("🎉 Standort wurde erfolgreich fertiggestellt und in Betrieb genommen!")
-                            
-                            # Fortschrittsbalken zeigen zur visuellen Bestätigung
-                            progress_bar = st.progress(0)
-                            for i in range(101):
-                                time.sleep(0.01)
-                                progress_bar.progress(i)
-                            
-                            st.info("Dieser Standort wird nun im Dashboard als 'Fertig' angezeigt.")
-                            st.info("Der gesamte Workflow für diesen Standort ist abgeschlossen. Der Standort ist betriebsbereit.")
-                            
-                            # Seite nach kurzer Verzögerung neu laden
-                            time.sleep(2)
+                        if not result.saved:
+                            concurrency.report_conflict("fertigstellung_seen", result, FIELD_LABELS)
+                        else:
                             st.rerun()
         
         with tab3:
@@ -322,14 +364,14 @@ else:
             
             if not history_df.empty:
                 # Prozessdauer berechnen
-                start_date = pd.to_datetime(history_df['Zeitstempel'].iloc[0])
-                end_date = pd.to_datetime(history_df['Zeitstempel'].iloc[-1])
-                duration = (end_date - start_date).days
+                start_epoch = history_df['Zeitstempel'].iloc[0]
+                end_epoch = history_df['Zeitstempel'].iloc[-1]
+                duration = int(timestamps.days_between(start_epoch, end_epoch))
                 
-                st.info(f"Gesamtdauer des Prozesses: **{duration} Tage** (von {start_date.strftime('%d.%m.%Y')} bis {end_date.strftime('%d.%m.%Y')})")
+                st.info(f"Gesamtdauer des Prozesses: **{duration} Tage** (von {timestamps.format_one(start_epoch)} bis {timestamps.format_one(end_epoch)})")
                 
                 # Formatierungen für bessere Lesbarkeit
-                history_df['Zeitstempel'] = pd.to_datetime(history_df['Zeitstempel']).dt.strftime('%d.%m.%Y, %H:%M Uhr')
+                history_df['Zeitstempel'] = timestamps.format_epoch(history_df['Zeitstempel'], timestamps.DATETIME_FORMAT)
                 
                 # Anzeigen der Historie mit farbiger Markierung
                 for idx, row in history_df.iterrows():
@@ -367,7 +409,7 @@ else:
                 st.markdown("### Technische Dokumentation")
                 
                 # Generierung von System-Informationen für Digitale Säule
-                if location.get('vermarktungsform') == "Digitale Säule":
+                if location.vermarktungsform == "Digitale Säule":
                     st.markdown("#### Displays")
                     st.markdown("""
                     * **Typ:** Full-HD LED Display
@@ -398,7 +440,7 @@ else:
                     st.download_button(
                         label="Technische Dokumentation herunterladen",
                         data="Technische Dokumentation der Digitalen Säule",
-                        file_name=f"Technische_Dokumentation_{location.get('standort', 'Standort')}.pdf",
+                        file_name=f"Technische_Dokumentation_{location.standort}.pdf",
                         mime="application/pdf",
                     )
             
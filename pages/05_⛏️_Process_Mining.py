@@ -0,0 +1,67 @@
+import streamlit as st
+import pandas as pd
+import sqlite3
+import time
+import aging
+import process_mining
+
+# Streamlit-Seiteneinstellungen
+st.set_page_config(layout="wide", page_title="Process Mining", page_icon="⛏️")
+
+st.title("Process Mining")
+st.write("Tatsächlich beobachteter Ablauf aus der Workflow-Historie: Varianten, Häufigkeiten und Durchlaufzeiten je Übergang.")
+
+
+# Modell aus der Historie berechnen (ein Streaming-Durchlauf, Ergebnis für 5 Minuten gecacht)
+@st.cache_data(ttl=300)
+def load_process_model():
+    conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
+    try:
+        aging.ensure_history_index(conn)
+        start = time.perf_counter()
+        model = process_mining.mine(conn)
+        return model, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+model, duration = load_process_model()
+
+if model.trace_count == 0:
+    st.info("Keine Workflow-Historie vorhanden.")
+else:
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Durchläufe", model.trace_count)
+    col2.metric("Ereignisse", model.event_count)
+    col3.metric("Varianten", len(model.variants))
+    col4.metric("Analysezeit", f"{duration * 1000:.0f} ms")
+
+    # Seltene Übergänge ausblenden, damit der Graph lesbar bleibt
+    max_edge = max(model.edge_counts.values(), default=0)
+    if max_edge > 1:
+        min_count = st.sidebar.slider("Mindestanzahl je Übergang", 1, max_edge, 1)
+    else:
+        # Ein Slider braucht min < max; bei lauter Einzelübergängen gibt es nichts auszublenden
+        min_count = 1
+
+    st.subheader("Beobachteter Prozessgraph")
+    st.caption("Linienstärke = Anzahl Durchläufe, Farbe = mittlere Dauer (blau kurz, rot lang). Beschriftung: Anzahl | Ø Tage")
+    graph = process_mining.build_graph(model, min_count=min_count)
+    st.plotly_chart(process_mining.build_figure(graph), use_container_width=True)
+
+    st.subheader("Häufigste Varianten")
+    top = st.sidebar.slider("Anzahl Varianten", 5, 50, 15, step=5)
+    variant_df = pd.DataFrame(process_mining.variant_table(model, top=top))
+    variant_df.columns = ['Variante', 'Anzahl', 'Anteil (%)']
+    st.dataframe(variant_df, hide_index=True, use_container_width=True)
+
+    st.subheader("Übergänge")
+    edge_df = pd.DataFrame([
+        {'Von': source, 'Nach': target, 'Anzahl': data['count'], 'Ø Tage': round(data['avg_days'], 1)}
+        for source, target, data in graph.edges(data=True)
+    ]).sort_values('Anzahl', ascending=False)
+    st.dataframe(edge_df, hide_index=True, use_container_width=True)
+
+    if st.sidebar.button("Neu berechnen"):
+        load_process_model.clear()
+        st.rerun()
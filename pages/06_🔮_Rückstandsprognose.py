@@ -0,0 +1,127 @@
+import streamlit as st
+import pandas as pd
+import sqlite3
+import math
+import time
+from datetime import date, timedelta
+import aging
+import pipeline_simulation
+
+# Streamlit-Seiteneinstellungen
+st.set_page_config(layout="wide", page_title="Rückstandsprognose", page_icon="🔮")
+
+st.title("Rückstandsprognose")
+st.write("Was-wäre-wenn-Simulation des Genehmigungsprozesses: Wann sind zusätzliche Standorte in den einzelnen Schritten abgearbeitet?")
+
+# Bezeichnungen der Schritte
+STEP_LABELS = {
+    'leiter_akquisition': 'Leiter Akquisition',
+    'baurecht': 'Baurecht',
+    'widerspruch': 'Widerspruch',
+    'ceo': 'CEO',
+    'bauteam': 'Bauteam',
+    'fertigstellung': 'Fertigstellung',
+}
+
+REPLICATION_OPTIONS = (100, 200, 500, 1000, 2000)
+
+
+# Modell aus der Historie schätzen (Ergebnis für 5 Minuten gecacht)
+@st.cache_data(ttl=300)
+def load_model():
+    conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
+    try:
+        aging.ensure_history_index(conn)
+        return pipeline_simulation.fit_model(conn), pipeline_simulation.load_wip(conn)
+    finally:
+        conn.close()
+
+
+# Gleiche Eingaben liefern dieselben Replikationen (feste Startwerte), daher gecacht
+@st.cache_data(max_entries=20)
+def run_simulation(model, scenario, replications):
+    start = time.perf_counter()
+    results = pipeline_simulation.simulate(model, scenario, replications)
+    return (pipeline_simulation.step_summary(results), pipeline_simulation.outcome_summary(results),
+            time.perf_counter() - start)
+
+
+# Tage ab heute als Datum; nan = Schritt nie erreicht, inf = bis zum Ende der Simulation nicht abgearbeitet
+def as_date(days):
+    if math.isnan(days):
+        return "–"
+    if math.isinf(days):
+        return "nicht im Simulationszeitraum"
+    return (date.today() + timedelta(days=days)).strftime('%d.%m.%Y')
+
+
+model, wip = load_model()
+
+# Szenario
+st.sidebar.header("Szenario")
+arrivals = st.sidebar.number_input("Neue Standorte", min_value=0, max_value=10000, value=400, step=50)
+arrival_days = st.sidebar.number_input("Eingang verteilt über (Tage)", min_value=1, max_value=730, value=91)
+include_wip = st.sidebar.checkbox(f"Aktuellen Bestand einbeziehen ({sum(wip.values())} Standorte)", value=True)
+replications = st.sidebar.select_slider("Replikationen", options=REPLICATION_OPTIONS, value=200)
+
+# Kapazitäten je Schritt (0 = unbegrenzt)
+st.sidebar.header("Kapazitäten")
+st.sidebar.caption("Gleichzeitig bearbeitete Standorte je Schritt, 0 = unbegrenzt")
+capacity = {}
+for step in pipeline_simulation.STEPS:
+    capacity[step] = st.sidebar.number_input(
+        STEP_LABELS[step], min_value=0, max_value=1000, value=model.capacity.get(step) or 0, key=f"capacity_{step}"
+    ) or None
+
+model = model._replace(capacity=capacity)
+scenario = pipeline_simulation.Scenario(int(arrivals), float(arrival_days), wip if include_wip else {})
+
+if arrivals == 0:
+    st.info("Für die Prognose mindestens einen neuen Standort angeben.")
+else:
+    steps, outcome, duration = run_simulation(model, scenario, replications)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Fertiggestellt (Ø)", f"{outcome['finished']:.0f} von {arrivals}")
+    col2.metric("Abgelehnt (Ø)", f"{outcome['rejected']:.0f}")
+    col3.metric("Ø Durchlaufzeit", f"{outcome['cycle_days']:.0f} Tage" if not math.isnan(outcome['cycle_days']) else "–")
+    col4.metric("Rechenzeit", f"{duration:.1f} s")
+
+    st.subheader("Abgearbeitet bis")
+    st.caption("Tag, an dem der letzte der neuen Standorte den Schritt verlassen hat (P50 = in der Hälfte, "
+               "P90 = in 90 % der Replikationen früher). Ø Warteschlange = mittlere längste Warteschlange.")
+
+    display_df = pd.DataFrame({
+        'Schritt': steps['step'].map(STEP_LABELS),
+        'P50': steps['p50'].apply(as_date),
+        'P90': steps['p90'].apply(as_date),
+        'P50 (Tage)': steps['p50'],
+        'P90 (Tage)': steps['p90'],
+        'Erreicht in % der Replikationen': steps['anteil'],
+        'Ø Warteschlange': steps['max_queue'],
+    })
+    st.dataframe(display_df, hide_index=True, use_container_width=True)
+
+    chart_df = steps[steps['p90'] < math.inf].set_index(steps['step'].map(STEP_LABELS))[['p50', 'p90']]
+    chart_df.columns = ['P50 (Tage)', 'P90 (Tage)']
+    st.bar_chart(chart_df)
+
+with st.expander("Geschätztes Modell", expanded=False):
+    st.caption("Bearbeitungszeiten als Lognormalverteilung aus workflow_history; Schritte mit weniger als "
+               f"{pipeline_simulation.MIN_SAMPLES} Beobachtungen verwenden die halbe SLA-Frist als Median.")
+    st.dataframe(pd.DataFrame([
+        {
+            'Schritt': STEP_LABELS[step],
+            'Median (Tage)': round(math.exp(model.service[step][0]), 2),
+            'Streuung (σ)': round(model.service[step][1], 2),
+            'Beobachtungen': model.samples[step],
+            'Ausgänge': ", ".join(f"{outcome} {probability:.0%}"
+                                  for outcome, probability in zip(*model.branches[step])),
+        }
+        for step in pipeline_simulation.STEPS
+    ]), hide_index=True, use_container_width=True)
+
+if st.sidebar.button("Modell neu schätzen"):
+    load_model.clear()
+    run_simulation.clear()
+    st.rerun()
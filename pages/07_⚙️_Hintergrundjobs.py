@@ -0,0 +1,100 @@
+import streamlit as st
+import pandas as pd
+import sqlite3
+import jobs
+
+# Streamlit-Seiteneinstellungen
+st.set_page_config(layout="wide", page_title="Hintergrundjobs", page_icon="⚙️")
+
+# Verbindung zur Datenbank herstellen
+conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
+jobs.ensure_jobs(conn)
+jobs.start_runner()
+
+st.title("Hintergrundjobs")
+st.write("Aufwendige Arbeiten (Exporte, Berichte, Wartung) laufen in eigenen Prozessen und blockieren keine Seite.")
+
+# Bezeichnungen der Job-Arten und Status
+KIND_LABELS = {
+    'archive_terminal': 'Archivierung abgeschlossener Standorte',
+    'rebuild_search_index': 'Suchindex neu aufbauen',
+    'workflow_graph_snapshot': 'Prozessdiagramm vorberechnen',
+    'export_locations': 'Export aller Standorte (CSV)',
+    'completion_report': 'Übergabeprotokoll',
+}
+STATUS_LABELS = {
+    jobs.QUEUED: '⏳ Wartend',
+    jobs.RUNNING: '▶️ Läuft',
+    jobs.DONE: '✅ Fertig',
+    jobs.FAILED: '❌ Fehlgeschlagen',
+}
+
+
+def format_time(value):
+    return pd.to_datetime(value).strftime('%d.%m.%Y %H:%M') if value else ""
+
+
+# Manuell starten
+st.subheader("Job starten")
+col1, col2 = st.columns([3, 1])
+with col1:
+    kind = st.selectbox(
+        "Job-Art",
+        [name for name in jobs.JOB_TYPES if name != 'completion_report'],
+        format_func=KIND_LABELS.get,
+        key="jobs_kind"
+    )
+with col2:
+    st.write("")
+    if st.button("Einreihen", type="primary"):
+        job_id = jobs.enqueue(conn, kind)
+        conn.commit()
+        jobs.wake_runner()
+        st.success(f"Job {job_id} eingereiht")
+
+
+# Liste wird alle 3 Sekunden neu abgefragt, ohne die übrige Seite neu auszuführen
+@st.fragment(run_every=3)
+def show_jobs():
+    recent = jobs.recent_jobs(conn, 50)
+    if not recent:
+        st.info("Noch keine Jobs vorhanden.")
+        return
+    st.dataframe(pd.DataFrame([
+        {
+            'ID': job.id,
+            'Job': KIND_LABELS.get(job.kind, job.kind),
+            'Status': STATUS_LABELS.get(job.status, job.status),
+            'Fortschritt': round(job.progress * 100),
+            'Meldung': job.message or "",
+            'Versuche': f"{job.attempts}/{job.max_attempts}",
+            'Erstellt': format_time(job.created_at),
+            'Nächster Versuch': format_time(job.run_after) if job.status == jobs.QUEUED else "",
+            'Beendet': format_time(job.finished_at),
+            'Zeitplan': job.schedule or "",
+            'Ergebnis': ", ".join(f"{key}: {value}" for key, value in job.result.items()) if job.result else "",
+            'Fehler': job.last_error or "",
+        }
+        for job in recent
+    ]), hide_index=True, use_container_width=True, column_config={
+        'Fortschritt': st.column_config.ProgressColumn("Fortschritt", min_value=0, max_value=100, format="%.0f%%"),
+    })
+
+
+st.subheader("Letzte Jobs")
+show_jobs()
+
+# Wiederkehrende Wartungsjobs
+st.subheader("Zeitpläne")
+st.caption("Cron-Ausdrücke (Minute Stunde Tag Monat Wochentag); verpasste Termine werden beim nächsten Start einmal nachgeholt.")
+st.dataframe(pd.DataFrame([
+    {
+        'Name': name,
+        'Job': KIND_LABELS.get(kind, kind),
+        'Cron': cron,
+        'Nächster Lauf': format_time(next_run),
+        'Letzter Job': last_job_id,
+        'Aktiv': bool(enabled),
+    }
+    for name, kind, cron, next_run, last_job_id, enabled in jobs.list_schedules(conn)
+]), hide_index=True, use_container_width=True)
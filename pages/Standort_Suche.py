@@ -0,0 +1,52 @@
+import html
+import streamlit as st
+import pandas as pd
+import sqlite3
+import time
+import search
+
+# Streamlit-Seiteneinstellungen
+st.set_page_config(layout="wide", page_title="Standort-Suche", page_icon="🔍")
+
+# Verbindung zur Datenbank herstellen
+conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
+
+st.title("🔍 Standort-Suche")
+st.write("Durchsucht Standortbezeichnung, Stadt, alte Werbeträgernummer, Erfasser und alle Kommentare der Workflow-Historie, auch von archivierten Standorten (z.B. Ablehnungsgründe oder Bauantragsnummern).")
+
+if not search.ensure_search_index(conn):
+    st.caption("Hinweis: SQLite wurde ohne FTS5 kompiliert. Die Suche verwendet eine langsamere Textsuche ohne Ranking.")
+
+query = st.text_input("Suchbegriff", placeholder="z.B. Holzmarkt, Berlin, BA-2024-1234 ...")
+limit = st.sidebar.slider("Maximale Trefferanzahl", 10, 200, 50, step=10)
+
+if query:
+    start = time.perf_counter()
+    results = search.search(conn, query, limit=limit)
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    if not results:
+        st.info(f"Keine Treffer für „{query}“.")
+    else:
+        st.write(f"**{len(results)} Treffer** in {duration_ms:.1f} ms")
+
+        for hit in results:
+            step = (hit['current_step'] or '').replace('_', ' ').title()
+            # Gespeicherte Texte escapen, nur die Fundstellen werden als HTML hervorgehoben
+            st.markdown(
+                f"<div style='padding:8px 10px; margin-bottom:8px; border-left: 3px solid #457B9D;'>"
+                f"<strong>{html.escape(hit['standort'] or '')}, {html.escape(hit['stadt'] or '')}</strong> "
+                f"<small>({hit['quelle']} · Schritt: {html.escape(step)})</small><br>"
+                f"{search.highlight_html(hit['treffer'])}"
+                f"</div>",
+                unsafe_allow_html=True
+            )
+
+        # Tabellarische Übersicht für den Export
+        result_df = pd.DataFrame(results)[['standort', 'stadt', 'current_step', 'quelle', 'treffer', 'location_id']]
+        result_df['treffer'] = result_df['treffer'].map(search.plain_text)
+        result_df.columns = ['Standort', 'Stadt', 'Schritt', 'Quelle', 'Treffer', 'ID']
+        with st.expander("Als Tabelle anzeigen"):
+            st.dataframe(result_df, hide_index=True, use_container_width=True)
+
+conn.close()
@@ -0,0 +1,208 @@
+import heapq
+import time
+from itertools import islice
+from typing import NamedTuple
+
+import streamlit as st
+
+import schema
+
+# Standardgröße einer Tabellenseite in den Queues
+PAGE_SIZE = 25
+
+# Gültigkeitsdauer der gecachten Gesamtanzahl in Sekunden
+COUNT_TTL = 30
+
+# Spalten, die in der Schnellsuche durchsucht werden
+SEARCH_COLUMNS = ("standort", "stadt")
+
+_count_cache = {}
+
+
+class QueuePage(NamedTuple):
+    rows: list
+    first_key: tuple
+    last_key: tuple
+    has_prev: bool
+    has_next: bool
+
+
+# Index für die Keyset-Paginierung anlegen (Filter auf Step/Status, Sortierung nach
+# schema.QUEUE_SORT_KEY, id); ältere Indizes auf created_at selbst werden ersetzt
+def ensure_queue_index(conn):
+    schema.ensure_index(conn, 'idx_locations_queue', 'locations', f"current_step, status, {schema.QUEUE_SORT_KEY}, id")
+    schema.ensure_index(conn, 'idx_locations_created', 'locations', f"{schema.QUEUE_SORT_KEY}, id")
+    conn.commit()
+
+
+# WHERE-Klausel aus einem Filter-Dictionary und dem Suchbegriff bauen
+def _build_where(where, search):
+    clauses = []
+    params = []
+
+    for column, value in where.items():
+        if isinstance(value, (list, tuple, set)):
+            value = list(value)
+            if not value:
+                # Leere Auswahl im Filter bedeutet: keine Treffer
+                clauses.append("0")
+                continue
+            placeholders = ", ".join(["?" for _ in value])
+            clauses.append(f"{column} IN ({placeholders})")
+            params.extend(value)
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+
+    if search:
+        pattern = f"%{search.strip()}%"
+        clauses.append("(" + " OR ".join(f"{col} LIKE ?" for col in SEARCH_COLUMNS) + ")")
+        params.extend([pattern] * len(SEARCH_COLUMNS))
+
+    return clauses, params
+
+
+def _page_rows(conn, select_columns, where, cursor, search, limit):
+    clauses, params = _build_where(where, search)
+
+    direction = cursor[0] if cursor else "next"
+    if cursor:
+        # Die Einzelbedingung auf den Sortierschlüssel lässt SQLite im Ausdrucksindex einsteigen,
+        # den Zeilenvergleich allein wertet es bei Ausdrücken erst beim Lesen aus
+        if direction == "next":
+            clauses.append(f"{schema.QUEUE_SORT_KEY} <= ? AND ({schema.QUEUE_SORT_KEY}, id) < (?, ?)")
+        else:
+            clauses.append(f"{schema.QUEUE_SORT_KEY} >= ? AND ({schema.QUEUE_SORT_KEY}, id) > (?, ?)")
+        params.extend([cursor[1], cursor[1], cursor[2]])
+
+    order = "DESC" if direction == "next" else "ASC"
+    where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    return conn.execute(f'''
+    SELECT {", ".join(select_columns)}
+    FROM locations
+    {where_sql}
+    ORDER BY {schema.QUEUE_SORT_KEY} {order}, id {order}
+    LIMIT ?
+    ''', params + [limit]).fetchall()
+
+
+def load_queue_page(conn, columns, where, cursor=None, search="", page_size=PAGE_SIZE):
+    """
+    Eine Seite einer Queue per Keyset-Paginierung auf (created_at, id) laden, neueste zuerst.
+    Fehlendes created_at zählt als '' (schema.QUEUE_SORT_KEY), solche Standorte stehen also am Ende.
+    cursor: None für die erste Seite, sonst ("next" | "prev", created_at oder '', id).
+    Die Kosten hängen nur von der Seitengröße ab, nicht von der Länge des Backlogs. Ein Filter mit
+    mehreren Werten (z.B. mehrere Regionen) wird je Wert abgefragt, damit jede Abfrage die
+    Sortierung aus dem Index liest; die Teilergebnisse werden sortiert zusammengeführt.
+    """
+    direction = cursor[0] if cursor else "next"
+
+    # created_at und id werden immer mitgeladen, damit die Cursor gebildet werden können
+    select_columns = list(columns)
+    for key_column in ("created_at", "id"):
+        if key_column not in select_columns:
+            select_columns.append(key_column)
+    created_idx = select_columns.index("created_at")
+    id_idx = select_columns.index("id")
+
+    split = next((column for column, value in where.items()
+                  if isinstance(value, (list, tuple, set)) and len(value) > 1), None)
+    if split is None:
+        rows = _page_rows(conn, select_columns, where, cursor, search, page_size + 1)
+    else:
+        parts = [_page_rows(conn, select_columns, {**where, split: value}, cursor, search, page_size + 1)
+                 for value in where[split]]
+        rows = list(islice(heapq.merge(
+            *parts, key=lambda row: (row[created_idx] or '', row[id_idx]), reverse=direction == "next"
+        ), page_size + 1))
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if direction == "prev":
+        rows.reverse()
+
+    keys = [(row[created_idx] or '', row[id_idx]) for row in rows]
+
+    # Zusätzlich mitgeladene Schlüsselspalten wieder entfernen
+    width = len(columns)
+    rows = [row[:width] for row in rows]
+
+    if direction == "next":
+        has_prev, has_next = cursor is not None, has_more
+    else:
+        has_prev, has_next = has_more, True
+
+    return QueuePage(
+        rows=rows,
+        first_key=keys[0] if keys else None,
+        last_key=keys[-1] if keys else None,
+        has_prev=has_prev and bool(keys),
+        has_next=has_next and bool(keys),
+    )
+
+
+# Filter-Dictionary als hashbarer, reihenfolgeunabhängiger Schlüssel
+def _where_key(where):
+    return tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple, set)) else v) for k, v in where.items()))
+
+
+def count_queue(conn, where, search=""):
+    """
+    Gesamtanzahl einer Queue, getrennt von den Seiten gecacht.
+    Der Cache wird nach COUNT_TTL Sekunden oder per invalidate_queue_counts() verworfen.
+    """
+    cache_key = (_where_key(where), search)
+    cached = _count_cache.get(cache_key)
+    now = time.monotonic()
+    if cached and now - cached[1] < COUNT_TTL:
+        return cached[0]
+
+    clauses, params = _build_where(where, search)
+    where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    total = conn.execute(f'SELECT COUNT(*) FROM locations {where_sql}', params).fetchone()[0]
+    _count_cache[cache_key] = (total, now)
+    return total
+
+
+# Nach jedem Statuswechsel aufrufen, damit die Zähler sofort stimmen
+def invalidate_queue_counts():
+    _count_cache.clear()
+
+
+# Aktuellen Cursor einer Tabelle aus dem Session-State lesen (bei neuer Suche oder geänderten
+# Filtern, z.B. der Regionsauswahl, zurück auf Seite 1)
+def get_cursor(key, search="", where=None):
+    search_key = f"{key}_search_applied"
+    applied = (search, _where_key(where or {}))
+    if st.session_state.get(search_key) != applied:
+        st.session_state[search_key] = applied
+        st.session_state[f"{key}_cursor"] = None
+        st.session_state[f"{key}_page_no"] = 1
+    return st.session_state.get(f"{key}_cursor")
+
+
+# Vor/Zurück-Buttons unter einer Tabelle anzeigen
+def render_page_navigation(key, page, total, page_size=PAGE_SIZE):
+    page_no = st.session_state.get(f"{key}_page_no", 1)
+    page_count = max(1, -(-total // page_size))
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col1:
+        if st.button("◀ Zurück", key=f"{key}_prev", disabled=not page.has_prev, use_container_width=True):
+            st.session_state[f"{key}_cursor"] = ("prev",) + page.first_key
+            st.session_state[f"{key}_page_no"] = max(1, page_no - 1)
+            st.rerun()
+
+    with col2:
+        st.markdown(
+            f"<div style='text-align:center; padding-top:6px;'>Seite {page_no} von {page_count}</div>",
+            unsafe_allow_html=True
+        )
+
+    with col3:
+        if st.button("Weiter ▶", key=f"{key}_next", disabled=not page.has_next, use_container_width=True):
+            st.session_state[f"{key}_cursor"] = ("next",) + page.last_key
+            st.session_state[f"{key}_page_no"] = page_no + 1
+            st.rerun()
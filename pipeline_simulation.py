@@ -0,0 +1,355 @@
+"""
+Ereignisdiskrete Simulation des Genehmigungsprozesses für Rückstandsprognosen
+("Wenn nächstes Quartal 400 Standorte hinzukommen, wann hat Baurecht sie abgearbeitet?").
+
+Jeder Standort durchläuft die Schritte des Workflows; je Schritt können nur so viele Standorte
+gleichzeitig bearbeitet werden, wie Kapazität vorhanden ist, die übrigen warten in einer
+FIFO-Warteschlange. Die Ereignisse (Ankunft, Abschluss eines Schritts) liegen in einer
+Heap-Warteschlange. Bearbeitungszeiten sind Lognormalverteilungen und Verzweigungen
+(Ablehnung, Widerspruch) sind Wahrscheinlichkeiten, beides aus workflow_history geschätzt. Die Replikationen werden auf
+einen Prozesspool verteilt.
+
+Aufruf (Laufzeitmessung):
+    python pipeline_simulation.py --arrivals 400 --replications 1000
+"""
+import argparse
+import heapq
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import aging
+
+# Schritte in Prozessreihenfolge (die Erfassung selbst hat keine Bearbeitungszeit). Der
+# Niederlassungsleiter fehlt: die Workflow-Seiten leiten von der Akquisition direkt an Baurecht weiter.
+STEPS = ('leiter_akquisition', 'baurecht', 'widerspruch', 'ceo', 'bauteam', 'fertigstellung')
+ENTRY_STEP = 'leiter_akquisition'
+
+DONE = 'fertig'
+REJECTED = 'abgelehnt'
+
+# Ausgänge je Schritt (Historien-Status) und der jeweils nächste Schritt, wie in den Workflow-Seiten
+TRANSITIONS = {
+    'leiter_akquisition': {'approved': 'baurecht', 'rejected': REJECTED},
+    'baurecht': {'approved': 'ceo', 'objection': 'widerspruch', 'rejected': REJECTED},
+    'widerspruch': {'approved': 'ceo', 'rejected': REJECTED},
+    'ceo': {'approved': 'bauteam', 'rejected': REJECTED},
+    'bauteam': {'completed': 'fertigstellung'},
+    'fertigstellung': {'completed': DONE},
+}
+
+# Annahmen ohne ausreichende Historie; sie gehen als PRIOR_WEIGHT Pseudo-Beobachtungen in die Schätzung ein
+DEFAULT_BRANCHES = {
+    'leiter_akquisition': {'approved': 0.8, 'rejected': 0.2},
+    'baurecht': {'approved': 0.7, 'objection': 0.15, 'rejected': 0.15},
+    'widerspruch': {'approved': 0.5, 'rejected': 0.5},
+    'ceo': {'approved': 0.85, 'rejected': 0.15},
+    'bauteam': {'completed': 1.0},
+    'fertigstellung': {'completed': 1.0},
+}
+PRIOR_WEIGHT = 5
+
+# Bearbeitungszeit ohne ausreichende Historie: Median = halbe SLA-Frist, Streuung DEFAULT_SIGMA
+MIN_SAMPLES = 5
+DEFAULT_SIGMA = 0.6
+
+# Gleichzeitig bearbeitete Standorte je Schritt (None = unbegrenzt, z.B. Verfahren bei der Stadt)
+DEFAULT_CAPACITY = {
+    'leiter_akquisition': 10,
+    'baurecht': 60,
+    'widerspruch': None,
+    'ceo': 10,
+    'bauteam': 20,
+    'fertigstellung': 10,
+}
+
+# Simulation endet spätestens nach so vielen Tagen
+MAX_DAYS = 5 * 365
+
+DEFAULT_REPLICATIONS = 500
+PARALLEL_MIN_REPLICATIONS = 100
+
+PERCENTILES = (50, 90)
+
+# Vorgezogene Zufallszahlen je Schritt (Nachziehen in Blöcken statt je Ereignis)
+_BATCH = 1024
+
+_ARRIVAL, _DEPARTURE = 0, 1
+
+
+class PipelineModel(NamedTuple):
+    service: dict  # Schritt -> (mu, sigma) der Lognormalverteilung in Tagen
+    branches: dict  # Schritt -> (Ausgänge, Wahrscheinlichkeiten)
+    capacity: dict  # Schritt -> gleichzeitig bearbeitete Standorte (None = unbegrenzt)
+    samples: dict  # Schritt -> Anzahl der Beobachtungen, auf denen die Bearbeitungszeit beruht
+
+
+class Scenario(NamedTuple):
+    arrivals: int  # neue Standorte
+    arrival_days: float  # verteilt über so viele Tage
+    wip: dict  # Schritt -> Standorte, die zu Beginn bereits im Schritt sind
+
+
+class Replication(NamedTuple):
+    clear_days: dict  # Schritt -> Tag, an dem der letzte neue Standort den Schritt verlassen hat (nan = nie erreicht)
+    finished: int  # neue Standorte, die fertig geworden sind
+    rejected: int
+    cycle_days: float  # mittlere Durchlaufzeit der fertig gewordenen neuen Standorte
+    max_queue: dict  # Schritt -> längste Warteschlange
+
+
+def _lognormal(days):
+    days = np.clip(np.asarray(days, dtype=float), 0.01, None)
+    logs = np.log(days)
+    return float(logs.mean()), float(logs.std(ddof=1)) if len(logs) > 1 else DEFAULT_SIGMA
+
+
+def approved_path():
+    """
+    Weg eines genehmigten Standorts von ENTRY_STEP bis zur Fertigstellung (ohne Widerspruch).
+    Returns: Tupel der Schritte
+    """
+    path = [ENTRY_STEP]
+    while True:
+        outcomes = TRANSITIONS[path[-1]]
+        target = outcomes.get('approved', outcomes.get('completed'))
+        if target == DONE:
+            return tuple(path)
+        path.append(target)
+
+
+def fit_model(conn, capacity=None):
+    """
+    Bearbeitungszeiten und Verzweigungswahrscheinlichkeiten aus der Historie schätzen.
+    Die beobachteten Verweildauern enthalten auch Wartezeiten; die Prognose ist damit eher vorsichtig.
+    Returns: PipelineModel
+    """
+    durations = aging.load_step_durations(conn)
+
+    service = {}
+    samples = {}
+    for step in STEPS:
+        days = durations.loc[durations['step'] == step, 'days'].to_numpy()
+        samples[step] = len(days)
+        if len(days) >= MIN_SAMPLES:
+            service[step] = _lognormal(days)
+        else:
+            service[step] = (math.log(aging.SLA_DAYS.get(step, 10) / 2), DEFAULT_SIGMA)
+
+    counts = durations.groupby(['step', 'status']).size()
+    branches = {}
+    for step, defaults in DEFAULT_BRANCHES.items():
+        outcomes = tuple(defaults)
+        observed = np.array([counts.get((step, outcome), 0) for outcome in outcomes], dtype=float)
+        prior = np.array([defaults[outcome] for outcome in outcomes]) * PRIOR_WEIGHT
+        probabilities = (observed + prior) / (observed.sum() + PRIOR_WEIGHT)
+        branches[step] = (outcomes, tuple(float(p) for p in probabilities))
+
+    return PipelineModel(service, branches, {**DEFAULT_CAPACITY, **(capacity or {})}, samples)
+
+
+def load_wip(conn):
+    """
+    Aktive Standorte je Schritt, mit denen die Simulation startet.
+    """
+    rows = conn.execute('''
+    SELECT current_step, COUNT(*) FROM locations WHERE status = 'active' GROUP BY current_step
+    ''').fetchall()
+    return {step: count for step, count in rows if step in TRANSITIONS}
+
+
+class _Draws:
+    """
+    Zufallszahlen eines Schritts, blockweise vorgezogen.
+    """
+
+    def __init__(self, rng, mu, sigma, probabilities):
+        self.rng = rng
+        self.mu = mu
+        self.sigma = sigma
+        self.cumulative = np.cumsum(probabilities)
+        self.cumulative[-1] = 1.0
+        self._service = self._branch = ()
+        self._service_index = self._branch_index = 0
+
+    def service(self):
+        if self._service_index >= len(self._service):
+            self._service = self.rng.lognormal(self.mu, self.sigma, _BATCH).tolist()
+            self._service_index = 0
+        self._service_index += 1
+        return self._service[self._service_index - 1]
+
+    def branch(self):
+        if self._branch_index >= len(self._branch):
+            self._branch = np.searchsorted(self.cumulative, self.rng.random(_BATCH), side='right').tolist()
+            self._branch_index = 0
+        self._branch_index += 1
+        return self._branch[self._branch_index - 1]
+
+
+def run_replication(model, scenario, seed):
+    """
+    Eine Replikation: Ankunfts- und Abschlussereignisse aus einer Heap-Warteschlange abarbeiten.
+    Returns: Replication
+    """
+    rng = np.random.default_rng(seed)
+    draws = {step: _Draws(rng, *model.service[step], model.branches[step][1]) for step in STEPS}
+    next_steps = {step: [TRANSITIONS[step][outcome] for outcome in model.branches[step][0]] for step in STEPS}
+    capacity = {step: model.capacity.get(step) or math.inf for step in STEPS}
+
+    busy = dict.fromkeys(STEPS, 0)
+    waiting = {step: deque() for step in STEPS}
+    max_queue = dict.fromkeys(STEPS, 0)
+    clear_days = dict.fromkeys(STEPS, math.nan)
+
+    # Standorte als Indizes: zuerst die neuen (Kohorte), danach der Bestand
+    arrivals = np.sort(rng.uniform(0, scenario.arrival_days, scenario.arrivals)).tolist()
+    cohort = len(arrivals)
+    wip = [step for step in STEPS for _ in range(scenario.wip.get(step, 0))]
+    arrived = arrivals + [0.0] * len(wip)
+
+    events = [(day, site, _ARRIVAL, ENTRY_STEP) for site, day in enumerate(arrivals)]
+    events += [(0.0, cohort + index, _ARRIVAL, step) for index, step in enumerate(wip)]
+    heapq.heapify(events)
+
+    finished = rejected = 0
+    cycle_total = 0.0
+    while events:
+        day, site, kind, step = heapq.heappop(events)
+        if day > MAX_DAYS:
+            heapq.heappush(events, (day, site, kind, step))
+            break
+
+        if kind == _ARRIVAL:
+            if busy[step] < capacity[step]:
+                busy[step] += 1
+                heapq.heappush(events, (day + draws[step].service(), site, _DEPARTURE, step))
+            else:
+                queue = waiting[step]
+                queue.append(site)
+                if len(queue) > max_queue[step]:
+                    max_queue[step] = len(queue)
+            continue
+
+        # Schritt abgeschlossen: nächsten wartenden Standort beginnen, diesen weiterleiten
+        queue = waiting[step]
+        if queue:
+            heapq.heappush(events, (day + draws[step].service(), queue.popleft(), _DEPARTURE, step))
+        else:
+            busy[step] -= 1
+
+        target = next_steps[step][draws[step].branch()]
+        if site < cohort:
+            clear_days[step] = day
+            if target == DONE:
+                finished += 1
+                cycle_total += day - arrived[site]
+            elif target == REJECTED:
+                rejected += 1
+        if target != DONE and target != REJECTED:
+            heapq.heappush(events, (day, site, _ARRIVAL, target))
+
+    # Ein Schritt ist nur abgearbeitet, wenn kein neuer Standort mehr darin wartet oder bearbeitet wird
+    if events:
+        pending = {step for _, site, _, step in events if site < cohort}
+        pending.update(step for step in STEPS if any(site < cohort for site in waiting[step]))
+        for step in pending:
+            clear_days[step] = math.inf
+
+    return Replication(clear_days, finished, rejected, cycle_total / finished if finished else math.nan, max_queue)
+
+
+def _run_chunk(model, scenario, seeds):
+    return [run_replication(model, scenario, seed) for seed in seeds]
+
+
+def simulate(model, scenario, replications=DEFAULT_REPLICATIONS, seed=0, processes=None):
+    """
+    Mehrere unabhängige Replikationen, ab PARALLEL_MIN_REPLICATIONS auf einen Prozesspool verteilt.
+    Die Startwerte hängen nur von seed ab, das Ergebnis also nicht von der Anzahl der Prozesse.
+    Returns: Liste von Replication
+    """
+    seeds = np.random.SeedSequence(seed).generate_state(replications).tolist()
+    processes = processes or os.cpu_count() or 1
+    if replications < PARALLEL_MIN_REPLICATIONS or processes == 1:
+        return _run_chunk(model, scenario, seeds)
+
+    size = -(-replications // processes)
+    chunks = [seeds[i:i + size] for i in range(0, replications, size)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        results = executor.map(_run_chunk, [model] * len(chunks), [scenario] * len(chunks), chunks)
+        return [replication for chunk in results for replication in chunk]
+
+
+def step_summary(results):
+    """
+    Je Schritt: Tage bis der letzte neue Standort den Schritt verlassen hat (P50/P90 über die
+    Replikationen, nur Replikationen, in denen ein neuer Standort den Schritt erreicht hat),
+    Anteil solcher Replikationen und mittlere längste Warteschlange.
+    Returns: DataFrame mit step, p50, p90, anteil, max_queue
+    """
+    rows = []
+    for step in STEPS:
+        days = np.array([result.clear_days[step] for result in results], dtype=float)
+        reached = days[~np.isnan(days)]
+        p50, p90 = np.percentile(reached, PERCENTILES) if len(reached) else (math.nan, math.nan)
+        rows.append({
+            'step': step,
+            'p50': round(float(p50), 1),
+            'p90': round(float(p90), 1),
+            'anteil': round(len(reached) / len(results) * 100, 1) if results else 0.0,
+            'max_queue': round(float(np.mean([result.max_queue[step] for result in results])), 1) if results else 0.0,
+        })
+    return pd.DataFrame(rows, columns=['step', 'p50', 'p90', 'anteil', 'max_queue'])
+
+
+def outcome_summary(results):
+    """
+    Mittelwerte über die Replikationen: fertige und abgelehnte neue Standorte, Durchlaufzeit.
+    """
+    cycle = [result.cycle_days for result in results if not math.isnan(result.cycle_days)]
+    return {
+        'finished': float(np.mean([result.finished for result in results])) if results else 0.0,
+        'rejected': float(np.mean([result.rejected for result in results])) if results else 0.0,
+        'cycle_days': float(np.mean(cycle)) if cycle else math.nan,
+    }
+
+
+def _demo_model():
+    return PipelineModel(
+        {step: (math.log(aging.SLA_DAYS.get(step, 10) / 2), DEFAULT_SIGMA) for step in STEPS},
+        {step: (tuple(defaults), tuple(defaults.values())) for step, defaults in DEFAULT_BRANCHES.items()},
+        dict(DEFAULT_CAPACITY), dict.fromkeys(STEPS, 0)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Laufzeit der Prozesssimulation messen.")
+    parser.add_argument("--arrivals", type=int, default=400)
+    parser.add_argument("--days", type=float, default=91)
+    parser.add_argument("--replications", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    model = _demo_model()
+    scenario = Scenario(args.arrivals, args.days, {'baurecht': 50, 'bauteam': 20})
+
+    start = time.perf_counter()
+    _run_chunk(model, scenario, range(20))
+    single = (time.perf_counter() - start) / 20
+    start = time.perf_counter()
+    results = simulate(model, scenario, args.replications, processes=args.processes)
+    duration = time.perf_counter() - start
+
+    print(f"1 Replikation: {single * 1000:.1f} ms; {args.replications} Replikationen: {duration:.2f} s")
+    print(step_summary(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
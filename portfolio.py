@@ -0,0 +1,240 @@
+"""
+Portfolio-Optimierung der CEO-Queue unter einem jährlichen Investitionsbudget.
+
+Gesucht ist die Auswahl von Standorten mit maximalem Kapitalwert (NPV), deren Investitionen
+zusammen im Budget bleiben (0/1-Rucksackproblem). Für übliche Queue-Größen wird es per
+dynamischer Programmierung gelöst (exakt auf den Euro, bei größeren Queues auf einem gröberen
+Budgetraster): die Tabelle wird einmal für das größte sinnvolle Budget berechnet und gecacht,
+jedes kleinere Budget ist danach nur noch eine Rückverfolgung. Bei Tausenden Standorten wird
+greedy nach NPV je € ausgewählt; die LP-Relaxation liefert dazu eine obere Schranke.
+
+Aufruf (Laufzeitmessung mit zufälligen Standorten):
+    python portfolio.py --sites 500
+"""
+import argparse
+import math
+import time
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import finance
+
+# Größe der DP-Tabelle (Standorte x Budgetstufen); reicht sie nicht für 1-€-Schritte, wird das
+# Budgetraster gröber und die Investitionen werden darauf aufgerundet (die Lösung bleibt zulässig)
+DP_MAX_CELLS = 25_000_000
+# Gröberes Raster als dieses (in €) lohnt nicht mehr, dann wird die Greedy-Lösung verwendet
+MAX_RESOLUTION = 500
+
+METHOD_EXACT = 'Dynamische Programmierung'
+METHOD_GREEDY = 'Greedy nach NPV je € (LP-Schranke)'
+
+
+class Candidate(NamedTuple):
+    location_id: str
+    name: str
+    investment: float
+    npv: float
+
+
+class Portfolio(NamedTuple):
+    budget: float
+    selected: tuple  # location_ids der empfohlenen Standorte
+    investment: float
+    npv: float
+    upper_bound: float  # höchstens erreichbarer NPV (LP-Relaxation)
+    shadow_price: float  # zusätzlicher NPV je zusätzlichem € Budget an der Grenze (LP-Relaxation)
+    method: str
+
+
+def load_candidates(conn, current_step='ceo'):
+    """
+    Alle aktiven Standorte eines Prozessschritts mit Investition und NPV aus dem Wirtschaftlichkeitsmodell.
+    Returns: Liste von Candidate
+    """
+    candidates = []
+    for inputs, name in finance.load_queue_inputs(conn, current_step):
+        estimate = finance.point_estimate(inputs)
+        candidates.append(Candidate(inputs.location_id, name, float(estimate['investment']), estimate['npv']))
+    return candidates
+
+
+def max_budget(candidates):
+    # Mehr Budget als alle Standorte mit positivem NPV zusammen bringt nichts
+    return float(sum(candidate.investment for candidate in candidates if candidate.npv > 0))
+
+
+def _resolution(capacity, count):
+    return max(1, math.ceil(capacity * count / DP_MAX_CELLS))
+
+
+@lru_cache(maxsize=4)
+def _knapsack_table(weights, values, units):
+    """
+    0/1-Rucksack über alle Budgetstufen 0..units, je Standort ein vektorisierter Schritt.
+    Returns: (bester Wert je Budgetstufe, Entscheidungsmatrix Standorte x Budgetstufen)
+    """
+    best = np.zeros(units + 1)
+    take = np.zeros((len(weights), units + 1), dtype=bool)
+    for item, (weight, value) in enumerate(zip(weights, values)):
+        if weight > units:
+            continue
+        candidate = best[:units + 1 - weight] + value
+        improved = candidate > best[weight:]
+        take[item, weight:] = improved
+        best[weight:] = np.where(improved, candidate, best[weight:])
+    best.flags.writeable = False
+    take.flags.writeable = False
+    return best, take
+
+
+def _lp_relaxation(items, budget):
+    """
+    Greedy nach NPV je € und LP-Schranke (der erste nicht mehr passende Standort anteilig).
+    Returns: (Auswahl, obere Schranke, NPV je € des Grenzstandorts)
+    """
+    ordered = sorted(items, key=lambda candidate: candidate.npv / candidate.investment, reverse=True)
+    selected = []
+    remaining = budget
+    bound = None
+    shadow_price = 0.0
+    for candidate in ordered:
+        if candidate.investment <= remaining:
+            selected.append(candidate)
+            remaining -= candidate.investment
+        elif bound is None:
+            # Erster Standort, der nicht mehr passt: Grenze der LP-Relaxation
+            shadow_price = candidate.npv / candidate.investment
+            bound = sum(item.npv for item in selected) + remaining * shadow_price
+    total = sum(item.npv for item in selected)
+    if bound is None:
+        bound = total
+    # Bekannte Absicherung des Greedy-Verfahrens: der beste einzelne passende Standort
+    fitting = [candidate for candidate in ordered if candidate.investment <= budget]
+    if fitting:
+        single = max(fitting, key=lambda candidate: candidate.npv)
+        if single.npv > total:
+            selected = [single]
+    return selected, max(bound, total), shadow_price
+
+
+def optimize(candidates, budget, method=None):
+    """
+    NPV-maximale Auswahl von Standorten, deren Investitionen zusammen höchstens budget betragen.
+    Standorte mit nicht positivem NPV werden nie empfohlen.
+    method: METHOD_EXACT oder METHOD_GREEDY erzwingen, sonst nach Größe der DP-Tabelle
+    Returns: Portfolio
+    """
+    items = [candidate for candidate in candidates if candidate.npv > 0 and candidate.investment > 0]
+    items.sort(key=lambda candidate: candidate.location_id)
+    capacity = max_budget(items)
+    budget = max(0.0, float(budget))
+
+    resolution = _resolution(capacity, len(items))
+    units = int(capacity // resolution)
+    if method is None:
+        method = METHOD_EXACT if resolution <= MAX_RESOLUTION else METHOD_GREEDY
+
+    greedy, lp_bound, shadow_price = _lp_relaxation(items, budget)
+    if method == METHOD_GREEDY:
+        selected = greedy
+    else:
+        weights = tuple(math.ceil(candidate.investment / resolution) for candidate in items)
+        best, take = _knapsack_table(weights, tuple(candidate.npv for candidate in items), units)
+        # Rückverfolgung für das gewählte Budget (abgerundet auf das Raster)
+        unit = min(int(budget // resolution), units)
+        selected = []
+        for item in range(len(items) - 1, -1, -1):
+            if take[item, unit]:
+                selected.append(items[item])
+                unit -= weights[item]
+        # Durch das Aufrunden kann die Greedy-Auswahl in seltenen Fällen knapp besser sein
+        if sum(candidate.npv for candidate in greedy) > sum(candidate.npv for candidate in selected):
+            selected = greedy
+
+    return Portfolio(
+        budget,
+        tuple(candidate.location_id for candidate in selected),
+        float(sum(candidate.investment for candidate in selected)),
+        float(sum(candidate.npv for candidate in selected)),
+        float(lp_bound),
+        float(shadow_price),
+        method,
+    )
+
+
+def frontier(candidates, budgets):
+    """
+    Höchster erreichbarer NPV je Budget (obere Schranke aus der LP-Relaxation), für ein Liniendiagramm.
+    Returns: Array gleicher Länge wie budgets
+    """
+    items = sorted((candidate for candidate in candidates if candidate.npv > 0 and candidate.investment > 0),
+                   key=lambda candidate: candidate.npv / candidate.investment, reverse=True)
+    invested = np.concatenate(([0.0], np.cumsum([candidate.investment for candidate in items])))
+    value = np.concatenate(([0.0], np.cumsum([candidate.npv for candidate in items])))
+    return np.interp(np.asarray(budgets, dtype=float), invested, value)
+
+
+def tradeoffs(candidates, portfolio):
+    """
+    Empfehlung je Standort mit den Grenzwerten: NPV je €, für nicht empfohlene Standorte das
+    fehlende Budget, um sie ohne Verzicht auf andere aufzunehmen.
+    Returns: DataFrame, empfohlene Standorte zuerst, jeweils nach NPV je € absteigend
+    """
+    selected = set(portfolio.selected)
+    remaining = portfolio.budget - portfolio.investment
+    rows = []
+    for candidate in candidates:
+        chosen = candidate.location_id in selected
+        rows.append({
+            'id': candidate.location_id,
+            'Standort': candidate.name,
+            'Empfehlung': 'genehmigen' if chosen else ('negativer NPV' if candidate.npv <= 0 else 'zurückstellen'),
+            'Investition €': round(candidate.investment),
+            'NPV €': round(candidate.npv),
+            'NPV je €': round(candidate.npv / candidate.investment, 3) if candidate.investment else None,
+            'Fehlendes Budget €': None if chosen or candidate.npv <= 0 else round(max(0.0, candidate.investment - remaining)),
+        })
+    df = pd.DataFrame(rows, columns=['id', 'Standort', 'Empfehlung', 'Investition €', 'NPV €', 'NPV je €',
+                                     'Fehlendes Budget €'])
+    if df.empty:
+        return df
+    df['_chosen'] = df['id'].isin(selected)
+    return df.sort_values(['_chosen', 'NPV je €'], ascending=[False, False]).drop(columns='_chosen').reset_index(drop=True)
+
+
+def _random_candidates(count, seed=0):
+    rng = np.random.default_rng(seed)
+    investment = rng.integers(*finance.INVESTMENT_RANGE, size=count).astype(float)
+    npv = rng.normal(8000, 6000, size=count)
+    return [Candidate(f"site-{i}", f"Standort {i}", investment[i], float(npv[i])) for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Laufzeit der Portfolio-Optimierung messen.")
+    parser.add_argument("--sites", type=int, default=500)
+    parser.add_argument("--budget-share", type=float, default=0.4, help="Budget als Anteil der maximalen Investition")
+    args = parser.parse_args(argv)
+
+    candidates = _random_candidates(args.sites)
+    budget = max_budget(candidates) * args.budget_share
+
+    start = time.perf_counter()
+    portfolio = optimize(candidates, budget)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for share in np.linspace(0.1, 0.9, 9):
+        optimize(candidates, max_budget(candidates) * share)
+    resolve = (time.perf_counter() - start) / 9
+    greedy = optimize(candidates, budget, METHOD_GREEDY)
+
+    print(f"{args.sites} Standorte, {portfolio.method}: erste Lösung {first * 1000:.1f} ms, "
+          f"weitere Budgets je {resolve * 1000:.1f} ms")
+    print(f"NPV {portfolio.npv:,.0f} € mit {len(portfolio.selected)} Standorten; "
+          f"Greedy {greedy.npv:,.0f} €, LP-Schranke {greedy.upper_bound:,.0f} €")
+
+
+if __name__ == "__main__":
+    main()
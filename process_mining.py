@@ -0,0 +1,215 @@
+from collections import Counter
+from typing import NamedTuple
+
+import timestamps
+
+# Reihenfolge der Prozessschritte für das Layout des beobachteten Graphen
+STEP_ORDER = [
+    'start', 'erfassung', 'leiter_akquisition', 'niederlassungsleiter', 'baurecht',
+    'widerspruch', 'ceo', 'bauteam', 'fertigstellung', 'ende'
+]
+
+# Historien-Status, die als eigener Ausgang einer Aktivität dargestellt werden
+OUTCOME_STATUSES = {'rejected': 'abgelehnt', 'objection': 'widerspruch'}
+
+START = 'start'
+END = 'ende'
+
+
+class ProcessModel(NamedTuple):
+    trace_count: int
+    event_count: int
+    variants: Counter
+    activity_counts: Counter
+    edge_counts: Counter
+    edge_days: dict
+
+
+# Aktivitätsname eines Historien-Eintrags (Schritt plus ggf. Ausgang)
+def activity_name(step, status):
+    outcome = OUTCOME_STATUSES.get(status)
+    return f"{step}:{outcome}" if outcome else step
+
+
+def iter_traces(conn, batch_size=10000):
+    """
+    Workflow-Historie (aktiv und archiviert) gruppiert nach Standort streamen, ohne sie vollständig
+    zu laden. Nutzt je Tabelle den Index (location_id, timestamp_epoch), daher ist keine Sortierung
+    im Speicher nötig.
+    Yields: (locations.pk des Standorts, [(aktivität, zeitpunkt in Epoch-Sekunden oder None), ...])
+    """
+    import archive
+
+    for history, _ in archive.history_tables(conn):
+        cursor = conn.execute(f'''
+        SELECT location_id, step, status, timestamp_epoch
+        FROM {history}
+        ORDER BY location_id, timestamp_epoch
+        ''')
+
+        current_id = None
+        events = []
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for location_id, step, status, timestamp in batch:
+                if location_id != current_id:
+                    if events:
+                        yield current_id, events
+                    current_id = location_id
+                    events = []
+                events.append((activity_name(step, status), timestamp))
+
+        if events:
+            yield current_id, events
+
+
+def mine(conn, batch_size=10000):
+    """
+    Varianten, Aktivitäten und Kanten (Anzahl und Dauer) in einem einzigen Durchlauf ermitteln.
+    Der Speicherbedarf hängt nur von der Anzahl unterschiedlicher Varianten/Kanten ab.
+    """
+    variants = Counter()
+    activity_counts = Counter()
+    edge_counts = Counter()
+    edge_days = {}
+    trace_count = 0
+    event_count = 0
+
+    for _, events in iter_traces(conn, batch_size):
+        trace_count += 1
+        event_count += len(events)
+
+        activities = [activity for activity, _ in events]
+        variants[tuple(activities)] += 1
+        activity_counts.update(activities)
+
+        path = [(START, None)] + events + [(END, None)]
+        for (source, source_time), (target, target_time) in zip(path, path[1:]):
+            edge = (source, target)
+            edge_counts[edge] += 1
+            if source_time is not None and target_time is not None:
+                days = timestamps.days_between(source_time, target_time)
+                total, measured = edge_days.get(edge, (0.0, 0))
+                edge_days[edge] = (total + days, measured + 1)
+
+    return ProcessModel(trace_count, event_count, variants, activity_counts, edge_counts, edge_days)
+
+
+def variant_table(model, top=20):
+    """
+    Häufigste Varianten mit Anteil an allen Durchläufen.
+    Returns: Liste von Dictionaries mit variante, anzahl, anteil
+    """
+    rows = []
+    for variant, count in model.variants.most_common(top):
+        rows.append({
+            'variante': " → ".join(variant),
+            'anzahl': count,
+            'anteil': round(count / model.trace_count * 100, 1) if model.trace_count else 0
+        })
+    return rows
+
+
+def build_graph(model, min_count=1):
+    """
+    Beobachteten Prozessgraphen mit Volumen (count) und mittlerer Dauer (avg_days) je Kante aufbauen.
+    """
+    import networkx as nx
+
+    graph = nx.DiGraph()
+    for activity, count in model.activity_counts.items():
+        graph.add_node(activity, count=count)
+    graph.add_node(START, count=model.trace_count)
+    graph.add_node(END, count=model.trace_count)
+
+    for (source, target), count in model.edge_counts.items():
+        if count < min_count:
+            continue
+        total, measured = model.edge_days.get((source, target), (0.0, 0))
+        graph.add_edge(source, target, count=count, avg_days=total / measured if measured else 0.0)
+
+    graph.remove_nodes_from([node for node in list(graph.nodes) if graph.degree(node) == 0])
+    return graph
+
+
+# Position eines Knotens: x nach Prozessschritt, Ausgänge (abgelehnt, widerspruch) unterhalb
+def _layout(graph):
+    pos = {}
+    lanes = Counter()
+    for node in sorted(graph.nodes):
+        step, _, outcome = node.partition(':')
+        x = STEP_ORDER.index(step) if step in STEP_ORDER else len(STEP_ORDER)
+        if outcome:
+            lanes[x] += 1
+            pos[node] = (x, -lanes[x])
+        else:
+            pos[node] = (x, 0)
+    return pos
+
+
+def build_figure(graph, height=550):
+    """
+    Plotly-Darstellung des beobachteten Graphen: Linienstärke nach Volumen, Farbe nach mittlerer Dauer.
+    """
+    import plotly.graph_objects as go
+
+    pos = _layout(graph)
+    fig = go.Figure()
+
+    max_count = max((data['count'] for _, _, data in graph.edges(data=True)), default=1)
+    max_days = max((data['avg_days'] for _, _, data in graph.edges(data=True)), default=0) or 1
+
+    label_x, label_y, label_text = [], [], []
+    for source, target, data in graph.edges(data=True):
+        x0, y0 = pos[source]
+        x1, y1 = pos[target]
+        # Rückwärtskanten leicht versetzen, damit sie nicht auf den Vorwärtskanten liegen
+        bend = 0.25 if x1 <= x0 else 0
+        ratio = data['avg_days'] / max_days
+        color = f"rgb({int(69 + 161 * ratio)}, {int(123 - 66 * ratio)}, {int(157 - 97 * ratio)})"
+
+        fig.add_trace(go.Scatter(
+            x=[x0, (x0 + x1) / 2, x1],
+            y=[y0, (y0 + y1) / 2 + bend, y1],
+            mode='lines',
+            line=dict(width=1 + 9 * data['count'] / max_count, color=color, shape='spline'),
+            hoverinfo='text',
+            hovertext=f"{source} → {target}<br>{data['count']} Durchläufe<br>Ø {data['avg_days']:.1f} Tage"
+        ))
+        label_x.append((x0 + x1) / 2)
+        label_y.append((y0 + y1) / 2 + bend + 0.08)
+        label_text.append(f"{data['count']} | {data['avg_days']:.1f} T")
+
+    fig.add_trace(go.Scatter(
+        x=label_x, y=label_y, mode='text', text=label_text,
+        textfont=dict(size=10, color='#555'), hoverinfo='none'
+    ))
+
+    nodes = list(graph.nodes)
+    fig.add_trace(go.Scatter(
+        x=[pos[node][0] for node in nodes],
+        y=[pos[node][1] for node in nodes],
+        mode='markers+text',
+        text=[node.replace('_', ' ') for node in nodes],
+        textposition='bottom center',
+        marker=dict(
+            size=[18 + 22 * graph.nodes[node].get('count', 0) / max(1, max_count) for node in nodes],
+            color=['#FADBD8' if ':' in node else '#D6EAF8' for node in nodes],
+            line=dict(width=2, color=['#E74C3C' if ':' in node else '#2E86C1' for node in nodes])
+        ),
+        hovertext=[f"{node}<br>{graph.nodes[node].get('count', 0)} Ereignisse" for node in nodes],
+        hoverinfo='text'
+    ))
+
+    fig.update_layout(
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=10, l=0, r=0, t=10),
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        height=height,
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
@@ -0,0 +1,96 @@
+from functools import lru_cache
+
+import archive
+import schema
+
+# Alle Spalten der Tabelle locations (inkl. der später per ALTER TABLE ergänzten)
+LOCATION_FIELDS = (
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng', 'leistungswert',
+    'eigentuemer', 'umruestung', 'alte_nummer', 'seiten', 'vermarktungsform', 'status',
+    'current_step', 'created_at', 'bauantrag_datum', 'plan_date', 'ist_date',
+    'build_status', 'contractor', 'power_connection', 'completion_date',
+    'final_inspection', 'network_id', 'dms_id', 'version'
+)
+
+
+class Location:
+    """
+    Standort-Datensatz mit festen Slots statt Dictionary (deutlich kleiner pro Instanz).
+    Die Attribute enthalten die Rohwerte aus der Datenbank, nicht geladene Spalten sind None.
+    """
+    __slots__ = LOCATION_FIELDS
+
+    def __init__(self, **values):
+        for name in LOCATION_FIELDS:
+            setattr(self, name, values.get(name))
+
+    @property
+    def eigentuemer_label(self):
+        return 'Stadt' if self.eigentuemer == 'Stadt' else 'Privat'
+
+    @property
+    def umruestung_label(self):
+        return 'Umrüstung' if self.umruestung else 'Neustandort'
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in LOCATION_FIELDS}
+
+    def __repr__(self):
+        return f"Location(id={self.id!r}, standort={self.standort!r}, stadt={self.stadt!r})"
+
+
+@lru_cache(maxsize=None)
+def location_factory(columns):
+    """
+    Vorgefertigter Konstruktor für Zeilen mit den gegebenen Spalten (in Abfrage-Reihenfolge).
+    Die Slot-Setter werden einmal je Spaltenkombination ermittelt, nicht je Zeile.
+    """
+    columns = tuple(columns)
+    unknown = set(columns) - set(LOCATION_FIELDS)
+    if unknown:
+        raise ValueError(f"Unbekannte Spalten für Location: {', '.join(sorted(unknown))}")
+
+    setters = tuple(getattr(Location, name).__set__ for name in columns)
+    missing = tuple(getattr(Location, name).__set__ for name in LOCATION_FIELDS if name not in columns)
+    new = object.__new__
+
+    def build(row):
+        location = new(Location)
+        for setter, value in zip(setters, row):
+            setter(location, value)
+        for setter in missing:
+            setter(location, None)
+        return location
+
+    return build
+
+
+def location_row_factory(cursor, row):
+    """
+    Als sqlite3 row_factory verwendbar: Spaltennamen kommen aus cursor.description.
+    """
+    return location_factory(tuple(column[0] for column in cursor.description))(row)
+
+
+def locations_from_rows(columns, rows):
+    """
+    Batch-Konstruktor für eine Liste von Ergebniszeilen mit denselben Spalten.
+    """
+    build = location_factory(tuple(columns))
+    return [build(row) for row in rows]
+
+
+def load_location(conn, location_id, columns=LOCATION_FIELDS):
+    """
+    Einen Standort über die ID laden (eine indizierte Abfrage).
+    Archivierte Standorte werden transparent aus dem Archiv gelesen.
+    Returns: Location oder None
+    """
+    columns = tuple(columns)
+    build = location_factory(columns)
+    location = schema.fetch_by_id(conn, 'locations', columns, location_id, factory=build)
+    if location is None:
+        row = archive.load_archived(conn, location_id, columns)
+        if row is not None:
+            location = build(row)
+    return location
@@ -0,0 +1,223 @@
+"""
+Regionspartitionierung der Standorte nach Niederlassung.
+
+Jeder Standort bekommt eine Region (Spalte locations.region). Grundlage ist die Stadt; ist sie
+nicht bekannt, gilt die nächstgelegene Niederlassung nach Koordinaten. Die Zuordnung pflegen
+Trigger beim Einfügen und bei Änderungen von Stadt/Koordinaten, schreibende Stellen müssen
+also nichts beachten.
+
+Die Regionen partitionieren die Daten logisch innerhalb von werbetraeger.db. Es gibt keine
+Datenbankdatei je Region, alle schreibenden Zugriffe teilen sich die eine Schreibsperre; dafür
+werden Benachrichtigungen, Jobs, Archiv und Suchindex in derselben Transaktion wie der Workflow
+geschrieben. Was die Partitionierung bringt:
+- die Queues lesen über idx_locations_region_step nur die Regionen des Bearbeiters
+  (bei mehreren Regionen je Region eine Abfrage, siehe pagination.load_queue_page)
+- lesende Auswertungen (Dashboard, GeoMap) fragen die Regionen parallel mit je einer eigenen
+  Verbindung ab (fan_out) und führen die Teilergebnisse zusammen
+
+Aufruf:
+    python regions.py                # Standorte je Region und Schritt
+"""
+import argparse
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import schema
+
+# Niederlassungen mit Standort (Breite, Länge) für die Zuordnung nach Koordinaten
+REGIONS = {
+    'Nord': (53.55, 9.99),        # Hamburg
+    'Ost': (52.52, 13.40),        # Berlin
+    'West': (51.23, 6.78),        # Düsseldorf
+    'Mitte': (50.11, 8.68),       # Frankfurt am Main
+    'Südwest': (48.78, 9.18),     # Stuttgart
+    'Süd': (48.14, 11.58),        # München
+}
+
+# Standorte ohne Stadt und Koordinaten
+UNASSIGNED = 'Ohne Zuordnung'
+
+# Städte mit fester Zuordnung (Vergleich ohne Groß-/Kleinschreibung), Vorrang vor den Koordinaten
+CITY_REGIONS = {
+    'Nord': ('Hamburg', 'Bremen', 'Hannover', 'Kiel', 'Lübeck', 'Braunschweig', 'Oldenburg', 'Osnabrück'),
+    'Ost': ('Berlin', 'Potsdam', 'Leipzig', 'Dresden', 'Chemnitz', 'Rostock', 'Magdeburg', 'Halle'),
+    'West': ('Düsseldorf', 'Köln', 'Dortmund', 'Essen', 'Duisburg', 'Bochum', 'Bonn', 'Münster', 'Aachen'),
+    'Mitte': ('Frankfurt', 'Frankfurt am Main', 'Wiesbaden', 'Mainz', 'Kassel', 'Darmstadt', 'Erfurt'),
+    'Südwest': ('Stuttgart', 'Karlsruhe', 'Mannheim', 'Freiburg', 'Heidelberg', 'Ulm', 'Saarbrücken'),
+    'Süd': ('München', 'Nürnberg', 'Augsburg', 'Regensburg', 'Ingolstadt', 'Würzburg'),
+}
+
+# Längengrade sind in Deutschland (um 51° Nord) etwa 0,63-mal so lang wie Breitengrade
+_LNG_WEIGHT = 0.4
+
+_ready = set()
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def all_regions():
+    return list(REGIONS) + [UNASSIGNED]
+
+
+def _region_expression(row):
+    # Stadt vor Koordinaten, ohne beides UNASSIGNED
+    return f'''
+    COALESCE(
+        (SELECT region FROM region_cities WHERE city = lower(trim({row}.stadt))),
+        (SELECT region FROM region_centres
+         WHERE {row}.lat IS NOT NULL AND {row}.lng IS NOT NULL
+         ORDER BY (lat - {row}.lat) * (lat - {row}.lat) + (lng - {row}.lng) * (lng - {row}.lng) * {_LNG_WEIGHT}
+         LIMIT 1),
+        '{UNASSIGNED}'
+    )
+    '''
+
+
+def ensure_regions(conn):
+    """
+    Regionstabellen, Spalte locations.region, Trigger und Index anlegen und bestehende
+    Standorte ohne Region zuordnen.
+    Returns: Anzahl neu zugeordneter Standorte
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS region_centres (region TEXT PRIMARY KEY, lat REAL NOT NULL, lng REAL NOT NULL)
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS region_cities (city TEXT PRIMARY KEY, region TEXT NOT NULL)
+    ''')
+    # Nur schreiben, wenn sich die Tabellen von REGIONS/CITY_REGIONS unterscheiden; sonst kommt
+    # jeder Seitenaufruf ohne Schreibsperre aus
+    centres = {(region, lat, lng) for region, (lat, lng) in REGIONS.items()}
+    if set(conn.execute('SELECT region, lat, lng FROM region_centres')) != centres:
+        conn.execute('DELETE FROM region_centres')
+        conn.executemany('INSERT INTO region_centres VALUES (?, ?, ?)', sorted(centres))
+    cities = {(city.lower(), region) for region, names in CITY_REGIONS.items() for city in names}
+    if set(conn.execute('SELECT city, region FROM region_cities')) != cities:
+        conn.execute('DELETE FROM region_cities')
+        conn.executemany('INSERT INTO region_cities VALUES (?, ?)', sorted(cities))
+
+    schema.ensure_columns(conn, 'locations', {'region': 'TEXT'})
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS locations_region_insert AFTER INSERT ON locations WHEN new.region IS NULL BEGIN
+        UPDATE locations SET region = {_region_expression('new')} WHERE rowid = new.rowid;
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS locations_region_update AFTER UPDATE OF stadt, lat, lng ON locations BEGIN
+        UPDATE locations SET region = {_region_expression('new')} WHERE rowid = new.rowid;
+    END
+    ''')
+    # Queue einer Region: Suche per Region und Schritt, sortiert wie die Keyset-Paginierung;
+    # dient auch den Zählungen je Region und Schritt (region_counts)
+    conn.execute('DROP INDEX IF EXISTS idx_locations_region_queue')
+    created = schema.ensure_index(conn, 'idx_locations_region_step', 'locations',
+                                  f"region, current_step, {schema.QUEUE_SORT_KEY}, id")
+    if created:
+        # Ohne Statistik hält der Planer idx_locations_queue (Schritt, Status) für gleichwertig
+        # und filtert die Region erst beim Lesen
+        conn.execute('ANALYZE locations')
+    # Bestand über den Update-Trigger zuordnen (SQLite erlaubt im UPDATE selbst keine
+    # korrelierte Unterabfrage mit ORDER BY); das UPDATE nur, wenn es etwas zuzuordnen gibt
+    assigned = 0
+    if conn.execute("SELECT 1 FROM locations WHERE region IS NULL LIMIT 1").fetchone():
+        assigned = conn.execute("UPDATE locations SET stadt = stadt WHERE region IS NULL").rowcount
+    conn.commit()
+    return assigned
+
+
+def ensure_region_column(conn):
+    """
+    ensure_regions einmal pro Prozess und Datenbank ausführen.
+    """
+    database = conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+    if database not in _ready or database == ":memory:":
+        ensure_regions(conn)
+        _ready.add(database)
+
+
+def region_where(regions):
+    """
+    Filter für pagination-Queues: leer, wenn alle Regionen gewählt sind (dann greift der
+    bisherige Queue-Index ohne Zusatzbedingung).
+    """
+    if set(all_regions()) <= set(regions):
+        return {}
+    return {'region': list(regions)}
+
+
+def select_regions(key="reviewer_regions"):
+    """
+    Auswahl der Regionen des Bearbeiters in der Seitenleiste. Die Auswahl wird außerhalb des
+    Widgets gespeichert und gilt so für alle Queues der Sitzung.
+    Returns: Liste der gewählten Regionen
+    """
+    import streamlit as st
+
+    selected = st.sidebar.multiselect("Niederlassungen", all_regions(), default=st.session_state.get(key, all_regions()))
+    st.session_state[key] = selected
+    return selected
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=len(all_regions()), thread_name_prefix="region")
+        return _executor
+
+
+def _thread_connection(database):
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    if database not in connections:
+        connections[database] = sqlite3.connect(database, timeout=30)
+    return connections[database]
+
+
+def fan_out(conn, query, regions=None):
+    """
+    Funktion query(verbindung, region) für jede Region in einem eigenen Thread mit eigener
+    Verbindung ausführen. Bei einer Datenbank im Speicher läuft alles nacheinander auf conn.
+    Returns: Dictionary Region -> Teilergebnis
+    """
+    regions = all_regions() if regions is None else list(regions)
+    database = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not database:
+        return {region: query(conn, region) for region in regions}
+
+    def run(region):
+        return query(_thread_connection(database), region)
+
+    return dict(zip(regions, _pool().map(run, regions)))
+
+
+def region_counts(conn):
+    """
+    Standorte je Region und Schritt (parallel je Region abgefragt).
+    Returns: Liste von (region, current_step, anzahl)
+    """
+    partial = fan_out(conn, lambda region_conn, region: region_conn.execute('''
+    SELECT current_step, COUNT(*) FROM locations WHERE region = ? GROUP BY current_step
+    ''', (region,)).fetchall())
+    return [(region, step, count) for region, rows in partial.items() for step, count in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Standorte je Niederlassung anzeigen.")
+    parser.add_argument("--database", default="werbetraeger.db")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.database)
+    assigned = ensure_regions(conn)
+    if assigned:
+        print(f"{assigned} Standorte neu zugeordnet")
+    for region, step, count in region_counts(conn):
+        print(f"{region:<16} {step or '–':<22} {count:>6}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
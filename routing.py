@@ -0,0 +1,222 @@
+"""
+Tourenplanung für die Bautrupps.
+
+Alle Standorte im Schritt bauteam mit PLAN-Datum und Koordinaten werden je Subunternehmer und
+Tag zu einer Tour verbunden: Nearest-Neighbour als Starttour, danach 2-opt-Verbesserung.
+Distanzen sind Luftlinien (Haversine) aus einer vektorisierten NumPy-Distanzmatrix.
+
+Aufruf (Laufzeitmessung mit zufälligen Standorten):
+    python routing.py --benchmark 3000
+"""
+import argparse
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+
+# Bezeichnung für Standorte ohne eingetragenen Subunternehmer
+NO_CONTRACTOR = 'Ohne Subunternehmer'
+
+# Obergrenzen für die 2-opt-Verbesserung (Durchläufe je Tour, Zeitbudget in Sekunden)
+MAX_PASSES = 50
+TIME_LIMIT = 0.5
+
+SITE_COLUMNS = ['id', 'standort', 'stadt', 'lat', 'lng', 'plan_date', 'contractor']
+
+
+class Route(NamedTuple):
+    contractor: str
+    day: str
+    stops: list  # Standort-IDs in Fahrreihenfolge
+    distance_km: float
+
+
+def load_sites(conn, day=None):
+    """
+    Standorte im Schritt bauteam mit PLAN-Datum und Koordinaten laden.
+    day: optional ein Tag (YYYY-MM-DD), sonst alle geplanten Tage
+    Returns: DataFrame mit SITE_COLUMNS, plan_date auf den Tag gekürzt
+    """
+    query = '''
+    SELECT id, standort, stadt, lat, lng, substr(plan_date, 1, 10), COALESCE(NULLIF(contractor, ''), ?)
+    FROM locations
+    WHERE status = 'active' AND current_step = 'bauteam'
+      AND plan_date IS NOT NULL AND plan_date != ''
+      AND lat IS NOT NULL AND lng IS NOT NULL
+    '''
+    params = [NO_CONTRACTOR]
+    if day:
+        query += ' AND substr(plan_date, 1, 10) = ?'
+        params.append(day)
+    df = pd.DataFrame(conn.execute(query, params).fetchall(), columns=SITE_COLUMNS)
+    df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+    df['lng'] = pd.to_numeric(df['lng'], errors='coerce')
+    return df.dropna(subset=['lat', 'lng']).reset_index(drop=True)
+
+
+def _unit_vectors(lat, lng):
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lng = np.radians(np.asarray(lng, dtype=float))
+    return np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)))
+
+
+def _haversine(dot):
+    # sin²(Δσ/2) = (1 - p·q) / 2 ist genau der Haversine-Term zweier Einheitsvektoren p, q
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip((1.0 - dot) / 2, 0.0, 1.0)))
+
+
+def distance_matrix(lat, lng):
+    """
+    Haversine-Distanzen aller Punktpaare in km (n x n), vollständig vektorisiert.
+    Statt der Winkeldifferenzen je Paar werden Einheitsvektoren per Matrixprodukt verglichen,
+    das Produkt übernimmt BLAS.
+    """
+    points = _unit_vectors(lat, lng)
+    return _haversine(points @ points.T)
+
+
+def nearest_neighbour(dist, start=0):
+    """
+    Starttour: vom Startpunkt aus immer zum nächsten noch nicht besuchten Standort.
+    Returns: Reihenfolge als Array von Indizes
+    """
+    n = len(dist)
+    order = np.empty(n, dtype=int)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for position in range(n):
+        order[position] = current
+        visited[current] = True
+        if position == n - 1:
+            break
+        candidates = np.where(visited, np.inf, dist[current])
+        current = int(np.argmin(candidates))
+    return order
+
+
+def two_opt(order, dist, max_passes=MAX_PASSES, time_limit=TIME_LIMIT):
+    """
+    2-opt-Verbesserung einer offenen Tour (Start fix, Ende frei). Für jede Position i werden
+    alle Umkehrungen order[i..j] auf einmal bewertet und die beste übernommen.
+    Bricht nach max_passes Durchläufen ohne Verbesserung oder nach time_limit Sekunden ab.
+    """
+    n = len(order)
+    if n < 4:
+        return order
+    # Virtueller Endpunkt mit Distanz 0 zu allen Standorten: so ist das Tourende frei wählbar
+    extended = np.zeros((n + 1, n + 1))
+    extended[:n, :n] = dist
+    route = np.append(order, n)
+
+    deadline = time.perf_counter() + time_limit
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            if time.perf_counter() > deadline:
+                return route[:n]
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:n]
+            d = route[i + 2:n + 1]
+            delta = extended[a, c] + extended[b, d] - extended[a, b] - extended[c, d]
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = i + 1 + k
+                route[i:j + 1] = route[i:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return route[:n]
+
+
+def route_length(order, dist):
+    if len(order) < 2:
+        return 0.0
+    return float(dist[order[:-1], order[1:]].sum())
+
+
+def plan_route(lat, lng, time_limit=TIME_LIMIT):
+    """
+    Tour über die gegebenen Punkte planen. Gestartet wird am Standort, der am weitesten vom
+    Schwerpunkt entfernt liegt (ein natürlicher Endpunkt einer offenen Tour).
+    Returns: (Reihenfolge als Indizes, Länge in km)
+    """
+    lat = np.asarray(lat, dtype=float)
+    lng = np.asarray(lng, dtype=float)
+    if len(lat) == 0:
+        return np.empty(0, dtype=int), 0.0
+    points = _unit_vectors(lat, lng)
+    dist = _haversine(points @ points.T)
+    centroid = _haversine(points @ _unit_vectors([lat.mean()], [lng.mean()])[0])
+    order = two_opt(nearest_neighbour(dist, int(np.argmax(centroid))), dist, time_limit=time_limit)
+    return order, route_length(order, dist)
+
+
+def plan_routes(sites, time_limit=TIME_LIMIT):
+    """
+    Tagestouren je Subunternehmer.
+    sites: DataFrame wie von load_sites
+    time_limit: Zeitbudget der 2-opt-Verbesserung insgesamt, anteilig nach Tourgröße verteilt
+    Returns: Liste von Route, sortiert nach Tag und Subunternehmer
+    """
+    routes = []
+    for (day, contractor), group in sites.groupby(['plan_date', 'contractor'], sort=True):
+        budget = time_limit * len(group) / len(sites)
+        order, length = plan_route(group['lat'].to_numpy(), group['lng'].to_numpy(), budget)
+        routes.append(Route(contractor, day, group['id'].to_numpy()[order].tolist(), length))
+    return routes
+
+
+def routes_frame(routes, sites):
+    """
+    Touren als Tabelle für die Anzeige (eine Zeile je Tour, Stopps als Text).
+    """
+    names = dict(zip(sites['id'], sites['standort'] + ', ' + sites['stadt']))
+    return pd.DataFrame({
+        'Tag': [route.day for route in routes],
+        'Subunternehmer': [route.contractor for route in routes],
+        'Stopps': [len(route.stops) for route in routes],
+        'Strecke (km)': [round(route.distance_km, 1) for route in routes],
+        'Reihenfolge': [' → '.join(names[stop] for stop in route.stops) for route in routes],
+    })
+
+
+def _random_sites(count, contractors=5, days=5, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': [f"site-{i}" for i in range(count)],
+        'standort': [f"Standort {i}" for i in range(count)],
+        'stadt': 'Berlin',
+        'lat': rng.uniform(52.35, 52.65, count),
+        'lng': rng.uniform(13.1, 13.7, count),
+        'plan_date': rng.choice([f"2025-07-{day:02d}" for day in range(1, days + 1)], count),
+        'contractor': rng.choice([f"Bau {c}" for c in range(contractors)], count),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Laufzeit der Tourenplanung messen.")
+    parser.add_argument("--benchmark", type=int, default=3000, help="Anzahl zufälliger Standorte")
+    parser.add_argument("--contractors", type=int, default=5)
+    parser.add_argument("--days", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    sites = _random_sites(args.benchmark, args.contractors, args.days)
+    start = time.perf_counter()
+    routes = plan_routes(sites)
+    duration = time.perf_counter() - start
+
+    nn_total = 0.0
+    for route in routes:
+        group = sites.set_index('id').loc[route.stops]
+        dist = distance_matrix(group['lat'], group['lng'])
+        nn_total += route_length(nearest_neighbour(dist), dist)
+    total = sum(route.distance_km for route in routes)
+    print(f"{len(sites)} Standorte, {len(routes)} Touren in {duration:.3f} s; "
+          f"Gesamtstrecke {total:.0f} km (nur Nearest-Neighbour: {nn_total:.0f} km)")
+
+
+if __name__ == "__main__":
+    main()
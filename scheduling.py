@@ -0,0 +1,296 @@
+"""
+Kapazitätsplanung der Subunternehmer für die Aufbautermine (plan_date) im Bauteam.
+
+Je Subunternehmer werden die geplanten Aufbautage als sortierte Liste geführt; die Auslastung
+eines Zeitraums (Tag, Kalenderwoche) ist damit eine Bereichsabfrage per Binärsuche. Änderungen an
+einem Standort verschieben nur dessen Buchung und prüfen nur die betroffenen Tage und Wochen neu.
+Terminvorschläge vergibt ein Greedy-Planer über eine Prioritätswarteschlange: ältere Standorte
+zuerst, jeweils der früheste Werktag mit freier Kapazität.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import NamedTuple
+
+import pandas as pd
+
+# Maximale Anzahl Aufbauten je Subunternehmer
+DAILY_CAPACITY = 2
+WEEKLY_CAPACITY = 8
+
+# Abweichende Kapazitäten einzelner Subunternehmer: Name -> (je Tag, je Woche)
+CONTRACTOR_CAPACITY = {}
+
+# Wie weit ein Vorschlag höchstens in der Zukunft liegen darf (Tage)
+HORIZON_DAYS = 365
+
+PERIOD_DAY = 'Tag'
+PERIOD_WEEK = 'Woche'
+
+_schedules = {}
+_schedules_lock = threading.Lock()
+
+
+class Booking(NamedTuple):
+    location_id: str
+    contractor: str
+    day: date
+    priority: str  # created_at, älteste Standorte haben Vorrang
+
+
+class Conflict(NamedTuple):
+    contractor: str
+    period: str  # PERIOD_DAY oder PERIOD_WEEK
+    start: date
+    count: int
+    capacity: int
+    location_ids: list
+
+
+class Proposal(NamedTuple):
+    location_id: str
+    contractor: str
+    current: date  # None, wenn noch kein Termin geplant ist
+    proposed: date  # None, wenn im Horizont kein freier Tag gefunden wurde
+
+
+def capacity(contractor):
+    return CONTRACTOR_CAPACITY.get(contractor, (DAILY_CAPACITY, WEEKLY_CAPACITY))
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def parse_day(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class CapacitySchedule:
+    """
+    Buchungen je Subunternehmer mit inkrementeller Konfliktprüfung.
+    """
+
+    def __init__(self):
+        self.bookings = {}  # location_id -> Booking
+        self.versions = {}  # location_id -> Versionsstand der Zeile beim letzten Abgleich
+        self.pending = {}  # location_id -> (contractor, priority) für Standorte ohne PLAN-Datum
+        self._days = defaultdict(list)  # contractor -> sortierte Liste (Tagesnummer, location_id)
+        self._conflicts = {}  # (contractor, period, start) -> Conflict
+
+    # Bereichsabfrage: Buchungen eines Subunternehmers in [start, end)
+    def bookings_between(self, contractor, start, end):
+        days = self._days.get(contractor, [])
+        low = bisect_left(days, (start.toordinal(), ''))
+        high = bisect_left(days, (end.toordinal(), ''))
+        return [location_id for _, location_id in days[low:high]]
+
+    def load(self, contractor, start, end):
+        days = self._days.get(contractor, [])
+        return bisect_left(days, (end.toordinal(), '')) - bisect_left(days, (start.toordinal(), ''))
+
+    def _periods(self, day):
+        return ((PERIOD_DAY, day, day + timedelta(days=1)),
+                (PERIOD_WEEK, week_start(day), week_start(day) + timedelta(days=7)))
+
+    def _recheck(self, contractor, day):
+        # Nur die Zeiträume des geänderten Tages neu bewerten
+        daily, weekly = capacity(contractor)
+        for (period, start, end), limit in zip(self._periods(day), (daily, weekly)):
+            key = (contractor, period, start)
+            ids = self.bookings_between(contractor, start, end)
+            if len(ids) > limit:
+                self._conflicts[key] = Conflict(contractor, period, start, len(ids), limit, ids)
+            else:
+                self._conflicts.pop(key, None)
+
+    def add(self, location_id, contractor, day, priority=''):
+        self.remove(location_id)
+        if not contractor:
+            return
+        if day is None:
+            self.pending[location_id] = (contractor, priority or '')
+            return
+        self.bookings[location_id] = Booking(location_id, contractor, day, priority or '')
+        insort(self._days[contractor], (day.toordinal(), location_id))
+        self._recheck(contractor, day)
+
+    def remove(self, location_id):
+        self.pending.pop(location_id, None)
+        booking = self.bookings.pop(location_id, None)
+        if booking is None:
+            return
+        days = self._days[booking.contractor]
+        days.pop(bisect_left(days, (booking.day.toordinal(), location_id)))
+        self._recheck(booking.contractor, booking.day)
+
+    def is_feasible(self, contractor, day, ignore=None):
+        """
+        Prüft, ob ein weiterer Aufbau (bzw. die Buchung von ignore an diesem Tag) in die Kapazität passt.
+        """
+        daily, weekly = capacity(contractor)
+        for (_, start, end), limit in zip(self._periods(day), (daily, weekly)):
+            ids = self.bookings_between(contractor, start, end)
+            if len([id_ for id_ in ids if id_ != ignore]) >= limit:
+                return False
+        return True
+
+    def earliest_feasible(self, contractor, not_before, ignore=None, horizon=HORIZON_DAYS):
+        """
+        Frühester Werktag ab not_before mit freier Kapazität, sonst None.
+        """
+        day = not_before
+        last = not_before + timedelta(days=horizon)
+        while day <= last:
+            if day.weekday() >= 5:
+                day += timedelta(days=7 - day.weekday())
+                continue
+            if self.is_feasible(contractor, day, ignore):
+                return day
+            # Volle Woche überspringen statt jeden Tag einzeln zu prüfen
+            start = week_start(day)
+            if self.load(contractor, start, start + timedelta(days=7)) >= capacity(contractor)[1]:
+                day = start + timedelta(days=7)
+            else:
+                day += timedelta(days=1)
+        return None
+
+    def conflicts(self, contractor=None):
+        return sorted(
+            (conflict for conflict in self._conflicts.values()
+             if contractor is None or conflict.contractor == contractor),
+            key=lambda conflict: (conflict.start, conflict.contractor, conflict.period)
+        )
+
+    def conflicts_for(self, location_id):
+        return [conflict for conflict in self._conflicts.values() if location_id in conflict.location_ids]
+
+
+def _load_rows(conn):
+    return conn.execute('''
+    SELECT id, contractor, plan_date, created_at, version
+    FROM locations
+    WHERE status = 'active' AND current_step = 'bauteam'
+      AND contractor IS NOT NULL AND contractor != ''
+    ''').fetchall()
+
+
+def sync(conn, schedule):
+    """
+    Plan mit der Datenbank abgleichen. Nur Standorte, deren Version sich geändert hat oder die
+    hinzugekommen bzw. weggefallen sind, werden umgebucht und neu geprüft.
+    Returns: Anzahl geänderter Buchungen
+    """
+    rows = _load_rows(conn)
+    seen = set()
+    changed = 0
+    for location_id, contractor, plan_date, created_at, version in rows:
+        seen.add(location_id)
+        if location_id in schedule.versions and schedule.versions[location_id] == version:
+            continue
+        schedule.versions[location_id] = version
+        schedule.add(location_id, contractor, parse_day(plan_date), created_at)
+        changed += 1
+    for location_id in set(schedule.versions) - seen:
+        del schedule.versions[location_id]
+        schedule.remove(location_id)
+        changed += 1
+    return changed
+
+
+def _database(conn):
+    return conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+
+
+def get_schedule(conn):
+    """
+    Kapazitätsplan der Datenbank (einmal je Prozess aufgebaut, danach inkrementell abgeglichen).
+    """
+    key = _database(conn)
+    with _schedules_lock:
+        schedule = _schedules.get(key)
+        if schedule is None:
+            schedule = _schedules[key] = CapacitySchedule()
+        sync(conn, schedule)
+    return schedule
+
+
+def propose_dates(schedule, not_before=None):
+    """
+    Terminvorschläge für alle Standorte in Kapazitätskonflikten und für Standorte mit
+    Subunternehmer, aber ohne PLAN-Datum. Innerhalb eines Konflikts behalten die ältesten
+    Standorte ihren Termin; die übrigen werden in einer Prioritätswarteschlange (ältester
+    Standort zuerst) auf den frühesten freien Werktag gelegt.
+    Der Plan selbst wird nicht verändert.
+    Returns: Liste von Proposal
+    """
+    not_before = not_before or date.today()
+    trial = CapacitySchedule()
+    for booking in schedule.bookings.values():
+        trial.add(booking.location_id, booking.contractor, booking.day, booking.priority)
+
+    # Überzählige Buchungen je Konflikt (jüngste zuerst) aus dem Probeplan nehmen; ein Konflikt
+    # kann sich dabei schon durch einen anderen erledigt haben (Tag und Woche überlappen)
+    queue = []
+    for conflict in schedule.conflicts():
+        remaining = trial._conflicts.get((conflict.contractor, conflict.period, conflict.start))
+        if remaining is None:
+            continue
+        ordered = sorted(remaining.location_ids, key=lambda id_: (trial.bookings[id_].priority, id_))
+        for location_id in ordered[remaining.capacity:]:
+            booking = trial.bookings[location_id]
+            trial.remove(location_id)
+            heapq.heappush(queue, (booking.priority, location_id, booking.contractor, booking.day))
+
+    # Standorte mit Subunternehmer, aber noch ohne Termin
+    for location_id, (contractor, priority) in schedule.pending.items():
+        heapq.heappush(queue, (priority, location_id, contractor, None))
+
+    proposals = []
+    while queue:
+        priority, location_id, contractor, current = heapq.heappop(queue)
+        proposed = trial.earliest_feasible(contractor, max(not_before, current) if current else not_before)
+        if proposed is not None:
+            trial.add(location_id, contractor, proposed, priority)
+        proposals.append(Proposal(location_id, contractor, current, proposed))
+    return proposals
+
+
+def location_names(conn):
+    return dict(conn.execute('''
+    SELECT id, standort || ', ' || stadt FROM locations WHERE status = 'active' AND current_step = 'bauteam'
+    ''').fetchall())
+
+
+def conflicts_frame(conflicts, names):
+    """
+    Kapazitätskonflikte als Tabelle für die Anzeige.
+    """
+    return pd.DataFrame({
+        'Subunternehmer': [conflict.contractor for conflict in conflicts],
+        'Zeitraum': [conflict.start.strftime('%d.%m.%Y') if conflict.period == PERIOD_DAY
+                     else "KW {1}/{0}".format(*conflict.start.isocalendar()) for conflict in conflicts],
+        'Aufbauten': [conflict.count for conflict in conflicts],
+        'Kapazität': [conflict.capacity for conflict in conflicts],
+        'Standorte': [', '.join(names.get(id_, id_) for id_ in conflict.location_ids) for conflict in conflicts],
+    })
+
+
+def proposals_frame(proposals, names):
+    """
+    Terminvorschläge als Tabelle für die Anzeige.
+    """
+    return pd.DataFrame({
+        'Standort': [names.get(proposal.location_id, proposal.location_id) for proposal in proposals],
+        'Subunternehmer': [proposal.contractor for proposal in proposals],
+        'Geplant': [proposal.current.strftime('%d.%m.%Y') if proposal.current else '–' for proposal in proposals],
+        'Vorschlag': [proposal.proposed.strftime('%d.%m.%Y') if proposal.proposed else 'kein freier Termin'
+                      for proposal in proposals],
+    })
@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# Spaltennamen je (Datenbankdatei, Tabelle). Wird einmal pro Prozess per PRAGMA table_info
+# ermittelt. Jede Migration, die Spalten ergänzt oder eine Tabelle neu aufbaut, verwirft die
+# Einträge der Tabelle per invalidate: ensure_columns (auch für die Archivtabellen in
+# archive.ensure_archive), numeric_columns.migrate und ids.migrate. Die Epoch-Spalten aus
+# timestamps sind generiert und erscheinen nicht in table_info.
+_columns = {}
+
+# Sortierschlüssel der Queues (Keyset auf (QUEUE_SORT_KEY, id)): Standorte ohne created_at
+# sortieren wie in MemoryStorage als '' und bleiben so über den Cursor erreichbar
+QUEUE_SORT_KEY = "COALESCE(created_at, '')"
+
+# Datenbankdatei je Verbindung (id -> (Verbindung, Pfad)), damit PRAGMA database_list nur einmal
+# pro Verbindung läuft. Die Verbindung wird mitgehalten, sonst könnte ihre id nach dem Schließen
+# an eine andere Verbindung vergeben werden; die Seiten öffnen bei jedem Lauf eine neue, daher
+# bleiben nur die zuletzt benutzten im Cache.
+_paths = OrderedDict()
+_PATHS_MAX = 16
+_paths_lock = threading.Lock()
+
+
+def _database(conn):
+    with _paths_lock:
+        entry = _paths.get(id(conn))
+        if entry is not None and entry[0] is conn:
+            _paths.move_to_end(id(conn))
+            return entry[1]
+    path = conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+    with _paths_lock:
+        _paths[id(conn)] = (conn, path)
+        while len(_paths) > _PATHS_MAX:
+            _paths.popitem(last=False)
+    return path
+
+
+def table_columns(conn, table):
+    """
+    Spaltennamen einer Tabelle in Schema-Reihenfolge (aus dem Cache, falls bekannt).
+    Returns: Tupel der Spaltennamen
+    """
+    key = (_database(conn), table)
+    if key not in _columns or key[0] == ":memory:":
+        _columns[key] = tuple(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+    return _columns[key]
+
+
+def available_columns(conn, table):
+    return frozenset(table_columns(conn, table))
+
+
+def invalidate(conn=None, table=None):
+    """
+    Gecachte Spalten verwerfen (alle oder nur die einer Datenbank/Tabelle).
+    """
+    if conn is None:
+        _columns.clear()
+        return
+    database = _database(conn)
+    for key in [key for key in _columns if key[0] == database and table in (None, key[1])]:
+        del _columns[key]
+
+
+def ensure_columns(conn, table, definitions):
+    """
+    Fehlende Spalten per ALTER TABLE ergänzen. Ohne fehlende Spalten wird keine Abfrage ausgeführt.
+    definitions: Dictionary Spaltenname -> SQL-Typ
+    Returns: Liste der neu angelegten Spalten
+    """
+    existing = available_columns(conn, table)
+    added = [name for name in definitions if name not in existing]
+    if not added:
+        return []
+
+    for name in added:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definitions[name]}")
+    conn.commit()
+    invalidate(conn, table)
+    return added
+
+
+def ensure_index(conn, name, table, columns):
+    """
+    Index anlegen; ein gleichnamiger Index mit anderer Definition wird ersetzt.
+    columns: Spalten bzw. Ausdrücke als SQL-Text
+    Returns: True, wenn der Index neu angelegt wurde
+    """
+    sql = f"CREATE INDEX {name} ON {table} ({columns})"
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()
+    if row is not None and row[0] == sql:
+        return False
+    if row is not None:
+        conn.execute(f"DROP INDEX {name}")
+    conn.execute(sql)
+    return True
+
+
+@lru_cache(maxsize=None)
+def row_mapper(columns):
+    """
+    Vorgefertigte Funktion, die eine Ergebniszeile zu einem Dictionary mit den gegebenen Spalten macht.
+    """
+    columns = tuple(columns)
+    return lambda row: dict(zip(columns, row))
+
+
+@lru_cache(maxsize=None)
+def _by_id_query(table, columns):
+    return f"SELECT {', '.join(columns)} FROM {table} WHERE id = ?"
+
+
+def fetch_by_id(conn, table, columns, row_id, factory=None):
+    """
+    Einen Datensatz über den Primärschlüssel laden: genau eine indizierte Abfrage.
+    factory: Funktion Zeile -> Objekt (Standard: Dictionary mit den angefragten Spalten)
+    Returns: Ergebnis der factory oder None
+    """
+    columns = tuple(columns)
+    row = conn.execute(_by_id_query(table, columns), (row_id,)).fetchone()
+    if row is None:
+        return None
+    return (factory or row_mapper(columns))(row)
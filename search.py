@@ -0,0 +1,286 @@
+import html
+import re
+import sqlite3
+
+import ids
+
+# Durchsuchbare Spalten der Standorte
+LOCATION_SEARCH_COLUMNS = ("standort", "stadt", "alte_nummer", "erfasser")
+
+# Markierung der Fundstellen in snippet(): Steuerzeichen statt HTML, damit der Text selbst
+# erst bei der Anzeige escaped werden kann (highlight_html)
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+_fts5_available = None
+_ready_databases = set()
+
+
+def fts5_available(conn):
+    """
+    Prüfen, ob SQLite mit FTS5 kompiliert wurde.
+    Returns: True, wenn virtuelle FTS5-Tabellen angelegt werden können
+    """
+    global _fts5_available
+    if _fts5_available is None:
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+            conn.execute("DROP TABLE IF EXISTS temp.fts5_probe")
+            _fts5_available = True
+        except sqlite3.OperationalError:
+            _fts5_available = False
+    return _fts5_available
+
+
+def ensure_search_index(conn):
+    """
+    Volltextindex über Standorte und Workflow-Kommentare (auch im Archiv, sobald es existiert)
+    anlegen und per Trigger synchron halten.
+    Die FTS-Tabellen nutzen die Quelltabellen als externen Content (Zuordnung über rowid),
+    der Index speichert also nur die Tokens und keine Kopie der Texte.
+    Ohne FTS5 passiert nichts; search() greift dann auf LIKE zurück.
+    """
+    # Die Treffer der Historie werden über locations.pk zugeordnet
+    ids.ensure_integer_keys(conn)
+    if not fts5_available(conn):
+        return False
+
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('locations_fts', 'history_fts', 'history_archive_fts', "
+        "'workflow_history_archive')"
+    )}
+
+    columns = ", ".join(LOCATION_SEARCH_COLUMNS)
+    new_columns = ", ".join(f"new.{col}" for col in LOCATION_SEARCH_COLUMNS)
+    old_columns = ", ".join(f"old.{col}" for col in LOCATION_SEARCH_COLUMNS)
+
+    if 'locations_fts' not in existing:
+        conn.execute(f'''
+        CREATE VIRTUAL TABLE locations_fts USING fts5(
+            {columns},
+            content='locations', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''')
+        conn.execute("INSERT INTO locations_fts(locations_fts) VALUES ('rebuild')")
+
+    if 'history_fts' not in existing:
+        conn.execute('''
+        CREATE VIRTUAL TABLE history_fts USING fts5(
+            comment,
+            content='workflow_history', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''')
+        conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+
+    # Trigger für Standorte (Update nur, wenn sich durchsuchbare Spalten ändern)
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS locations_fts_insert AFTER INSERT ON locations BEGIN
+        INSERT INTO locations_fts(rowid, {columns}) VALUES (new.rowid, {new_columns});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS locations_fts_delete AFTER DELETE ON locations BEGIN
+        INSERT INTO locations_fts(locations_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns});
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS locations_fts_update AFTER UPDATE OF {columns} ON locations BEGIN
+        INSERT INTO locations_fts(locations_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_columns});
+        INSERT INTO locations_fts(rowid, {columns}) VALUES (new.rowid, {new_columns});
+    END
+    ''')
+
+    # Trigger für die Workflow-Historie
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS history_fts_insert AFTER INSERT ON workflow_history BEGIN
+        INSERT INTO history_fts(rowid, comment) VALUES (new.rowid, new.comment);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS history_fts_delete AFTER DELETE ON workflow_history BEGIN
+        INSERT INTO history_fts(history_fts, rowid, comment) VALUES ('delete', old.rowid, old.comment);
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS history_fts_update AFTER UPDATE OF comment ON workflow_history BEGIN
+        INSERT INTO history_fts(history_fts, rowid, comment) VALUES ('delete', old.rowid, old.comment);
+        INSERT INTO history_fts(rowid, comment) VALUES (new.rowid, new.comment);
+    END
+    ''')
+
+    # Archivierte Kommentare bleiben durchsuchbar; das Archiv wird nur ergänzt, nie geändert
+    if 'workflow_history_archive' in existing:
+        if 'history_archive_fts' not in existing:
+            conn.execute('''
+            CREATE VIRTUAL TABLE history_archive_fts USING fts5(
+                comment,
+                content='workflow_history_archive', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            ''')
+            conn.execute("INSERT INTO history_archive_fts(history_archive_fts) VALUES ('rebuild')")
+        conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS history_archive_fts_insert AFTER INSERT ON workflow_history_archive BEGIN
+            INSERT INTO history_archive_fts(rowid, comment) VALUES (new.rowid, new.comment);
+        END
+        ''')
+
+    conn.commit()
+    return True
+
+
+def _has_archive_index(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_archive_fts'"
+    ).fetchone() is not None
+
+
+# Index komplett neu aufbauen (z.B. nach VACUUM, das die rowids verändern kann)
+def rebuild_search_index(conn):
+    if not ensure_search_index(conn):
+        return False
+    conn.execute("INSERT INTO locations_fts(locations_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO history_fts(history_fts) VALUES ('rebuild')")
+    if _has_archive_index(conn):
+        conn.execute("INSERT INTO history_archive_fts(history_archive_fts) VALUES ('rebuild')")
+    conn.commit()
+    return True
+
+
+# Index pro Datenbankdatei nur einmal je Prozess prüfen/anlegen
+def _index_ready(conn):
+    database = conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+    if database not in _ready_databases or database == ":memory:":
+        if not ensure_search_index(conn):
+            return False
+        _ready_databases.add(database)
+    return True
+
+
+# Benutzereingabe in eine sichere FTS5-Abfrage umwandeln: jedes Wort wird zur Phrase
+# (z.B. "BA-2024-1234" -> "BA 2024 1234"), nur das letzte Wort wird als Präfix gesucht
+def _fts_query(text):
+    phrases = []
+    for word in text.split():
+        tokens = re.findall(r"\w+", word, flags=re.UNICODE)
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"')
+    if phrases:
+        phrases[-1] += "*"
+    return " ".join(phrases)
+
+
+def search(conn, text, limit=20):
+    """
+    Standorte und Workflow-Kommentare nach Relevanz durchsuchen.
+    Returns: Liste von Dictionaries mit location_id, standort, stadt, current_step, quelle, treffer
+             (Fundstellen zwischen MARK_START und MARK_END) und score (Relevanz innerhalb der Quelle, 0..1)
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+
+    if fts5_available(conn) and _index_ready(conn):
+        query = _fts_query(text)
+        if not query:
+            return []
+
+        location_hits = conn.execute('''
+        SELECT l.id, l.standort, l.stadt, l.current_step,
+               snippet(locations_fts, -1, ?, ?, '…', 8), bm25(locations_fts)
+        FROM locations_fts
+        JOIN locations l ON l.rowid = locations_fts.rowid
+        WHERE locations_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        ''', (MARK_START, MARK_END, query, limit)).fetchall()
+
+        history_hits = conn.execute('''
+        SELECT l.id, l.standort, l.stadt, l.current_step,
+               snippet(history_fts, 0, ?, ?, '…', 12), bm25(history_fts)
+        FROM history_fts
+        JOIN workflow_history h ON h.rowid = history_fts.rowid
+        JOIN locations l ON l.pk = h.location_id
+        WHERE history_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        ''', (MARK_START, MARK_END, query, limit)).fetchall()
+
+        archive_hits = []
+        if _has_archive_index(conn):
+            archive_hits = conn.execute('''
+            SELECT l.id, l.standort, l.stadt, l.current_step,
+                   snippet(history_archive_fts, 0, ?, ?, '…', 12), bm25(history_archive_fts)
+            FROM history_archive_fts
+            JOIN workflow_history_archive h ON h.rowid = history_archive_fts.rowid
+            JOIN locations_archive l ON l.pk = h.location_id
+            WHERE history_archive_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            ''', (MARK_START, MARK_END, query, limit)).fetchall()
+    else:
+        # Fallback ohne FTS5: LIKE-Suche, Reihenfolge nach Erfassungsdatum
+        pattern = f"%{text}%"
+        conditions = " OR ".join(f"{col} LIKE ?" for col in LOCATION_SEARCH_COLUMNS)
+        location_hits = conn.execute(f'''
+        SELECT id, standort, stadt, current_step, standort || ', ' || stadt, 0
+        FROM locations
+        WHERE {conditions}
+        ORDER BY created_at DESC
+        LIMIT ?
+        ''', [pattern] * len(LOCATION_SEARCH_COLUMNS) + [limit]).fetchall()
+
+        history_hits = conn.execute('''
+        SELECT l.id, l.standort, l.stadt, l.current_step, h.comment, 0
+        FROM workflow_history h
+        JOIN locations l ON l.pk = h.location_id
+        WHERE h.comment LIKE ?
+        ORDER BY h.timestamp DESC
+        LIMIT ?
+        ''', (pattern, limit)).fetchall()
+
+        archive_hits = []
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'workflow_history_archive'").fetchone():
+            archive_hits = conn.execute('''
+            SELECT l.id, l.standort, l.stadt, l.current_step, h.comment, 0
+            FROM workflow_history_archive h
+            JOIN locations_archive l ON l.pk = h.location_id
+            WHERE h.comment LIKE ?
+            ORDER BY h.timestamp DESC
+            LIMIT ?
+            ''', (pattern, limit)).fetchall()
+
+    # bm25 liefert negative Werte (kleiner ist relevanter), die zwischen den Indizes nicht
+    # vergleichbar sind: je Quelle auf den besten Treffer normiert (1 = bester Treffer der Quelle)
+    results = []
+    for source, hits in (("Standort", location_hits), ("Historie", history_hits), ("Archiv", archive_hits)):
+        best = min((hit[5] for hit in hits), default=0)
+        for location_id, standort, stadt, current_step, snippet, score in hits:
+            results.append({
+                'location_id': location_id,
+                'standort': standort,
+                'stadt': stadt,
+                'current_step': current_step,
+                'quelle': source,
+                'treffer': snippet,
+                'score': score / best if best else 1.0
+            })
+
+    results.sort(key=lambda hit: hit['score'], reverse=True)
+    return results[:limit]
+
+
+def highlight_html(snippet):
+    """
+    Treffertext für st.markdown(unsafe_allow_html=True): Text escaped, nur die Fundstellen fett.
+    """
+    return html.escape(snippet or "").replace(MARK_START, "<b>").replace(MARK_END, "</b>")
+
+
+def plain_text(snippet):
+    """
+    Treffertext ohne Markierungen (z.B. für Tabellen).
+    """
+    return (snippet or "").replace(MARK_START, "").replace(MARK_END, "")
@@ -0,0 +1,168 @@
+"""
+Startzeit-Profil der Streamlit-Seiten auf Basis von `python -X importtime`.
+
+Für jede Seite werden die Imports auf Modulebene (nur diese laufen beim Kaltstart
+garantiert) in einem frischen Interpreter ausgeführt und die Ausgabe von -X importtime
+ausgewertet. streamlit und pandas werden vorab geladen und separat ausgewiesen: alle
+Seiten laufen im selben Server-Prozess und praktisch jede Seite benötigt beide.
+Das Budget gilt für die seitenspezifischen Imports.
+
+Aufruf:
+    python startup_profile.py              # Bericht für alle Seiten
+    python startup_profile.py --check      # Exit-Code 1, wenn eine Seite ihr Budget überschreitet
+    python startup_profile.py --top 10 pages/02_📊_Dashboard.py
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(BASE_DIR, "pages")
+
+# Einstiegspunkt der App plus alle Seiten
+ENTRY_POINTS = ["1_🏠_Home.py"]
+
+# Gemeinsame Basis aller Seiten, vorab geladen und nicht dem Seitenbudget zugerechnet
+PRELOAD = ("streamlit", "pandas")
+
+# Budget in Millisekunden für die seitenspezifischen Imports (nach der Basis)
+DEFAULT_BUDGET_MS = 50
+PAGE_BUDGET_MS = {
+    # plotly.express wird für den Funnel direkt beim Aufbau der Seite gebraucht
+    "02_📊_Dashboard.py": 200,
+}
+
+
+def list_pages():
+    pages = [os.path.join(BASE_DIR, name) for name in ENTRY_POINTS]
+    pages += sorted(
+        os.path.join(PAGES_DIR, name) for name in os.listdir(PAGES_DIR) if name.endswith(".py")
+    )
+    return pages
+
+
+def top_level_imports(path):
+    """
+    Import-Anweisungen auf Modulebene einer Seite als Quelltext.
+    Imports innerhalb von Funktionen oder Zweigen werden bewusst ignoriert (verzögertes Laden).
+    """
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read(), filename=path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def _import_script(statements):
+    # Fehlende optionale Pakete sollen die Messung der übrigen Imports nicht abbrechen
+    lines = []
+    for statement in statements:
+        lines.append("try:")
+        lines.append(f"    {statement}")
+        lines.append("except ImportError as exc:")
+        lines.append("    print('fehlt:', exc.name, file=sys.stderr)")
+    return "import sys\n" + "\n".join(lines) + "\n"
+
+
+def parse_importtime(stderr):
+    """
+    Zeilen der Form 'import time: self [us] | cumulative | imported package' auswerten.
+    Returns: Liste von (modul, tiefe, self_us, cumulative_us) in Ausgabereihenfolge
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Kopfzeile
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(parts[0]), int(parts[1])))
+    return entries
+
+
+def _run(code):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    missing = [line.split(":", 1)[1].strip() for line in result.stderr.splitlines() if line.startswith("fehlt:")]
+    return parse_importtime(result.stderr), missing
+
+
+def _interpreter_modules():
+    # Module, die der Interpreter selbst beim Start lädt (site, encodings, ...)
+    entries, _ = _run("pass")
+    return {name for name, depth, _, _ in entries if depth == 0}
+
+
+def profile_page(path, startup_modules, repeat=3):
+    """
+    Kaltstart einer Seite mehrfach messen (jeweils frischer Prozess), Median verwenden.
+    Returns: Dictionary mit preload_ms, page_ms, modules (seitenspezifisch, absteigend), missing
+    """
+    code = _import_script([f"import {name}" for name in PRELOAD] + top_level_imports(path))
+    preload_runs, page_runs = [], []
+    modules, missing = [], []
+
+    for _ in range(repeat):
+        entries, missing = _run(code)
+        top = [(name, cumulative) for name, depth, _, cumulative in entries
+               if depth == 0 and name not in startup_modules]
+        preload = [(name, us) for name, us in top if name in PRELOAD]
+        page = [(name, us) for name, us in top if name not in PRELOAD]
+        preload_runs.append(sum(us for _, us in preload) / 1000)
+        page_runs.append(sum(us for _, us in page) / 1000)
+        if not modules:
+            modules = page
+
+    return {
+        "preload_ms": statistics.median(preload_runs),
+        "page_ms": statistics.median(page_runs),
+        "modules": sorted(modules, key=lambda item: item[1], reverse=True),
+        "missing": missing,
+    }
+
+
+def budget_for(path):
+    return PAGE_BUDGET_MS.get(os.path.basename(path), DEFAULT_BUDGET_MS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-Zeiten der Streamlit-Seiten beim Kaltstart messen.")
+    parser.add_argument("pages", nargs="*", help="Seiten (Standard: alle)")
+    parser.add_argument("--top", type=int, default=5, help="Anzahl der teuersten Module je Seite")
+    parser.add_argument("--repeat", type=int, default=3, help="Messungen je Seite (Median)")
+    parser.add_argument("--check", action="store_true", help="Mit Exit-Code 1 beenden, wenn ein Budget überschritten wird")
+    args = parser.parse_args(argv)
+
+    pages = [os.path.abspath(page) for page in args.pages] or list_pages()
+    startup_modules = _interpreter_modules()
+    over_budget = []
+
+    for path in pages:
+        result = profile_page(path, startup_modules, repeat=args.repeat)
+        budget = budget_for(path)
+        ok = result["page_ms"] <= budget
+        if not ok:
+            over_budget.append(os.path.basename(path))
+
+        print(f"{'OK  ' if ok else 'ZU LANGSAM'} {os.path.relpath(path, BASE_DIR)}")
+        print(f"     Seite: {result['page_ms']:7.1f} ms (Budget {budget} ms)"
+              f" | Basis ({', '.join(PRELOAD)}): {result['preload_ms']:.1f} ms")
+        for name, us in result["modules"][:args.top]:
+            print(f"     {us / 1000:9.1f} ms  {name}")
+        if result["missing"]:
+            print(f"     nicht installiert: {', '.join(result['missing'])}")
+
+    if over_budget:
+        print(f"\nBudget überschritten: {', '.join(over_budget)}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
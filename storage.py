@@ -0,0 +1,641 @@
+"""
+Speicher-Schnittstelle für den Workflow: Standorte, Historie, Bauantrag, Bau- und
+Fertigstellungsdaten.
+
+Storage beschreibt die Operationen, die die Workflow-Schritte brauchen. Es gibt zwei
+Implementierungen mit demselben Verhalten:
+- SQLiteStorage auf dem bestehenden Schema (werbetraeger.db oder eine neue Datenbank),
+  Abfragen über die Queue- und Primärschlüssel-Indizes, SQL je Spaltenkombination vorbereitet
+- MemoryStorage nur mit Dictionaries und sortierten Listen als Indizes, ohne Datenbankdatei,
+  z.B. für Benchmarks und Tests der Workflow-Logik
+
+check_contract prüft beide gegen denselben Vertrag.
+
+Aufruf:
+    python storage.py --check               # Vertrag für beide Implementierungen prüfen
+    python storage.py --benchmark 20000     # Laufzeiten beider Implementierungen
+"""
+import argparse
+import bisect
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import NamedTuple
+
+import ids
+import numeric_columns
+import records
+import schema
+
+PAGE_SIZE = 25
+
+# Felder, die nur über die jeweiligen Workflow-Schritte geschrieben werden
+BAUANTRAG_FIELDS = ('bauantrag_datum',)
+BUILD_FIELDS = ('plan_date', 'ist_date', 'build_status', 'contractor', 'power_connection')
+COMPLETION_FIELDS = ('completion_date', 'final_inspection', 'network_id', 'dms_id')
+
+# Von außen nicht änderbar (id ist der Schlüssel, version zählt jede Änderung automatisch mit)
+_KEY_FIELDS = ('id', 'version')
+WRITABLE_FIELDS = tuple(field for field in records.LOCATION_FIELDS if field not in _KEY_FIELDS)
+_WRITABLE = frozenset(WRITABLE_FIELDS)
+
+HISTORY_FIELDS = ('id', 'location_id', 'step', 'status', 'comment', 'user', 'timestamp')
+
+
+class HistoryEntry(NamedTuple):
+    id: str
+    location_id: str
+    step: str
+    status: str
+    comment: str
+    user: str
+    timestamp: str
+
+
+def _check_fields(fields, allowed=_WRITABLE):
+    if not allowed.issuperset(fields):
+        unknown = set(fields) - allowed
+        raise ValueError(f"Nicht änderbare oder unbekannte Felder: {', '.join(sorted(unknown))}")
+
+
+def _parse_numbers(values):
+    # Numerische Spalten wie in den Formularen prüfen ("12,5" wird 12.5), damit beide
+    # Implementierungen dieselben Werte annehmen wie die CHECK-Bedingung der Datenbank
+    values = dict(values)
+    for column in numeric_columns.NUMERIC_COLUMNS:
+        if column in values:
+            values[column] = numeric_columns.parse_number(values[column], column)
+    return values
+
+
+class Storage(ABC):
+    """
+    Gemeinsame Schnittstelle. Unterklassen müssen die Grundoperationen implementieren
+    (add_location, get_location, queue, count, update, add_history, history, transaction),
+    die Workflow-Operationen darunter bauen darauf auf.
+
+    update schreibt nur, wenn der Standort existiert und – falls angegeben – die Version und
+    alle Felder in expect dem gespeicherten Stand entsprechen; jede Änderung erhöht version um 1.
+    Numerische Felder (leistungswert) werden wie Formulareingaben geprüft, ungültige Werte
+    lösen ValueError aus. Außerhalb von transaction() ist jede Operation sofort dauerhaft.
+    """
+
+    @abstractmethod
+    def add_location(self, values):
+        """
+        Returns: ID des neuen Standorts (values['id'], sonst eine neue ID)
+        """
+
+    @abstractmethod
+    def get_location(self, location_id):
+        """
+        Returns: records.Location oder None
+        """
+
+    @abstractmethod
+    def queue(self, step, status='active', after=None, limit=PAGE_SIZE):
+        """
+        Standorte eines Schritts, neueste zuerst (created_at, id absteigend; ohne created_at
+        zählt '', solche Standorte kommen also zuletzt).
+        after: (created_at, id) des letzten Standorts der vorherigen Seite
+        Returns: Liste von records.Location
+        """
+
+    @abstractmethod
+    def count(self, step, status='active'):
+        """
+        Returns: Anzahl Standorte eines Schritts
+        """
+
+    @abstractmethod
+    def update(self, location_id, changes, version=None, expect=None):
+        """
+        Returns: True, wenn geschrieben wurde
+        """
+
+    @abstractmethod
+    def add_history(self, location_id, step, status, comment, user, timestamp=None):
+        """
+        Returns: ID des Historieneintrags
+        """
+
+    @abstractmethod
+    def history(self, location_id):
+        """
+        Returns: Liste von HistoryEntry, zeitlich sortiert
+        """
+
+    @abstractmethod
+    def transaction(self):
+        """
+        Kontextmanager: alle Operationen darin werden gemeinsam übernommen oder bei einer
+        Ausnahme gemeinsam verworfen.
+        """
+
+    def transition(self, location_id, step, next_step, status, action, comment, user, version=None):
+        """
+        Workflow-Übergang: Standort von step nach next_step weiterleiten und den
+        Historieneintrag schreiben, beides in einer Transaktion. Steht der Standort nicht mehr
+        in step (oder passt die Version nicht), wird nichts geschrieben.
+        Returns: True bei Erfolg
+        """
+        with self.transaction():
+            if not self.update(location_id, {'status': status, 'current_step': next_step},
+                               version=version, expect={'current_step': step}):
+                return False
+            self.add_history(location_id, step, action, comment, user)
+        return True
+
+    def set_bauantrag(self, location_id, datum, version=None):
+        return self.update(location_id, {'bauantrag_datum': datum}, version=version)
+
+    def set_build_info(self, location_id, version=None, **fields):
+        _check_fields(fields, frozenset(BUILD_FIELDS))
+        return self.update(location_id, fields, version=version)
+
+    def set_completion(self, location_id, version=None, **fields):
+        _check_fields(fields, frozenset(COMPLETION_FIELDS))
+        return self.update(location_id, fields, version=version)
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage auf einer sqlite3-Verbindung mit dem Schema der App.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._depth = 0
+        ensure_schema(conn)
+        self._columns = tuple(field for field in records.LOCATION_FIELDS
+                              if field in schema.available_columns(conn, 'locations'))
+        self._build = records.location_factory(self._columns)
+        select = ", ".join(self._columns)
+        self._sql_get = f"SELECT {select} FROM locations WHERE id = ?"
+        self._sql_first_page = f'''
+        SELECT {select} FROM locations
+        WHERE current_step = ? AND status = ?
+        ORDER BY {schema.QUEUE_SORT_KEY} DESC, id DESC LIMIT ?
+        '''
+        self._sql_next_page = f'''
+        SELECT {select} FROM locations
+        WHERE current_step = ? AND status = ?
+          AND {schema.QUEUE_SORT_KEY} <= ? AND ({schema.QUEUE_SORT_KEY}, id) < (?, ?)
+        ORDER BY {schema.QUEUE_SORT_KEY} DESC, id DESC LIMIT ?
+        '''
+        # location_id verweist auf locations.pk; nach außen gilt wie überall die ID des Standorts
+        self._sql_history = '''
+        SELECT h.id, l.id, h.step, h.status, h.comment, h.user, h.timestamp
+        FROM workflow_history h JOIN locations l ON l.pk = h.location_id
+        WHERE l.id = ? ORDER BY h.timestamp, h.rowid
+        '''
+
+    @classmethod
+    def create(cls, database=':memory:'):
+        return cls(sqlite3.connect(database, check_same_thread=False))
+
+    def _commit(self):
+        if self._depth == 0:
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.rollback()
+            raise
+        self._depth -= 1
+        self._commit()
+
+    def add_location(self, values):
+        _check_fields(set(values) - {'id'})
+        values = _parse_numbers(values)
+        values.setdefault('created_at', datetime.now().isoformat())
+        location_id = values.pop('id', None) or ids.new_id()
+        columns = ('id', *values)
+        self.conn.execute(
+            f"INSERT INTO locations ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            (location_id, *values.values())
+        )
+        self._commit()
+        return location_id
+
+    def get_location(self, location_id):
+        row = self.conn.execute(self._sql_get, (location_id,)).fetchone()
+        return None if row is None else self._build(row)
+
+    def queue(self, step, status='active', after=None, limit=PAGE_SIZE):
+        if after is None:
+            rows = self.conn.execute(self._sql_first_page, (step, status, limit)).fetchall()
+        else:
+            created_at = after[0] or ''
+            rows = self.conn.execute(self._sql_next_page, (step, status, created_at, created_at, after[1], limit)).fetchall()
+        return records.locations_from_rows(self._columns, rows)
+
+    def count(self, step, status='active'):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM locations WHERE current_step = ? AND status = ?", (step, status)
+        ).fetchone()[0]
+
+    def update(self, location_id, changes, version=None, expect=None):
+        _check_fields(changes)
+        _check_fields(expect or {})
+        changes = _parse_numbers(changes)
+        assignments = "".join(f"{field} = ?, " for field in changes)
+        conditions = "".join(f" AND {field} IS ?" for field in expect or {})
+        params = [*changes.values(), location_id, *(expect or {}).values()]
+        if version is not None:
+            conditions += " AND version = ?"
+            params.append(version)
+        cursor = self.conn.execute(
+            f"UPDATE locations SET {assignments}version = version + 1 WHERE id = ?{conditions}", params
+        )
+        self._commit()
+        return cursor.rowcount == 1
+
+    def add_history(self, location_id, step, status, comment, user, timestamp=None):
+        history_id = ids.new_id()
+        self.conn.execute(
+            f"INSERT INTO workflow_history ({', '.join(HISTORY_FIELDS)}) "
+            "VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)",
+            (history_id, location_id, step, status, comment, user, timestamp or datetime.now().isoformat())
+        )
+        self._commit()
+        return history_id
+
+    def history(self, location_id):
+        return [HistoryEntry(*row) for row in self.conn.execute(self._sql_history, (location_id,))]
+
+
+class MemoryStorage(Storage):
+    """
+    Storage ohne Datenbank. Indizes:
+    - Standorte als Dictionary id -> Felder
+    - je (current_step, status) eine sortierte Liste von (created_at, id) für queue/count
+    - je Standort die Historie in zeitlicher Reihenfolge
+    Innerhalb von transaction() wird zu jeder Änderung die Gegenoperation gemerkt.
+    """
+
+    def __init__(self):
+        self._locations = {}
+        self._queues = {}
+        self._history = {}
+        self._undo = None
+
+    def _remember(self, undo):
+        if self._undo is not None:
+            self._undo.append(undo)
+
+    @contextmanager
+    def transaction(self):
+        if self._undo is not None:
+            # Verschachtelt: gehört zur äußeren Transaktion
+            yield self
+            return
+        self._undo = []
+        try:
+            yield self
+        except BaseException:
+            for undo in reversed(self._undo):
+                undo()
+            raise
+        finally:
+            self._undo = None
+
+    @staticmethod
+    def _queue_key(values):
+        return (values['created_at'] or '', values['id'])
+
+    def _index(self, values):
+        bisect.insort(self._queues.setdefault((values['current_step'], values['status']), []), self._queue_key(values))
+
+    def _unindex(self, values):
+        entries = self._queues[(values['current_step'], values['status'])]
+        del entries[bisect.bisect_left(entries, self._queue_key(values))]
+
+    def add_location(self, values):
+        _check_fields(set(values) - {'id'})
+        location = dict.fromkeys(records.LOCATION_FIELDS)
+        location.update(_parse_numbers(values))
+        location['id'] = location['id'] or ids.new_id()
+        location['created_at'] = location['created_at'] or datetime.now().isoformat()
+        location['version'] = 0
+        if location['id'] in self._locations:
+            raise ValueError(f"Standort {location['id']} existiert bereits")
+        self._locations[location['id']] = location
+        self._index(location)
+        self._remember(lambda: (self._unindex(location), self._locations.pop(location['id'])))
+        return location['id']
+
+    def get_location(self, location_id):
+        location = self._locations.get(location_id)
+        return None if location is None else records.Location(**location)
+
+    def queue(self, step, status='active', after=None, limit=PAGE_SIZE):
+        entries = self._queues.get((step, status), [])
+        end = len(entries) if after is None else bisect.bisect_left(entries, (after[0] or '', after[1]))
+        return [records.Location(**self._locations[location_id])
+                for _, location_id in reversed(entries[max(0, end - limit):end])]
+
+    def count(self, step, status='active'):
+        return len(self._queues.get((step, status), ()))
+
+    def update(self, location_id, changes, version=None, expect=None):
+        _check_fields(changes)
+        _check_fields(expect or {})
+        changes = _parse_numbers(changes)
+        location = self._locations.get(location_id)
+        if location is None or (version is not None and location['version'] != version):
+            return False
+        if any(location[field] != value for field, value in (expect or {}).items()):
+            return False
+
+        previous = {field: location[field] for field in (*changes, 'version')}
+        self._unindex(location)
+        location.update(changes)
+        location['version'] += 1
+        self._index(location)
+
+        def undo():
+            self._unindex(location)
+            location.update(previous)
+            self._index(location)
+
+        self._remember(undo)
+        return True
+
+    def add_history(self, location_id, step, status, comment, user, timestamp=None):
+        entry = HistoryEntry(ids.new_id(), location_id, step, status, comment, user,
+                             timestamp or datetime.now().isoformat())
+        entries = self._history.setdefault(location_id, [])
+        # Gleiche Zeitstempel bleiben in Einfügereihenfolge (wie ORDER BY timestamp, rowid)
+        position = bisect.bisect_right(entries, entry.timestamp, key=lambda item: item.timestamp)
+        entries.insert(position, entry)
+        self._remember(lambda: entries.remove(entry))
+        return entry.id
+
+    def history(self, location_id):
+        return list(self._history.get(location_id, ()))
+
+
+def ensure_schema(conn):
+    """
+    Tabellen locations/workflow_history mit allen Spalten der App und den Queue-Index anlegen
+    bzw. fehlende Spalten und den Primärschlüssel pk ergänzen (Daten bleiben unverändert).
+    """
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS locations (
+        id TEXT NOT NULL UNIQUE,
+        erfasser TEXT,
+        datum TEXT,
+        standort TEXT,
+        stadt TEXT,
+        lat REAL,
+        lng REAL,
+        {numeric_columns.column_definition('leistungswert')},
+        eigentuemer TEXT,
+        umruestung BOOLEAN,
+        alte_nummer TEXT,
+        seiten TEXT,
+        vermarktungsform TEXT,
+        status TEXT,
+        current_step TEXT,
+        created_at TEXT,
+        pk INTEGER PRIMARY KEY AUTOINCREMENT
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS workflow_history (
+        id TEXT NOT NULL UNIQUE,
+        location_id INTEGER,
+        step TEXT,
+        status TEXT,
+        comment TEXT,
+        user TEXT,
+        timestamp TEXT,
+        pk INTEGER PRIMARY KEY,
+        FOREIGN KEY (location_id) REFERENCES locations (pk)
+    )
+    ''')
+    ids.ensure_integer_keys(conn)
+    schema.ensure_columns(conn, 'locations', {
+        **{field: 'TEXT' for field in (*BAUANTRAG_FIELDS, *BUILD_FIELDS, *COMPLETION_FIELDS)},
+        'version': 'INTEGER NOT NULL DEFAULT 0',
+    })
+    # Dieselben Indizes wie pagination.ensure_queue_index und aging.ensure_history_index
+    schema.ensure_index(conn, 'idx_locations_queue', 'locations', f"current_step, status, {schema.QUEUE_SORT_KEY}, id")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_history_location_time ON workflow_history (location_id, timestamp)')
+    conn.commit()
+
+
+def check_contract(factory):
+    """
+    Vertrag einer Implementierung prüfen (jede Prüfung auf einem frischen Speicher von factory()).
+    Raises: AssertionError mit der fehlgeschlagenen Prüfung
+    Returns: Anzahl bestandener Prüfungen
+    """
+    checks = 0
+
+    def check(condition, message):
+        nonlocal checks
+        if not condition:
+            raise AssertionError(f"{type(store).__name__}: {message}")
+        checks += 1
+
+    def add(store, name, created_at, step='leiter_akquisition', **values):
+        return store.add_location({'standort': name, 'stadt': 'Köln', 'status': 'active',
+                                   'current_step': step, 'created_at': created_at, **values})
+
+    # Anlegen und Lesen
+    store = factory()
+    location_id = add(store, 'A', '2025-01-01T10:00:00', leistungswert=12.5)
+    location = store.get_location(location_id)
+    check(location is not None and location.standort == 'A', "angelegter Standort nicht lesbar")
+    check(location.leistungswert == 12.5 and location.version == 0, "Werte oder Startversion falsch")
+    check(store.get_location('fehlt') is None, "unbekannte ID liefert nicht None")
+    check(add(store, 'B', '2025-01-01T10:00:00', id='fest') == 'fest', "vorgegebene ID nicht übernommen")
+
+    # Numerische Felder: Eingabeformat wie in den Formularen, keine Texte
+    store = factory()
+    location_id = add(store, 'N', '2025-01-01T10:00:00', leistungswert='1.000,5')
+    check(store.get_location(location_id).leistungswert == 1000.5, "leistungswert nicht als Zahl gespeichert")
+    try:
+        add(store, 'Text', '2025-01-01T11:00:00', leistungswert='viel')
+        check(False, "leistungswert als Text angenommen")
+    except ValueError:
+        checks += 1
+    check(store.count('leiter_akquisition') == 1, "abgelehnter Standort trotzdem angelegt")
+    try:
+        store.update(location_id, {'leistungswert': 'viel'})
+        check(False, "leistungswert per Update als Text angenommen")
+    except ValueError:
+        checks += 1
+    check(store.get_location(location_id).leistungswert == 1000.5 and store.get_location(location_id).version == 0,
+          "abgelehntes Update hat geschrieben")
+
+    # Queue: neueste zuerst, Keyset-Seiten ohne Lücken und Doppelungen
+    store = factory()
+    created = [add(store, f'S{number}', f'2025-01-{number % 9 + 1:02d}T08:00:00') for number in range(30)]
+    add(store, 'anderer Schritt', '2025-02-01T08:00:00', step='ceo')
+    check(store.count('leiter_akquisition') == 30 and store.count('ceo') == 1, "count je Schritt falsch")
+    pages, after = [], None
+    while True:
+        page = store.queue('leiter_akquisition', after=after, limit=7)
+        if not page:
+            break
+        pages.append(page)
+        after = (page[-1].created_at, page[-1].id)
+    seen = [location.id for page in pages for location in page]
+    check(sorted(seen) == sorted(created), "Seiten decken die Queue nicht genau ab")
+    keys = [(location.created_at, location.id) for page in pages for location in page]
+    check(keys == sorted(keys, reverse=True), "Queue nicht absteigend nach (created_at, id) sortiert")
+    check(store.queue('gibt_es_nicht') == [], "leere Queue liefert nicht []")
+
+    # Standorte ohne created_at (Altbestand): zählen als '' und bleiben über Folgeseiten erreichbar
+    undated = created[:3]
+    for location_id in undated:
+        store.update(location_id, {'created_at': None})
+    pages, after = [], None
+    while True:
+        page = store.queue('leiter_akquisition', after=after, limit=7)
+        if not page:
+            break
+        pages.append(page)
+        after = (page[-1].created_at, page[-1].id)
+    seen = [location.id for page in pages for location in page]
+    check(sorted(seen) == sorted(created), "Standorte ohne created_at fehlen in den Seiten")
+    check(sorted(seen[-3:]) == sorted(undated), "Standorte ohne created_at stehen nicht am Ende")
+
+    # Optimistische Updates
+    store = factory()
+    location_id = add(store, 'C', '2025-03-01T08:00:00')
+    check(store.update(location_id, {'contractor': 'Bau GmbH'}, version=0), "Update mit passender Version abgelehnt")
+    check(not store.update(location_id, {'contractor': 'Andere'}, version=0), "Update mit alter Version geschrieben")
+    check(store.get_location(location_id).contractor == 'Bau GmbH', "abgelehntes Update hat geschrieben")
+    check(store.get_location(location_id).version == 1, "Version nicht hochgezählt")
+    check(not store.update(location_id, {'status': 'x'}, expect={'current_step': 'ceo'}), "expect nicht geprüft")
+    check(not store.update('fehlt', {'status': 'x'}), "Update auf unbekannte ID meldet Erfolg")
+    try:
+        store.update(location_id, {'version': 5})
+        check(False, "version ist direkt änderbar")
+    except ValueError:
+        checks += 1
+
+    # Workflow-Übergang mit Historie, Queues folgen dem Schritt
+    store = factory()
+    location_id = add(store, 'D', '2025-04-01T08:00:00')
+    check(store.transition(location_id, 'leiter_akquisition', 'baurecht', 'active', 'approved', 'ok', 'Max'),
+          "Übergang abgelehnt")
+    check(store.count('leiter_akquisition') == 0 and store.count('baurecht') == 1, "Queues nach Übergang falsch")
+    check(not store.transition(location_id, 'leiter_akquisition', 'baurecht', 'active', 'approved', 'ok', 'Max'),
+          "doppelter Übergang geschrieben")
+    entries = store.history(location_id)
+    check([(entry.step, entry.status, entry.user) for entry in entries] == [('leiter_akquisition', 'approved', 'Max')],
+          "Historie des Übergangs falsch")
+    store.add_history(location_id, 'baurecht', 'comment', 'früher', 'Eva', '2025-01-01T00:00:00')
+    check(store.history(location_id)[0].comment == 'früher', "Historie nicht zeitlich sortiert")
+    check(store.history('fehlt') == [], "Historie einer unbekannten ID nicht leer")
+
+    # Transaktionen werden bei Fehlern vollständig verworfen
+    store = factory()
+    location_id = add(store, 'E', '2025-05-01T08:00:00')
+    try:
+        with store.transaction():
+            store.update(location_id, {'current_step': 'ceo'})
+            store.add_history(location_id, 'baurecht', 'approved', '', 'Max')
+            add(store, 'F', '2025-05-02T08:00:00')
+            raise RuntimeError("Abbruch")
+    except RuntimeError:
+        pass
+    check(store.get_location(location_id).current_step == 'leiter_akquisition', "Update nicht zurückgerollt")
+    check(store.get_location(location_id).version == 0, "Version nicht zurückgerollt")
+    check(store.history(location_id) == [] and store.count('leiter_akquisition') == 1, "Einfügungen nicht zurückgerollt")
+    check(store.count('ceo') == 0, "Queue-Index nicht zurückgerollt")
+
+    # Bauantrag, Baudaten, Fertigstellung
+    store = factory()
+    location_id = add(store, 'G', '2025-06-01T08:00:00', step='bauteam')
+    check(store.set_bauantrag(location_id, '2025-06-02'), "Bauantrag nicht gespeichert")
+    check(store.set_build_info(location_id, plan_date='2025-07-01', contractor='Bau GmbH'), "Baudaten nicht gespeichert")
+    check(store.set_completion(location_id, completion_date='2025-08-01', dms_id='DMS-1'), "Fertigstellung nicht gespeichert")
+    location = store.get_location(location_id)
+    check((location.bauantrag_datum, location.plan_date, location.contractor, location.completion_date, location.dms_id)
+          == ('2025-06-02', '2025-07-01', 'Bau GmbH', '2025-08-01', 'DMS-1'), "Schrittdaten falsch gespeichert")
+    check(location.version == 3, "Schrittdaten zählen die Version nicht hoch")
+    try:
+        store.set_build_info(location_id, dms_id='falsche Gruppe')
+        check(False, "Feld einer anderen Gruppe angenommen")
+    except ValueError:
+        checks += 1
+    return checks
+
+
+# Implementierungen für --check und --benchmark
+IMPLEMENTATIONS = {
+    'sqlite': SQLiteStorage.create,
+    'memory': MemoryStorage,
+}
+
+
+def benchmark(factory, rows):
+    """
+    Laufzeiten typischer Workflow-Operationen.
+    Returns: Dictionary Operation -> Sekunden
+    """
+    store = factory()
+    timings = {}
+
+    start = time.perf_counter()
+    with store.transaction():
+        location_ids = [store.add_location({
+            'standort': f'Standort {number}', 'stadt': 'Köln', 'status': 'active',
+            'current_step': 'leiter_akquisition', 'created_at': f'2025-01-01T00:00:{number % 60:02d}.{number:06d}',
+        }) for number in range(rows)]
+    timings['anlegen'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with store.transaction():
+        for location_id in location_ids[::2]:
+            store.transition(location_id, 'leiter_akquisition', 'baurecht', 'active', 'approved', '', 'Benchmark')
+    timings['übergänge'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    after = None
+    while True:
+        page = store.queue('baurecht', after=after)
+        if not page:
+            break
+        after = (page[-1].created_at, page[-1].id)
+    timings['queue blättern'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for location_id in location_ids[:1000]:
+        store.get_location(location_id)
+        store.history(location_id)
+    timings['1000 Detailansichten'] = time.perf_counter() - start
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Speicher-Implementierungen prüfen und vergleichen.")
+    parser.add_argument("--check", action="store_true", help="Vertrag für alle Implementierungen prüfen")
+    parser.add_argument("--benchmark", type=int, metavar="ANZAHL", help="Laufzeiten mit ANZAHL Standorten")
+    args = parser.parse_args(argv)
+
+    if args.check or not args.benchmark:
+        for name, factory in IMPLEMENTATIONS.items():
+            print(f"{name}: {check_contract(factory)} Prüfungen bestanden")
+    if args.benchmark:
+        for name, factory in IMPLEMENTATIONS.items():
+            timings = benchmark(factory, args.benchmark)
+            print(f"{name}: " + ", ".join(f"{operation} {seconds:.3f} s" for operation, seconds in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
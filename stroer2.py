@@ -2,7 +2,11 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import sqlite3
-import uuid
+import ids
+import pagination
+import notifications
+import numeric_columns
+import concurrency
 
 # Verbindung zur Datenbank herstellen
 conn = sqlite3.connect('werbetraeger.db', check_same_thread=False)
@@ -12,14 +16,14 @@ c = conn.cursor()
 def create_tables():
     c.execute('''
     CREATE TABLE IF NOT EXISTS locations (
-        id TEXT PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
         erfasser TEXT,
         datum TEXT,
         standort TEXT,
         stadt TEXT,
         lat REAL,
         lng REAL,
-        leistungswert TEXT,
+        leistungswert REAL CHECK (typeof(leistungswert) IN ('real', 'integer', 'null')),
         eigentuemer TEXT,
         umruestung BOOLEAN,
         alte_nummer TEXT,
@@ -27,25 +31,33 @@ def create_tables():
         vermarktungsform TEXT,
         status TEXT,
         current_step TEXT,
-        created_at TEXT
+        created_at TEXT,
+        pk INTEGER PRIMARY KEY AUTOINCREMENT
     )
     ''')
     
     c.execute('''
     CREATE TABLE IF NOT EXISTS workflow_history (
-        id TEXT PRIMARY KEY,
-        location_id TEXT,
+        id TEXT NOT NULL UNIQUE,
+        location_id INTEGER,
         step TEXT,
         status TEXT,
         comment TEXT,
         user TEXT,
         timestamp TEXT,
-        FOREIGN KEY (location_id) REFERENCES locations (id)
+        pk INTEGER PRIMARY KEY,
+        FOREIGN KEY (location_id) REFERENCES locations (pk)
     )
     ''')
     conn.commit()
 
 create_tables()
+ids.ensure_integer_keys(conn)
+numeric_columns.ensure_numeric_columns(conn)
+pagination.ensure_queue_index(conn)
+notifications.ensure_outbox(conn)
+notifications.start_worker()
+concurrency.ensure_version_column(conn)
 
 # Hauptfunktion
 def main():
@@ -109,17 +121,29 @@ def create_location_form():
         submit = st.form_submit_button("Standort speichern")
         
         if submit:
+            # Leistungswert als Zahl prüfen (leer ist erlaubt)
+            try:
+                leistungswert = numeric_columns.parse_number(leistungswert)
+                leistungswert_error = None
+            except ValueError as e:
+                leistungswert_error = str(e)
+            
             if not name or not standort or not stadt:
                 st.error("Bitte füllen Sie alle Pflichtfelder aus.")
             elif umruestung == "Umrüstung" and not alte_nummer:
                 st.error("Bitte geben Sie die alte Werbeträgernummer an.")
+            elif leistungswert_error:
+                st.error(f"Leistungswert ungültig: {leistungswert_error}")
             elif not uploaded_files:
                 st.error("Bitte laden Sie mindestens ein Bild hoch.")
             else:
                 # Speichern der Daten
-                location_id = str(uuid.uuid4())
+                location_id = ids.new_id()
                 c.execute('''
-                INSERT INTO locations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO locations (id, erfasser, datum, standort, stadt, lat, lng,
+                                      leistungswert, eigentuemer, umruestung, alte_nummer,
+                                      seiten, vermarktungsform, status, current_step, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     location_id, name, datum.isoformat(), standort, stadt, lat, lng,
                     leistungswert, eigentuemer, umruestung == "Umrüstung", alte_nummer,
@@ -128,50 +152,70 @@ def create_location_form():
                 ))
                 
                 # Workflow-History-Eintrag erstellen
-                history_id = str(uuid.uuid4())
+                history_id = ids.new_id()
                 c.execute('''
-                INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+                VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
                 ''', (
                     history_id, location_id, "erfassung", "completed", 
                     "Standort erfasst", name, datetime.now().isoformat()
                 ))
                 
+                notifications.notify_transition(conn, location_id, "leiter_akquisition", f"Neuer Standort erfasst von {name}")
+                
                 conn.commit()
+                pagination.invalidate_queue_counts()
+                notifications.wake_worker()
                 st.success("Standort erfolgreich gespeichert.")
 
+# Spalten der Standortübersicht
+LOCATION_COLUMNS = [
+    'id', 'erfasser', 'datum', 'standort', 'stadt', 'lat', 'lng',
+    'leistungswert', 'eigentuemer', 'umruestung', 'alte_nummer',
+    'seiten', 'vermarktungsform', 'status', 'current_step', 'created_at'
+]
+
 # Funktion zum Anzeigen der Standorte
 def show_locations():
-    c.execute('SELECT * FROM locations')
-    result = c.fetchall()
+    # Filteroptionen direkt aus der Datenbank, statt alle Standorte zu laden
+    c.execute('SELECT DISTINCT status FROM locations WHERE status IS NOT NULL')
+    status_options = [row[0] for row in c.fetchall()]
+    c.execute('SELECT DISTINCT vermarktungsform FROM locations WHERE vermarktungsform IS NOT NULL')
+    form_options = [row[0] for row in c.fetchall()]
     
-    if result:
-        locations_df = pd.DataFrame(result, columns=[
-            'ID', 'Erfasser', 'Datum', 'Standort', 'Stadt', 'Lat', 'Lng',
-            'Leistungswert', 'Eigentümer', 'Umrüstung', 'Alte Nummer',
-            'Seiten', 'Vermarktungsform', 'Status', 'Aktueller Step', 'Erstellt'
-        ])
-        
-        # Filteroptionen
+    if status_options:
         st.sidebar.header("Filter")
         status_filter = st.sidebar.multiselect(
             "Status",
-            options=list(locations_df['Status'].unique()),
-            default=list(locations_df['Status'].unique())
+            options=status_options,
+            default=status_options
         )
         
         form_filter = st.sidebar.multiselect(
             "Vermarktungsform",
-            options=list(locations_df['Vermarktungsform'].unique()),
-            default=list(locations_df['Vermarktungsform'].unique())
+            options=form_options,
+            default=form_options
         )
         
-        filtered_df = locations_df[
-            locations_df['Status'].isin(status_filter) &
-            locations_df['Vermarktungsform'].isin(form_filter)
-        ]
+        where = {'status': status_filter, 'vermarktungsform': form_filter}
+        search = st.text_input("Suche nach Standort oder Stadt", key="locations_search")
+        
+        # Cursor hängt auch von den Filtern ab, damit eine neue Auswahl wieder auf Seite 1 beginnt
+        cursor_key = f"{search}|{sorted(status_filter)}|{sorted(form_filter)}"
+        page = pagination.load_queue_page(
+            conn, LOCATION_COLUMNS, where, pagination.get_cursor("locations", cursor_key), search
+        )
+        total = pagination.count_queue(conn, where, search)
+        
+        filtered_df = pd.DataFrame(page.rows, columns=[
+            'ID', 'Erfasser', 'Datum', 'Standort', 'Stadt', 'Lat', 'Lng',
+            'Leistungswert', 'Eigentümer', 'Umrüstung', 'Alte Nummer',
+            'Seiten', 'Vermarktungsform', 'Status', 'Aktueller Step', 'Erstellt'
+        ])
         
-        st.write(f"{len(filtered_df)} Standorte gefunden")
+        st.write(f"{total} Standorte gefunden")
         st.dataframe(filtered_df, height=400)
+        pagination.render_page_navigation("locations", page, total)
         
         # Details für ausgewählten Standort anzeigen
         selected_id = st.selectbox("Standort-Details anzeigen", filtered_df['ID'].tolist())
@@ -204,7 +248,10 @@ def show_location_details(location_id):
         
         # Workflow-Historie anzeigen
         st.subheader("Workflow-Historie")
-        c.execute('SELECT * FROM workflow_history WHERE location_id = ? ORDER BY timestamp', (location_id,))
+        c.execute('''
+        SELECT id, location_id, step, status, comment, user, timestamp
+        FROM workflow_history WHERE location_id = (SELECT pk FROM locations WHERE id = ?) ORDER BY timestamp
+        ''', (location_id,))
         history = c.fetchall()
         
         if history:
@@ -298,23 +345,31 @@ def process_workflow():
                         next_step = "rejected"
                         workflow_status = "rejected"
                     
-                    # Status in der Datenbank aktualisieren
+                    # Status in der Datenbank aktualisieren, nur wenn der Standort noch im angezeigten Schritt ist
                     c.execute('''
                     UPDATE locations 
-                    SET status = ?, current_step = ? 
-                    WHERE id = ?
-                    ''', (new_status, next_step, selected_id))
+                    SET status = ?, current_step = ?, version = version + 1
+                    WHERE id = ? AND current_step = ?
+                    ''', (new_status, next_step, selected_id, current_step))
+                    if c.rowcount == 0:
+                        st.warning("Der Standort wurde zwischenzeitlich von jemand anderem bearbeitet. Bitte die Ansicht neu laden.")
+                        return
                     
                     # Workflow-Historie aktualisieren
-                    history_id = str(uuid.uuid4())
+                    history_id = ids.new_id()
                     c.execute('''
-                    INSERT INTO workflow_history VALUES (?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO workflow_history (id, location_id, step, status, comment, user, timestamp)
+                VALUES (?, (SELECT pk FROM locations WHERE id = ?), ?, ?, ?, ?, ?)
                     ''', (
                         history_id, selected_id, current_step, workflow_status,
                         kommentar, role, datetime.now().isoformat()
                     ))
                     
+                    notifications.notify_transition(conn, selected_id, next_step, kommentar or workflow_status)
+                    
                     conn.commit()
+                    pagination.invalidate_queue_counts()
+                    notifications.wake_worker()
                     st.success(f"Entscheidung gespeichert. Neuer Status: {new_status}, Nächster Step: {next_step}")
     else:
         st.info(f"Keine Standorte für {role} zur Bearbeitung.")
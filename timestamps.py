@@ -0,0 +1,150 @@
+"""
+Zeitstempel als ganze Zahlen (Sekunden seit 1970) neben den ISO-Texten.
+
+Zu jeder Zeitspalte gibt es eine generierte Spalte <name>_epoch (VIRTUAL, per ALTER TABLE ergänzt).
+SQLite berechnet sie aus dem Text; ein ungültiger Text ergibt NULL. Für die indizierten Spalten
+liegt der Wert fertig im Index. Zeitfilter und Dauerberechnungen vergleichen bzw. subtrahieren
+nur noch Ganzzahlen statt julianday() oder pd.to_datetime.
+
+Die Texte sind lokale Zeit ohne Zeitzone. Die Epoch-Werte behandeln sie wie UTC (so rechnet
+strftime('%s')). Grenzwerte aus Python kommen deshalb von to_epoch, nicht von datetime.timestamp().
+
+Generierte Spalten zählen nicht zu PRAGMA table_info, SELECT-Listen aus schema.table_columns und
+INSERT ohne Spaltenliste bleiben also unverändert.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Tabelle -> Zeitspalten (ISO-Text), zu denen eine Epoch-Spalte angelegt wird
+EPOCH_COLUMNS = {
+    'locations': ('created_at', 'datum', 'plan_date', 'ist_date', 'completion_date'),
+    'workflow_history': ('timestamp',),
+    'locations_archive': ('created_at', 'datum', 'plan_date', 'ist_date', 'completion_date'),
+    'workflow_history_archive': ('timestamp',),
+    'locations_archive_summary': ('created_at',),
+}
+
+# Indizes auf den Epoch-Spalten: Name -> (Tabelle, Spalten)
+EPOCH_INDEXES = {
+    'idx_locations_created_epoch': ('locations', ('created_at_epoch', 'id')),
+    'idx_history_location_epoch': ('workflow_history', ('location_id', 'timestamp_epoch')),
+    'idx_history_step_epoch': ('workflow_history', ('step', 'location_id', 'timestamp_epoch')),
+    'idx_history_archive_location_epoch': ('workflow_history_archive', ('location_id', 'timestamp_epoch')),
+    'idx_archive_summary_created_epoch': ('locations_archive_summary', ('created_at_epoch',)),
+}
+
+DATE_FORMAT = '%d.%m.%Y'
+DATETIME_FORMAT = '%d.%m.%Y, %H:%M Uhr'
+
+SECONDS_PER_DAY = 86400
+
+_ready = set()
+
+
+def epoch_column(column):
+    return f"{column}_epoch"
+
+
+def epoch_expression(column):
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+def add_epoch_columns(conn, table):
+    """
+    Fehlende Epoch-Spalten und -Indizes einer Tabelle ergänzen (nur wenn die Tabelle existiert).
+    Returns: Liste der neu angelegten Spalten
+    """
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+    if not existing:
+        return []
+    added = []
+    for column in EPOCH_COLUMNS[table]:
+        name = epoch_column(column)
+        if column in existing and name not in existing:
+            conn.execute(f'''
+            ALTER TABLE {table} ADD COLUMN {name} INTEGER
+            GENERATED ALWAYS AS ({epoch_expression(column)}) VIRTUAL
+            ''')
+            added.append(name)
+    for index, (index_table, columns) in EPOCH_INDEXES.items():
+        if index_table == table:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({', '.join(columns)})")
+    conn.commit()
+    return added
+
+
+def ensure_epoch_columns(conn):
+    """
+    Epoch-Spalten aller Tabellen einmal pro Prozess und Datenbank prüfen/anlegen.
+    """
+    database = conn.execute("PRAGMA database_list").fetchone()[2] or ":memory:"
+    if database not in _ready or database == ":memory:":
+        for table in EPOCH_COLUMNS:
+            add_epoch_columns(conn, table)
+        _ready.add(database)
+
+
+def to_epoch(value):
+    """
+    datetime bzw. date (lokale Zeit) als Epoch-Sekunden, passend zu den generierten Spalten.
+    """
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return calendar.timegm(value.timetuple())
+
+
+def since(days, now=None):
+    """
+    Grenzwert für Filter der Form <spalte>_epoch >= ? (vor days Tagen).
+    """
+    return to_epoch((now or datetime.now()) - timedelta(days=days))
+
+
+def to_datetimes(values):
+    """
+    Epoch-Sekunden spaltenweise als Datumswerte (lokale Zeit, NULL wird NaT).
+    """
+    return pd.to_datetime(pd.Series(values, dtype='float64'), unit='s')
+
+
+def format_epoch(values, fmt=DATE_FORMAT, missing=''):
+    """
+    Epoch-Sekunden für die Anzeige formatieren (ein vektorisierter Durchlauf, NULL wird missing).
+    Returns: Series mit Texten (Index wie values, falls values eine Series ist)
+    """
+    series = pd.Series(values, dtype='float64')
+    return to_datetimes(series).dt.strftime(fmt).where(series.notna(), missing)
+
+
+def from_epoch(value):
+    """
+    Einzelnen Epoch-Wert als datetime (lokale Zeit), None/NaN bleibt None.
+    """
+    if value is None or pd.isna(value):
+        return None
+    return datetime(1970, 1, 1) + timedelta(seconds=int(value))
+
+
+def format_one(value, fmt=DATE_FORMAT, missing=''):
+    """
+    Einzelnen Epoch-Wert formatieren (z.B. für Metriken und Hinweistexte).
+    """
+    moment = from_epoch(value)
+    return missing if moment is None else moment.strftime(fmt)
+
+
+def days_between(start, end):
+    """
+    Dauer in Tagen zwischen zwei Epoch-Werten bzw. -Spalten.
+    """
+    return (end - start) / SECONDS_PER_DAY
+
+
+def to_date(value):
+    """
+    Epoch-Wert als date (z.B. als Vorgabe für st.date_input), None bleibt None.
+    """
+    moment = from_epoch(value)
+    return None if moment is None else moment.date()
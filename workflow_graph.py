@@ -0,0 +1,294 @@
+import hashlib
+import json
+import math
+import os
+from functools import lru_cache
+
+# Gemeinsame Definition des Workflows der Digitalen Säule
+# (verwendet von Prozessdiagramm, Flowchart.py und 2_Workflow_visualizer_2.py)
+
+# Knoten mit Beschreibungen, Farben und Graphviz-Form
+NODES = {
+    'A': {'label': 'Erfassung durch Akquisiteur',
+          'desc': 'Standortdaten werden erfasst, inklusive spezifischer Merkmale der Digitalen Säule',
+          'color': '#D6EAF8', 'border': '#2E86C1', 'shape': 'box'},
+    'B': {'label': 'Leiter Akquisitionsmanagement',
+          'desc': 'Bewertet und genehmigt/lehnt ab',
+          'color': '#D6EAF8', 'border': '#2E86C1', 'shape': 'box'},
+    'C': {'label': 'Niederlassungsleiter (übersprungen)',
+          'desc': 'Dieser Schritt wird bei der Digitalen Säule übersprungen',
+          'color': '#EBF5FB', 'border': '#85C1E9', 'dash': 'dash', 'shape': 'box'},
+    'D': {'label': 'Baurecht',
+          'desc': 'Bauanträge werden bei der Stadt eingereicht',
+          'color': '#D6EAF8', 'border': '#2E86C1', 'shape': 'box'},
+    'E': {'label': 'Klage/Widerspruch?',
+          'desc': 'Entscheidung, ob bei Ablehnung Widerspruch eingelegt wird',
+          'color': '#FCF3CF', 'border': '#F1C40F', 'shape': 'diamond'},
+    'E1': {'label': 'Klage-/Widerspruchsverfahren',
+           'desc': 'Rechtliches Verfahren nach Ablehnung des Bauantrags',
+           'color': '#FDEBD0', 'border': '#F39C12', 'shape': 'box'},
+    'F': {'label': 'CEO',
+          'desc': 'Finale Genehmigungsstufe durch den CEO',
+          'color': '#D6EAF8', 'border': '#2E86C1', 'shape': 'box'},
+    'G': {'label': 'Bauteam',
+          'desc': 'Umsetzung des Aufbaus, Eingabe von Stromanschluss, PLAN und IST-Aufbaudatum',
+          'color': '#D6EAF8', 'border': '#2E86C1', 'shape': 'box'},
+    'H': {'label': 'Fertigstellung',
+          'desc': 'Werbeträger ist aufgebaut und bereit für die Vermarktung',
+          'color': '#D4EFDF', 'border': '#27AE60', 'shape': 'box'},
+    'X1': {'label': 'Prozess unterbrochen',
+           'desc': 'Prozessabbruch nach Ablehnung durch Leiter Akquisitionsmanagement',
+           'color': '#FADBD8', 'border': '#E74C3C', 'shape': 'ellipse'},
+    'X2': {'label': 'Prozess unterbrochen',
+           'desc': 'Prozessabbruch nach Ablehnung des Bauantrags ohne Widerspruch',
+           'color': '#FADBD8', 'border': '#E74C3C', 'shape': 'ellipse'},
+    'X3': {'label': 'Prozess unterbrochen',
+           'desc': 'Prozessabbruch nach erfolglosem Widerspruchsverfahren',
+           'color': '#FADBD8', 'border': '#E74C3C', 'shape': 'ellipse'},
+    'X4': {'label': 'Prozess unterbrochen',
+           'desc': 'Prozessabbruch nach Ablehnung durch CEO',
+           'color': '#FADBD8', 'border': '#E74C3C', 'shape': 'ellipse'}
+}
+
+# Kanten mit Beschriftung und Darstellung (gestrichelt = übersprungener Standard-Workflow)
+EDGES = [
+    ('A', 'B', {'label': '', 'color': 'gray', 'width': 1}),
+    ('B', 'D', {'label': 'Genehmigung', 'color': '#27AE60', 'width': 1.5}),
+    ('B', 'X1', {'label': 'Ablehnung', 'color': '#E74C3C', 'width': 1.5}),
+    ('D', 'F', {'label': 'Bauantrag genehmigt', 'color': '#27AE60', 'width': 1.5}),
+    ('D', 'E', {'label': 'Bauantrag abgelehnt', 'color': '#E74C3C', 'width': 1.5}),
+    ('E', 'E1', {'label': 'Ja', 'color': '#F39C12', 'width': 1.5}),
+    ('E', 'X2', {'label': 'Nein', 'color': '#E74C3C', 'width': 1.5}),
+    ('E1', 'F', {'label': 'Erfolg', 'color': '#27AE60', 'width': 1.5}),
+    ('E1', 'X3', {'label': 'Misserfolg', 'color': '#E74C3C', 'width': 1.5}),
+    ('F', 'G', {'label': 'Genehmigung', 'color': '#27AE60', 'width': 1.5}),
+    ('F', 'X4', {'label': 'Ablehnung', 'color': '#E74C3C', 'width': 1.5}),
+    ('G', 'H', {'label': 'Aufbau + Stromanschluss', 'color': '#27AE60', 'width': 1.5}),
+    ('B', 'C', {'label': 'Standard-\nWorkflow', 'color': '#85C1E9', 'width': 1, 'dash': 'dash'}),
+    ('C', 'D', {'label': 'Standard-\nWorkflow', 'color': '#85C1E9', 'width': 1, 'dash': 'dash'})
+]
+
+# Feste Positionen für das Plotly-Diagramm
+POSITIONS = {
+    'A': [0, 0],
+    'B': [2.0, 0],
+    'C': [3.5, 0.8],
+    'D': [5.0, 0],
+    'E': [7.0, -0.8],
+    'E1': [8.5, -1.2],
+    'F': [10.0, 0],
+    'G': [12.0, 0],
+    'H': [14.0, 0],
+    'X1': [3.5, -0.8],
+    'X2': [7.0, -1.6],
+    'X3': [10.0, -1.2],
+    'X4': [12.0, -0.8],
+}
+
+GRAPH_NOTE = 'Hinweis: Niederlassungsleiter wird übersprungen'
+
+# Verzeichnis für die serialisierten Diagramme
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'workflow_graph')
+
+
+def definition_hash():
+    """
+    Hash über die komplette Workflow-Definition; ändert sich die Definition, werden die Caches neu gebaut.
+    """
+    payload = json.dumps(
+        {'nodes': NODES, 'edges': EDGES, 'positions': POSITIONS, 'note': GRAPH_NOTE},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def build_networkx_graph():
+    import networkx as nx
+
+    graph = nx.DiGraph()
+    for node, attrs in NODES.items():
+        graph.add_node(node, **attrs)
+    for source, target, attrs in EDGES:
+        graph.add_edge(source, target, **attrs)
+    return graph
+
+
+def build_plotly_figure():
+    """
+    Plotly-Diagramm des Workflows mit Pfeilen, Knoten und Kantenbeschriftungen aufbauen.
+    """
+    import plotly.graph_objects as go
+
+    graph = build_networkx_graph()
+    pos = POSITIONS
+    fig = go.Figure()
+
+    # Schlichte Pfeile: Linie bis kurz vor den Zielknoten plus Pfeilspitze
+    for source, target in graph.edges():
+        x0, y0 = pos[source]
+        x1, y1 = pos[target]
+
+        attrs = graph.edges[source, target]
+        color = attrs['color']
+        width = attrs['width']
+        dash_style = 'dash' if attrs.get('dash') == 'dash' else None
+
+        # Pfeilspitze vor dem Knoten platzieren
+        node_size = 40 if 'X' in target else 60
+        node_radius = node_size / 120
+
+        dx = x1 - x0
+        dy = y1 - y0
+        dist = (dx ** 2 + dy ** 2) ** 0.5
+        if dist > 0:
+            ux, uy = dx / dist, dy / dist
+        else:
+            ux, uy = 0, 0
+
+        arrow_end_x = x1 - ux * node_radius
+        arrow_end_y = y1 - uy * node_radius
+
+        fig.add_trace(go.Scatter(
+            x=[x0, arrow_end_x],
+            y=[y0, arrow_end_y],
+            mode='lines',
+            line=dict(color=color, width=width, dash=dash_style),
+            hoverinfo='none'
+        ))
+
+        if dash_style != 'dash':
+            angle = math.degrees(math.atan2(dy, dx))
+            fig.add_trace(go.Scatter(
+                x=[arrow_end_x],
+                y=[arrow_end_y],
+                mode='markers',
+                marker=dict(
+                    symbol='triangle-right',
+                    size=6 + width,
+                    color=color,
+                    angle=angle,
+                    line=dict(width=0)
+                ),
+                hoverinfo='none'
+            ))
+
+    # Kantentext (die gestrichelten Kanten bleiben im Plotly-Diagramm unbeschriftet)
+    edge_labels, edge_label_x, edge_label_y = [], [], []
+    for source, target in graph.edges():
+        attrs = graph.edges[source, target]
+        if attrs.get('label') and attrs.get('dash') != 'dash':
+            x0, y0 = pos[source]
+            x1, y1 = pos[target]
+            edge_labels.append(attrs['label'])
+            edge_label_x.append((x0 + x1) / 2)
+            edge_label_y.append((y0 + y1) / 2 + 0.1)
+
+    fig.add_trace(go.Scatter(
+        x=[pos[node][0] for node in graph.nodes()],
+        y=[pos[node][1] for node in graph.nodes()],
+        mode='markers+text',
+        text=[NODES[node]['label'] for node in graph.nodes()],
+        textfont=dict(size=14),
+        marker=dict(
+            showscale=False,
+            color=[NODES[node]['color'] for node in graph.nodes()],
+            size=[40 if 'X' in node else 60 for node in graph.nodes()],
+            line_width=[1 if NODES[node].get('dash') == 'dash' else 2 for node in graph.nodes()],
+            line_color=[NODES[node]['border'] for node in graph.nodes()]
+        ),
+        textposition="bottom center",
+        hovertext=[f"{NODES[node]['label']}<br>{NODES[node]['desc']}" for node in graph.nodes()],
+        hoverinfo="text"
+    ))
+
+    if edge_labels:
+        fig.add_trace(go.Scatter(
+            x=edge_label_x,
+            y=edge_label_y,
+            mode="text",
+            text=edge_labels,
+            textfont=dict(size=14),
+            hoverinfo="none"
+        ))
+
+    fig.update_layout(
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=10, l=0, r=0, t=10, pad=0),
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        height=500,
+        plot_bgcolor='rgba(0,0,0,0)',
+        autosize=True
+    )
+    fig.update_xaxes(range=[-1, 15])
+    fig.update_yaxes(range=[-2.0, 1.3])
+    return fig
+
+
+def _dot_quote(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+def build_graphviz_source():
+    """
+    DOT-Quelltext des Workflows (vertikal, farbig) für st.graphviz_chart.
+    Wird direkt als Text erzeugt, dafür ist weder das graphviz-Paket noch die dot-Binary nötig.
+    """
+    lines = ['digraph {', '\trankdir=TB']
+    for node, attrs in NODES.items():
+        label = attrs['label'].replace(' (übersprungen)', '\n(übersprungen)')
+        style = 'dashed,filled' if attrs.get('dash') == 'dash' else 'filled'
+        lines.append(
+            f"\t{node} [label={_dot_quote(label)} shape={attrs['shape']} style={_dot_quote(style)} "
+            f"fillcolor={_dot_quote(attrs['color'])} color={_dot_quote(attrs['border'])}]"
+        )
+    for source, target, attrs in EDGES:
+        options = [f"color={_dot_quote(attrs['color'])}"]
+        if attrs.get('label'):
+            options.append(f"label={_dot_quote(attrs['label'])}")
+        if attrs.get('dash') == 'dash':
+            options.append('style=dashed')
+        else:
+            options.append('penwidth="2.0"')
+        lines.append(f"\t{source} -> {target} [{' '.join(options)}]")
+    # Unsichtbare Kante, damit der übersprungene Schritt neben dem Hauptpfad steht
+    lines.append('\tC -> X1 [style=invis]')
+    lines.append(f'\tlabel={_dot_quote(GRAPH_NOTE)} labelloc=t fontcolor="#3498DB" fontsize=16')
+    lines.append('}')
+    return "\n".join(lines)
+
+
+# Serialisierte Form aus dem Datei-Cache lesen bzw. einmalig erzeugen und ablegen
+def _cached(name, extension, builder):
+    path = os.path.join(CACHE_DIR, f"{name}_{definition_hash()}.{extension}")
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        pass
+
+    content = builder()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Ohne Schreibrechte trotzdem funktionieren, dann nur prozessweit gecacht
+        pass
+    return content
+
+
+@lru_cache(maxsize=1)
+def cached_figure_dict():
+    """
+    Plotly-Figur als Dictionary; wird einmal pro Definition gebaut und als JSON auf Platte gecacht.
+    """
+    return json.loads(_cached('prozessdiagramm', 'json', lambda: build_plotly_figure().to_json()))
+
+
+@lru_cache(maxsize=1)
+def cached_graphviz_source():
+    return _cached('workflow', 'dot', build_graphviz_source)